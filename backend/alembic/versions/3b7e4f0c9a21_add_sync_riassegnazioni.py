@@ -0,0 +1,42 @@
+"""add sync_riassegnazioni for mobile sync tombstones of reassigned records
+
+Revision ID: 3b7e4f0c9a21
+Revises: 9ca05ac2c840
+Create Date: 2026-10-19 21:05:12.480913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e4f0c9a21'
+down_revision: Union[str, Sequence[str], None] = '9ca05ac2c840'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sync_riassegnazioni',
+    sa.Column('entita', sa.String(length=20), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.Column('tecnico_id', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('attivo', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['tecnico_id'], ['tecnici.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_riassegnazioni_id'), 'sync_riassegnazioni', ['id'], unique=False)
+    op.create_index('ix_sync_riassegnazioni_tecnico_created', 'sync_riassegnazioni', ['tecnico_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_riassegnazioni_tecnico_created', table_name='sync_riassegnazioni')
+    op.drop_index(op.f('ix_sync_riassegnazioni_id'), table_name='sync_riassegnazioni')
+    op.drop_table('sync_riassegnazioni')
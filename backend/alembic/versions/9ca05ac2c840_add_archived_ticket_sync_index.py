@@ -0,0 +1,32 @@
+"""add index for archived ticket tombstones in mobile sync
+
+Revision ID: 9ca05ac2c840
+Revises: d806bf1079b8
+Create Date: 2026-10-19 20:12:48.317604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ca05ac2c840'
+down_revision: Union[str, Sequence[str], None] = 'd806bf1079b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # /sync/changes legge i ticket archiviati del tecnico dopo il cursore (archiviato_at, id)
+    op.create_index(
+        'ix_archivio_ticket_tecnico_archiviato', 'ticket',
+        ['tecnico_assegnato_id', 'archiviato_at', 'id'], unique=False, schema='archivio',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_archivio_ticket_tecnico_archiviato', table_name='ticket', schema='archivio')
@@ -0,0 +1,44 @@
+"""add delta sync indexes and client_uuid
+
+Revision ID: a3d7e9c15b42
+Revises: f1c4a8e5d290
+Create Date: 2026-10-19 14:22:07.503918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d7e9c15b42'
+down_revision: Union[str, Sequence[str], None] = 'f1c4a8e5d290'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('interventi_sessioni', sa.Column('client_uuid', sa.String(length=36), nullable=True))
+    op.create_unique_constraint('interventi_sessioni_client_uuid_key', 'interventi_sessioni', ['client_uuid'])
+    op.add_column('interventi_righe', sa.Column('client_uuid', sa.String(length=36), nullable=True))
+    op.create_unique_constraint('interventi_righe_client_uuid_key', 'interventi_righe', ['client_uuid'])
+
+    op.create_index('ix_interventi_tecnico_updated', 'interventi', ['tecnico_id', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_interventi_sessioni_updated', 'interventi_sessioni', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_interventi_righe_updated', 'interventi_righe', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_ticket_tecnico_updated', 'ticket', ['tecnico_assegnato_id', 'updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_ticket_tecnico_updated', table_name='ticket')
+    op.drop_index('ix_interventi_righe_updated', table_name='interventi_righe')
+    op.drop_index('ix_interventi_sessioni_updated', table_name='interventi_sessioni')
+    op.drop_index('ix_interventi_tecnico_updated', table_name='interventi')
+
+    op.drop_constraint('interventi_righe_client_uuid_key', 'interventi_righe', type_='unique')
+    op.drop_column('interventi_righe', 'client_uuid')
+    op.drop_constraint('interventi_sessioni_client_uuid_key', 'interventi_sessioni', type_='unique')
+    op.drop_column('interventi_sessioni', 'client_uuid')
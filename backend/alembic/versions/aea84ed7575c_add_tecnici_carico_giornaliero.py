@@ -0,0 +1,63 @@
+"""add tecnici_carico_giornaliero rollup
+
+Revision ID: aea84ed7575c
+Revises: 74f8d51409bc
+Create Date: 2026-10-19 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'aea84ed7575c'
+down_revision: Union[str, Sequence[str], None] = '74f8d51409bc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tecnici_carico_giornaliero',
+    sa.Column('tecnico_id', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Date(), nullable=False),
+    sa.Column('minuti_lavoro', sa.Integer(), nullable=False),
+    sa.Column('minuti_viaggio', sa.Integer(), nullable=False),
+    sa.Column('km_percorsi', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('sessioni', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('attivo', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['tecnico_id'], ['tecnici.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tecnico_id', 'data', name='uq_tecnici_carico_giornaliero_tecnico_data')
+    )
+    op.create_index(op.f('ix_tecnici_carico_giornaliero_attivo'), 'tecnici_carico_giornaliero', ['attivo'], unique=False)
+    op.create_index(op.f('ix_tecnici_carico_giornaliero_data'), 'tecnici_carico_giornaliero', ['data'], unique=False)
+    op.create_index(op.f('ix_tecnici_carico_giornaliero_id'), 'tecnici_carico_giornaliero', ['id'], unique=False)
+
+    # Backfill dalle sessioni esistenti
+    op.execute("""
+        INSERT INTO tecnici_carico_giornaliero
+            (tecnico_id, data, minuti_lavoro, minuti_viaggio, km_percorsi, sessioni, created_at, updated_at, attivo)
+        SELECT tecnico_id, data,
+               COALESCE(SUM(durata_minuti), 0),
+               COALESCE(SUM(tempo_viaggio_minuti), 0),
+               COALESCE(SUM(km_percorsi), 0),
+               COUNT(id),
+               now(), now(), true
+        FROM interventi_sessioni
+        WHERE attivo = true
+        GROUP BY tecnico_id, data
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_tecnici_carico_giornaliero_id'), table_name='tecnici_carico_giornaliero')
+    op.drop_index(op.f('ix_tecnici_carico_giornaliero_data'), table_name='tecnici_carico_giornaliero')
+    op.drop_index(op.f('ix_tecnici_carico_giornaliero_attivo'), table_name='tecnici_carico_giornaliero')
+    op.drop_table('tecnici_carico_giornaliero')
@@ -0,0 +1,48 @@
+"""add slow_query_log
+
+Revision ID: b8e2f4a61c07
+Revises: a3d7e9c15b42
+Create Date: 2026-10-19 15:06:41.270385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f4a61c07'
+down_revision: Union[str, Sequence[str], None] = 'a3d7e9c15b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('slow_query_log',
+    sa.Column('fingerprint', sa.String(length=16), nullable=False),
+    sa.Column('engine', sa.String(length=20), nullable=False),
+    sa.Column('statement', sa.Text(), nullable=False),
+    sa.Column('parametri', sa.Text(), nullable=True),
+    sa.Column('durata_ms', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('chiamante', sa.String(length=300), nullable=True),
+    sa.Column('route', sa.String(length=200), nullable=True),
+    sa.Column('piano', sa.Text(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('attivo', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_slow_query_log_fingerprint_created', 'slow_query_log', ['fingerprint', 'created_at'], unique=False)
+    op.create_index(op.f('ix_slow_query_log_attivo'), 'slow_query_log', ['attivo'], unique=False)
+    op.create_index(op.f('ix_slow_query_log_id'), 'slow_query_log', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_slow_query_log_id'), table_name='slow_query_log')
+    op.drop_index(op.f('ix_slow_query_log_attivo'), table_name='slow_query_log')
+    op.drop_index('ix_slow_query_log_fingerprint_created', table_name='slow_query_log')
+    op.drop_table('slow_query_log')
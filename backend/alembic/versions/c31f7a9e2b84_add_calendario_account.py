@@ -0,0 +1,55 @@
+"""add calendario_account for external calendar sync
+
+Revision ID: c31f7a9e2b84
+Revises: aea84ed7575c
+Create Date: 2026-10-19 11:02:47.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c31f7a9e2b84'
+down_revision: Union[str, Sequence[str], None] = 'aea84ed7575c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('calendario_account',
+    sa.Column('tecnico_id', sa.Integer(), nullable=False),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('calendar_id', sa.String(length=255), nullable=True),
+    sa.Column('access_token', sa.Text(), nullable=True),
+    sa.Column('refresh_token', sa.Text(), nullable=True),
+    sa.Column('token_scadenza', sa.DateTime(), nullable=True),
+    sa.Column('sync_token', sa.Text(), nullable=True),
+    sa.Column('ultimo_sync', sa.DateTime(), nullable=True),
+    sa.Column('ultimo_export', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('attivo', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['tecnico_id'], ['tecnici.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_calendario_account_attivo'), 'calendario_account', ['attivo'], unique=False)
+    op.create_index(op.f('ix_calendario_account_id'), 'calendario_account', ['id'], unique=False)
+    op.create_index(op.f('ix_calendario_account_tecnico_id'), 'calendario_account', ['tecnico_id'], unique=False)
+    # Lookup degli eventi importati per id esterno
+    op.create_index('ix_calendario_eventi_google_event_id', 'calendario_eventi', ['google_event_id'], unique=False)
+    op.create_index('ix_calendario_eventi_outlook_event_id', 'calendario_eventi', ['outlook_event_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_calendario_eventi_outlook_event_id', table_name='calendario_eventi')
+    op.drop_index('ix_calendario_eventi_google_event_id', table_name='calendario_eventi')
+    op.drop_index(op.f('ix_calendario_account_tecnico_id'), table_name='calendario_account')
+    op.drop_index(op.f('ix_calendario_account_id'), table_name='calendario_account')
+    op.drop_index(op.f('ix_calendario_account_attivo'), table_name='calendario_account')
+    op.drop_table('calendario_account')
@@ -0,0 +1,152 @@
+"""add partial composite indexes on active rows, drop attivo indexes
+
+Revision ID: c6f1a2d94e38
+Revises: b8e2f4a61c07
+Create Date: 2026-10-19 16:05:42.318227
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f1a2d94e38'
+down_revision: Union[str, Sequence[str], None] = 'b8e2f4a61c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (nome, tabella, colonne) - tutti parziali WHERE attivo
+INDICI_ATTIVI = [
+    ('ix_ticket_attivi_created', 'ticket', ['created_at']),
+    ('ix_ticket_attivi_stato_created', 'ticket', ['stato_id', 'created_at']),
+    ('ix_ticket_attivi_tecnico_created', 'ticket', ['tecnico_assegnato_id', 'created_at']),
+    ('ix_ticket_attivi_cliente_created', 'ticket', ['cliente_id', 'created_at']),
+    ('ix_ticket_attivi_chiusura', 'ticket', ['data_chiusura']),
+    ('ix_interventi_attivi_inizio', 'interventi', ['data_inizio']),
+    ('ix_interventi_attivi_tecnico_inizio', 'interventi', ['tecnico_id', 'data_inizio']),
+    ('ix_interventi_attivi_fine', 'interventi', ['data_fine']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY: ticket e interventi restano scrivibili durante la creazione
+    with op.get_context().autocommit_block():
+        for nome, tabella, colonne in INDICI_ATTIVI:
+            op.create_index(
+                nome,
+                tabella,
+                colonne,
+                unique=False,
+                postgresql_where=sa.text('attivo'),
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+    # Coperti da ix_ticket_tecnico_updated / ix_interventi_tecnico_updated (stessa colonna iniziale)
+    op.drop_index(op.f('ix_ticket_tecnico_assegnato_id'), table_name='ticket')
+    op.drop_index(op.f('ix_interventi_tecnico_id'), table_name='interventi')
+
+    # Indici su attivo: quasi tutte le righe sono attive, il planner non li usa
+    op.drop_index(op.f('ix_asset_attivo'), table_name='asset')
+    op.drop_index(op.f('ix_asset_credenziali_attivo'), table_name='asset_credenziali')
+    op.drop_index(op.f('ix_asset_credenziali_accessi_attivo'), table_name='asset_credenziali_accessi')
+    op.drop_index(op.f('ix_asset_storico_attivo'), table_name='asset_storico')
+    op.drop_index(op.f('ix_cache_clienti_attivo'), table_name='cache_clienti')
+    op.drop_index(op.f('ix_cache_contratti_attivo'), table_name='cache_contratti')
+    op.drop_index(op.f('ix_cache_referenti_attivo'), table_name='cache_referenti')
+    op.drop_index(op.f('ix_calendario_account_attivo'), table_name='calendario_account')
+    op.drop_index(op.f('ix_calendario_eventi_attivo'), table_name='calendario_eventi')
+    op.drop_index(op.f('ix_calendario_sync_log_attivo'), table_name='calendario_sync_log')
+    op.drop_index(op.f('ix_calendario_tecnici_attivo'), table_name='calendario_tecnici')
+    op.drop_index(op.f('ix_clienti_portale_attivo'), table_name='clienti_portale')
+    op.drop_index(op.f('ix_interventi_attivo'), table_name='interventi')
+    op.drop_index(op.f('ix_interventi_allegati_attivo'), table_name='interventi_allegati')
+    op.drop_index(op.f('ix_interventi_righe_attivo'), table_name='interventi_righe')
+    op.drop_index(op.f('ix_interventi_sessioni_attivo'), table_name='interventi_sessioni')
+    op.drop_index(op.f('ix_interventi_tecnici_attivo'), table_name='interventi_tecnici')
+    op.drop_index(op.f('ix_kb_articoli_attivo'), table_name='kb_articoli')
+    op.drop_index(op.f('ix_kb_articoli_feedback_attivo'), table_name='kb_articoli_feedback')
+    op.drop_index(op.f('ix_kb_articoli_tags_attivo'), table_name='kb_articoli_tags')
+    op.drop_index(op.f('ix_kb_categorie_attivo'), table_name='kb_categorie')
+    op.drop_index(op.f('ix_kb_tags_attivo'), table_name='kb_tags')
+    op.drop_index(op.f('ix_lookup_canali_richiesta_attivo'), table_name='lookup_canali_richiesta')
+    op.drop_index(op.f('ix_lookup_categorie_attivita_attivo'), table_name='lookup_categorie_attivita')
+    op.drop_index(op.f('ix_lookup_classificazioni_cliente_attivo'), table_name='lookup_classificazioni_cliente')
+    op.drop_index(op.f('ix_lookup_origini_intervento_attivo'), table_name='lookup_origini_intervento')
+    op.drop_index(op.f('ix_lookup_priorita_attivo'), table_name='lookup_priorita')
+    op.drop_index(op.f('ix_lookup_reparti_attivo'), table_name='lookup_reparti')
+    op.drop_index(op.f('ix_lookup_ruoli_utente_attivo'), table_name='lookup_ruoli_utente')
+    op.drop_index(op.f('ix_lookup_stati_cliente_attivo'), table_name='lookup_stati_cliente')
+    op.drop_index(op.f('ix_lookup_stati_intervento_attivo'), table_name='lookup_stati_intervento')
+    op.drop_index(op.f('ix_lookup_stati_ticket_attivo'), table_name='lookup_stati_ticket')
+    op.drop_index(op.f('ix_lookup_tipi_intervento_attivo'), table_name='lookup_tipi_intervento')
+    op.drop_index(op.f('ix_richieste_intervento_attivo'), table_name='richieste_intervento')
+    op.drop_index(op.f('ix_sedi_cliente_attivo'), table_name='sedi_cliente')
+    op.drop_index(op.f('ix_sla_definizioni_attivo'), table_name='sla_definizioni')
+    op.drop_index(op.f('ix_slow_query_log_attivo'), table_name='slow_query_log')
+    op.drop_index(op.f('ix_sync_log_attivo'), table_name='sync_log')
+    op.drop_index(op.f('ix_tecnici_attivo'), table_name='tecnici')
+    op.drop_index(op.f('ix_tecnici_carico_giornaliero_attivo'), table_name='tecnici_carico_giornaliero')
+    op.drop_index(op.f('ix_ticket_attivo'), table_name='ticket')
+    op.drop_index(op.f('ix_ticket_allegati_attivo'), table_name='ticket_allegati')
+    op.drop_index(op.f('ix_ticket_messaggi_attivo'), table_name='ticket_messaggi')
+    op.drop_index(op.f('ix_ticket_note_attivo'), table_name='ticket_note')
+    op.drop_index(op.f('ix_ticket_storico_attivo'), table_name='ticket_storico')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_asset_attivo'), 'asset', ['attivo'], unique=False)
+    op.create_index(op.f('ix_asset_credenziali_attivo'), 'asset_credenziali', ['attivo'], unique=False)
+    op.create_index(op.f('ix_asset_credenziali_accessi_attivo'), 'asset_credenziali_accessi', ['attivo'], unique=False)
+    op.create_index(op.f('ix_asset_storico_attivo'), 'asset_storico', ['attivo'], unique=False)
+    op.create_index(op.f('ix_cache_clienti_attivo'), 'cache_clienti', ['attivo'], unique=False)
+    op.create_index(op.f('ix_cache_contratti_attivo'), 'cache_contratti', ['attivo'], unique=False)
+    op.create_index(op.f('ix_cache_referenti_attivo'), 'cache_referenti', ['attivo'], unique=False)
+    op.create_index(op.f('ix_calendario_account_attivo'), 'calendario_account', ['attivo'], unique=False)
+    op.create_index(op.f('ix_calendario_eventi_attivo'), 'calendario_eventi', ['attivo'], unique=False)
+    op.create_index(op.f('ix_calendario_sync_log_attivo'), 'calendario_sync_log', ['attivo'], unique=False)
+    op.create_index(op.f('ix_calendario_tecnici_attivo'), 'calendario_tecnici', ['attivo'], unique=False)
+    op.create_index(op.f('ix_clienti_portale_attivo'), 'clienti_portale', ['attivo'], unique=False)
+    op.create_index(op.f('ix_interventi_attivo'), 'interventi', ['attivo'], unique=False)
+    op.create_index(op.f('ix_interventi_allegati_attivo'), 'interventi_allegati', ['attivo'], unique=False)
+    op.create_index(op.f('ix_interventi_righe_attivo'), 'interventi_righe', ['attivo'], unique=False)
+    op.create_index(op.f('ix_interventi_sessioni_attivo'), 'interventi_sessioni', ['attivo'], unique=False)
+    op.create_index(op.f('ix_interventi_tecnici_attivo'), 'interventi_tecnici', ['attivo'], unique=False)
+    op.create_index(op.f('ix_kb_articoli_attivo'), 'kb_articoli', ['attivo'], unique=False)
+    op.create_index(op.f('ix_kb_articoli_feedback_attivo'), 'kb_articoli_feedback', ['attivo'], unique=False)
+    op.create_index(op.f('ix_kb_articoli_tags_attivo'), 'kb_articoli_tags', ['attivo'], unique=False)
+    op.create_index(op.f('ix_kb_categorie_attivo'), 'kb_categorie', ['attivo'], unique=False)
+    op.create_index(op.f('ix_kb_tags_attivo'), 'kb_tags', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_canali_richiesta_attivo'), 'lookup_canali_richiesta', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_categorie_attivita_attivo'), 'lookup_categorie_attivita', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_classificazioni_cliente_attivo'), 'lookup_classificazioni_cliente', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_origini_intervento_attivo'), 'lookup_origini_intervento', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_priorita_attivo'), 'lookup_priorita', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_reparti_attivo'), 'lookup_reparti', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_ruoli_utente_attivo'), 'lookup_ruoli_utente', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_stati_cliente_attivo'), 'lookup_stati_cliente', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_stati_intervento_attivo'), 'lookup_stati_intervento', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_stati_ticket_attivo'), 'lookup_stati_ticket', ['attivo'], unique=False)
+    op.create_index(op.f('ix_lookup_tipi_intervento_attivo'), 'lookup_tipi_intervento', ['attivo'], unique=False)
+    op.create_index(op.f('ix_richieste_intervento_attivo'), 'richieste_intervento', ['attivo'], unique=False)
+    op.create_index(op.f('ix_sedi_cliente_attivo'), 'sedi_cliente', ['attivo'], unique=False)
+    op.create_index(op.f('ix_sla_definizioni_attivo'), 'sla_definizioni', ['attivo'], unique=False)
+    op.create_index(op.f('ix_slow_query_log_attivo'), 'slow_query_log', ['attivo'], unique=False)
+    op.create_index(op.f('ix_sync_log_attivo'), 'sync_log', ['attivo'], unique=False)
+    op.create_index(op.f('ix_tecnici_attivo'), 'tecnici', ['attivo'], unique=False)
+    op.create_index(op.f('ix_tecnici_carico_giornaliero_attivo'), 'tecnici_carico_giornaliero', ['attivo'], unique=False)
+    op.create_index(op.f('ix_ticket_attivo'), 'ticket', ['attivo'], unique=False)
+    op.create_index(op.f('ix_ticket_allegati_attivo'), 'ticket_allegati', ['attivo'], unique=False)
+    op.create_index(op.f('ix_ticket_messaggi_attivo'), 'ticket_messaggi', ['attivo'], unique=False)
+    op.create_index(op.f('ix_ticket_note_attivo'), 'ticket_note', ['attivo'], unique=False)
+    op.create_index(op.f('ix_ticket_storico_attivo'), 'ticket_storico', ['attivo'], unique=False)
+
+    op.create_index(op.f('ix_interventi_tecnico_id'), 'interventi', ['tecnico_id'], unique=False)
+    op.create_index(op.f('ix_ticket_tecnico_assegnato_id'), 'ticket', ['tecnico_assegnato_id'], unique=False)
+
+    for nome, tabella, _ in reversed(INDICI_ATTIVI):
+        op.drop_index(nome, table_name=tabella)
@@ -0,0 +1,61 @@
+"""add ticket archive schema partitioned by year
+
+Revision ID: d2b7e5a9c13f
+Revises: c6f1a2d94e38
+Create Date: 2026-10-19 16:48:13.540271
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7e5a9c13f'
+down_revision: Union[str, Sequence[str], None] = 'c6f1a2d94e38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ticket per primo: in downgrade le righe figlie tornano dopo il ticket (FK)
+TABELLE = ['ticket', 'ticket_note', 'ticket_messaggi', 'ticket_storico', 'ticket_allegati']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute('CREATE SCHEMA IF NOT EXISTS archivio')
+
+    # Stesse colonne delle tabelle attive (senza FK né default), partizioni annuali
+    # create dal job di archiviazione al primo ticket di ogni anno
+    for tabella in TABELLE:
+        op.execute(
+            f'CREATE TABLE archivio.{tabella} ('
+            f'LIKE public.{tabella}, '
+            f'archiviato_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, '
+            f'PRIMARY KEY (id, created_at)'
+            f') PARTITION BY RANGE (created_at)'
+        )
+
+    op.create_index('ix_archivio_ticket_numero', 'ticket', ['numero'], unique=False, schema='archivio')
+    op.create_index('ix_archivio_ticket_cliente_created', 'ticket', ['cliente_id', 'created_at'], unique=False, schema='archivio')
+    for tabella in TABELLE[1:]:
+        op.create_index(f'ix_archivio_{tabella}_ticket_id', tabella, ['ticket_id'], unique=False, schema='archivio')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # I ticket archiviati tornano nelle tabelle attive prima di eliminare lo schema
+    conn = op.get_bind()
+    for tabella in TABELLE:
+        colonne = ', '.join(
+            conn.execute(
+                sa.text(
+                    "SELECT column_name FROM information_schema.columns "
+                    "WHERE table_schema = 'public' AND table_name = :tabella ORDER BY ordinal_position"
+                ),
+                {'tabella': tabella},
+            ).scalars()
+        )
+        op.execute(f'INSERT INTO public.{tabella} ({colonne}) SELECT {colonne} FROM archivio.{tabella}')
+
+    op.execute('DROP SCHEMA archivio CASCADE')
@@ -0,0 +1,52 @@
+"""add gist range indexes for availability and overlap checks
+
+Revision ID: d5a8e1f04c37
+Revises: c31f7a9e2b84
+Create Date: 2026-10-19 11:48:05.662930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5a8e1f04c37'
+down_revision: Union[str, Sequence[str], None] = 'c31f7a9e2b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gist: colonna intera (tecnico) nello stesso indice GiST del range
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    # Le espressioni devono restare identiche a quelle in app/repositories/calendar.py
+    op.execute(
+        """
+        CREATE INDEX ix_calendario_eventi_periodo ON calendario_eventi
+        USING gist (tsrange(data_inizio, data_fine, '[)'), tecnico_principale_id)
+        WHERE attivo AND data_fine > data_inizio
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX ix_interventi_sessioni_periodo ON interventi_sessioni
+        USING gist (
+            tsrange(
+                data + ora_inizio,
+                (data + ora_fine) + CASE WHEN (ora_fine <= ora_inizio) THEN interval '1 day' ELSE interval '0' END,
+                '[)'
+            ),
+            tecnico_id
+        )
+        WHERE attivo AND ora_inizio IS NOT NULL AND ora_fine IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_interventi_sessioni_periodo', table_name='interventi_sessioni')
+    op.drop_index('ix_calendario_eventi_periodo', table_name='calendario_eventi')
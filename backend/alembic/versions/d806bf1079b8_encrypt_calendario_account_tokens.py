@@ -0,0 +1,52 @@
+"""encrypt calendario_account OAuth tokens at rest
+
+Revision ID: d806bf1079b8
+Revises: e1a3a6a355f6
+Create Date: 2026-10-19 19:04:37.902115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.security import decrypt_secret, encrypt_secret
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd806bf1079b8'
+down_revision: Union[str, Sequence[str], None] = 'e1a3a6a355f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Le colonne restano TEXT: cambia solo il contenuto (Fernet, EncryptedText)
+account = sa.table(
+    'calendario_account',
+    sa.column('id', sa.Integer),
+    sa.column('access_token', sa.Text),
+    sa.column('refresh_token', sa.Text),
+)
+
+
+def _converti(funzione) -> None:
+    connessione = op.get_bind()
+    righe = connessione.execute(sa.select(account.c.id, account.c.access_token, account.c.refresh_token)).all()
+    for riga in righe:
+        connessione.execute(
+            account.update()
+            .where(account.c.id == riga.id)
+            .values(
+                access_token=funzione(riga.access_token) if riga.access_token else None,
+                refresh_token=funzione(riga.refresh_token) if riga.refresh_token else None,
+            )
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _converti(encrypt_secret)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _converti(decrypt_secret)
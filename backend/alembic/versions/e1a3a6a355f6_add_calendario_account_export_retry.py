@@ -0,0 +1,28 @@
+"""add calendario_account.export_in_sospeso for failed export retries
+
+Revision ID: e1a3a6a355f6
+Revises: d2b7e5a9c13f
+Create Date: 2026-10-19 18:52:11.406318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a3a6a355f6'
+down_revision: Union[str, Sequence[str], None] = 'd2b7e5a9c13f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('calendario_account', sa.Column('export_in_sospeso', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('calendario_account', 'export_in_sospeso')
@@ -0,0 +1,34 @@
+"""add partial index on pending intervention requests
+
+Revision ID: e7b2c9d13f60
+Revises: d5a8e1f04c37
+Create Date: 2026-10-19 12:31:19.204876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c9d13f60'
+down_revision: Union[str, Sequence[str], None] = 'd5a8e1f04c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_richieste_intervento_pendenti',
+        'richieste_intervento',
+        ['priorita_id', 'data_richiesta'],
+        unique=False,
+        postgresql_where=sa.text("stato = 'PENDENTE' AND attivo"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_richieste_intervento_pendenti', table_name='richieste_intervento')
@@ -0,0 +1,30 @@
+"""add coordinates to sedi_cliente
+
+Revision ID: f1c4a8e5d290
+Revises: e7b2c9d13f60
+Create Date: 2026-10-19 13:40:52.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4a8e5d290'
+down_revision: Union[str, Sequence[str], None] = 'e7b2c9d13f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sedi_cliente', sa.Column('latitudine', sa.Numeric(precision=10, scale=6), nullable=True))
+    op.add_column('sedi_cliente', sa.Column('longitudine', sa.Numeric(precision=10, scale=6), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sedi_cliente', 'longitudine')
+    op.drop_column('sedi_cliente', 'latitudine')
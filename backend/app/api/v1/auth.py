@@ -1,11 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
 from app.database import get_db
 from app.models.user import Tecnico
-from app.core.security import verify_password, create_access_token, create_refresh_token, decode_token
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password_async,
+)
+from app.core.throttle import login_throttle
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -58,7 +66,8 @@ async def get_current_user(
     )
 
     payload = decode_token(token)
-    if payload is None:
+    # I ticket SSE aprono solo lo stream degli eventi
+    if payload is None or payload.get("type") == "sse":
         raise credentials_exception
 
     username: str = payload.get("sub")
@@ -74,21 +83,39 @@ async def get_current_user(
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    """Login endpoint"""
+    """Login endpoint (429 after too many failed attempts per username or IP)"""
+    ip = request.client.host if request.client else None
+
+    attesa = await login_throttle.bloccato(form_data.username, ip)
+    if attesa:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Troppi tentativi di accesso, riprovare più tardi",
+            headers={"Retry-After": str(attesa)},
+        )
+
     user = db.query(Tecnico).filter(
         Tecnico.username == form_data.username,
         Tecnico.attivo == True
     ).first()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Verifica bcrypt fuori dal loop; senza utente si verifica un hash fittizio (stessi tempi)
+    if not await verify_password_async(form_data.password, user.hashed_password if user else None):
+        await login_throttle.fallito(form_data.username, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    await login_throttle.riuscito(form_data.username)
+
+    # Hash con un costo diverso da PASSWORD_BCRYPT_ROUNDS: aggiornato ora che la password è nota
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(form_data.password)
 
     # Update last login
     user.ultimo_login = datetime.utcnow()
@@ -0,0 +1,73 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+
+from app.database import get_db_read
+from app.api.v1.auth import get_current_user
+from app.models.user import Tecnico
+from app.repositories.billing import BillingRepository, RAGGRUPPAMENTI_ORE
+from app.schemas.billing import OreAggregatoResponse, ImportiResponse
+
+router = APIRouter()
+
+
+@router.get("/ore", response_model=OreAggregatoResponse)
+async def get_ore_aggregate(
+    raggruppa: str = Query("cliente", description=", ".join(RAGGRUPPAMENTI_ORE)),
+    data_from: Optional[date] = None,
+    data_to: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    contratto_id: Optional[int] = None,
+    db: Session = Depends(get_db_read),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Hours worked grouped by intervention, contract, client, technician or month"""
+    repo = BillingRepository(db)
+
+    try:
+        righe = repo.get_ore(
+            raggruppa=raggruppa,
+            data_from=data_from,
+            data_to=data_to,
+            cliente_id=cliente_id,
+            tecnico_id=tecnico_id,
+            contratto_id=contratto_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return OreAggregatoResponse(
+        raggruppa=raggruppa,
+        totale_ore=round(sum(r["ore"] for r in righe), 2),
+        righe=righe,
+    )
+
+
+@router.get("/importi", response_model=ImportiResponse)
+async def get_importi(
+    data_from: Optional[date] = None,
+    data_to: Optional[date] = None,
+    cliente_id: Optional[int] = None,
+    contratto_id: Optional[int] = None,
+    solo_completati: bool = True,
+    db: Session = Depends(get_db_read),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Amounts per intervention for billing (date range on completion date)"""
+    repo = BillingRepository(db)
+
+    interventi = repo.get_importi_interventi(
+        data_from=data_from,
+        data_to=data_to,
+        cliente_id=cliente_id,
+        contratto_id=contratto_id,
+        solo_completati=solo_completati,
+    )
+
+    return ImportiResponse(
+        totale_importo=round(sum(i["importo_totale"] for i in interventi), 2),
+        totale_fatturabile=round(sum(i["importo_fatturabile"] for i in interventi), 2),
+        interventi=interventi,
+    )
@@ -0,0 +1,322 @@
+import secrets
+from fastapi import APIRouter, BackgroundTasks, Cookie, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime, timedelta
+from pydantic import BaseModel, Field
+
+from app.database import get_db
+from app.api.v1.auth import get_current_user
+from app.core.config import settings
+from app.core.exceptions import SyncException
+from app.core.security import create_oauth_state, decode_token
+from app.models.calendar import CalendarioAccount, CalendarioSyncLog
+from app.models.user import Tecnico
+from app.repositories.calendar import CalendarRepository
+
+router = APIRouter()
+
+# Cookie con il nonce dello state OAuth, inviato solo ai callback
+OAUTH_NONCE_COOKIE = "calendar_oauth_nonce"
+OAUTH_NONCE_PATH = "/api/v1/calendar/sync"
+
+_sync_engine = None
+
+
+def get_sync_engine():
+    """Calendar sync engine, imported on first use (httpx and provider clients)"""
+    global _sync_engine
+    if _sync_engine is None:
+        from app.services.calendar_sync import CalendarSyncEngine
+
+        _sync_engine = CalendarSyncEngine()
+    return _sync_engine
+
+
+# Schemas
+class AuthorizeResponse(BaseModel):
+    authorize_url: str
+
+
+class CalendarAccountResponse(BaseModel):
+    id: int
+    tecnico_id: int
+    provider: str
+    calendar_id: Optional[str] = None
+    ultimo_sync: Optional[datetime] = None
+    ultimo_export: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncRequest(BaseModel):
+    tecnico_id: Optional[int] = None
+
+
+class SyncStartedResponse(BaseModel):
+    message: str
+    tecnico_id: Optional[int] = None
+
+
+class SyncLogResponse(BaseModel):
+    id: int
+    tecnico_id: int
+    provider: str
+    direzione: Optional[str] = None
+    eventi_sincronizzati: Optional[int] = None
+    eventi_errori: Optional[int] = None
+    errore: Optional[str] = None
+    dettagli: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class EventoCreate(BaseModel):
+    titolo: str = Field(..., max_length=200)
+    descrizione: Optional[str] = None
+    luogo: Optional[str] = Field(None, max_length=255)
+    data_inizio: datetime
+    data_fine: datetime
+    tipo_intervento_id: Optional[int] = None
+    cliente_id: Optional[int] = None
+    richiesta_id: Optional[int] = None
+    intervento_id: Optional[int] = None
+    tecnico_principale_id: int
+    tecnici_ids: List[int] = []
+    stato: str = "PIANIFICATO"
+    colore: Optional[str] = Field(None, max_length=7)
+    promemoria_minuti: int = 30
+    note: Optional[str] = None
+
+
+class EventoResponse(BaseModel):
+    id: int
+    titolo: str
+    descrizione: Optional[str] = None
+    luogo: Optional[str] = None
+    data_inizio: datetime
+    data_fine: datetime
+    tipo_intervento_id: Optional[int] = None
+    cliente_id: Optional[int] = None
+    richiesta_id: Optional[int] = None
+    intervento_id: Optional[int] = None
+    tecnico_principale_id: int
+    stato: Optional[str] = None
+    colore: Optional[str] = None
+    promemoria_minuti: Optional[int] = None
+    note: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class Slot(BaseModel):
+    inizio: datetime
+    fine: datetime
+
+
+class DisponibilitaTecnico(BaseModel):
+    tecnico_id: int
+    nome_completo: str
+    libero_intero_periodo: bool
+    minuti_liberi: int
+    occupato: List[Slot]
+    libero: List[Slot]
+
+
+class AvailabilityResponse(BaseModel):
+    data_from: datetime
+    data_to: datetime
+    tecnici: List[DisponibilitaTecnico]
+
+
+def _provider_code(provider: str) -> str:
+    from app.services.calendar_sync import PROVIDERS
+
+    codice = provider.upper()
+    if codice not in PROVIDERS:
+        raise HTTPException(status_code=404, detail=f"Provider non supportato: {provider}")
+    return codice
+
+
+@router.get("/availability", response_model=AvailabilityResponse)
+async def get_availability(
+    data_from: datetime = Query(..., alias="from"),
+    data_to: datetime = Query(..., alias="to"),
+    reparto_id: Optional[int] = None,
+    solo_orario_lavoro: bool = True,
+    durata_minima: int = Query(0, ge=0, description="Durata minima slot liberi (minuti)"),
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Free/busy slots of all technicians (events and work sessions)"""
+    if data_to <= data_from:
+        raise HTTPException(status_code=400, detail="Il parametro 'to' deve essere successivo a 'from'")
+    if data_to - data_from > timedelta(days=93):
+        raise HTTPException(status_code=400, detail="Periodo massimo 3 mesi")
+
+    repo = CalendarRepository(db)
+    return AvailabilityResponse(
+        data_from=data_from,
+        data_to=data_to,
+        tecnici=repo.get_availability(
+            data_from,
+            data_to,
+            reparto_id=reparto_id,
+            solo_orario_lavoro=solo_orario_lavoro,
+            durata_minima_minuti=durata_minima,
+        ),
+    )
+
+
+@router.post("/events", response_model=EventoResponse, status_code=201)
+async def create_calendar_event(
+    evento_data: EventoCreate,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Create a calendar event (409 if an assigned technician is already busy)"""
+    repo = CalendarRepository(db)
+
+    try:
+        return repo.create_evento(evento_data.model_dump(exclude={"tecnici_ids"}), evento_data.tecnici_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/sync/accounts", response_model=List[CalendarAccountResponse])
+async def list_calendar_accounts(
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Connected external calendars of the current user"""
+    return db.query(CalendarioAccount).filter(
+        CalendarioAccount.tecnico_id == current_user.id,
+        CalendarioAccount.attivo == True,
+    ).all()
+
+
+@router.get("/sync/{provider}/authorize", response_model=AuthorizeResponse)
+async def authorize_calendar(
+    provider: str,
+    response: Response,
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """
+    OAuth consent URL to connect the user's Google or Outlook calendar.
+    The flow must be completed in the same browser (nonce cookie).
+    """
+    codice = _provider_code(provider)
+    # Lo state lega il callback all'utente che ha avviato il collegamento, il
+    # cookie al browser: un link di consenso altrui non collega il proprio calendario
+    nonce = secrets.token_urlsafe(32)
+    state = create_oauth_state(f"{current_user.id}:{codice}", nonce)
+    response.set_cookie(
+        OAUTH_NONCE_COOKIE,
+        nonce,
+        max_age=600,
+        path=OAUTH_NONCE_PATH,
+        httponly=True,
+        secure=not settings.DEBUG,
+        samesite="lax",
+    )
+
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        return AuthorizeResponse(authorize_url=get_sync_engine().provider(codice, client).authorize_url(state))
+
+
+@router.get("/sync/{provider}/callback", response_model=CalendarAccountResponse)
+async def calendar_callback(
+    provider: str,
+    code: str,
+    state: str,
+    response: Response,
+    oauth_nonce: Optional[str] = Cookie(None, alias=OAUTH_NONCE_COOKIE),
+    db: Session = Depends(get_db),
+):
+    """OAuth redirect target: exchange the code and store the account tokens"""
+    codice = _provider_code(provider)
+
+    payload = decode_token(state)
+    if (
+        payload is None
+        or payload.get("type") != "oauth_state"
+        or ":" not in payload.get("sub", "")
+        or not oauth_nonce
+        or not secrets.compare_digest(str(payload.get("nonce", "")), oauth_nonce)
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="State non valido o scaduto")
+    tecnico_id, state_provider = payload["sub"].split(":", 1)
+    if state_provider != codice:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="State non valido o scaduto")
+    response.delete_cookie(OAUTH_NONCE_COOKIE, path=OAUTH_NONCE_PATH)
+
+    import httpx
+
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            access_token, refresh_token, scadenza = await get_sync_engine().provider(codice, client).exchange_code(code)
+    except SyncException as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=e.message)
+
+    account = db.query(CalendarioAccount).filter(
+        CalendarioAccount.tecnico_id == int(tecnico_id),
+        CalendarioAccount.provider == codice,
+    ).first()
+
+    if account is None:
+        account = CalendarioAccount(tecnico_id=int(tecnico_id), provider=codice)
+        db.add(account)
+
+    account.access_token = access_token
+    account.refresh_token = refresh_token or account.refresh_token
+    account.token_scadenza = scadenza
+    account.attivo = True
+    db.commit()
+    db.refresh(account)
+
+    return account
+
+
+@router.post("/sync", response_model=SyncStartedResponse, status_code=status.HTTP_202_ACCEPTED)
+async def start_calendar_sync(
+    background_tasks: BackgroundTasks,
+    data: Optional[SyncRequest] = None,
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """
+    Start an incremental two-way sync in the background.
+
+    Admins can sync every connected technician (or one with `tecnico_id`);
+    other users only their own calendars.
+    """
+    tecnico_id = data.tecnico_id if data else None
+    if not current_user.is_admin:
+        tecnico_id = current_user.id
+
+    background_tasks.add_task(get_sync_engine().sync_all, tecnico_id)
+
+    return SyncStartedResponse(message="Sincronizzazione calendari avviata", tecnico_id=tecnico_id)
+
+
+@router.get("/sync/log", response_model=List[SyncLogResponse])
+async def get_calendar_sync_log(
+    tecnico_id: Optional[int] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Latest calendar sync runs"""
+    if not current_user.is_admin:
+        tecnico_id = current_user.id
+
+    query = db.query(CalendarioSyncLog)
+    if tecnico_id:
+        query = query.filter(CalendarioSyncLog.tecnico_id == tecnico_id)
+
+    return query.order_by(CalendarioSyncLog.created_at.desc()).limit(min(limit, 500)).all()
@@ -2,8 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_db_read
 from app.api.v1.auth import get_current_user
+from app.core.responses import model_response
 from app.models.user import Tecnico
 from app.repositories.client import ClientRepository
 from app.schemas.client import (
@@ -23,7 +24,7 @@ async def get_clients(
     limit: int = Query(20, ge=1, le=100),
     search: Optional[str] = None,
     attivo: Optional[bool] = Query(None),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get list of clients with pagination and filters"""
@@ -37,18 +38,16 @@ async def get_clients(
         attivo=attivo,
     )
 
-    return ClienteListResponse(
-        total=total,
-        page=page,
-        limit=limit,
-        clienti=[ClienteResponse.model_validate(c) for c in clienti],
+    return model_response(
+        ClienteListResponse,
+        {"total": total, "page": page, "limit": limit, "clienti": clienti},
     )
 
 
 @router.get("/{cliente_id}", response_model=ClienteDetailResponse)
 async def get_client(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get client details with contracts and contacts"""
@@ -81,7 +80,7 @@ async def get_client(
 @router.get("/{cliente_id}/contratti", response_model=list[ContrattoResponse])
 async def get_client_contracts(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get all contracts for a client"""
@@ -99,7 +98,7 @@ async def get_client_contracts(
 @router.get("/{cliente_id}/referenti", response_model=list[ReferenteResponse])
 async def get_client_contacts(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get all contacts for a client"""
@@ -117,7 +116,7 @@ async def get_client_contacts(
 @router.get("/{cliente_id}/stats")
 async def get_client_stats(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get statistics for a client"""
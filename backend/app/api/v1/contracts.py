@@ -6,7 +6,9 @@ from decimal import Decimal
 from app.database import get_db
 from app.models.client import CacheContratti, CacheClienti, SLADefinizione
 from app.api.v1.auth import get_current_user
+from app.core.responses import model_response
 from app.models.user import Tecnico
+from app.repositories.billing import BillingRepository
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -143,11 +145,9 @@ async def get_contracts(
         CacheContratti.data_inizio.desc()
     ).offset(offset).limit(limit).all()
 
-    return ContractListResponse(
-        items=items,
-        total=total,
-        page=page,
-        limit=limit
+    return model_response(
+        ContractListResponse,
+        {"items": items, "total": total, "page": page, "limit": limit},
     )
 
 
@@ -282,22 +282,4 @@ async def get_contract_stats_by_client(
     current_user: Tecnico = Depends(get_current_user)
 ):
     """Get contract statistics for a specific client"""
-    contracts = db.query(CacheContratti).filter(
-        CacheContratti.cliente_id == cliente_id,
-        CacheContratti.attivo == True
-    ).all()
-
-    total_contracts = len(contracts)
-    active_contracts = len([c for c in contracts if c.attivo_gestionale])
-    total_ore_incluse = sum([float(c.ore_incluse or 0) for c in contracts])
-    total_ore_utilizzate = sum([float(c.ore_utilizzate or 0) for c in contracts])
-    ore_residue = total_ore_incluse - total_ore_utilizzate
-
-    return {
-        "total_contracts": total_contracts,
-        "active_contracts": active_contracts,
-        "total_ore_incluse": total_ore_incluse,
-        "total_ore_utilizzate": total_ore_utilizzate,
-        "ore_residue": ore_residue,
-        "percentuale_utilizzo": (total_ore_utilizzate / total_ore_incluse * 100) if total_ore_incluse > 0 else 0
-    }
+    return BillingRepository(db).get_contract_stats(cliente_id)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db_read
 from app.api.v1.auth import get_current_user
 from app.models.user import Tecnico
 from app.repositories.dashboard import DashboardRepository
@@ -18,7 +18,7 @@ router = APIRouter()
 
 @router.get("", response_model=DashboardResponse)
 async def get_dashboard(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_read),
     current_user: Tecnico = Depends(get_current_user),
 ):
     """Get dashboard aggregated statistics"""
@@ -57,8 +57,8 @@ async def get_dashboard(
             numero=i.numero,
             cliente_ragione_sociale=i.cliente.ragione_sociale if i.cliente else "",
             oggetto=i.oggetto,
-            tipo_descrizione=i.tipo.descrizione if i.tipo else "",
-            tipo_richiede_viaggio=i.tipo.richiede_viaggio if i.tipo else False,
+            tipo_descrizione=i.tipo_intervento.descrizione if i.tipo_intervento else "",
+            tipo_richiede_viaggio=i.tipo_intervento.richiede_viaggio if i.tipo_intervento else False,
             stato_codice=i.stato.codice if i.stato else "",
             stato_descrizione=i.stato.descrizione if i.stato else "",
             data_inizio=i.data_inizio,
@@ -0,0 +1,132 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.api.v1.auth import get_current_user
+from app.models.user import Tecnico
+from app.repositories.dispatch import DispatchRepository
+from app.schemas.dispatch import (
+    DispatchQueueResponse,
+    RichiestaDispatch,
+    DispatchAssign,
+    DispatchAssignResponse,
+    ScheduleRequest,
+    ScheduleResponse,
+    ScheduleConfirm,
+)
+from app.services.dispatch import dispatch_queue
+
+router = APIRouter()
+
+
+@router.get("/queue", response_model=DispatchQueueResponse)
+async def get_dispatch_queue(
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    cliente_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    priorita_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Pending intervention requests ranked by priority, SLA deadline and waiting time"""
+    dispatch_queue.refresh(DispatchRepository(db).load_pending)
+
+    totale, richieste = dispatch_queue.top(
+        limit=limit,
+        offset=offset,
+        cliente_id=cliente_id,
+        tecnico_id=tecnico_id,
+        priorita_id=priorita_id,
+    )
+    return DispatchQueueResponse(totale=totale, richieste=richieste)
+
+
+@router.get("/next", response_model=Optional[RichiestaDispatch])
+async def get_next_request(
+    tecnico_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Highest ranked pending request (optionally among those requested for a technician)"""
+    dispatch_queue.refresh(DispatchRepository(db).load_pending)
+
+    _, richieste = dispatch_queue.top(limit=1, tecnico_id=tecnico_id)
+    return richieste[0] if richieste else None
+
+
+@router.post("/schedule", response_model=ScheduleResponse)
+async def schedule_pending_requests(
+    data: ScheduleRequest,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """
+    Propose a plan for all pending requests over the period, minimizing travel
+    while respecting priorities and SLA. Results are saved as draft (BOZZA)
+    calendar events replacing the previous proposal; use salva_bozze=false
+    for a simulation.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Solo gli admin possono pianificare le richieste")
+    if data.data_to < data.data_from:
+        raise HTTPException(status_code=400, detail="data_to deve essere successiva a data_from")
+    if (data.data_to - data.data_from).days > 31:
+        raise HTTPException(status_code=400, detail="Periodo massimo 31 giorni")
+
+    # Import differito: numpy serve solo alla pianificazione
+    from app.services.scheduler import pianifica_richieste
+
+    return pianifica_richieste(
+        db,
+        data.data_from,
+        data.data_to,
+        reparto_id=data.reparto_id,
+        salva_bozze=data.salva_bozze,
+    )
+
+
+@router.post("/schedule/confirm", response_model=dict)
+async def confirm_schedule(
+    data: ScheduleConfirm,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Confirm draft events (all or the given ones): requests become PIANIFICATA"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Solo gli admin possono confermare la pianificazione")
+
+    confermate = DispatchRepository(db).confirm_bozze(data.evento_ids)
+    dispatch_queue.invalidate()
+
+    return {"confermate": confermate, "message": "Pianificazione confermata"}
+
+
+@router.post("/{richiesta_id}/assign", response_model=DispatchAssignResponse)
+async def assign_request(
+    richiesta_id: int,
+    data: DispatchAssign,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Schedule a pending request on a technician's calendar (409 on overlap)"""
+    repo = DispatchRepository(db)
+
+    richiesta = repo.get_by_id(richiesta_id)
+    if not richiesta:
+        raise HTTPException(status_code=404, detail="Richiesta non trovata")
+
+    try:
+        evento = repo.assign(richiesta, data.tecnico_id, data.data_inizio, data.data_fine, data.tecnici_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    dispatch_queue.invalidate(richiesta_id=richiesta.id)
+
+    return DispatchAssignResponse(
+        richiesta_id=richiesta.id,
+        evento_id=evento.id,
+        tecnico_id=data.tecnico_id,
+        message="Richiesta pianificata con successo",
+    )
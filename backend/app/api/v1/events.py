@@ -0,0 +1,133 @@
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional
+
+from app.api.v1.auth import get_current_user
+from app.core.config import settings
+from app.core.events import event_broker
+from app.core.security import create_sse_ticket, decode_token
+from app.database import SessionLocal
+from app.models.user import Tecnico
+
+router = APIRouter()
+
+
+class EventsTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+def _authenticate(request: Request, ticket: Optional[str]) -> Tecnico:
+    """
+    Resolve the user from the Authorization header (access token) or the
+    `ticket` query parameter (EventSource cannot send custom headers).
+    """
+    payload = None
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        payload = decode_token(authorization[7:])
+        if payload and payload.get("type") is not None:
+            payload = None
+    elif ticket:
+        # In query string solo ticket SSE: finiscono nei log di accesso
+        payload = decode_token(ticket)
+        if payload and payload.get("type") != "sse":
+            payload = None
+
+    username = payload.get("sub") if payload else None
+    if username is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Sessione breve: lo stream non deve tenere occupata una connessione del pool
+    db = SessionLocal()
+    try:
+        user = db.query(Tecnico).filter(Tecnico.username == username, Tecnico.attivo == True).first()
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def _format_sse(event: dict) -> str:
+    return f"event: {event['tipo']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@router.post("/ticket", response_model=EventsTicket)
+async def create_events_ticket(current_user: Tecnico = Depends(get_current_user)):
+    """
+    Short-lived ticket for `GET /events?ticket=...`.
+
+    The ticket is valid only for opening the stream and expires after
+    EVENTS_TICKET_EXPIRE_SECONDS; clients request a new one on reconnect.
+    """
+    return EventsTicket(
+        ticket=create_sse_ticket(current_user.username),
+        expires_in=settings.EVENTS_TICKET_EXPIRE_SECONDS,
+    )
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    solo_miei: bool = False,
+    tipi: Optional[str] = Query(None, description="Tipi evento separati da virgola"),
+    ticket: Optional[str] = None,
+):
+    """
+    Server-Sent Events stream of ticket and intervention changes.
+
+    With `solo_miei=true` only events for tickets/interventions assigned to the
+    current user are delivered. When a client falls behind, the oldest queued
+    events are dropped and a `resync` event tells it to reload its lists.
+    """
+    user = _authenticate(request, ticket)
+    filtro_tipi = {t.strip() for t in tipi.split(",") if t.strip()} if tipi else None
+
+    subscriber = event_broker.subscribe(
+        tecnico_id=user.id if solo_miei else None,
+        tipi=filtro_tipi,
+    )
+
+    async def event_generator():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if subscriber.dropped:
+                    yield _format_sse({"tipo": "resync", "eventi_persi": subscriber.dropped})
+                    subscriber.dropped = 0
+
+                yield _format_sse(event)
+        finally:
+            event_broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disabilita buffering Nginx
+        },
+    )
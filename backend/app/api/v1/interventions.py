@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 
-from app.database import get_db
+from app.core.etag import build_etag, etag_matches
+from app.core.export import export_response
+from app.core.responses import model_response
+from app.database import get_db, get_session_lettura
 from app.api.v1.auth import get_current_user
 from app.models.user import Tecnico
 from app.repositories.intervention import InterventionRepository
@@ -56,14 +59,58 @@ async def get_interventions(
         search=search,
     )
 
-    return InterventoListResponse(
-        total=total,
-        page=page,
-        limit=limit,
-        interventi=[InterventoResponse.model_validate(i) for i in interventi],
+    return model_response(
+        InterventoListResponse,
+        {"total": total, "page": page, "limit": limit, "interventi": interventi},
     )
 
 
+INTERVENTO_EXPORT_HEADER = [
+    "Numero",
+    "Data inizio",
+    "Data fine",
+    "Cliente",
+    "Oggetto",
+    "Tipo",
+    "Stato",
+    "Tecnico",
+    "Ore lavorate",
+]
+
+
+@router.get("/export")
+async def export_interventions(
+    formato: str = Query("csv", pattern="^(csv|xlsx)$"),
+    stato_id: Optional[int] = None,
+    tipo_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    data_from: Optional[datetime] = None,
+    data_to: Optional[datetime] = None,
+    search: Optional[str] = None,
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Export interventions matching the list filters as a streamed CSV/XLSX file"""
+
+    def rows():
+        # Sessione dedicata: resta aperta per tutta la durata dello stream
+        db = get_session_lettura()
+        try:
+            yield from InterventionRepository(db).iter_export(
+                stato_id=stato_id,
+                tipo_id=tipo_id,
+                tecnico_id=tecnico_id,
+                cliente_id=cliente_id,
+                data_from=data_from,
+                data_to=data_to,
+                search=search,
+            )
+        finally:
+            db.close()
+
+    return export_response(formato, "interventi", INTERVENTO_EXPORT_HEADER, rows())
+
+
 @router.post("", response_model=InterventoResponse, status_code=201)
 async def create_intervention(
     intervento_data: InterventoCreate,
@@ -81,16 +128,29 @@ async def create_intervention(
 @router.get("/{intervento_id}", response_model=InterventoResponse)
 async def get_intervention(
     intervento_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Tecnico = Depends(get_current_user),
 ):
-    """Get intervention details"""
+    """Get intervention details (ETag / If-None-Match aware)"""
     repo = InterventionRepository(db)
 
+    # Versione letta prima del caricamento completo: 304 senza join né serializzazione
+    versione = repo.get_versione(intervento_id)
+    if versione is None:
+        raise HTTPException(status_code=404, detail="Intervento non trovato")
+
+    etag = build_etag("intervento", intervento_id, versione)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
     intervento = repo.get_by_id(intervento_id)
     if not intervento:
         raise HTTPException(status_code=404, detail="Intervento non trovato")
 
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return InterventoResponse.model_validate(intervento)
 
 
@@ -98,12 +158,25 @@ async def get_intervention(
 async def update_intervention(
     intervento_id: int,
     update_data: InterventoUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Tecnico = Depends(get_current_user),
 ):
-    """Update intervention"""
+    """Update intervention (with If-Match: 412 if it changed since it was read)"""
     repo = InterventionRepository(db)
 
+    updated_at_atteso = None
+    if_match = request.headers.get("if-match")
+    if if_match:
+        versione = repo.get_versione(intervento_id)
+        if versione is not None:
+            if not etag_matches(if_match, build_etag("intervento", intervento_id, versione)):
+                raise HTTPException(
+                    status_code=412, detail="L'intervento è stato modificato da un'altra richiesta"
+                )
+            updated_at_atteso = versione[0]
+
     intervento = repo.get_by_id(intervento_id)
     if not intervento:
         raise HTTPException(status_code=404, detail="Intervento non trovato")
@@ -114,8 +187,9 @@ async def update_intervention(
             status_code=400, detail="Non è possibile modificare un intervento completato"
         )
 
-    intervento = repo.update(intervento, update_data)
+    intervento = repo.update(intervento, update_data, updated_at_atteso=updated_at_atteso)
 
+    response.headers["ETag"] = build_etag("intervento", intervento.id, repo.get_versione(intervento.id) or ())
     return InterventoResponse.model_validate(intervento)
 
 
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+from app.database import get_db
+from app.api.v1.auth import get_current_user
+from app.core.metrics import pool_status
+from app.models.user import Tecnico
+from app.repositories.monitoring import MonitoringRepository
+
+router = APIRouter()
+
+
+# Schemas
+class SlowQueryGroup(BaseModel):
+    fingerprint: str
+    esecuzioni: int
+    totale_ms: float
+    media_ms: float
+    massimo_ms: float
+    ultima_esecuzione: datetime
+    engine: str
+    statement: str
+    parametri: Optional[str] = None
+    chiamante: Optional[str] = None
+    route: Optional[str] = None
+    piano: Optional[str] = None
+
+
+class SlowQuerySample(BaseModel):
+    id: int
+    engine: str
+    durata_ms: float
+    parametri: Optional[str] = None
+    chiamante: Optional[str] = None
+    route: Optional[str] = None
+    piano: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PoolStatus(BaseModel):
+    engine: str
+    pool: str
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    timeout_seconds: Optional[float] = None
+
+
+def _require_admin(current_user: Tecnico) -> None:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Solo gli admin possono consultare il monitoraggio")
+
+
+@router.get("/slow-queries", response_model=List[SlowQueryGroup])
+async def get_slow_queries(
+    giorni: int = Query(7, ge=1, le=90),
+    limit: int = Query(20, ge=1, le=200),
+    route: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Slowest statements by total time, with the latest captured plan"""
+    _require_admin(current_user)
+    return MonitoringRepository(db).get_top_slow_queries(giorni=giorni, limit=limit, route=route)
+
+
+@router.get("/slow-queries/{fingerprint}", response_model=List[SlowQuerySample])
+async def get_slow_query_samples(
+    fingerprint: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Latest executions of one slow statement"""
+    _require_admin(current_user)
+    return MonitoringRepository(db).get_samples(fingerprint, limit=limit)
+
+
+@router.get("/pool", response_model=List[PoolStatus])
+async def get_pool_status(current_user: Tecnico = Depends(get_current_user)):
+    """Connection pool state of the worker serving the request (all workers: /metrics)"""
+    _require_admin(current_user)
+    return pool_status()
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, lookup, tickets, clients, interventions, dashboard, technicians, contracts, sites, contacts
+from app.api.v1 import auth, lookup, tickets, clients, interventions, dashboard, technicians, contracts, sites, contacts, events, billing, calendar, dispatch, sync, monitoring
 
 api_router = APIRouter()
 
@@ -14,9 +14,13 @@ api_router.include_router(contacts.router, tags=["Contacts"])  # No prefix, uses
 api_router.include_router(interventions.router, prefix="/interventions", tags=["Interventions"])
 api_router.include_router(technicians.router, prefix="/technicians", tags=["Technicians"])
 api_router.include_router(contracts.router, prefix="/contracts", tags=["Contracts"])
+api_router.include_router(events.router, prefix="/events", tags=["Events"])
+api_router.include_router(billing.router, prefix="/billing", tags=["Billing"])
+api_router.include_router(calendar.router, prefix="/calendar", tags=["Calendar"])
+api_router.include_router(dispatch.router, prefix="/dispatch", tags=["Dispatch"])
+api_router.include_router(sync.router, prefix="/sync", tags=["Sync"])
+api_router.include_router(monitoring.router, prefix="/monitoring", tags=["Monitoring"])
 
 # TODO: Add other routers as they are implemented
-# api_router.include_router(calendar.router, prefix="/calendar", tags=["Calendar"])
 # api_router.include_router(assets.router, prefix="/assets", tags=["Assets"])
 # api_router.include_router(kb.router, prefix="/kb", tags=["Knowledge Base"])
-# api_router.include_router(sync.router, prefix="/sync", tags=["Sync"])
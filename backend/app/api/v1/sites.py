@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
+from decimal import Decimal
 from app.database import get_db
 from app.models.client import SediCliente, CacheClienti
 from app.api.v1.auth import get_current_user
@@ -80,6 +81,8 @@ async def create_site(
         nazione=data.nazione,
         telefono=data.telefono,
         email=data.email,
+        latitudine=Decimal(str(data.latitudine)) if data.latitudine is not None else None,
+        longitudine=Decimal(str(data.longitudine)) if data.longitudine is not None else None,
         orari_servizio=data.orari_servizio,
         note=data.note,
         attivo=True,
@@ -125,6 +128,10 @@ async def update_site(
         sede.telefono = data.telefono
     if data.email is not None:
         sede.email = data.email
+    if data.latitudine is not None:
+        sede.latitudine = Decimal(str(data.latitudine))
+    if data.longitudine is not None:
+        sede.longitudine = Decimal(str(data.longitudine))
     if data.orari_servizio is not None:
         sede.orari_servizio = data.orari_servizio
     if data.note is not None:
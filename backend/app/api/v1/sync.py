@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+from app.api.v1.auth import get_current_user
+from app.core.config import settings
+from app.core.responses import model_response
+from app.models.user import Tecnico
+from app.repositories.intervention import InterventionRepository
+from app.repositories.sync import SyncRepository, decode_sync_token, encode_sync_token
+from app.schemas.sync import (
+    SyncChangesResponse,
+    SyncPushRequest,
+    SyncPushResponse,
+)
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=SyncChangesResponse)
+async def get_sync_changes(
+    since: Optional[str] = None,
+    limit: int = Query(settings.SYNC_PAGE_SIZE, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """
+    Interventions, sessions, activity rows, tickets and lookups of the current
+    technician changed since `since` (the token of the previous call; omit it
+    for a full download). Call again with the returned token while
+    `has_more` is true.
+    """
+    cursori = {}
+    if since:
+        try:
+            cursori = decode_sync_token(since)
+        except ValueError as e:
+            # Il client riparte con una sincronizzazione completa
+            raise HTTPException(status_code=400, detail=str(e))
+
+    modifiche = SyncRepository(db).get_changes(current_user.id, cursori, limit)
+
+    modifiche["token"] = encode_sync_token(modifiche.pop("cursori"))
+    return model_response(SyncChangesResponse, modifiche)
+
+
+@router.post("/push", response_model=SyncPushResponse)
+async def push_offline_changes(
+    dati: SyncPushRequest,
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """
+    Apply work sessions and activity rows recorded offline, in one
+    transaction. Items in conflict are skipped and listed in `conflitti`;
+    re-sending items already applied is safe (matched by `client_uuid`).
+    """
+    if len(dati.sessioni) + len(dati.righe) > 1000:
+        raise HTTPException(status_code=400, detail="Massimo 1000 elementi per invio")
+
+    applicati, conflitti, nuove_sessioni = SyncRepository(db).push(current_user.id, dati)
+
+    repo = InterventionRepository(db)
+    for sessione in nuove_sessioni:
+        repo.publish_posizione(sessione)
+
+    return SyncPushResponse(applicati=applicati, conflitti=conflitti)
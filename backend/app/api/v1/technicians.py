@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
-from app.database import get_db
+from datetime import datetime, date, timedelta
+from app.core.config import settings
+from app.database import get_db, get_db_read
+from app.models.client import SediCliente
 from app.models.user import Tecnico
 from app.models.lookup import LookupReparti, LookupRuoliUtente
 from app.api.v1.auth import get_current_user
+from app.core.responses import model_response
 from pydantic import BaseModel, EmailStr
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
+from app.repositories.workload import WorkloadRepository
+from app.repositories.calendar import CalendarRepository
+from app.repositories.dispatch import DispatchRepository
+from app.services.locator import technician_locator
 
 router = APIRouter()
 
@@ -112,6 +119,56 @@ class TecnicoListResponse(BaseModel):
     limit: int
 
 
+class WorkloadGiorno(BaseModel):
+    data: date
+    ore_lavoro: float
+    ore_viaggio: float
+    km_percorsi: float
+    sessioni: int
+
+
+class WorkloadRiepilogo(BaseModel):
+    tecnico_id: int
+    nome_completo: str
+    ore_lavoro: float
+    ore_viaggio: float
+    km_percorsi: float
+    sessioni: int
+    giorni_lavorati: int
+    ore_disponibili: float
+    utilizzo_percentuale: float
+
+
+class WorkloadTecnicoResponse(WorkloadRiepilogo):
+    giorni: List[WorkloadGiorno]
+
+
+class WorkloadTeamResponse(BaseModel):
+    data_from: date
+    data_to: date
+    tecnici: List[WorkloadRiepilogo]
+
+
+class TecnicoVicino(BaseModel):
+    tecnico_id: int
+    nome_completo: str
+    distanza_km: float
+    latitudine: float
+    longitudine: float
+    posizione_rilevata_at: datetime
+
+
+class TecniciViciniResponse(BaseModel):
+    latitudine: float
+    longitudine: float
+    tecnici: List[TecnicoVicino]
+
+
+def _validate_period(data_from: date, data_to: date) -> None:
+    if data_to < data_from:
+        raise HTTPException(status_code=400, detail="Invalid period: 'to' before 'from'")
+
+
 @router.get("", response_model=TecnicoListResponse)
 async def get_technicians(
     page: int = 1,
@@ -152,11 +209,93 @@ async def get_technicians(
     offset = (page - 1) * limit
     items = query.order_by(Tecnico.cognome, Tecnico.nome).offset(offset).limit(limit).all()
 
-    return TecnicoListResponse(
-        items=items,
-        total=total,
-        page=page,
-        limit=limit
+    return model_response(
+        TecnicoListResponse,
+        {"items": items, "total": total, "page": page, "limit": limit},
+    )
+
+
+@router.get("/workload", response_model=WorkloadTeamResponse)
+async def get_team_workload(
+    data_from: date = Query(..., alias="from"),
+    data_to: date = Query(..., alias="to"),
+    reparto_id: Optional[int] = None,
+    db: Session = Depends(get_db_read),
+    current_user: Tecnico = Depends(get_current_user)
+):
+    """Get hours worked and utilization for all technicians (daily rollups)"""
+    _validate_period(data_from, data_to)
+
+    repo = WorkloadRepository(db)
+    return WorkloadTeamResponse(
+        data_from=data_from,
+        data_to=data_to,
+        tecnici=repo.get_team(data_from, data_to, reparto_id=reparto_id),
+    )
+
+
+@router.get("/nearest", response_model=TecniciViciniResponse)
+async def get_nearest_technicians(
+    sede_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    k: int = Query(5, ge=1, le=50),
+    solo_disponibili: bool = True,
+    durata_minuti: int = Query(120, ge=1, le=24 * 60),
+    max_distanza_km: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+    current_user: Tecnico = Depends(get_current_user)
+):
+    """
+    k technicians closest to a client site (or to lat/lon) by last known
+    session position. With solo_disponibili only technicians with no event or
+    session in the next `durata_minuti` are returned.
+    """
+    if lat is None or lon is None:
+        if sede_id:
+            sede = db.query(SediCliente).filter(SediCliente.id == sede_id).first()
+            if not sede:
+                raise HTTPException(status_code=404, detail="Site not found")
+            if sede.latitudine is None or sede.longitudine is None:
+                raise HTTPException(status_code=400, detail="Site has no coordinates")
+            lat, lon = float(sede.latitudine), float(sede.longitudine)
+        elif cliente_id:
+            posizione = DispatchRepository(db).get_posizioni_clienti([cliente_id]).get(cliente_id)
+            if posizione is None:
+                raise HTTPException(status_code=400, detail="Client location unknown")
+            lat, lon = posizione
+        else:
+            raise HTTPException(status_code=400, detail="Provide sede_id, cliente_id or lat/lon")
+
+    technician_locator.ensure_loaded(DispatchRepository(db).get_ultime_posizioni_tecnici)
+
+    escludi = {t.id for t in db.query(Tecnico.id).filter(Tecnico.attivo == False)}
+    if solo_disponibili:
+        now = datetime.utcnow()
+        occupati = CalendarRepository(db).get_busy_intervals(now, now + timedelta(minutes=durata_minuti))
+        escludi.update(i[0] for i in occupati)
+
+    vicini = technician_locator.nearest(
+        lat,
+        lon,
+        k=k,
+        escludi=escludi,
+        max_distanza_km=max_distanza_km,
+        rilevata_dopo=datetime.utcnow() - timedelta(hours=settings.LOCATOR_MAX_AGE_HOURS),
+    )
+
+    nomi = {
+        t.id: f"{t.nome} {t.cognome}"
+        for t in db.query(Tecnico.id, Tecnico.nome, Tecnico.cognome).filter(
+            Tecnico.id.in_([v["tecnico_id"] for v in vicini])
+        )
+    } if vicini else {}
+
+    return TecniciViciniResponse(
+        latitudine=lat,
+        longitudine=lon,
+        tecnici=[{**v, "nome_completo": nomi.get(v["tecnico_id"], "")} for v in vicini],
     )
 
 
@@ -205,7 +344,7 @@ async def create_technician(
     tecnico = Tecnico(
         username=data.username,
         email=data.email,
-        hashed_password=get_password_hash(data.password),
+        hashed_password=await get_password_hash_async(data.password),
         nome=data.nome,
         cognome=data.cognome,
         telefono=data.telefono,
@@ -259,7 +398,7 @@ async def update_technician(
     if data.email is not None:
         tecnico.email = data.email
     if data.password is not None:
-        tecnico.hashed_password = get_password_hash(data.password)
+        tecnico.hashed_password = await get_password_hash_async(data.password)
     if data.nome is not None:
         tecnico.nome = data.nome
     if data.cognome is not None:
@@ -324,3 +463,22 @@ async def delete_technician(
 
     db.commit()
     return None
+
+
+@router.get("/{tecnico_id}/workload", response_model=WorkloadTecnicoResponse)
+async def get_technician_workload(
+    tecnico_id: int,
+    data_from: date = Query(..., alias="from"),
+    data_to: date = Query(..., alias="to"),
+    db: Session = Depends(get_db_read),
+    current_user: Tecnico = Depends(get_current_user)
+):
+    """Get daily hours worked and utilization for a technician (daily rollups)"""
+    _validate_period(data_from, data_to)
+
+    tecnico = db.query(Tecnico).filter(Tecnico.id == tecnico_id).first()
+    if not tecnico:
+        raise HTTPException(status_code=404, detail="Technician not found")
+
+    repo = WorkloadRepository(db)
+    return repo.get_riepilogo_tecnico(tecnico, data_from, data_to)
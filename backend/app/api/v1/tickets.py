@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.database import get_db
+from app.core.etag import build_etag, etag_matches
+from app.core.export import export_response
+from app.core.responses import model_response
+from app.database import get_db, get_session_lettura
 from app.api.v1.auth import get_current_user
 from app.models.user import Tecnico
 from app.models.lookup import LookupStatiTicket
+from app.repositories.archive import ArchiveRepository
 from app.repositories.ticket import TicketRepository
+from app.repositories.dispatch import DispatchRepository
+from app.services.dispatch import dispatch_queue
 from app.schemas.ticket import (
     TicketCreate,
     TicketUpdate,
@@ -47,14 +53,55 @@ async def get_tickets(
         search=search,
     )
 
-    return TicketListResponse(
-        total=total,
-        page=page,
-        limit=limit,
-        tickets=tickets,
+    return model_response(
+        TicketListResponse,
+        {"total": total, "page": page, "limit": limit, "tickets": tickets},
     )
 
 
+TICKET_EXPORT_HEADER = [
+    "Numero",
+    "Data apertura",
+    "Cliente",
+    "Oggetto",
+    "Priorità",
+    "Stato",
+    "Tecnico assegnato",
+    "Scadenza SLA",
+    "Data chiusura",
+    "Tipo chiusura",
+]
+
+
+@router.get("/export")
+async def export_tickets(
+    formato: str = Query("csv", pattern="^(csv|xlsx)$"),
+    stato_id: Optional[int] = None,
+    priorita_id: Optional[int] = None,
+    tecnico_id: Optional[int] = None,
+    cliente_id: Optional[int] = None,
+    search: Optional[str] = None,
+    current_user: Tecnico = Depends(get_current_user),
+):
+    """Export tickets matching the list filters as a streamed CSV/XLSX file"""
+
+    def rows():
+        # Sessione dedicata: resta aperta per tutta la durata dello stream
+        db = get_session_lettura()
+        try:
+            yield from TicketRepository(db).iter_export(
+                stato_id=stato_id,
+                priorita_id=priorita_id,
+                tecnico_id=tecnico_id,
+                cliente_id=cliente_id,
+                search=search,
+            )
+        finally:
+            db.close()
+
+    return export_response(formato, "ticket", TICKET_EXPORT_HEADER, rows())
+
+
 @router.post("", response_model=TicketResponse, status_code=status.HTTP_201_CREATED)
 async def create_ticket(
     ticket_data: TicketCreate,
@@ -88,12 +135,33 @@ async def create_ticket(
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(
     ticket_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Tecnico = Depends(get_current_user),
 ):
-    """Get ticket by ID"""
+    """Get ticket by ID (ETag / If-None-Match aware)"""
     repo = TicketRepository(db)
-    ticket = repo.get_by_id(ticket_id)
+
+    # Versione letta prima del caricamento completo: 304 senza join né serializzazione
+    versione = repo.get_versione(ticket_id)
+    ticket = None
+    if versione is None:
+        # Ticket chiusi da tempo: spostati nello schema archivio (sola lettura)
+        ticket = ArchiveRepository(db).get_ticket(ticket_id)
+        if ticket is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Ticket {ticket_id} non trovato",
+            )
+        versione = (ticket.updated_at, ticket.archiviato_at)
+
+    etag = build_etag("ticket", ticket_id, versione)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    if ticket is None:
+        ticket = repo.get_by_id(ticket_id)
 
     if not ticket:
         raise HTTPException(
@@ -101,6 +169,8 @@ async def get_ticket(
             detail=f"Ticket {ticket_id} non trovato",
         )
 
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return ticket
 
 
@@ -108,11 +178,26 @@ async def get_ticket(
 async def update_ticket(
     ticket_id: int,
     update_data: TicketUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: Tecnico = Depends(get_current_user),
 ):
-    """Update ticket"""
+    """Update ticket (with If-Match: 412 if it changed since it was read)"""
     repo = TicketRepository(db)
+
+    updated_at_atteso = None
+    if_match = request.headers.get("if-match")
+    if if_match:
+        versione = repo.get_versione(ticket_id)
+        if versione is not None:
+            if not etag_matches(if_match, build_etag("ticket", ticket_id, versione)):
+                raise HTTPException(
+                    status_code=status.HTTP_412_PRECONDITION_FAILED,
+                    detail="Il ticket è stato modificato da un'altra richiesta",
+                )
+            updated_at_atteso = versione[0]
+
     ticket = repo.get_by_id(ticket_id)
 
     if not ticket:
@@ -121,7 +206,7 @@ async def update_ticket(
             detail=f"Ticket {ticket_id} non trovato",
         )
 
-    ticket = repo.update(ticket, update_data)
+    ticket = repo.update(ticket, update_data, updated_at_atteso=updated_at_atteso)
 
     # Log update
     repo.log_action(
@@ -131,6 +216,7 @@ async def update_ticket(
         descrizione=f"Ticket modificato da {current_user.nome_completo}",
     )
 
+    response.headers["ETag"] = build_etag("ticket", ticket.id, repo.get_versione(ticket.id) or ())
     return ticket
 
 
@@ -474,6 +560,9 @@ async def schedule_intervention_from_ticket(
     db.commit()
     db.refresh(richiesta)
 
+    dispatch_queue.invalidate(richiesta_id=richiesta.id)
+    DispatchRepository.publish_change(richiesta)
+
     # Update ticket stato to SCHEDULATO
     stato_schedulato = db.query(LookupStatiTicket).filter_by(codice="SCHEDULATO", attivo=True).first()
     if stato_schedulato:
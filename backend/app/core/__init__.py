@@ -2,9 +2,17 @@ from app.core.config import settings
 from app.core.security import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    password_needs_rehash,
     create_access_token,
     create_refresh_token,
+    create_sse_ticket,
+    create_oauth_state,
     decode_token,
+    bearer_subject,
+    encrypt_secret,
+    decrypt_secret,
 )
 from app.core.exceptions import (
     DAAssistException,
@@ -14,15 +22,24 @@ from app.core.exceptions import (
     ValidationException,
     ConflictException,
     SyncException,
+    PreconditionFailedException,
 )
 
 __all__ = [
     "settings",
     "verify_password",
     "get_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
+    "password_needs_rehash",
     "create_access_token",
     "create_refresh_token",
+    "create_sse_ticket",
+    "create_oauth_state",
     "decode_token",
+    "bearer_subject",
+    "encrypt_secret",
+    "decrypt_secret",
     "DAAssistException",
     "NotFoundException",
     "UnauthorizedException",
@@ -30,4 +47,5 @@ __all__ = [
     "ValidationException",
     "ConflictException",
     "SyncException",
+    "PreconditionFailedException",
 ]
@@ -0,0 +1,56 @@
+"""
+ETag delle risorse di dettaglio.
+
+L'ETag è l'hash dei timestamp updated_at del record e delle entità incluse
+nella risposta (cliente, tecnico, lookup), letti con una query sulle sole
+colonne: If-None-Match viene valutato senza caricare né serializzare il
+record, If-Match protegge le PATCH dalle modifiche concorrenti.
+"""
+import hashlib
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import PreconditionFailedException
+
+
+def build_etag(prefisso: str, record_id: int, versioni: Iterable[Optional[datetime]]) -> str:
+    """Strong ETag from the version timestamps of a resource"""
+    parti = "|".join(v.isoformat() if v is not None else "-" for v in versioni)
+    digest = hashlib.sha1(f"{prefisso}:{record_id}:{parti}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match / If-Match header value matches etag"""
+    if not header:
+        return False
+    for valore in header.split(","):
+        valore = valore.strip()
+        if valore == "*":
+            return True
+        if valore.startswith("W/"):
+            valore = valore[2:]
+        if valore == etag:
+            return True
+    return False
+
+
+def claim_version(db: Session, model: Any, record_id: int, updated_at: datetime) -> datetime:
+    """
+    Compare-and-set on updated_at in the caller's transaction: bump the row
+    only if it still has the version the client read, otherwise raise
+    PreconditionFailedException. The row stays locked until commit, so the
+    update that follows cannot interleave with another writer.
+    """
+    adesso = datetime.utcnow()
+    aggiornati = (
+        db.query(model)
+        .filter(model.id == record_id, model.updated_at == updated_at)
+        .update({model.updated_at: adesso}, synchronize_session=False)
+    )
+    if not aggiornati:
+        db.rollback()
+        raise PreconditionFailedException()
+    return adesso
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Tipi di evento pubblicati dai repository
+TICKET_CREATED = "ticket.created"
+TICKET_ASSIGNED = "ticket.assigned"
+TICKET_CLOSED = "ticket.closed"
+INTERVENTION_STARTED = "intervention.started"
+INTERVENTION_COMPLETED = "intervention.completed"
+DISPATCH_UPDATED = "dispatch.updated"
+TECHNICIAN_POSITION = "technician.position"
+
+
+class EventSubscriber:
+    """Client connesso allo stream eventi con coda limitata"""
+
+    def __init__(self, tecnico_id: Optional[int] = None, tipi: Optional[Set[str]] = None, maxsize: int = 100):
+        self.tecnico_id = tecnico_id
+        self.tipi = tipi
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def accepts(self, event: Dict[str, Any]) -> bool:
+        """Check if event matches subscriber filters"""
+        if self.tipi and event["tipo"] not in self.tipi:
+            return False
+        if self.tecnico_id is not None and event.get("tecnico_id") != self.tecnico_id:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Enqueue event; drop the oldest one if the client is not keeping up"""
+        if not self.accepts(event):
+            return
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """
+    Fan-out eventi verso i client SSE.
+
+    Con Redis attivo ogni worker pubblica sul canale condiviso e riceve gli
+    eventi (anche i propri) dal listener pub/sub; senza Redis la consegna
+    resta locale al processo.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[EventSubscriber] = set()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Bind to the running loop and start the Redis listener"""
+        self._loop = asyncio.get_running_loop()
+
+        if not settings.EVENTS_REDIS_ENABLED:
+            return
+
+        try:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(settings.EVENTS_REDIS_CHANNEL)
+            self._listener = asyncio.create_task(self._listen(pubsub))
+        except Exception as e:
+            logger.warning(f"Redis pub/sub non disponibile, eventi solo locali: {e}")
+            self._redis = None
+
+    async def stop(self) -> None:
+        """Stop the Redis listener"""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def _listen(self, pubsub) -> None:
+        """Dispatch events received from Redis to local subscribers"""
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                self._dispatch(event)
+        except asyncio.CancelledError:
+            await pubsub.close()
+            raise
+        except Exception as e:
+            logger.error(f"Listener eventi Redis interrotto: {e}", exc_info=True)
+            self._redis = None
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Listener eventi fallito: {e}", exc_info=True)
+        for subscriber in list(self._subscribers):
+            subscriber.offer(event)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Register an in-process callback run on the event loop for every event
+        (including those published by other workers through Redis).
+        Callbacks must be quick and must not do I/O.
+        """
+        self._listeners.append(listener)
+
+    def subscribe(self, tecnico_id: Optional[int] = None, tipi: Optional[Set[str]] = None) -> EventSubscriber:
+        """Register a new subscriber"""
+        subscriber = EventSubscriber(tecnico_id=tecnico_id, tipi=tipi, maxsize=settings.EVENTS_QUEUE_SIZE)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber) -> None:
+        """Remove a subscriber"""
+        self._subscribers.discard(subscriber)
+
+    def publish(self, tipo: str, **payload: Any) -> None:
+        """
+        Publish an event. Safe to call from sync code (repositories) running
+        on the event loop or in a worker thread; no-op outside the app.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+
+        event = {"tipo": tipo, "timestamp": datetime.utcnow().isoformat(), **payload}
+
+        if self._redis is not None:
+            data = json.dumps(event, default=str)
+            asyncio.run_coroutine_threadsafe(self._publish_redis(event, data), self._loop)
+        else:
+            self._loop.call_soon_threadsafe(self._dispatch, event)
+
+    async def _publish_redis(self, event: Dict[str, Any], data: str) -> None:
+        if self._redis is None:
+            self._dispatch(event)
+            return
+        try:
+            await self._redis.publish(settings.EVENTS_REDIS_CHANNEL, data)
+        except Exception as e:
+            logger.warning(f"Pubblicazione evento su Redis fallita, consegna locale: {e}")
+            self._dispatch(event)
+
+
+event_broker = EventBroker()
@@ -62,3 +62,14 @@ class SyncException(DAAssistException):
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=detail,
         )
+
+
+class PreconditionFailedException(DAAssistException):
+    """Exception raised when If-Match does not match the current version"""
+
+    def __init__(self, message: str = "La risorsa è stata modificata da un'altra richiesta", detail: Optional[Any] = None):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=detail,
+        )
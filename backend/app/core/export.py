@@ -0,0 +1,93 @@
+import csv
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence
+
+from fastapi.responses import StreamingResponse
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+CSV_ROWS_PER_CHUNK = 500
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class _Echo:
+    """File-like object that returns what is written (for csv.writer)"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _format_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d/%m/%Y %H:%M")
+    if isinstance(value, date):
+        return value.strftime("%d/%m/%Y")
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """Yield CSV lines (semicolon separated, UTF-8 BOM for Excel)"""
+    writer = csv.writer(_Echo(), delimiter=";")
+    yield "\ufeff" + writer.writerow(header)
+
+    # Righe raggruppate: ogni chunk è un passaggio nel threadpool di Starlette
+    buffer = []
+    for row in rows:
+        buffer.append(writer.writerow([_format_value(v) for v in row]))
+        if len(buffer) >= CSV_ROWS_PER_CHUNK:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+def iter_xlsx(header: Sequence[str], rows: Iterable[Sequence[Any]], sheet_name: str) -> Iterator[bytes]:
+    """
+    Write rows to an XLSX file in constant-memory mode and yield its bytes.
+
+    XLSX is a zip archive, so the file has to be completed before it can be
+    sent; xlsxwriter flushes every row to disk, keeping memory flat.
+    """
+    import xlsxwriter
+
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as tmp:
+        workbook = xlsxwriter.Workbook(tmp.name, {"constant_memory": True, "remove_timezone": True})
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        worksheet.write_row(0, 0, header, workbook.add_format({"bold": True}))
+        for row_idx, row in enumerate(rows, start=1):
+            worksheet.write_row(row_idx, 0, [_format_value(v) for v in row])
+        workbook.close()
+
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(EXPORT_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def export_response(
+    formato: str,
+    filename: str,
+    header: List[str],
+    rows: Iterable[Sequence[Any]],
+) -> StreamingResponse:
+    """Build a streaming CSV or XLSX download response"""
+    if formato == "xlsx":
+        content = iter_xlsx(header, rows, sheet_name=filename)
+        media_type = XLSX_MEDIA_TYPE
+    else:
+        content = iter_csv(header, rows)
+        media_type = "text/csv; charset=utf-8"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{formato}"'},
+    )
@@ -0,0 +1,273 @@
+"""
+Idempotency-Key per le richieste POST.
+
+Il primo invio con una chiave viene eseguito e la risposta (status, header,
+body) salvata per IDEMPOTENCY_TTL_HOURS; i reinvii con la stessa chiave e lo
+stesso body ricevono la risposta salvata senza rieseguire l'endpoint. Le
+chiavi sono separate per utente (sub del token: restano valide dopo un
+refresh del token). Finché la richiesta è in elaborazione il marcatore viene
+rinnovato ogni IDEMPOTENCY_LOCK_SECONDS / 3, così una richiesta lenta non
+perde la protezione; se il worker muore scade dopo IDEMPOTENCY_LOCK_SECONDS.
+Con Redis lo store è condiviso fra i worker, altrimenti resta in memoria nel
+processo.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import bearer_subject
+
+logger = logging.getLogger(__name__)
+
+HEADER_CHIAVE = b"idempotency-key"
+STATO_IN_CORSO = "IN_CORSO"
+STATO_COMPLETATA = "COMPLETATA"
+# Tentativi di acquisizione quando la chiave scade fra acquire e get
+TENTATIVI_ACQUISIZIONE = 3
+
+
+class IdempotencyStore:
+    """Redis (SET NX + EX) con ripiego su dizionario in memoria"""
+
+    def __init__(self):
+        self._redis = None
+        self._redis_provato = False
+        self._memoria: Dict[str, Tuple[float, str]] = {}
+
+    async def _client(self):
+        if not self._redis_provato:
+            self._redis_provato = True
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(settings.REDIS_URL)
+                await self._redis.ping()
+            except Exception as e:
+                logger.warning(f"Redis non disponibile, idempotency keys solo locali: {e}")
+                self._redis = None
+        return self._redis
+
+    def _sweep(self) -> None:
+        adesso = time.monotonic()
+        for chiave in [k for k, (scadenza, _) in self._memoria.items() if scadenza <= adesso]:
+            del self._memoria[chiave]
+
+    async def acquire(self, chiave: str, valore: Dict[str, Any], ttl: int) -> bool:
+        """Store valore only if the key is free; True when acquired"""
+        dati = json.dumps(valore)
+        client = await self._client()
+        if client is not None:
+            try:
+                return bool(await client.set(chiave, dati, ex=ttl, nx=True))
+            except Exception as e:
+                logger.warning(f"Idempotency store Redis non raggiungibile: {e}")
+        self._sweep()
+        if chiave in self._memoria:
+            return False
+        self._memoria[chiave] = (time.monotonic() + ttl, dati)
+        return True
+
+    async def get(self, chiave: str) -> Optional[Dict[str, Any]]:
+        client = await self._client()
+        if client is not None:
+            try:
+                dati = await client.get(chiave)
+                return json.loads(dati) if dati else None
+            except Exception as e:
+                logger.warning(f"Idempotency store Redis non raggiungibile: {e}")
+        self._sweep()
+        voce = self._memoria.get(chiave)
+        return json.loads(voce[1]) if voce else None
+
+    async def set(self, chiave: str, valore: Dict[str, Any], ttl: int) -> None:
+        dati = json.dumps(valore)
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.set(chiave, dati, ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Idempotency store Redis non raggiungibile: {e}")
+        self._memoria[chiave] = (time.monotonic() + ttl, dati)
+
+    async def renew(self, chiave: str, ttl: int) -> None:
+        """Push back the expiry of an existing key"""
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.expire(chiave, ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Idempotency store Redis non raggiungibile: {e}")
+        voce = self._memoria.get(chiave)
+        if voce is not None:
+            self._memoria[chiave] = (time.monotonic() + ttl, voce[1])
+
+    async def delete(self, chiave: str) -> None:
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.delete(chiave)
+                return
+            except Exception as e:
+                logger.warning(f"Idempotency store Redis non raggiungibile: {e}")
+        self._memoria.pop(chiave, None)
+
+
+def _problem(status_code: int, titolo: str) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    body = json.dumps({
+        "type": "about:blank",
+        "title": titolo,
+        "status": status_code,
+        "detail": None,
+    }).encode()
+    return status_code, [(b"content-type", b"application/json")], body
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware: replay of POST responses by Idempotency-Key"""
+
+    def __init__(self, app, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or IdempotencyStore()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        chiave_client = headers.get(HEADER_CHIAVE)
+        if chiave_client is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not 0 < len(chiave_client) <= 255:
+            await self._send(send, *_problem(400, "Idempotency-Key non valida (1-255 caratteri)"))
+            return
+
+        # Il body serve per l'impronta e va poi riconsegnato all'app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        def replay_receive():
+            consegnato = False
+
+            async def _receive():
+                nonlocal consegnato
+                if not consegnato:
+                    consegnato = True
+                    return {"type": "http.request", "body": body, "more_body": False}
+                return await receive()
+
+            return _receive
+
+        utente = (bearer_subject(headers.get(b"authorization", b"").decode("latin-1")) or "").encode()
+        chiave = "daassist:idempotency:" + hashlib.sha256(
+            utente + b"\0" + scope["path"].encode() + b"\0" + chiave_client
+        ).hexdigest()
+        impronta = hashlib.sha256(body).hexdigest()
+
+        for _ in range(TENTATIVI_ACQUISIZIONE):
+            if await self.store.acquire(
+                chiave,
+                {"stato": STATO_IN_CORSO, "impronta": impronta},
+                settings.IDEMPOTENCY_LOCK_SECONDS,
+            ):
+                break
+            salvata = await self.store.get(chiave)
+            if salvata is None:
+                # Scaduta fra acquire e get: si riprova ad acquisirla
+                continue
+            if salvata["impronta"] != impronta:
+                await self._send(send, *_problem(422, "Idempotency-Key già usata con una richiesta diversa"))
+                return
+            if salvata["stato"] == STATO_IN_CORSO:
+                await self._send_in_corso(send)
+                return
+            await self._send(
+                send,
+                salvata["status"],
+                [(k.encode(), v.encode()) for k, v in salvata["headers"]] + [(b"idempotent-replayed", b"true")],
+                base64.b64decode(salvata["body"]),
+            )
+            return
+        else:
+            # Mai eseguire senza protezione: il client ritenterà
+            await self._send_in_corso(send)
+            return
+
+        risposta: Dict[str, Any] = {"body": []}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                risposta["status"] = message["status"]
+                risposta["headers"] = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                risposta["body"].append(message.get("body", b""))
+            await send(message)
+
+        # Fermato prima del salvataggio: un rinnovo successivo accorcerebbe il TTL della risposta
+        rinnovo = asyncio.create_task(self._rinnova(chiave))
+        try:
+            await self.app(scope, replay_receive(), capture_send)
+        except Exception:
+            await self.store.delete(chiave)
+            raise
+        finally:
+            rinnovo.cancel()
+            try:
+                await rinnovo
+            except asyncio.CancelledError:
+                pass
+
+        risposta_body = b"".join(risposta["body"])
+        status_code = risposta.get("status", 500)
+        if status_code >= 500 or len(risposta_body) > settings.IDEMPOTENCY_MAX_BODY_BYTES:
+            # Errori del server: il client può ritentare con la stessa chiave
+            await self.store.delete(chiave)
+            return
+
+        await self.store.set(
+            chiave,
+            {
+                "stato": STATO_COMPLETATA,
+                "impronta": impronta,
+                "status": status_code,
+                "headers": [
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in risposta["headers"]
+                    if k.lower() not in (b"set-cookie", b"date", b"server")
+                ],
+                "body": base64.b64encode(risposta_body).decode(),
+            },
+            settings.IDEMPOTENCY_TTL_HOURS * 3600,
+        )
+
+    async def _rinnova(self, chiave: str) -> None:
+        intervallo = max(settings.IDEMPOTENCY_LOCK_SECONDS / 3, 1)
+        while True:
+            await asyncio.sleep(intervallo)
+            await self.store.renew(chiave, settings.IDEMPOTENCY_LOCK_SECONDS)
+
+    async def _send_in_corso(self, send) -> None:
+        status_code, headers, body = _problem(409, "Richiesta con la stessa Idempotency-Key ancora in elaborazione")
+        headers.append((b"retry-after", b"1"))
+        await self._send(send, status_code, headers, body)
+
+    @staticmethod
+    async def _send(send, status_code: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
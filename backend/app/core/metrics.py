@@ -0,0 +1,311 @@
+"""
+Strumentazione delle richieste HTTP.
+
+Per ogni richiesta vengono contati query SQL, tempo passato nel database,
+attesa per una connessione del pool e latenza dell'handler. I valori escono
+nell'header Server-Timing e negli istogrammi Prometheus per route esposti da
+/metrics; oltre METRICS_QUERY_BUDGET query viene loggato un avviso N+1 con
+lo statement più ripetuto.
+
+Per ogni engine vengono esportate anche le metriche del pool: connessioni in
+uso e in overflow, attesa per il checkout e timeout del pool.
+
+Con più worker /metrics aggrega i valori di tutti i processi tramite
+PROMETHEUS_MULTIPROC_DIR, impostata e creata da gunicorn.conf.py solo per il
+server: gli script (cron, docker compose run/exec) non la ereditano e tengono
+le metriche in memoria.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter as Conteggio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKET_SECONDI = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKET_QUERY = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_LATENCY = Histogram(
+    "daassist_http_request_duration_seconds",
+    "Handler latency",
+    ["method", "route", "status"],
+    buckets=BUCKET_SECONDI,
+)
+REQUEST_DB_TIME = Histogram(
+    "daassist_http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["method", "route"],
+    buckets=BUCKET_SECONDI,
+)
+REQUEST_QUERIES = Histogram(
+    "daassist_http_request_queries",
+    "SQL statements per request",
+    ["method", "route"],
+    buckets=BUCKET_QUERY,
+)
+REQUEST_POOL_WAIT = Histogram(
+    "daassist_http_request_pool_wait_seconds",
+    "Time spent waiting for a pooled connection per request",
+    ["method", "route"],
+    buckets=BUCKET_SECONDI,
+)
+QUERY_BUDGET_EXCEEDED = Counter(
+    "daassist_http_query_budget_exceeded_total",
+    "Requests over METRICS_QUERY_BUDGET statements",
+    ["method", "route"],
+)
+
+# Gauge sommati sui worker vivi con PROMETHEUS_MULTIPROC_DIR
+DB_POOL_CHECKED_OUT = Gauge(
+    "daassist_db_pool_checked_out",
+    "Connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "daassist_db_pool_overflow",
+    "Connections open beyond pool_size",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "daassist_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=BUCKET_SECONDI,
+)
+DB_POOL_TIMEOUTS = Counter(
+    "daassist_db_pool_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    ["engine"],
+)
+
+# Engine strumentati, per pool_status()
+_engines: Dict[str, Engine] = {}
+
+
+class RequestStats:
+    """Contatori della richiesta corrente (condivisi con i thread del threadpool)"""
+
+    __slots__ = ("scope", "queries", "db_time", "db_time_per_engine", "pool_wait", "statements")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+        self.db_time_per_engine: Dict[str, float] = {}
+        self.pool_wait = 0.0
+        self.statements: Conteggio = Conteggio()
+
+
+_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the request being served (None outside requests)"""
+    return _stats.get()
+
+
+@contextmanager
+def collect_stats() -> Iterator[RequestStats]:
+    """Count statements and DB time outside HTTP requests (benchmarks, jobs)"""
+    stats = RequestStats()
+    token = _stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _stats.reset(token)
+
+
+def current_route() -> Optional[str]:
+    """Route template of the request being served"""
+    stats = _stats.get()
+    return _route(stats.scope) if stats is not None and stats.scope is not None else None
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool che misura l'attesa per ottenere una connessione. L'etichetta
+    delle metriche è il pool_logging_name dell'engine, che sopravvive alla
+    ricreazione del pool dopo una disconnessione.
+    """
+
+    def _do_get(self):
+        nome = getattr(self, "logging_name", None) or "postgres"
+        inizio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(nome).inc()
+            raise
+        finally:
+            attesa = time.perf_counter() - inizio
+            DB_POOL_WAIT.labels(nome).observe(attesa)
+            stats = _stats.get()
+            if stats is not None:
+                stats.pool_wait += attesa
+
+
+def instrument_engine(engine: Engine, nome: str) -> None:
+    """
+    Count statements and DB time of an engine into the current request stats
+    and export its pool gauges. Register after any checkout listener that may
+    reject a connection, so that rejected checkouts are not counted.
+    """
+    _engines[nome] = engine
+    # Contate qui: durante l'evento checkin il pool non ha ancora rilasciato la connessione
+    in_uso = [0]
+    lock = threading.Lock()
+
+    def _aggiorna(delta: int) -> None:
+        with lock:
+            in_uso[0] += delta
+            attive = in_uso[0]
+        DB_POOL_CHECKED_OUT.labels(nome).set(attive)
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            DB_POOL_OVERFLOW.labels(nome).set(max(attive - pool.size(), 0))
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        _aggiorna(1)
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        _aggiorna(-1)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        durata = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _stats.get()
+        if stats is None:
+            return
+        stats.queries += 1
+        stats.db_time += durata
+        stats.db_time_per_engine[nome] = stats.db_time_per_engine.get(nome, 0.0) + durata
+        stats.statements[statement] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        # La query fallita non passa da after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+def pool_status() -> List[Dict[str, Any]]:
+    """Pool state of every instrumented engine in this worker"""
+    stato = []
+    for nome, engine in _engines.items():
+        pool = engine.pool
+        voce: Dict[str, Any] = {"engine": nome, "pool": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            voce.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                timeout_seconds=pool.timeout(),
+            )
+        stato.append(voce)
+    return stato
+
+
+def _route(scope) -> str:
+    """Route template (e.g. /api/v1/tickets/{ticket_id}) to keep label cardinality bounded"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _server_timing(stats: RequestStats, handler: float) -> bytes:
+    parti = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"']
+    for nome, durata in stats.db_time_per_engine.items():
+        parti.append(f"db-{nome};dur={durata * 1000:.1f}")
+    parti.append(f"pool;dur={stats.pool_wait * 1000:.1f}")
+    parti.append(f"app;dur={handler * 1000:.1f}")
+    return ", ".join(parti).encode()
+
+
+class MetricsMiddleware:
+    """ASGI middleware: Server-Timing header, Prometheus histograms, N+1 warnings"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _stats.set(stats)
+        inizio = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(stats, time.perf_counter() - inizio)))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _stats.reset(token)
+            self._record(scope, stats, time.perf_counter() - inizio, status_code)
+
+    @staticmethod
+    def _record(scope, stats: RequestStats, durata: float, status_code: int) -> None:
+        method = scope["method"]
+        route = _route(scope)
+
+        REQUEST_LATENCY.labels(method, route, str(status_code)).observe(durata)
+        REQUEST_DB_TIME.labels(method, route).observe(stats.db_time)
+        REQUEST_QUERIES.labels(method, route).observe(stats.queries)
+        REQUEST_POOL_WAIT.labels(method, route).observe(stats.pool_wait)
+
+        if stats.queries > settings.METRICS_QUERY_BUDGET:
+            QUERY_BUDGET_EXCEEDED.labels(method, route).inc()
+            statement, ripetizioni = stats.statements.most_common(1)[0]
+            logger.warning(
+                f"Possibile N+1 su {method} {route}: {stats.queries} query "
+                f"({stats.db_time * 1000:.0f} ms), ripetuta {ripetizioni} volte: {statement[:300]}"
+            )
+
+
+def metrics_payload() -> bytes:
+    """Prometheus exposition of all workers (multiprocess) or of this process"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
@@ -0,0 +1,115 @@
+"""
+Instradamento delle letture sulle repliche PostgreSQL.
+
+Le richieste GET/HEAD possono leggere da una replica (vedi get_db_read in
+app.database); dopo una richiesta di modifica (POST, PUT, PATCH, DELETE)
+l'utente legge dal primario per REPLICA_READ_YOUR_WRITES_SECONDS, così vede
+subito le proprie scritture anche se la replica è in ritardo. L'ultima
+scrittura per utente è in Redis (condivisa fra i worker) con ripiego in
+memoria nel processo.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.security import bearer_subject
+
+logger = logging.getLogger(__name__)
+
+METODI_LETTURA = ("GET", "HEAD")
+PREFISSO_CHIAVE = "daassist:scrittura:"
+
+_lettura_replica: ContextVar[bool] = ContextVar("lettura_replica", default=False)
+
+
+def lettura_da_replica() -> bool:
+    """True when the request being served may read from a replica"""
+    return _lettura_replica.get()
+
+
+class WriteTracker:
+    """Ultima scrittura per utente: Redis (SET EX) con ripiego su dizionario in memoria"""
+
+    def __init__(self):
+        self._redis = None
+        self._redis_provato = False
+        self._memoria: Dict[str, float] = {}
+
+    async def _client(self):
+        if not self._redis_provato:
+            self._redis_provato = True
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(settings.REDIS_URL)
+                await self._redis.ping()
+            except Exception as e:
+                logger.warning(f"Redis non disponibile, read-your-writes solo nel worker: {e}")
+                self._redis = None
+        return self._redis
+
+    async def segna(self, utente: str, ttl: int) -> None:
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.set(PREFISSO_CHIAVE + utente, 1, ex=ttl)
+                return
+            except Exception as e:
+                logger.warning(f"Write tracker Redis non raggiungibile: {e}")
+        adesso = time.monotonic()
+        for chiave in [k for k, scadenza in self._memoria.items() if scadenza <= adesso]:
+            del self._memoria[chiave]
+        self._memoria[utente] = adesso + ttl
+
+    async def recente(self, utente: str) -> bool:
+        client = await self._client()
+        if client is not None:
+            try:
+                return bool(await client.exists(PREFISSO_CHIAVE + utente))
+            except Exception as e:
+                logger.warning(f"Write tracker Redis non raggiungibile: {e}")
+                # Nel dubbio si legge dal primario
+                return True
+        return self._memoria.get(utente, 0) > time.monotonic()
+
+
+def _utente(scope) -> Optional[str]:
+    """Subject of the bearer token (None for anonymous requests)"""
+    return bearer_subject(dict(scope["headers"]).get(b"authorization", b"").decode("latin-1"))
+
+
+class ReplicaRoutingMiddleware:
+    """ASGI middleware: marks reads that may use a replica and records writes per user"""
+
+    def __init__(self, app, tracker: Optional[WriteTracker] = None):
+        self.app = app
+        self.tracker = tracker or WriteTracker()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        utente = _utente(scope)
+        if scope["method"] in METODI_LETTURA:
+            consentita = utente is None or not await self.tracker.recente(utente)
+            token = _lettura_replica.set(consentita)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _lettura_replica.reset(token)
+            return
+
+        if utente is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_tracking(message):
+            # Registrata prima che il client riceva la risposta: la GET successiva la vede già
+            if message["type"] == "http.response.start":
+                await self.tracker.segna(utente, settings.REPLICA_READ_YOUR_WRITES_SECONDS)
+            await send(message)
+
+        await self.app(scope, receive, send_with_tracking)
@@ -0,0 +1,48 @@
+"""
+Serializzazione veloce delle risposte.
+
+Le liste paginate vengono validate una sola volta dagli oggetti ORM
+(from_attributes) e scritte direttamente in JSON da pydantic-core con un
+TypeAdapter in cache: restituendo una Response, FastAPI salta la seconda
+validazione contro response_model e il passaggio da jsonable_encoder.
+response_model resta sul decoratore per la documentazione OpenAPI.
+"""
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from starlette.middleware.gzip import GZipMiddleware
+
+# Stream SSE (anche da client che non inviano Accept: text/event-stream)
+SSE_PATHS = {"/api/v1/events"}
+
+
+@lru_cache(maxsize=None)
+def type_adapter(tipo: Any) -> TypeAdapter:
+    """Cached TypeAdapter (building one compiles the validator/serializer)"""
+    return TypeAdapter(tipo)
+
+
+def model_response(tipo: Any, dati: Any, status_code: int = 200) -> Response:
+    """Validate dati (dicts or ORM objects) against tipo once and dump it to JSON bytes"""
+    adapter = type_adapter(tipo)
+    valore = adapter.validate_python(dati, from_attributes=True)
+    return Response(content=adapter.dump_json(valore), media_type="application/json", status_code=status_code)
+
+
+class CompressionMiddleware:
+    """GZip above a size threshold, except Server-Sent Events streams"""
+
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 6):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            accept = dict(scope["headers"]).get(b"accept", b"")
+            # Lo stream SSE deve arrivare evento per evento, senza buffer del compressore
+            if b"text/event-stream" not in accept and scope["path"].rstrip("/") not in SSE_PATHS:
+                await self.gzip(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
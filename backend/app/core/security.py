@@ -1,11 +1,30 @@
+import asyncio
+import base64
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Any, Union
+from cryptography.fernet import Fernet, InvalidToken
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+# bcrypt costa 100-300 ms di CPU: negli endpoint async gira in un pool di
+# thread limitato, così il loop continua a servire le altre richieste
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# Verificato quando l'utente non esiste, perché la risposta impieghi lo stesso tempo
+_hash_fittizio: Optional[str] = None
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +37,32 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with another scheme or bcrypt cost"""
+    if pwd_context.needs_update(hashed_password):
+        return True
+    # $2b$12$...: il costo è il secondo campo
+    parti = hashed_password.split("$")
+    return len(parti) < 4 or not parti[2].isdigit() or int(parti[2]) != settings.PASSWORD_BCRYPT_ROUNDS
+
+
+async def verify_password_async(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """verify_password in the bcrypt thread pool; hashed_password None burns the same time and fails"""
+    global _hash_fittizio
+    loop = asyncio.get_running_loop()
+    if hashed_password is None:
+        if _hash_fittizio is None:
+            _hash_fittizio = await loop.run_in_executor(_hash_executor, get_password_hash, "password-fittizia")
+        await loop.run_in_executor(_hash_executor, verify_password, plain_password, _hash_fittizio)
+        return False
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash in the bcrypt thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, get_password_hash, password)
+
+
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     if expires_delta:
@@ -38,6 +83,38 @@ def create_refresh_token(subject: Union[str, Any]) -> str:
     return encoded_jwt
 
 
+def bearer_subject(authorization: str) -> Optional[str]:
+    """Subject of the JWT in an Authorization header value (None if missing or invalid)"""
+    if not authorization.lower().startswith("bearer "):
+        return None
+    payload = decode_token(authorization[7:].strip())
+    return str(payload["sub"]) if payload and payload.get("sub") else None
+
+
+def create_sse_ticket(subject: Union[str, Any]) -> str:
+    """
+    Create a short-lived JWT that only opens the events stream.
+
+    EventSource cannot send headers, so the credential ends up in the URL and
+    in the access logs: there it must not be a reusable access token.
+    """
+    expire = datetime.utcnow() + timedelta(seconds=settings.EVENTS_TICKET_EXPIRE_SECONDS)
+    to_encode = {"exp": expire, "sub": str(subject), "type": "sse"}
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def create_oauth_state(subject: Union[str, Any], nonce: str) -> str:
+    """
+    Create the OAuth state of a calendar connection (10 minutes).
+
+    The nonce is also set in a cookie of the browser that started the flow:
+    the callback accepts the state only from that browser.
+    """
+    expire = datetime.utcnow() + timedelta(minutes=10)
+    to_encode = {"exp": expire, "sub": str(subject), "type": "oauth_state", "nonce": nonce}
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
 def decode_token(token: str) -> Optional[dict]:
     """Decode and verify JWT token"""
     try:
@@ -45,3 +122,21 @@ def decode_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+
+# Chiave Fernet derivata da CREDENTIALS_ENCRYPTION_KEY (stringa di lunghezza libera)
+_fernet = Fernet(base64.urlsafe_b64encode(hashlib.sha256(settings.CREDENTIALS_ENCRYPTION_KEY.encode()).digest()))
+
+
+def encrypt_secret(value: str) -> str:
+    """Encrypt a secret for storage (Fernet, key from CREDENTIALS_ENCRYPTION_KEY)"""
+    return _fernet.encrypt(value.encode()).decode()
+
+
+def decrypt_secret(value: str) -> Optional[str]:
+    """Decrypt a stored secret; None when the key changed or the value is not encrypted"""
+    try:
+        return _fernet.decrypt(value.encode()).decode()
+    except InvalidToken:
+        logger.warning("Segreto non decifrabile: CREDENTIALS_ENCRYPTION_KEY cambiata o valore in chiaro")
+        return None
@@ -0,0 +1,201 @@
+"""
+Log delle query lente.
+
+Gli statement che superano SLOW_QUERY_THRESHOLD_MS vengono accodati con
+parametri (mascherati quelli sensibili), punto di chiamata nel codice
+applicativo e route della richiesta; un thread in background li scrive nella
+tabella slow_query_log. Per una frazione dei SELECT lenti
+(SLOW_QUERY_EXPLAIN_SAMPLE_RATE, al massimo uno per statement ogni
+SLOW_QUERY_EXPLAIN_COOLDOWN_MINUTES) viene catturato anche il piano con
+EXPLAIN (ANALYZE, BUFFERS) su una connessione separata allo stesso database
+che l'ha eseguito (primario o replica), in una transazione annullata e con
+statement_timeout.
+"""
+import hashlib
+import logging
+import queue
+import random
+import re
+import threading
+import time
+import traceback
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.metrics import current_route
+
+logger = logging.getLogger(__name__)
+
+_PARAMETRI = re.compile(r"%\(\w+\)s(\s*,\s*%\(\w+\)s)*")
+_NUMERI = re.compile(r"\b\d+\b")
+_SPAZI = re.compile(r"\s+")
+_SCRITTURA = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|FOR\s+UPDATE|FOR\s+SHARE)\b", re.IGNORECASE)
+_CHIAVI_SENSIBILI = ("password", "token", "secret", "credenzial")
+
+
+def fingerprint(statement: str) -> str:
+    """Hash of the statement with parameters and literals collapsed"""
+    normalizzato = _SPAZI.sub(" ", _NUMERI.sub("?", _PARAMETRI.sub("?", statement))).strip()
+    return hashlib.sha1(normalizzato.encode()).hexdigest()[:16]
+
+
+def _maschera(parameters: Any) -> str:
+    if isinstance(parameters, dict):
+        parameters = {
+            k: "***" if any(s in k.lower() for s in _CHIAVI_SENSIBILI) else v
+            for k, v in parameters.items()
+        }
+    return repr(parameters)[:2000]
+
+
+def _chiamante() -> Optional[str]:
+    """Innermost application frame outside app/core and app/database.py"""
+    for frame in reversed(traceback.extract_stack()):
+        percorso = frame.filename.replace("\\", "/")
+        if "/app/" not in percorso or "/app/core/" in percorso or percorso.endswith("/app/database.py"):
+            continue
+        return f"{percorso.split('/app/', 1)[1]}:{frame.lineno}:{frame.name}"[:300]
+    return None
+
+
+class SlowQueryRecorder:
+    """Coda limitata + thread writer: la richiesta non aspetta né EXPLAIN né INSERT"""
+
+    def __init__(self):
+        self._coda: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._ultimo_explain: Dict[str, float] = {}
+        self._prossima_pulizia = 0.0
+        self._engine: Optional[Engine] = None
+        self._engines_explain: Dict[str, Engine] = {}
+
+    def instrument(self, engine: Engine, nome: str, explain: bool) -> None:
+        """Watch an engine; explain=True only for PostgreSQL (plans are taken on that same database)"""
+        url_explain = engine.url if explain else None
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            durata_ms = (time.perf_counter() - conn.info["slow_query_start"].pop()) * 1000
+            if durata_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self._accoda(nome, statement, parameters, durata_ms, None if executemany else url_explain)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(context):
+            if context.connection is not None and context.connection.info.get("slow_query_start"):
+                context.connection.info["slow_query_start"].pop()
+
+    def _accoda(
+        self, nome: str, statement: str, parameters: Any, durata_ms: float, url_explain: Optional[URL]
+    ) -> None:
+        impronta = fingerprint(statement)
+        voce = {
+            "fingerprint": impronta,
+            "engine": nome,
+            "statement": statement,
+            "parametri": _maschera(parameters),
+            "durata_ms": durata_ms,
+            "chiamante": _chiamante(),
+            "route": current_route(),
+            "created_at": datetime.utcnow(),
+            "explain_parametri": None,
+            "explain_url": None,
+        }
+        if url_explain is not None and not _SCRITTURA.search(statement) and self._campiona(impronta):
+            voce["explain_parametri"] = parameters
+            voce["explain_url"] = url_explain
+
+        try:
+            self._coda.put_nowait(voce)
+        except queue.Full:
+            logger.warning(f"Coda slow query piena, scartata: {statement[:200]}")
+            return
+        self._avvia()
+
+    def _campiona(self, impronta: str) -> bool:
+        if random.random() >= settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+            return False
+        adesso = time.monotonic()
+        attesa = settings.SLOW_QUERY_EXPLAIN_COOLDOWN_MINUTES * 60
+        with self._lock:
+            if adesso >= self._prossima_pulizia:
+                # Statement fuori dal cooldown: non serve ricordarli
+                self._ultimo_explain = {k: t for k, t in self._ultimo_explain.items() if adesso - t < attesa}
+                self._prossima_pulizia = adesso + attesa
+            ultimo = self._ultimo_explain.get(impronta)
+            if ultimo is not None and adesso - ultimo < attesa:
+                return False
+            self._ultimo_explain[impronta] = adesso
+        return True
+
+    def _avvia(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="slow-query-log", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        # Engine dedicato, senza pool e non strumentato: nessuna ricorsione sul log
+        if self._engine is None:
+            self._engine = create_engine(settings.DATABASE_URL, poolclass=NullPool)
+        while True:
+            voce = self._coda.get()
+            try:
+                parametri = voce.pop("explain_parametri")
+                url = voce.pop("explain_url")
+                piano = self._explain(url, voce["statement"], parametri) if parametri is not None else None
+                self._salva(voce, piano)
+            except Exception as e:
+                logger.warning(f"Registrazione slow query fallita: {e}")
+
+    def _explain(self, url: URL, statement: str, parametri: Any) -> Optional[str]:
+        # La query viene rieseguita dove è stata eseguita (una query di report
+        # su una replica non deve pesare sul primario): solo SELECT, con
+        # timeout, transazione annullata
+        chiave = url.render_as_string(hide_password=False)
+        if chiave not in self._engines_explain:
+            self._engines_explain[chiave] = create_engine(url, poolclass=NullPool)
+        raw = self._engines_explain[chiave].raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute(f"SET LOCAL statement_timeout = {int(settings.SLOW_QUERY_EXPLAIN_TIMEOUT_MS)}")
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parametri or None)
+            return "\n".join(riga[0] for riga in cursor.fetchall())
+        except Exception as e:
+            return f"EXPLAIN non riuscito: {e}"
+        finally:
+            raw.rollback()
+            raw.close()
+
+    def _salva(self, voce: Dict[str, Any], piano: Optional[str]) -> None:
+        from app.models.monitoring import SlowQueryLog
+
+        with self._engine.begin() as conn:
+            conn.execute(
+                SlowQueryLog.__table__.insert().values(
+                    fingerprint=voce["fingerprint"],
+                    engine=voce["engine"],
+                    statement=voce["statement"],
+                    parametri=voce["parametri"],
+                    durata_ms=Decimal(str(round(voce["durata_ms"], 2))),
+                    chiamante=voce["chiamante"],
+                    route=voce["route"],
+                    piano=piano,
+                    created_at=voce["created_at"],
+                    updated_at=voce["created_at"],
+                    attivo=True,
+                )
+            )
+
+
+slow_query_recorder = SlowQueryRecorder()
@@ -0,0 +1,112 @@
+"""
+Limitazione dei tentativi di login.
+
+I login falliti vengono contati per username e per IP in una finestra di
+LOGIN_THROTTLE_WINDOW_SECONDS (INCR + EXPIRE): oltre LOGIN_MAX_FAILURES_PER_USER
+o LOGIN_MAX_FAILURES_PER_IP il login risponde 429 senza verificare la
+password, fino alla scadenza della finestra. Un login riuscito azzera il
+contatore dell'username. Con Redis i contatori sono condivisi fra i worker,
+altrimenti restano in memoria nel processo.
+"""
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PREFISSO_CHIAVE = "daassist:login:"
+
+
+class LoginThrottle:
+    """Contatori dei login falliti: Redis con ripiego su dizionario in memoria"""
+
+    def __init__(self):
+        self._redis = None
+        self._redis_provato = False
+        self._memoria: Dict[str, Tuple[float, int]] = {}
+
+    async def _client(self):
+        if not self._redis_provato:
+            self._redis_provato = True
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(settings.REDIS_URL)
+                await self._redis.ping()
+            except Exception as e:
+                logger.warning(f"Redis non disponibile, limiti di login solo locali: {e}")
+                self._redis = None
+        return self._redis
+
+    @staticmethod
+    def _chiavi(username: str, ip: Optional[str]) -> Dict[str, int]:
+        chiavi = {f"{PREFISSO_CHIAVE}user:{username.lower()}": settings.LOGIN_MAX_FAILURES_PER_USER}
+        if ip:
+            chiavi[f"{PREFISSO_CHIAVE}ip:{ip}"] = settings.LOGIN_MAX_FAILURES_PER_IP
+        return chiavi
+
+    async def bloccato(self, username: str, ip: Optional[str]) -> int:
+        """Seconds until the next allowed attempt (0 when not throttled)"""
+        chiavi = self._chiavi(username, ip)
+        client = await self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for chiave in chiavi:
+                        pipe.get(chiave)
+                        pipe.ttl(chiave)
+                    valori = await pipe.execute()
+                attesa = 0
+                for i, limite in enumerate(chiavi.values()):
+                    tentativi, ttl = valori[2 * i], valori[2 * i + 1]
+                    if tentativi is not None and int(tentativi) >= limite:
+                        attesa = max(attesa, ttl if ttl > 0 else settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+                return attesa
+            except Exception as e:
+                logger.warning(f"Login throttle Redis non raggiungibile: {e}")
+        adesso = time.monotonic()
+        attesa = 0
+        for chiave, limite in chiavi.items():
+            scadenza, tentativi = self._memoria.get(chiave, (0.0, 0))
+            if scadenza > adesso and tentativi >= limite:
+                attesa = max(attesa, int(scadenza - adesso) + 1)
+        return attesa
+
+    async def fallito(self, username: str, ip: Optional[str]) -> None:
+        """Count a failed attempt for the username and the IP"""
+        finestra = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        client = await self._client()
+        if client is not None:
+            try:
+                async with client.pipeline(transaction=False) as pipe:
+                    for chiave in self._chiavi(username, ip):
+                        pipe.incr(chiave)
+                        # NX: la finestra parte dal primo fallimento e non si allunga
+                        pipe.expire(chiave, finestra, nx=True)
+                    await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Login throttle Redis non raggiungibile: {e}")
+        adesso = time.monotonic()
+        for chiave in [k for k, (scadenza, _) in self._memoria.items() if scadenza <= adesso]:
+            del self._memoria[chiave]
+        for chiave in self._chiavi(username, ip):
+            scadenza, tentativi = self._memoria.get(chiave, (adesso + finestra, 0))
+            self._memoria[chiave] = (scadenza, tentativi + 1)
+
+    async def riuscito(self, username: str) -> None:
+        """Reset the username counter after a successful login"""
+        chiave = f"{PREFISSO_CHIAVE}user:{username.lower()}"
+        client = await self._client()
+        if client is not None:
+            try:
+                await client.delete(chiave)
+                return
+            except Exception as e:
+                logger.warning(f"Login throttle Redis non raggiungibile: {e}")
+        self._memoria.pop(chiave, None)
+
+
+login_throttle = LoginThrottle()
@@ -1,34 +1,245 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql import Select
 from app.core.config import settings
+from app.core.metrics import TimedQueuePool, instrument_engine
+from app.core.replicas import lettura_da_replica
+from app.core.slow_queries import slow_query_recorder
 from app.models.base import Base
 
+logger = logging.getLogger(__name__)
+
+# Keepalive TCP (libpq): le connessioni cadute lato rete vengono chiuse dal
+# sistema operativo invece di restare appese fino al primo utilizzo
+KEEPALIVE_POSTGRES = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+
+def ping_se_inattiva(engine: Engine, secondi: int) -> None:
+    """
+    Liveness check at checkout only for connections idle for more than
+    secondi (instead of pool_pre_ping on every checkout). A dead connection
+    raises DisconnectionError and the pool transparently opens a new one.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checkin_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checkin_at = connection_record.info.get("checkin_at")
+        if checkin_at is None or time.monotonic() - checkin_at < secondi:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            raise exc.DisconnectionError() from e
+
+
+def _crea_engine_postgres(url: str, nome: str, connect_args: Optional[dict] = None) -> Engine:
+    connect_args = {**KEEPALIVE_POSTGRES, **(connect_args or {})}
+    if settings.DB_PGBOUNCER:
+        # Il pooling lo fa PgBouncer (transaction mode): ogni sessione apre e
+        # chiude la propria connessione verso PgBouncer. psycopg2 non usa
+        # prepared statement lato server; non vanno usati SET di sessione,
+        # LISTEN, advisory lock di sessione o tabelle temporanee.
+        nuovo = create_engine(
+            url,
+            poolclass=NullPool,
+            pool_logging_name=nome,
+            connect_args=connect_args,
+        )
+    else:
+        nuovo = create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_logging_name=nome,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_use_lifo=True,
+            connect_args=connect_args,
+        )
+        ping_se_inattiva(nuovo, settings.DB_POOL_PING_IDLE_SECONDS)
+    instrument_engine(nuovo, nome)
+    return nuovo
+
+
 # PostgreSQL engine (locale)
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+engine = _crea_engine_postgres(settings.DATABASE_URL, "postgres")
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_recorder.instrument(engine, "postgres", explain=True)
+
+# Repliche PostgreSQL in lettura (opzionali)
+replica_engines: List[Engine] = []
+for i, url in enumerate(settings.POSTGRES_REPLICA_URLS, start=1):
+    replica_engine = _crea_engine_postgres(
+        url, f"replica{i}", connect_args={"connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_SECONDS}
+    )
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        slow_query_recorder.instrument(replica_engine, "replica", explain=True)
+    replica_engines.append(replica_engine)
+
+# Ritardo di replica: zero se tutto il WAL ricevuto è già applicato
+# (pg_last_xact_replay_timestamp da solo cresce anche quando il primario è fermo)
+_QUERY_RITARDO = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
 )
 
-# SQL Server engine (gestionale) - opzionale, verrà creato solo se disponibile
-sqlserver_engine = None
-SessionGestionale = None
 
-try:
-    sqlserver_engine = create_engine(
-        settings.SQLSERVER_URL,
-        pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10,
-    )
-    SessionGestionale = sessionmaker(autocommit=False, autoflush=False, bind=sqlserver_engine)
-except Exception as e:
-    print(f"Warning: SQL Server connection not available: {e}")
-    print("Continuando solo con PostgreSQL locale...")
+class ReplicaRouter:
+    """
+    Round-robin sulle repliche raggiungibili e con ritardo entro
+    REPLICA_MAX_LAG_SECONDS. Una replica su cui una query fallisce per
+    connessione (caduta o impossibile) viene esclusa subito, fino al
+    controllo successivo.
+    """
+
+    def __init__(self, engines: List[Engine]):
+        self.engines = engines
+        self._sane: List[Engine] = list(engines)
+        self._turno = itertools.count()
+        self._prossimo_controllo = 0.0
+        self._lock = threading.Lock()
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_errore(replica))
+
+    def _on_errore(self, replica: Engine):
+        def _errore(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                self.escludi(replica)
+        return _errore
+
+    def escludi(self, replica: Engine) -> None:
+        """Take a replica out of rotation until the next health check"""
+        if replica in self._sane:
+            # Nuova lista: scegli() legge _sane senza lock
+            self._sane = [r for r in self._sane if r is not replica]
+            logger.warning(f"Replica {replica.url.host} esclusa dopo un errore di connessione")
+
+    def scegli(self) -> Optional[Engine]:
+        """Next healthy replica, None when all of them are down or lagging"""
+        if not self.engines:
+            return None
+        # Un solo thread alla volta ricontrolla; gli altri usano l'ultimo esito
+        if time.monotonic() >= self._prossimo_controllo and self._lock.acquire(blocking=False):
+            try:
+                self._controlla()
+            finally:
+                self._lock.release()
+        sane = self._sane
+        if not sane:
+            return None
+        return sane[next(self._turno) % len(sane)]
+
+    def _controlla(self) -> None:
+        sane = []
+        for replica in self.engines:
+            try:
+                with replica.connect() as conn:
+                    ritardo = float(conn.execute(_QUERY_RITARDO).scalar() or 0)
+            except Exception as e:
+                logger.warning(f"Replica {replica.url.host} non raggiungibile: {e}")
+                continue
+            if ritardo > settings.REPLICA_MAX_LAG_SECONDS:
+                logger.warning(f"Replica {replica.url.host} in ritardo di {ritardo:.1f}s, esclusa")
+                continue
+            sane.append(replica)
+        self._sane = sane
+        self._prossimo_controllo = time.monotonic() + settings.REPLICA_HEALTH_CHECK_SECONDS
+
+
+replica_router = ReplicaRouter(replica_engines)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs to the replica in info["replica"] and
+    everything else (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE) to
+    the primary. After the first write the session stays on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None:
+            return engine
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            self.info["replica"] = None
+            return engine
+        return replica
+
+
+# SQL Server engine (gestionale) - opzionale, creato al primo utilizzo: i
+# processi che non leggono il gestionale non importano pymssql
+_sqlserver_engine: Optional[Engine] = None
+_session_gestionale: Optional[sessionmaker] = None
+_sqlserver_provato = False
+_sqlserver_lock = threading.Lock()
+
+
+def get_sqlserver_engine() -> Optional[Engine]:
+    """Gestionale engine, created on first use; None when SQL Server is not available"""
+    global _sqlserver_engine, _session_gestionale, _sqlserver_provato
+    if _sqlserver_provato:
+        return _sqlserver_engine
+    with _sqlserver_lock:
+        if _sqlserver_provato:
+            return _sqlserver_engine
+        try:
+            nuovo = create_engine(
+                settings.SQLSERVER_URL,
+                poolclass=TimedQueuePool,
+                pool_logging_name="gestionale",
+                pool_size=settings.SQLSERVER_POOL_SIZE,
+                max_overflow=settings.SQLSERVER_MAX_OVERFLOW,
+                pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+                pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            )
+            ping_se_inattiva(nuovo, settings.DB_POOL_PING_IDLE_SECONDS)
+            instrument_engine(nuovo, "gestionale")
+            if settings.SLOW_QUERY_LOG_ENABLED:
+                slow_query_recorder.instrument(nuovo, "gestionale", explain=False)
+            _session_gestionale = sessionmaker(autocommit=False, autoflush=False, bind=nuovo)
+            _sqlserver_engine = nuovo
+        except Exception as e:
+            logger.warning(f"SQL Server non disponibile, solo PostgreSQL locale: {e}")
+        _sqlserver_provato = True
+    return _sqlserver_engine
+
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionRouting = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
+
+
+def get_session_lettura(replica: Optional[bool] = None) -> Session:
+    """
+    Session for read-mostly work: on a replica when one is healthy and the
+    current request may use it (GET without recent writes by the same user,
+    see app.core.replicas), otherwise on the primary. replica=True forces a
+    replica outside HTTP requests (report scripts).
+    """
+    if replica is None:
+        replica = lettura_da_replica()
+    scelta = replica_router.scegli() if replica else None
+    if scelta is None:
+        return SessionLocal()
+    return SessionRouting(info={"replica": scelta})
 
 
 def get_db() -> Session:
@@ -40,17 +251,42 @@ def get_db() -> Session:
         db.close()
 
 
+def get_db_read() -> Session:
+    """Dependency per endpoint GET di sola lettura (replica quando possibile)"""
+    db = get_session_lettura()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 def get_db_gestionale() -> Session:
     """Dependency per ottenere sessione database gestionale"""
-    if SessionGestionale is None:
+    if get_sqlserver_engine() is None:
         raise Exception("SQL Server connection not configured")
-    db = SessionGestionale()
+    db = _session_gestionale()
     try:
         yield db
     finally:
         db.close()
 
 
+def warmup_engines() -> None:
+    """
+    Per-worker start: forget pooled connections inherited through fork (gunicorn
+    --preload) without closing them for the parent, then open the first
+    primary connection so that the first request does not pay for it.
+    """
+    for e in [engine, *replica_engines, _sqlserver_engine]:
+        if e is not None:
+            e.dispose(close=False)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"PostgreSQL non raggiungibile all'avvio: {e}")
+
+
 def init_db():
     """Inizializza il database creando tutte le tabelle"""
     Base.metadata.create_all(bind=engine)
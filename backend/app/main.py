@@ -1,10 +1,18 @@
-from fastapi import FastAPI, Request, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from app.core.config import settings
 from app.core.exceptions import DAAssistException
+from app.core.events import event_broker
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.metrics import METRICS_CONTENT_TYPE, MetricsMiddleware, metrics_payload
+from app.core.replicas import ReplicaRoutingMiddleware
+from app.core.responses import CompressionMiddleware
 from app.api.v1.router import api_router
+from app.database import warmup_engines
 import logging
 
 # Logging configuration
@@ -14,6 +22,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker startup and shutdown. With gunicorn --preload the app is
+    imported once in the master and forked: everything bound to a process
+    (pool connections, event loop, Redis listener) is created here.
+    """
+    logger.info(f"{settings.APP_NAME} v{settings.APP_VERSION} starting up...")
+    await run_in_threadpool(warmup_engines)
+    await event_broker.start()
+    # Initialize database if needed
+    # from app.database import init_db
+    # init_db()
+    yield
+    logger.info(f"{settings.APP_NAME} shutting down...")
+    await event_broker.stop()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -22,8 +49,29 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# Letture GET sulle repliche, primario per chi ha appena scritto (read-your-writes)
+if settings.POSTGRES_REPLICA_URLS:
+    app.add_middleware(ReplicaRoutingMiddleware)
+
+# Idempotency-Key sulle POST (registrato prima di CORS, che resta il più esterno)
+if settings.IDEMPOTENCY_ENABLED:
+    app.add_middleware(IdempotencyMiddleware)
+
+# Compressione risposte (esterna all'idempotenza: le risposte salvate restano in chiaro)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
 )
 
+# Query/tempi DB/latenza per richiesta (Server-Timing e /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -91,33 +139,25 @@ async def health_check():
     }
 
 
-# Include API router
-app.include_router(api_router, prefix="/api/v1")
-
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup"""
-    logger.info(f"{settings.APP_NAME} v{settings.APP_VERSION} starting up...")
-    # Initialize database if needed
-    # from app.database import init_db
-    # init_db()
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics"""
+        return Response(content=metrics_payload(), media_type=METRICS_CONTENT_TYPE)
 
 
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown"""
-    logger.info(f"{settings.APP_NAME} shutting down...")
+# Include API router
+app.include_router(api_router, prefix="/api/v1")
 
 
 if __name__ == "__main__":
+    # Sviluppo: un processo con reload. In produzione: gunicorn -c gunicorn.conf.py app.main:app
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=settings.DEBUG,
+        workers=None if settings.DEBUG else settings.SERVER_WORKERS,
         log_level="info",
     )
@@ -23,6 +23,7 @@ from app.models.intervention import (
     Intervento,
     InterventoRiga,
     InterventoSessione,
+    TecnicoCaricoGiornaliero,
     InterventoTecnico,
     InterventoAllegato,
     RichiestaIntervento,
@@ -31,6 +32,7 @@ from app.models.calendar import (
     CalendarioEvento,
     CalendarioTecnico,
     CalendarioSyncLog,
+    CalendarioAccount,
 )
 from app.models.asset import (
     Asset,
@@ -45,7 +47,8 @@ from app.models.kb import (
     KBArticoloTag,
     KBArticoloFeedback,
 )
-from app.models.sync import SyncLog
+from app.models.sync import SyncLog, SyncRiassegnazione
+from app.models.monitoring import SlowQueryLog
 
 __all__ = [
     "Base",
@@ -78,6 +81,7 @@ __all__ = [
     "Intervento",
     "InterventoRiga",
     "InterventoSessione",
+    "TecnicoCaricoGiornaliero",
     "InterventoTecnico",
     "InterventoAllegato",
     "RichiestaIntervento",
@@ -85,6 +89,7 @@ __all__ = [
     "CalendarioEvento",
     "CalendarioTecnico",
     "CalendarioSyncLog",
+    "CalendarioAccount",
     # Assets
     "Asset",
     "AssetCredenziale",
@@ -98,4 +103,7 @@ __all__ = [
     "KBArticoloFeedback",
     # Sync
     "SyncLog",
+    "SyncRiassegnazione",
+    # Monitoring
+    "SlowQueryLog",
 ]
@@ -0,0 +1,42 @@
+"""
+Archivio dei ticket chiusi (schema archivio).
+
+Le tabelle hanno le stesse colonne dei modelli ticket più archiviato_at,
+senza foreign key, con chiave primaria (id, created_at) e partizionate per
+anno di created_at. Vengono create dalla migrazione e non fanno parte di
+Base.metadata: l'autogenerate di Alembic non le vede, quindi una colonna
+aggiunta a ticket/ticket_* richiede anche l'ALTER TABLE sulla tabella di
+archivio nella stessa migrazione.
+"""
+from sqlalchemy import Column, DateTime, MetaData, Table
+
+from app.models.ticket import Ticket, TicketAllegato, TicketMessaggio, TicketNota, TicketStorico
+
+ARCHIVIO_SCHEMA = "archivio"
+
+archivio_metadata = MetaData(schema=ARCHIVIO_SCHEMA)
+
+
+def _tabella_archivio(modello) -> Table:
+    colonne = [
+        Column(c.name, c.type, primary_key=c.name in ("id", "created_at"), nullable=c.nullable)
+        for c in modello.__table__.columns
+    ]
+    return Table(
+        modello.__tablename__,
+        archivio_metadata,
+        *colonne,
+        Column("archiviato_at", DateTime, nullable=False),
+    )
+
+
+ticket_archivio = _tabella_archivio(Ticket)
+ticket_storico_archivio = _tabella_archivio(TicketStorico)
+
+# Tabelle figlie: spostate e cancellate prima del ticket
+TABELLE_FIGLIE_ARCHIVIO = [
+    (TicketNota, _tabella_archivio(TicketNota)),
+    (TicketMessaggio, _tabella_archivio(TicketMessaggio)),
+    (TicketStorico, ticket_storico_archivio),
+    (TicketAllegato, _tabella_archivio(TicketAllegato)),
+]
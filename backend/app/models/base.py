@@ -1,11 +1,27 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, DateTime, Boolean
+from sqlalchemy import Column, Integer, DateTime, Boolean, Text
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.orm import Session
 
+from app.core.security import decrypt_secret, encrypt_secret
+
 Base = declarative_base()
 
 
+class EncryptedText(TypeDecorator):
+    """Text column encrypted at rest with encrypt_secret/decrypt_secret"""
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encrypt_secret(value) if value is not None else None
+
+    def process_result_value(self, value, dialect):
+        return decrypt_secret(value) if value is not None else None
+
+
 class BaseModel(Base):
     """Base model with common fields for all tables"""
 
@@ -14,7 +30,9 @@ class BaseModel(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-    attivo = Column(Boolean, default=True, nullable=False, index=True)
+    # Nessun indice dedicato: quasi tutte le righe sono attive, i filtri su
+    # attivo usano gli indici parziali WHERE attivo dei singoli modelli
+    attivo = Column(Boolean, default=True, nullable=False)
 
     @declared_attr
     def __tablename__(cls) -> str:
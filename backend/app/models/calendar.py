@@ -1,6 +1,6 @@
 from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
-from app.models.base import BaseModel
+from app.models.base import BaseModel, EncryptedText
 
 
 class CalendarioEvento(BaseModel):
@@ -27,11 +27,11 @@ class CalendarioEvento(BaseModel):
     tecnico_principale_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False, index=True)
 
     # Stato evento
-    stato = Column(String(50), default="PIANIFICATO")  # PIANIFICATO, CONFERMATO, IN_CORSO, COMPLETATO, ANNULLATO
+    stato = Column(String(50), default="PIANIFICATO")  # BOZZA, PIANIFICATO, CONFERMATO, IN_CORSO, COMPLETATO, ANNULLATO
 
     # Sync calendari esterni
-    google_event_id = Column(String(255))
-    outlook_event_id = Column(String(255))
+    google_event_id = Column(String(255), index=True)
+    outlook_event_id = Column(String(255), index=True)
     caldav_uid = Column(String(255))
 
     # Personalizzazione
@@ -87,3 +87,30 @@ class CalendarioSyncLog(BaseModel):
 
     # Relationships
     tecnico = relationship("Tecnico")
+
+
+class CalendarioAccount(BaseModel):
+    """Collegamento tecnico - calendario esterno (token OAuth e stato sync incrementale)"""
+
+    __tablename__ = "calendario_account"
+
+    tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False, index=True)
+    provider = Column(String(50), nullable=False)  # GOOGLE, OUTLOOK
+
+    calendar_id = Column(String(255), default="primary")
+
+    # OAuth, cifrati (CREDENTIALS_ENCRYPTION_KEY)
+    access_token = Column(EncryptedText)
+    refresh_token = Column(EncryptedText)
+    token_scadenza = Column(DateTime)
+
+    # Sync incrementale: Google nextSyncToken / Graph deltaLink
+    sync_token = Column(Text)
+    ultimo_sync = Column(DateTime)
+    ultimo_export = Column(DateTime)
+    # JSON: id degli eventi il cui ultimo invio è fallito, ritentati al sync successivo
+    export_in_sospeso = Column(Text)
+
+    # Relationships
+    tecnico = relationship("Tecnico")
+
@@ -103,6 +103,10 @@ class SediCliente(BaseModel):
     telefono = Column(String(50))
     email = Column(String(255))
 
+    # Posizione (pianificazione e ricerca tecnico più vicino)
+    latitudine = Column(Numeric(10, 6))
+    longitudine = Column(Numeric(10, 6))
+
     # Orari specifici sede (se diversi da quelli generali)
     orari_servizio = Column(Text)  # JSON format
 
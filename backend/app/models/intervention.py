@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Numeric, Date, Time
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Numeric, Date, Time, UniqueConstraint, Index, func, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -7,6 +8,14 @@ class Intervento(BaseModel):
     """Interventi tecnici"""
 
     __tablename__ = "interventi"
+    __table_args__ = (
+        # Delta sync app mobile: modifiche per tecnico in ordine di updated_at
+        Index("ix_interventi_tecnico_updated", "tecnico_id", "updated_at", "id"),
+        # Agenda e dashboard: finestre temporali sui soli interventi attivi
+        Index("ix_interventi_attivi_inizio", "data_inizio", postgresql_where=text("attivo")),
+        Index("ix_interventi_attivi_tecnico_inizio", "tecnico_id", "data_inizio", postgresql_where=text("attivo")),
+        Index("ix_interventi_attivi_fine", "data_fine", postgresql_where=text("attivo")),
+    )
 
     numero = Column(String(50), unique=True, nullable=False, index=True)
     serie = Column(String(20))  # Per numerazione gestionale
@@ -26,7 +35,7 @@ class Intervento(BaseModel):
     stato_id = Column(Integer, ForeignKey("lookup_stati_intervento.id"), nullable=False, index=True)
 
     # Tecnico principale
-    tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False, index=True)
+    tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False)
 
     # Descrizione
     oggetto = Column(String(200), nullable=False)
@@ -71,6 +80,9 @@ class InterventoRiga(BaseModel):
     """Righe attività intervento"""
 
     __tablename__ = "interventi_righe"
+    __table_args__ = (
+        Index("ix_interventi_righe_updated", "updated_at", "id"),
+    )
 
     intervento_id = Column(Integer, ForeignKey("interventi.id", ondelete="CASCADE"), nullable=False, index=True)
     numero_riga = Column(Integer, nullable=False)
@@ -91,22 +103,38 @@ class InterventoRiga(BaseModel):
     # Collegamento a sessione (opzionale)
     sessione_id = Column(Integer, ForeignKey("interventi_sessioni.id"), nullable=True)
 
+    # Id generato dall'app offline (idempotenza di /sync/push)
+    client_uuid = Column(String(36), unique=True, nullable=True)
+
     # Relationships
     intervento = relationship("Intervento", back_populates="righe")
     categoria = relationship("LookupCategorieAttivita", lazy="joined")
     sessione = relationship("InterventoSessione", foreign_keys=[sessione_id])
 
-    @property
+    @hybrid_property
     def importo(self) -> float:
         base = float(self.quantita * self.prezzo_unitario)
-        sconto = base * (float(self.sconto_percentuale) / 100)
+        sconto = base * (float(self.sconto_percentuale or 0) / 100)
         return base - sconto
 
+    @importo.expression
+    def importo(cls):
+        # Stesso calcolo lato SQL, per aggregare senza caricare le righe
+        return (
+            func.coalesce(cls.quantita, 0)
+            * func.coalesce(cls.prezzo_unitario, 0)
+            * (100 - func.coalesce(cls.sconto_percentuale, 0))
+            / 100
+        )
+
 
 class InterventoSessione(BaseModel):
     """Sessioni di lavoro (tempi)"""
 
     __tablename__ = "interventi_sessioni"
+    __table_args__ = (
+        Index("ix_interventi_sessioni_updated", "updated_at", "id"),
+    )
 
     intervento_id = Column(Integer, ForeignKey("interventi.id", ondelete="CASCADE"), nullable=False, index=True)
     tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False)
@@ -130,12 +158,35 @@ class InterventoSessione(BaseModel):
 
     note = Column(Text)
 
+    # Id generato dall'app offline (idempotenza di /sync/push)
+    client_uuid = Column(String(36), unique=True, nullable=True)
+
     # Relationships
     intervento = relationship("Intervento", back_populates="sessioni")
     tecnico = relationship("Tecnico")
     tipo_intervento = relationship("LookupTipiIntervento", lazy="joined")
 
 
+class TecnicoCaricoGiornaliero(BaseModel):
+    """Rollup giornaliero delle sessioni per tecnico (aggiornato incrementalmente)"""
+
+    __tablename__ = "tecnici_carico_giornaliero"
+    __table_args__ = (
+        UniqueConstraint("tecnico_id", "data", name="uq_tecnici_carico_giornaliero_tecnico_data"),
+    )
+
+    tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False)
+    data = Column(Date, nullable=False, index=True)
+
+    minuti_lavoro = Column(Integer, nullable=False, default=0)
+    minuti_viaggio = Column(Integer, nullable=False, default=0)
+    km_percorsi = Column(Numeric(10, 2), nullable=False, default=0)
+    sessioni = Column(Integer, nullable=False, default=0)
+
+    # Relationships
+    tecnico = relationship("Tecnico")
+
+
 class InterventoTecnico(BaseModel):
     """Tecnici aggiuntivi nel team"""
 
@@ -179,6 +230,15 @@ class RichiestaIntervento(BaseModel):
     """Richieste di intervento da pianificare"""
 
     __tablename__ = "richieste_intervento"
+    __table_args__ = (
+        # Coda dispatch: solo le richieste ancora da pianificare
+        Index(
+            "ix_richieste_intervento_pendenti",
+            "priorita_id",
+            "data_richiesta",
+            postgresql_where=text("stato = 'PENDENTE' AND attivo"),
+        ),
+    )
 
     ticket_id = Column(Integer, ForeignKey("ticket.id"), nullable=True, index=True)
     cliente_id = Column(Integer, ForeignKey("cache_clienti.id"), nullable=False, index=True)
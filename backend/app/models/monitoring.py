@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Text, Numeric, Index
+from app.models.base import BaseModel
+
+
+class SlowQueryLog(BaseModel):
+    """Query lente catturate dall'applicazione (con piano EXPLAIN campionato)"""
+
+    __tablename__ = "slow_query_log"
+    __table_args__ = (
+        Index("ix_slow_query_log_fingerprint_created", "fingerprint", "created_at"),
+    )
+
+    fingerprint = Column(String(16), nullable=False)  # Hash dello statement normalizzato
+    engine = Column(String(20), nullable=False)  # postgres, gestionale
+    statement = Column(Text, nullable=False)
+    parametri = Column(Text)
+    durata_ms = Column(Numeric(12, 2), nullable=False)
+    chiamante = Column(String(300))  # file:riga:funzione nel codice applicativo
+    route = Column(String(200))
+    piano = Column(Text)  # EXPLAIN (ANALYZE, BUFFERS), solo per i campioni
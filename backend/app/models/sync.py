@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Index
 from app.models.base import BaseModel
 
 
@@ -28,3 +28,19 @@ class SyncLog(BaseModel):
 
     # Metadata
     triggered_by = Column(String(50))  # SCHEDULER, MANUAL, API
+
+
+class SyncRiassegnazione(BaseModel):
+    """
+    Record tolti a un tecnico per riassegnazione: non rientrano più nelle sue
+    query di /sync/changes, che glieli consegna come eliminati da qui
+    """
+
+    __tablename__ = "sync_riassegnazioni"
+    __table_args__ = (
+        Index("ix_sync_riassegnazioni_tecnico_created", "tecnico_id", "created_at", "id"),
+    )
+
+    entita = Column(String(20), nullable=False)  # Nome dell'entità in /sync/changes (ticket)
+    record_id = Column(Integer, nullable=False)
+    tecnico_id = Column(Integer, ForeignKey("tecnici.id"), nullable=False)  # Tecnico precedente
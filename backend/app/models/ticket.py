@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Text, Index, text
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
 
@@ -7,6 +7,16 @@ class Ticket(BaseModel):
     """Ticket di assistenza"""
 
     __tablename__ = "ticket"
+    __table_args__ = (
+        # Delta sync app mobile: modifiche per tecnico in ordine di updated_at
+        Index("ix_ticket_tecnico_updated", "tecnico_assegnato_id", "updated_at", "id"),
+        # Liste e dashboard: filtri sui soli ticket attivi, ordinati per data di apertura
+        Index("ix_ticket_attivi_created", "created_at", postgresql_where=text("attivo")),
+        Index("ix_ticket_attivi_stato_created", "stato_id", "created_at", postgresql_where=text("attivo")),
+        Index("ix_ticket_attivi_tecnico_created", "tecnico_assegnato_id", "created_at", postgresql_where=text("attivo")),
+        Index("ix_ticket_attivi_cliente_created", "cliente_id", "created_at", postgresql_where=text("attivo")),
+        Index("ix_ticket_attivi_chiusura", "data_chiusura", postgresql_where=text("attivo")),
+    )
 
     numero = Column(String(50), unique=True, nullable=False, index=True)
 
@@ -25,7 +35,7 @@ class Ticket(BaseModel):
     descrizione = Column(Text)
 
     # Assegnazione
-    tecnico_assegnato_id = Column(Integer, ForeignKey("tecnici.id"), nullable=True, index=True)
+    tecnico_assegnato_id = Column(Integer, ForeignKey("tecnici.id"), nullable=True)
     reparto_id = Column(Integer, ForeignKey("lookup_reparti.id"), nullable=True)
 
     # Contratto e asset
@@ -0,0 +1,128 @@
+from typing import List, Optional, Set, Tuple
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy.orm import Session
+from sqlalchemy import Table, and_, delete, exists, extract, insert, literal, or_, select, text
+
+from app.models.archive import ARCHIVIO_SCHEMA, TABELLE_FIGLIE_ARCHIVIO, ticket_archivio
+from app.models.client import CacheClienti, CacheReferenti
+from app.models.intervention import Intervento, RichiestaIntervento
+from app.models.lookup import LookupCanaliRichiesta, LookupPriorita, LookupStatiTicket
+from app.models.ticket import Ticket
+from app.models.user import Tecnico
+
+
+class TicketArchiviato(SimpleNamespace):
+    """Ticket letto dall'archivio, con gli stessi attributi usati da TicketResponse"""
+
+
+class ArchiveRepository:
+    """Spostamento dei ticket chiusi nello schema archivio e lettura dall'archivio"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._partizioni: Set[Tuple[str, int]] = set()
+        # Create nella transazione in corso: in cache solo dopo il commit
+        self._partizioni_in_corso: Set[Tuple[str, int]] = set()
+
+    def get_archiviabili(self, prima_di: datetime, limit: int) -> List[int]:
+        """
+        Ids of tickets closed (final state) or soft-deleted before prima_di,
+        locked for the current transaction. Tickets still referenced by an
+        intervention or an intervention request stay in the hot tables.
+        """
+        query = (
+            select(Ticket.id)
+            .join(LookupStatiTicket, LookupStatiTicket.id == Ticket.stato_id)
+            .where(
+                or_(
+                    and_(LookupStatiTicket.finale != 0, Ticket.data_chiusura < prima_di),
+                    and_(Ticket.attivo == False, Ticket.updated_at < prima_di),
+                ),
+                ~exists().where(Intervento.ticket_id == Ticket.id),
+                ~exists().where(RichiestaIntervento.ticket_id == Ticket.id),
+            )
+            .order_by(Ticket.id)
+            .limit(limit)
+            .with_for_update(of=Ticket, skip_locked=True)
+        )
+        return list(self.db.execute(query).scalars())
+
+    def archivia_ticket(self, prima_di: datetime, batch_size: int) -> int:
+        """
+        Move one batch of archivable tickets, with notes, messages, history and
+        attachment metadata, into the archive. One transaction per batch;
+        returns the number of tickets moved (0 when nothing is left).
+        """
+        self._partizioni_in_corso.clear()
+        ids = self.get_archiviabili(prima_di, batch_size)
+        if not ids:
+            self.db.rollback()
+            return 0
+
+        adesso = datetime.utcnow()
+        for modello, tabella in TABELLE_FIGLIE_ARCHIVIO:
+            self._sposta(modello, tabella, modello.ticket_id.in_(ids), adesso)
+        self._sposta(Ticket, ticket_archivio, Ticket.id.in_(ids), adesso)
+
+        self.db.commit()
+        self._partizioni |= self._partizioni_in_corso
+        self._partizioni_in_corso.clear()
+        return len(ids)
+
+    def sposta(self, modello, tabella: Table, filtro) -> None:
+        """Copy the rows matching filtro into the archive table and delete them (no commit)"""
+        self._sposta(modello, tabella, filtro, datetime.utcnow())
+
+    def _sposta(self, modello, tabella: Table, filtro, adesso: datetime) -> None:
+        anni = self.db.execute(
+            select(extract("year", modello.created_at)).where(filtro).distinct()
+        ).scalars()
+        for anno in anni:
+            self._crea_partizione(tabella, int(anno))
+
+        colonne = [c.name for c in modello.__table__.columns]
+        sorgente = select(*modello.__table__.c, literal(adesso)).where(filtro)
+        self.db.execute(insert(tabella).from_select(colonne + ["archiviato_at"], sorgente))
+        self.db.execute(delete(modello).where(filtro).execution_options(synchronize_session=False))
+
+    def _crea_partizione(self, tabella: Table, anno: int) -> None:
+        """Yearly partition of an archive table, created on first use"""
+        chiave = (tabella.name, anno)
+        if chiave in self._partizioni or chiave in self._partizioni_in_corso:
+            return
+        self.db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {ARCHIVIO_SCHEMA}.{tabella.name}_{anno} "
+            f"PARTITION OF {ARCHIVIO_SCHEMA}.{tabella.name} "
+            f"FOR VALUES FROM ('{anno}-01-01') TO ('{anno + 1}-01-01')"
+        ))
+        self._partizioni_in_corso.add(chiave)
+
+    def get_ticket(self, ticket_id: int) -> Optional[TicketArchiviato]:
+        """Archived ticket with client, contact, lookups and technician (one query)"""
+        t = ticket_archivio
+        row = self.db.execute(
+            select(t, CacheClienti, CacheReferenti, LookupCanaliRichiesta, LookupPriorita, LookupStatiTicket, Tecnico)
+            .select_from(t)
+            .outerjoin(CacheClienti, CacheClienti.id == t.c.cliente_id)
+            .outerjoin(CacheReferenti, CacheReferenti.id == t.c.referente_id)
+            .outerjoin(LookupCanaliRichiesta, LookupCanaliRichiesta.id == t.c.canale_id)
+            .outerjoin(LookupPriorita, LookupPriorita.id == t.c.priorita_id)
+            .outerjoin(LookupStatiTicket, LookupStatiTicket.id == t.c.stato_id)
+            .outerjoin(Tecnico, Tecnico.id == t.c.tecnico_assegnato_id)
+            .where(t.c.id == ticket_id, t.c.attivo == True)
+        ).first()
+        if row is None:
+            return None
+
+        n = len(t.c)
+        cliente, referente, canale, priorita, stato, tecnico = row[n:]
+        return TicketArchiviato(
+            **dict(zip(t.c.keys(), row[:n])),
+            cliente=cliente,
+            referente=referente,
+            canale=canale,
+            priorita=priorita,
+            stato=stato,
+            tecnico_assegnato=tecnico,
+        )
@@ -0,0 +1,232 @@
+from typing import List, Optional, Dict, Any
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, update, select
+
+from app.models.client import CacheClienti, CacheContratti
+from app.models.intervention import Intervento, InterventoRiga, InterventoSessione
+from app.models.user import Tecnico
+
+
+# Dimensioni di raggruppamento supportate per le ore lavorate
+RAGGRUPPAMENTI_ORE = ("intervento", "contratto", "cliente", "tecnico", "mese")
+
+
+class BillingRepository:
+    """Aggregati di fatturazione calcolati in SQL (ore e importi)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_ore(
+        self,
+        raggruppa: str = "cliente",
+        data_from: Optional[date] = None,
+        data_to: Optional[date] = None,
+        cliente_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        contratto_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Hours worked grouped by one dimension, computed in a single query"""
+        if raggruppa not in RAGGRUPPAMENTI_ORE:
+            raise ValueError(f"Raggruppamento non valido: {raggruppa}")
+
+        if raggruppa == "intervento":
+            chiave = Intervento.id
+            etichetta = Intervento.numero
+        elif raggruppa == "contratto":
+            chiave = Intervento.contratto_id
+            etichetta = CacheContratti.descrizione
+        elif raggruppa == "cliente":
+            chiave = Intervento.cliente_id
+            etichetta = CacheClienti.ragione_sociale
+        elif raggruppa == "tecnico":
+            chiave = InterventoSessione.tecnico_id
+            etichetta = func.concat(Tecnico.nome, " ", Tecnico.cognome)
+        else:
+            chiave = func.date_trunc("month", InterventoSessione.data)
+            etichetta = func.to_char(chiave, "YYYY-MM")
+
+        query = (
+            self.db.query(
+                chiave.label("chiave"),
+                etichetta.label("etichetta"),
+                func.coalesce(func.sum(InterventoSessione.durata_minuti), 0).label("minuti"),
+                func.coalesce(func.sum(InterventoSessione.tempo_viaggio_minuti), 0).label("minuti_viaggio"),
+                func.coalesce(func.sum(InterventoSessione.km_percorsi), 0).label("km"),
+                func.count(InterventoSessione.id).label("sessioni"),
+                func.count(func.distinct(InterventoSessione.intervento_id)).label("interventi"),
+            )
+            .select_from(InterventoSessione)
+            .join(Intervento, InterventoSessione.intervento_id == Intervento.id)
+            .filter(InterventoSessione.attivo == True, Intervento.attivo == True)
+        )
+
+        if raggruppa == "contratto":
+            query = query.outerjoin(CacheContratti, Intervento.contratto_id == CacheContratti.id)
+        elif raggruppa == "cliente":
+            query = query.join(CacheClienti, Intervento.cliente_id == CacheClienti.id)
+        elif raggruppa == "tecnico":
+            query = query.join(Tecnico, InterventoSessione.tecnico_id == Tecnico.id)
+
+        if data_from:
+            query = query.filter(InterventoSessione.data >= data_from)
+        if data_to:
+            query = query.filter(InterventoSessione.data <= data_to)
+        if cliente_id:
+            query = query.filter(Intervento.cliente_id == cliente_id)
+        if tecnico_id:
+            query = query.filter(InterventoSessione.tecnico_id == tecnico_id)
+        if contratto_id:
+            query = query.filter(Intervento.contratto_id == contratto_id)
+
+        rows = query.group_by(chiave, etichetta).order_by(chiave).all()
+
+        return [
+            {
+                "chiave": str(r.chiave.date()) if raggruppa == "mese" else r.chiave,
+                "etichetta": r.etichetta,
+                "ore": round(float(r.minuti) / 60.0, 2),
+                "ore_viaggio": round(float(r.minuti_viaggio) / 60.0, 2),
+                "km": float(r.km),
+                "sessioni": r.sessioni,
+                "interventi": r.interventi,
+            }
+            for r in rows
+        ]
+
+    def get_importi_interventi(
+        self,
+        data_from: Optional[date] = None,
+        data_to: Optional[date] = None,
+        cliente_id: Optional[int] = None,
+        contratto_id: Optional[int] = None,
+        solo_completati: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Amounts per intervention (with discount), split into billable and not"""
+        fatturabile = (
+            (func.coalesce(InterventoRiga.fatturabile, 1) != 0)
+            & (func.coalesce(InterventoRiga.in_garanzia, 0) == 0)
+            & (func.coalesce(InterventoRiga.incluso_contratto, 0) == 0)
+        )
+
+        query = (
+            self.db.query(
+                Intervento.id,
+                Intervento.numero,
+                Intervento.cliente_id,
+                CacheClienti.ragione_sociale,
+                Intervento.contratto_id,
+                Intervento.data_fine,
+                func.count(InterventoRiga.id).label("righe"),
+                func.coalesce(func.sum(InterventoRiga.quantita), 0).label("quantita"),
+                func.coalesce(func.sum(InterventoRiga.importo), 0).label("importo_totale"),
+                func.coalesce(
+                    func.sum(case((fatturabile, InterventoRiga.importo), else_=0)), 0
+                ).label("importo_fatturabile"),
+            )
+            .select_from(Intervento)
+            .join(CacheClienti, Intervento.cliente_id == CacheClienti.id)
+            .join(
+                InterventoRiga,
+                (InterventoRiga.intervento_id == Intervento.id) & (InterventoRiga.attivo == True),
+            )
+            .filter(Intervento.attivo == True)
+        )
+
+        if solo_completati:
+            query = query.filter(Intervento.data_fine.isnot(None))
+        if data_from:
+            query = query.filter(Intervento.data_fine >= data_from)
+        if data_to:
+            query = query.filter(Intervento.data_fine < data_to + timedelta(days=1))
+        if cliente_id:
+            query = query.filter(Intervento.cliente_id == cliente_id)
+        if contratto_id:
+            query = query.filter(Intervento.contratto_id == contratto_id)
+
+        rows = (
+            query.group_by(
+                Intervento.id,
+                Intervento.numero,
+                Intervento.cliente_id,
+                CacheClienti.ragione_sociale,
+                Intervento.contratto_id,
+                Intervento.data_fine,
+            )
+            .order_by(CacheClienti.ragione_sociale, Intervento.numero)
+            .all()
+        )
+
+        return [
+            {
+                "intervento_id": r.id,
+                "numero": r.numero,
+                "cliente_id": r.cliente_id,
+                "cliente_ragione_sociale": r.ragione_sociale,
+                "contratto_id": r.contratto_id,
+                "data_fine": r.data_fine,
+                "righe": r.righe,
+                "quantita": float(r.quantita),
+                "importo_totale": round(float(r.importo_totale), 2),
+                "importo_fatturabile": round(float(r.importo_fatturabile), 2),
+            }
+            for r in rows
+        ]
+
+    def get_contract_stats(self, cliente_id: int) -> Dict[str, Any]:
+        """Contract hours summary for a client in one aggregate query"""
+        row = (
+            self.db.query(
+                func.count(CacheContratti.id).label("totali"),
+                func.count(case((CacheContratti.attivo_gestionale != 0, CacheContratti.id))).label("attivi"),
+                func.coalesce(func.sum(CacheContratti.ore_incluse), 0).label("ore_incluse"),
+                func.coalesce(func.sum(CacheContratti.ore_utilizzate), 0).label("ore_utilizzate"),
+            )
+            .filter(CacheContratti.cliente_id == cliente_id, CacheContratti.attivo == True)
+            .one()
+        )
+
+        total_ore_incluse = float(row.ore_incluse)
+        total_ore_utilizzate = float(row.ore_utilizzate)
+
+        return {
+            "total_contracts": row.totali,
+            "active_contracts": row.attivi,
+            "total_ore_incluse": total_ore_incluse,
+            "total_ore_utilizzate": total_ore_utilizzate,
+            "ore_residue": total_ore_incluse - total_ore_utilizzate,
+            "percentuale_utilizzo": (total_ore_utilizzate / total_ore_incluse * 100) if total_ore_incluse > 0 else 0,
+        }
+
+    def refresh_ore_contratto(self, contratto_id: int) -> None:
+        """
+        Recompute CacheContratti.ore_utilizzate from the active sessions of the
+        contract's interventions. Runs inside the caller's transaction (no commit)
+        so the counter is updated atomically with the session change.
+        """
+        minuti = (
+            select(func.coalesce(func.sum(InterventoSessione.durata_minuti), 0))
+            .select_from(InterventoSessione)
+            .join(Intervento, InterventoSessione.intervento_id == Intervento.id)
+            .where(
+                Intervento.contratto_id == contratto_id,
+                Intervento.attivo == True,
+                InterventoSessione.attivo == True,
+            )
+            .scalar_subquery()
+        )
+
+        self.db.flush()
+
+        # Lock della riga contratto: aggiornamenti concorrenti si serializzano e
+        # l'UPDATE successivo vede le sessioni già committate dagli altri
+        self.db.query(CacheContratti.id).filter(CacheContratti.id == contratto_id).with_for_update().scalar()
+
+        self.db.execute(
+            update(CacheContratti)
+            .where(CacheContratti.id == contratto_id)
+            .values(ore_utilizzate=func.round(minuti / Decimal("60.0"), 2))
+            .execution_options(synchronize_session=False)
+        )
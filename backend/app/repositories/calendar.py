@@ -0,0 +1,315 @@
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import date, datetime, time, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, or_, literal_column, Interval
+
+from app.core.config import settings
+from app.core.exceptions import ConflictException
+from app.models.calendar import CalendarioEvento, CalendarioTecnico
+from app.models.intervention import InterventoSessione
+from app.models.user import Tecnico
+
+# Intervalli semiaperti [inizio, fine): eventi consecutivi non sono in conflitto
+_BOUNDS = literal_column("'[)'")
+
+# Le espressioni devono coincidere con quelle degli indici GiST (migration
+# d5a8e1f04c37), altrimenti PostgreSQL non li usa
+EVENTO_RANGE = func.tsrange(CalendarioEvento.data_inizio, CalendarioEvento.data_fine, _BOUNDS)
+
+SESSIONE_INIZIO = InterventoSessione.data + InterventoSessione.ora_inizio
+SESSIONE_FINE = (InterventoSessione.data + InterventoSessione.ora_fine) + case(
+    (InterventoSessione.ora_fine <= InterventoSessione.ora_inizio, literal_column("interval '1 day'", Interval)),
+    else_=literal_column("interval '0'", Interval),
+)
+SESSIONE_RANGE = func.tsrange(SESSIONE_INIZIO, SESSIONE_FINE, _BOUNDS)
+
+STATI_NON_BLOCCANTI = ("ANNULLATO",)
+
+
+def _periodo(inizio: datetime, fine: datetime):
+    return func.tsrange(inizio, fine, _BOUNDS)
+
+
+def _conflict_detail(conflitti: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{**c, "inizio": c["inizio"].isoformat(), "fine": c["fine"].isoformat()} for c in conflitti]
+
+
+def _sessione_datetimes(data: date, ora_inizio: time, ora_fine: time) -> Tuple[datetime, datetime]:
+    inizio = datetime.combine(data, ora_inizio)
+    fine = datetime.combine(data, ora_fine)
+    if fine <= inizio:
+        fine += timedelta(days=1)  # Sessione a cavallo della mezzanotte
+    return inizio, fine
+
+
+class CalendarRepository:
+    """Eventi di calendario, conflitti e disponibilità tecnici"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _eventi_filter(self, inizio: datetime, fine: datetime):
+        return (
+            CalendarioEvento.attivo == True,
+            CalendarioEvento.data_fine > CalendarioEvento.data_inizio,
+            EVENTO_RANGE.op("&&")(_periodo(inizio, fine)),
+            or_(CalendarioEvento.stato.is_(None), CalendarioEvento.stato.notin_(STATI_NON_BLOCCANTI)),
+        )
+
+    def _sessioni_filter(self, inizio: datetime, fine: datetime):
+        return (
+            InterventoSessione.attivo == True,
+            InterventoSessione.ora_inizio.isnot(None),
+            InterventoSessione.ora_fine.isnot(None),
+            SESSIONE_RANGE.op("&&")(_periodo(inizio, fine)),
+        )
+
+    def get_busy_intervals(
+        self,
+        inizio: datetime,
+        fine: datetime,
+        tecnico_ids: Optional[Iterable[int]] = None,
+        eventi: bool = True,
+        sessioni: bool = True,
+    ) -> List[Tuple[int, datetime, datetime, str, int]]:
+        """
+        Busy intervals (tecnico_id, inizio, fine, tipo, id) overlapping the
+        period, sorted by technician and start. Three range-indexed queries:
+        events as main technician, events as additional technician, sessions.
+        """
+        ids = list(tecnico_ids) if tecnico_ids is not None else None
+        intervalli: List[Tuple[int, datetime, datetime, str, int]] = []
+
+        if eventi:
+            intervalli.extend(self._busy_eventi(inizio, fine, ids))
+        if sessioni:
+            intervalli.extend(self._busy_sessioni(inizio, fine, ids))
+        intervalli.sort(key=lambda i: (i[0], i[1]))
+
+        return intervalli
+
+    def _busy_eventi(self, inizio: datetime, fine: datetime, ids: Optional[List[int]]):
+        principali = self.db.query(
+            CalendarioEvento.tecnico_principale_id,
+            CalendarioEvento.data_inizio,
+            CalendarioEvento.data_fine,
+            CalendarioEvento.id,
+        ).filter(*self._eventi_filter(inizio, fine))
+
+        aggiuntivi = (
+            self.db.query(
+                CalendarioTecnico.tecnico_id,
+                CalendarioEvento.data_inizio,
+                CalendarioEvento.data_fine,
+                CalendarioEvento.id,
+            )
+            .join(CalendarioEvento, CalendarioTecnico.evento_id == CalendarioEvento.id)
+            .filter(
+                CalendarioTecnico.attivo == True,
+                CalendarioTecnico.tecnico_id != CalendarioEvento.tecnico_principale_id,
+                *self._eventi_filter(inizio, fine),
+            )
+        )
+
+        if ids is not None:
+            principali = principali.filter(CalendarioEvento.tecnico_principale_id.in_(ids))
+            aggiuntivi = aggiuntivi.filter(CalendarioTecnico.tecnico_id.in_(ids))
+
+        return [(r[0], r[1], r[2], "EVENTO", r[3]) for r in [*principali.all(), *aggiuntivi.all()]]
+
+    def _busy_sessioni(self, inizio: datetime, fine: datetime, ids: Optional[List[int]]):
+        query = self.db.query(
+            InterventoSessione.tecnico_id,
+            SESSIONE_INIZIO,
+            SESSIONE_FINE,
+            InterventoSessione.id,
+        ).filter(*self._sessioni_filter(inizio, fine))
+
+        if ids is not None:
+            query = query.filter(InterventoSessione.tecnico_id.in_(ids))
+
+        return [(r[0], r[1], r[2], "SESSIONE", r[3]) for r in query.all()]
+
+    def find_conflicts(
+        self,
+        tecnico_ids: Iterable[int],
+        inizio: datetime,
+        fine: datetime,
+        escludi_evento_id: Optional[int] = None,
+        escludi_sessione_id: Optional[int] = None,
+        eventi: bool = True,
+        sessioni: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Events and/or sessions of the technicians overlapping [inizio, fine)"""
+        conflitti = []
+        intervalli = self.get_busy_intervals(inizio, fine, tecnico_ids, eventi=eventi, sessioni=sessioni)
+        for tecnico_id, c_inizio, c_fine, tipo, ref_id in intervalli:
+            if (tipo, ref_id) in (("EVENTO", escludi_evento_id), ("SESSIONE", escludi_sessione_id)):
+                continue
+            conflitti.append({
+                "tecnico_id": tecnico_id,
+                "tipo": tipo,
+                "id": ref_id,
+                "inizio": c_inizio,
+                "fine": c_fine,
+            })
+        return conflitti
+
+    def _lock_tecnici(self, tecnico_ids: Iterable[int]) -> None:
+        """
+        Lock the technicians' rows until the end of the transaction, so the
+        overlap check and the insert of concurrent requests on the same
+        technicians run one after the other. Locked in id order (no
+        deadlocks); FOR NO KEY UPDATE does not block foreign key inserts.
+        """
+        ids = sorted(set(tecnico_ids))
+        if ids:
+            self.db.query(Tecnico.id).filter(Tecnico.id.in_(ids)).order_by(Tecnico.id).with_for_update(key_share=True).all()
+
+    def check_sessione(
+        self,
+        tecnico_id: int,
+        data: date,
+        ora_inizio: Optional[time],
+        ora_fine: Optional[time],
+        escludi_sessione_id: Optional[int] = None,
+    ) -> None:
+        """
+        Reject a work session overlapping another session of the same
+        technician. Planned events are not checked: a session is usually the
+        work done for one of them. The technician stays locked until commit.
+        """
+        if ora_inizio is None or ora_fine is None:
+            return
+
+        inizio, fine = _sessione_datetimes(data, ora_inizio, ora_fine)
+        self._lock_tecnici([tecnico_id])
+        conflitti = self.find_conflicts(
+            [tecnico_id], inizio, fine, escludi_sessione_id=escludi_sessione_id, eventi=False
+        )
+        if conflitti:
+            raise ConflictException(
+                "Sessione sovrapposta ad un'altra sessione del tecnico",
+                detail=_conflict_detail(conflitti),
+            )
+
+    def create_evento(self, valori: Dict[str, Any], tecnici_ids: Optional[List[int]] = None) -> CalendarioEvento:
+        """Create an event, rejecting overlaps for any assigned technician"""
+        if valori["data_fine"] <= valori["data_inizio"]:
+            raise ValueError("La data di fine deve essere successiva alla data di inizio")
+
+        aggiuntivi = [t for t in (tecnici_ids or []) if t != valori["tecnico_principale_id"]]
+        self._lock_tecnici([valori["tecnico_principale_id"], *aggiuntivi])
+        conflitti = self.find_conflicts(
+            [valori["tecnico_principale_id"], *aggiuntivi],
+            valori["data_inizio"],
+            valori["data_fine"],
+            sessioni=False,
+        )
+        if conflitti:
+            raise ConflictException(
+                "Tecnico già impegnato nel periodo richiesto",
+                detail=_conflict_detail(conflitti),
+            )
+
+        evento = CalendarioEvento(**valori)
+        self.db.add(evento)
+        self.db.flush()
+
+        for tecnico_id in aggiuntivi:
+            self.db.add(CalendarioTecnico(evento_id=evento.id, tecnico_id=tecnico_id, ruolo="SUPPORTO"))
+
+        self.db.commit()
+        self.db.refresh(evento)
+
+        return evento
+
+    @staticmethod
+    def _finestre_lavoro(inizio: datetime, fine: datetime, solo_orario_lavoro: bool) -> List[Tuple[datetime, datetime]]:
+        """Working-hour windows (Mon-Fri) clipped to the period"""
+        if not solo_orario_lavoro:
+            return [(inizio, fine)]
+
+        finestre = []
+        giorno = inizio.date()
+        while giorno <= fine.date():
+            if giorno.weekday() < 5:
+                apertura = datetime.combine(giorno, time(settings.AVAILABILITY_WORKDAY_START_HOUR))
+                chiusura = datetime.combine(giorno, time(settings.AVAILABILITY_WORKDAY_END_HOUR))
+                apertura, chiusura = max(apertura, inizio), min(chiusura, fine)
+                if apertura < chiusura:
+                    finestre.append((apertura, chiusura))
+            giorno += timedelta(days=1)
+        return finestre
+
+    def get_availability(
+        self,
+        inizio: datetime,
+        fine: datetime,
+        reparto_id: Optional[int] = None,
+        solo_orario_lavoro: bool = True,
+        durata_minima_minuti: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Free/busy slots for every active technician.
+
+        Busy intervals of all technicians are loaded once, sorted by
+        (technician, start), then a single sweep merges them and subtracts
+        them from the working windows.
+        """
+        tecnici_query = self.db.query(Tecnico.id, Tecnico.nome, Tecnico.cognome).filter(Tecnico.attivo == True)
+        if reparto_id:
+            tecnici_query = tecnici_query.filter(Tecnico.reparto_id == reparto_id)
+        tecnici = tecnici_query.order_by(Tecnico.cognome, Tecnico.nome).all()
+
+        intervalli = self.get_busy_intervals(
+            inizio, fine, tecnico_ids=[t.id for t in tecnici] if reparto_id else None
+        )
+
+        # Sweep: intervalli già ordinati, fusione di quelli sovrapposti per tecnico
+        occupati: Dict[int, List[List[datetime]]] = {}
+        for tecnico_id, b_inizio, b_fine, _, _ in intervalli:
+            b_inizio, b_fine = max(b_inizio, inizio), min(b_fine, fine)
+            blocchi = occupati.setdefault(tecnico_id, [])
+            if blocchi and b_inizio <= blocchi[-1][1]:
+                if b_fine > blocchi[-1][1]:
+                    blocchi[-1][1] = b_fine
+            else:
+                blocchi.append([b_inizio, b_fine])
+
+        finestre = self._finestre_lavoro(inizio, fine, solo_orario_lavoro)
+        durata_minima = timedelta(minutes=durata_minima_minuti)
+
+        risultato = []
+        for t in tecnici:
+            blocchi = occupati.get(t.id, [])
+            liberi = []
+            idx = 0
+            for f_inizio, f_fine in finestre:
+                cursore = f_inizio
+                # Salta i blocchi che terminano prima della finestra
+                while idx < len(blocchi) and blocchi[idx][1] <= f_inizio:
+                    idx += 1
+                j = idx
+                while j < len(blocchi) and blocchi[j][0] < f_fine:
+                    if blocchi[j][0] > cursore:
+                        liberi.append((cursore, blocchi[j][0]))
+                    cursore = max(cursore, blocchi[j][1])
+                    j += 1
+                if cursore < f_fine:
+                    liberi.append((cursore, f_fine))
+
+            liberi = [s for s in liberi if s[1] - s[0] >= durata_minima]
+            minuti_liberi = sum(int((s[1] - s[0]).total_seconds() // 60) for s in liberi)
+            minuti_finestre = sum(int((f[1] - f[0]).total_seconds() // 60) for f in finestre)
+
+            risultato.append({
+                "tecnico_id": t.id,
+                "nome_completo": f"{t.nome} {t.cognome}",
+                "libero_intero_periodo": bool(finestre) and minuti_liberi == minuti_finestre,
+                "minuti_liberi": minuti_liberi,
+                "occupato": [{"inizio": b[0], "fine": b[1]} for b in blocchi],
+                "libero": [{"inizio": s[0], "fine": s[1]} for s in liberi],
+            })
+
+        return risultato
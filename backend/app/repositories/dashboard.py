@@ -190,7 +190,7 @@ class DashboardRepository:
             self.db.query(Intervento)
             .options(
                 joinedload(Intervento.cliente),
-                joinedload(Intervento.tipo),
+                joinedload(Intervento.tipo_intervento),
                 joinedload(Intervento.stato),
             )
             .filter(
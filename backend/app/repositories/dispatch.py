@@ -0,0 +1,381 @@
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+
+from app.core import events
+from app.core.events import event_broker
+from app.core.config import settings
+from app.models.calendar import CalendarioEvento
+from app.models.client import CacheClienti, SediCliente
+from app.models.intervention import Intervento, InterventoSessione, RichiestaIntervento
+from app.models.lookup import LookupPriorita, LookupTipiIntervento
+from app.models.ticket import Ticket
+from app.repositories.calendar import CalendarRepository
+
+STATO_PENDENTE = "PENDENTE"
+STATO_PIANIFICATA = "PIANIFICATA"
+
+# Eventi proposti dall'ottimizzatore, da confermare
+STATO_EVENTO_BOZZA = "BOZZA"
+
+
+def posizione_sessione(sessione) -> Optional[Tuple[int, float, float, datetime]]:
+    """(tecnico_id, lat, lon, timestamp) of a session: end position if recorded, else start"""
+    if sessione.latitudine_fine is not None and sessione.longitudine_fine is not None and sessione.ora_fine:
+        return (
+            sessione.tecnico_id,
+            float(sessione.latitudine_fine),
+            float(sessione.longitudine_fine),
+            datetime.combine(sessione.data, sessione.ora_fine),
+        )
+    if sessione.latitudine_inizio is not None and sessione.longitudine_inizio is not None:
+        return (
+            sessione.tecnico_id,
+            float(sessione.latitudine_inizio),
+            float(sessione.longitudine_inizio),
+            datetime.combine(sessione.data, sessione.ora_inizio or datetime.min.time()),
+        )
+    return None
+
+
+class DispatchRepository:
+    """Richieste di intervento da pianificare (coda dispatch)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def load_pending(self, ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Pending requests with the fields needed for ranking, as plain dicts.
+        Uses the partial index on pending requests; `ids` limits the load to
+        a few rows when refreshing single queue entries.
+        """
+        query = (
+            self.db.query(
+                RichiestaIntervento.id,
+                RichiestaIntervento.ticket_id,
+                Ticket.numero,
+                RichiestaIntervento.cliente_id,
+                CacheClienti.ragione_sociale,
+                RichiestaIntervento.oggetto,
+                RichiestaIntervento.priorita_id,
+                LookupPriorita.codice,
+                LookupPriorita.livello,
+                RichiestaIntervento.data_richiesta,
+                RichiestaIntervento.data_preferita,
+                Ticket.sla_scadenza_risoluzione,
+                RichiestaIntervento.tecnico_richiesto_id,
+                RichiestaIntervento.tipo_intervento_id,
+            )
+            .join(LookupPriorita, RichiestaIntervento.priorita_id == LookupPriorita.id)
+            .join(CacheClienti, RichiestaIntervento.cliente_id == CacheClienti.id)
+            .outerjoin(Ticket, RichiestaIntervento.ticket_id == Ticket.id)
+            .filter(RichiestaIntervento.stato == STATO_PENDENTE, RichiestaIntervento.attivo == True)
+        )
+
+        if ids is not None:
+            query = query.filter(RichiestaIntervento.id.in_(list(ids)))
+
+        return [
+            {
+                "id": r.id,
+                "ticket_id": r.ticket_id,
+                "ticket_numero": r.numero,
+                "cliente_id": r.cliente_id,
+                "cliente_ragione_sociale": r.ragione_sociale,
+                "oggetto": r.oggetto,
+                "priorita_id": r.priorita_id,
+                "priorita_codice": r.codice,
+                "priorita_livello": r.livello,
+                "data_richiesta": r.data_richiesta,
+                "data_preferita": r.data_preferita,
+                "sla_scadenza": r.sla_scadenza_risoluzione,
+                "tecnico_richiesto_id": r.tecnico_richiesto_id,
+                "tipo_intervento_id": r.tipo_intervento_id,
+            }
+            for r in query.all()
+        ]
+
+    def get_by_id(self, richiesta_id: int) -> Optional[RichiestaIntervento]:
+        """Get request by ID"""
+        return (
+            self.db.query(RichiestaIntervento)
+            .filter(RichiestaIntervento.id == richiesta_id, RichiestaIntervento.attivo == True)
+            .first()
+        )
+
+    def assign(
+        self,
+        richiesta: RichiestaIntervento,
+        tecnico_id: int,
+        data_inizio: datetime,
+        data_fine: datetime,
+        tecnici_ids: Optional[List[int]] = None,
+    ):
+        """
+        Schedule a pending request: create its calendar event and mark it
+        PIANIFICATA in the same transaction (overlaps raise ConflictException).
+        """
+        if richiesta.stato != STATO_PENDENTE:
+            raise ValueError("La richiesta non è in attesa di pianificazione")
+
+        richiesta.stato = STATO_PIANIFICATA
+        richiesta.tecnico_richiesto_id = tecnico_id
+        richiesta.updated_at = datetime.utcnow()
+
+        # create_evento esegue il commit anche del cambio stato della richiesta
+        evento = CalendarRepository(self.db).create_evento(
+            {
+                "titolo": richiesta.oggetto,
+                "descrizione": richiesta.descrizione,
+                "data_inizio": data_inizio,
+                "data_fine": data_fine,
+                "tipo_intervento_id": richiesta.tipo_intervento_id,
+                "cliente_id": richiesta.cliente_id,
+                "richiesta_id": richiesta.id,
+                "tecnico_principale_id": tecnico_id,
+                "stato": "PIANIFICATO",
+            },
+            tecnici_ids,
+        )
+
+        self.publish_change(richiesta)
+
+        return evento
+
+    # Dati per l'ottimizzatore di pianificazione
+
+    def get_tipi_con_viaggio(self) -> Dict[int, bool]:
+        """tipo_intervento_id -> requires travel"""
+        return {
+            r.id: bool(r.richiede_viaggio)
+            for r in self.db.query(LookupTipiIntervento.id, LookupTipiIntervento.richiede_viaggio)
+        }
+
+    def get_posizioni_clienti(self, cliente_ids: Iterable[int]) -> Dict[int, Tuple[float, float]]:
+        """
+        Client location: first site with coordinates, otherwise the centroid
+        of the start positions of past sessions at that client.
+        """
+        ids = list(set(cliente_ids))
+        if not ids:
+            return {}
+
+        posizioni: Dict[int, Tuple[float, float]] = {}
+        sedi = (
+            self.db.query(SediCliente.cliente_id, SediCliente.latitudine, SediCliente.longitudine)
+            .filter(
+                SediCliente.cliente_id.in_(ids),
+                SediCliente.attivo == True,
+                SediCliente.latitudine.isnot(None),
+                SediCliente.longitudine.isnot(None),
+            )
+            .order_by(SediCliente.cliente_id, SediCliente.id)
+            .all()
+        )
+        for r in sedi:
+            posizioni.setdefault(r.cliente_id, (float(r.latitudine), float(r.longitudine)))
+
+        mancanti = [i for i in ids if i not in posizioni]
+        if mancanti:
+            centroidi = (
+                self.db.query(
+                    Intervento.cliente_id,
+                    func.avg(InterventoSessione.latitudine_inizio).label("lat"),
+                    func.avg(InterventoSessione.longitudine_inizio).label("lon"),
+                )
+                .join(Intervento, InterventoSessione.intervento_id == Intervento.id)
+                .filter(
+                    Intervento.cliente_id.in_(mancanti),
+                    InterventoSessione.attivo == True,
+                    InterventoSessione.latitudine_inizio.isnot(None),
+                    InterventoSessione.longitudine_inizio.isnot(None),
+                )
+                .group_by(Intervento.cliente_id)
+                .all()
+            )
+            for r in centroidi:
+                posizioni[r.cliente_id] = (float(r.lat), float(r.lon))
+
+        return posizioni
+
+    def get_basi_tecnici(self, tecnico_ids: Iterable[int]) -> Dict[int, Tuple[float, float]]:
+        """Usual starting point of each technician (centroid of recent session starts)"""
+        ids = list(tecnico_ids)
+        if not ids:
+            return {}
+        data_from = datetime.utcnow().date() - timedelta(days=settings.SCHEDULER_STORICO_GIORNI)
+
+        rows = (
+            self.db.query(
+                InterventoSessione.tecnico_id,
+                func.avg(InterventoSessione.latitudine_inizio).label("lat"),
+                func.avg(InterventoSessione.longitudine_inizio).label("lon"),
+            )
+            .filter(
+                InterventoSessione.tecnico_id.in_(ids),
+                InterventoSessione.attivo == True,
+                InterventoSessione.data >= data_from,
+                InterventoSessione.latitudine_inizio.isnot(None),
+                InterventoSessione.longitudine_inizio.isnot(None),
+            )
+            .group_by(InterventoSessione.tecnico_id)
+            .all()
+        )
+        return {r.tecnico_id: (float(r.lat), float(r.lon)) for r in rows}
+
+    def get_ultime_posizioni_tecnici(self) -> List[Tuple[int, float, float, datetime]]:
+        """Last geolocated session position of each technician (one DISTINCT ON query)"""
+        data_from = (datetime.utcnow() - timedelta(hours=settings.LOCATOR_MAX_AGE_HOURS)).date()
+        rows = (
+            self.db.query(
+                InterventoSessione.tecnico_id,
+                InterventoSessione.data,
+                InterventoSessione.ora_inizio,
+                InterventoSessione.ora_fine,
+                InterventoSessione.latitudine_inizio,
+                InterventoSessione.longitudine_inizio,
+                InterventoSessione.latitudine_fine,
+                InterventoSessione.longitudine_fine,
+            )
+            .filter(
+                InterventoSessione.attivo == True,
+                InterventoSessione.data >= data_from,
+                InterventoSessione.latitudine_inizio.isnot(None),
+                InterventoSessione.longitudine_inizio.isnot(None),
+            )
+            .distinct(InterventoSessione.tecnico_id)
+            .order_by(
+                InterventoSessione.tecnico_id,
+                InterventoSessione.data.desc(),
+                InterventoSessione.ora_inizio.desc(),
+            )
+            .all()
+        )
+        return [p for p in (posizione_sessione(r) for r in rows) if p is not None]
+
+    def get_storico_viaggi(self, cliente_ids: Iterable[int]) -> List[Tuple[int, int, float, float]]:
+        """Average km and travel minutes per (technician, client) from past sessions"""
+        ids = list(set(cliente_ids))
+        if not ids:
+            return []
+        data_from = datetime.utcnow().date() - timedelta(days=settings.SCHEDULER_STORICO_GIORNI)
+
+        rows = (
+            self.db.query(
+                InterventoSessione.tecnico_id,
+                Intervento.cliente_id,
+                func.avg(InterventoSessione.km_percorsi).label("km"),
+                func.avg(InterventoSessione.tempo_viaggio_minuti).label("minuti"),
+            )
+            .join(Intervento, InterventoSessione.intervento_id == Intervento.id)
+            .filter(
+                Intervento.cliente_id.in_(ids),
+                InterventoSessione.attivo == True,
+                InterventoSessione.data >= data_from,
+                InterventoSessione.km_percorsi > 0,
+            )
+            .group_by(InterventoSessione.tecnico_id, Intervento.cliente_id)
+            .all()
+        )
+        return [(r.tecnico_id, r.cliente_id, float(r.km), float(r.minuti or 0)) for r in rows]
+
+    def get_durate_medie(self) -> Dict[int, float]:
+        """Average session duration (minutes) per intervention type"""
+        rows = (
+            self.db.query(
+                InterventoSessione.tipo_intervento_id,
+                func.avg(InterventoSessione.durata_minuti).label("durata"),
+            )
+            .filter(InterventoSessione.attivo == True, InterventoSessione.durata_minuti > 0)
+            .group_by(InterventoSessione.tipo_intervento_id)
+            .all()
+        )
+        return {r.tipo_intervento_id: float(r.durata) for r in rows}
+
+    def clear_bozze(self, inizio: datetime, fine: datetime) -> int:
+        """Discard draft events of a previous optimizer run in the period (no commit)"""
+        return (
+            self.db.query(CalendarioEvento)
+            .filter(
+                CalendarioEvento.stato == STATO_EVENTO_BOZZA,
+                CalendarioEvento.attivo == True,
+                CalendarioEvento.data_inizio < fine,
+                CalendarioEvento.data_fine > inizio,
+            )
+            .update(
+                {CalendarioEvento.attivo: False, CalendarioEvento.updated_at: datetime.utcnow()},
+                synchronize_session=False,
+            )
+        )
+
+    def save_bozze(self, assegnazioni: List[Dict[str, Any]], richieste: Dict[int, Dict[str, Any]]) -> List[int]:
+        """Write optimizer assignments as draft calendar events (no commit)"""
+        eventi = [
+            CalendarioEvento(
+                titolo=richieste[a["richiesta_id"]]["oggetto"],
+                data_inizio=a["data_inizio"],
+                data_fine=a["data_fine"],
+                tipo_intervento_id=richieste[a["richiesta_id"]]["tipo_intervento_id"],
+                cliente_id=richieste[a["richiesta_id"]]["cliente_id"],
+                richiesta_id=a["richiesta_id"],
+                tecnico_principale_id=a["tecnico_id"],
+                stato=STATO_EVENTO_BOZZA,
+                note=f"Proposta automatica: {a['km_stimati']:.1f} km stimati",
+            )
+            for a in assegnazioni
+        ]
+        self.db.add_all(eventi)
+        self.db.flush()
+        return [e.id for e in eventi]
+
+    def confirm_bozze(self, evento_ids: Optional[List[int]] = None) -> int:
+        """Turn draft events into planned ones and mark their requests PIANIFICATA"""
+        query = self.db.query(CalendarioEvento).filter(
+            CalendarioEvento.stato == STATO_EVENTO_BOZZA,
+            CalendarioEvento.attivo == True,
+        )
+        if evento_ids is not None:
+            query = query.filter(CalendarioEvento.id.in_(evento_ids))
+        bozze = query.all()
+
+        richiesta_ids = [e.richiesta_id for e in bozze if e.richiesta_id]
+        richieste = {
+            r.id: r
+            for r in self.db.query(RichiestaIntervento).filter(RichiestaIntervento.id.in_(richiesta_ids)).all()
+        } if richiesta_ids else {}
+
+        now = datetime.utcnow()
+        confermate = []
+        for evento in bozze:
+            richiesta = richieste.get(evento.richiesta_id)
+            if richiesta is not None and richiesta.stato != STATO_PENDENTE:
+                # Richiesta pianificata nel frattempo: la bozza non serve più
+                evento.attivo = False
+                continue
+            evento.stato = "PIANIFICATO"
+            evento.updated_at = now
+            if richiesta is not None:
+                richiesta.stato = STATO_PIANIFICATA
+                richiesta.tecnico_richiesto_id = evento.tecnico_principale_id
+                richiesta.updated_at = now
+                confermate.append(richiesta)
+
+        self.db.commit()
+
+        for richiesta in confermate:
+            self.publish_change(richiesta)
+
+        return len(confermate)
+
+    @staticmethod
+    def publish_change(richiesta: RichiestaIntervento) -> None:
+        """Notify queues and dispatch boards (all workers) about a request change"""
+        event_broker.publish(
+            events.DISPATCH_UPDATED,
+            richiesta_id=richiesta.id,
+            ticket_id=richiesta.ticket_id,
+            stato=richiesta.stato,
+            tecnico_id=richiesta.tecnico_richiesto_id,
+        )
@@ -1,9 +1,20 @@
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, func, and_
 
+from app.core import events
+from app.core.etag import claim_version
+from app.core.events import event_broker
+from app.models.client import CacheClienti
 from app.models.intervention import Intervento, InterventoRiga, InterventoSessione
+from app.models.lookup import LookupOriginiIntervento, LookupStatiIntervento, LookupTipiIntervento
+from app.models.user import Tecnico
+from app.repositories.billing import BillingRepository
+from app.repositories.calendar import CalendarRepository
+from app.repositories.dispatch import posizione_sessione
+from app.repositories.workload import WorkloadRepository
+from app.services.locator import technician_locator
 from app.schemas.intervention import (
     InterventoCreate,
     InterventoUpdate,
@@ -39,14 +50,109 @@ class InterventionRepository:
             joinedload(Intervento.origine),
         )
 
-        # Apply filters
+        query = self._apply_filters(
+            query,
+            stato_id=stato_id,
+            tipo_id=tipo_id,
+            tecnico_id=tecnico_id,
+            cliente_id=cliente_id,
+            data_from=data_from,
+            data_to=data_to,
+            search=search,
+        )
+
+        # Get total count
+        total = query.count()
+
+        # Apply pagination and ordering
+        interventi = (
+            query.order_by(Intervento.data_inizio.desc()).offset(skip).limit(limit).all()
+        )
+
+        return interventi, total
+
+    def iter_export(
+        self,
+        stato_id: Optional[int] = None,
+        tipo_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        cliente_id: Optional[int] = None,
+        data_from: Optional[datetime] = None,
+        data_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple]:
+        """
+        Stream flat intervention rows for export through a server-side cursor.
+        Same filters as get_all, no pagination.
+        """
+        ore_sessioni = (
+            self.db.query(
+                InterventoSessione.intervento_id.label("intervento_id"),
+                func.sum(InterventoSessione.durata_minuti).label("minuti"),
+            )
+            .filter(InterventoSessione.attivo == True)
+            .group_by(InterventoSessione.intervento_id)
+            .subquery()
+        )
+
+        query = (
+            self.db.query(
+                Intervento.numero,
+                Intervento.data_inizio,
+                Intervento.data_fine,
+                CacheClienti.ragione_sociale,
+                Intervento.oggetto,
+                LookupTipiIntervento.descrizione,
+                LookupStatiIntervento.descrizione,
+                Tecnico.nome,
+                Tecnico.cognome,
+                ore_sessioni.c.minuti,
+            )
+            .select_from(Intervento)
+            .outerjoin(CacheClienti, Intervento.cliente_id == CacheClienti.id)
+            .outerjoin(LookupTipiIntervento, Intervento.tipo_intervento_id == LookupTipiIntervento.id)
+            .outerjoin(LookupStatiIntervento, Intervento.stato_id == LookupStatiIntervento.id)
+            .outerjoin(Tecnico, Intervento.tecnico_id == Tecnico.id)
+            .outerjoin(ore_sessioni, ore_sessioni.c.intervento_id == Intervento.id)
+        )
+        query = self._apply_filters(
+            query,
+            stato_id=stato_id,
+            tipo_id=tipo_id,
+            tecnico_id=tecnico_id,
+            cliente_id=cliente_id,
+            data_from=data_from,
+            data_to=data_to,
+            search=search,
+        )
+
+        for row in query.order_by(Intervento.data_inizio.desc()).yield_per(batch_size):
+            (numero, data_inizio, data_fine, cliente, oggetto, tipo, stato,
+             nome, cognome, minuti) = row
+            tecnico = f"{nome} {cognome}" if nome else None
+            ore = round((minuti or 0) / 60.0, 2)
+            yield (numero, data_inizio, data_fine, cliente, oggetto, tipo, stato, tecnico, ore)
+
+    def _apply_filters(
+        self,
+        query,
+        stato_id: Optional[int] = None,
+        tipo_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        cliente_id: Optional[int] = None,
+        data_from: Optional[datetime] = None,
+        data_to: Optional[datetime] = None,
+        search: Optional[str] = None,
+    ):
+        """Apply list filters shared by get_all and iter_export"""
         query = query.filter(Intervento.attivo == True)
 
         if stato_id:
             query = query.filter(Intervento.stato_id == stato_id)
 
         if tipo_id:
-            query = query.filter(Intervento.tipo_id == tipo_id)
+            query = query.filter(Intervento.tipo_intervento_id == tipo_id)
 
         if tecnico_id:
             query = query.filter(Intervento.tecnico_id == tecnico_id)
@@ -65,19 +171,12 @@ class InterventionRepository:
             query = query.filter(
                 or_(
                     Intervento.numero.ilike(search_filter),
-                    Intervento.descrizione.ilike(search_filter),
+                    Intervento.oggetto.ilike(search_filter),
+                    Intervento.descrizione_lavoro.ilike(search_filter),
                 )
             )
 
-        # Get total count
-        total = query.count()
-
-        # Apply pagination and ordering
-        interventi = (
-            query.order_by(Intervento.data_inizio.desc()).offset(skip).limit(limit).all()
-        )
-
-        return interventi, total
+        return query
 
     def get_by_id(self, intervento_id: int) -> Optional[Intervento]:
         """Get intervention by ID with relationships"""
@@ -94,6 +193,28 @@ class InterventionRepository:
             .first()
         )
 
+    def get_versione(self, intervento_id: int) -> Optional[Tuple[Optional[datetime], ...]]:
+        """updated_at of the intervention and of the entities embedded in InterventoResponse (ETag)"""
+        row = (
+            self.db.query(
+                Intervento.updated_at,
+                CacheClienti.updated_at,
+                Tecnico.updated_at,
+                LookupTipiIntervento.updated_at,
+                LookupStatiIntervento.updated_at,
+                LookupOriginiIntervento.updated_at,
+            )
+            .select_from(Intervento)
+            .outerjoin(CacheClienti, CacheClienti.id == Intervento.cliente_id)
+            .outerjoin(Tecnico, Tecnico.id == Intervento.tecnico_id)
+            .outerjoin(LookupTipiIntervento, LookupTipiIntervento.id == Intervento.tipo_intervento_id)
+            .outerjoin(LookupStatiIntervento, LookupStatiIntervento.id == Intervento.stato_id)
+            .outerjoin(LookupOriginiIntervento, LookupOriginiIntervento.id == Intervento.origine_id)
+            .filter(Intervento.id == intervento_id, Intervento.attivo == True)
+            .first()
+        )
+        return tuple(row) if row else None
+
     def get_by_numero(self, numero: str) -> Optional[Intervento]:
         """Get intervention by numero"""
         return (
@@ -118,15 +239,34 @@ class InterventionRepository:
 
         return intervento
 
-    def update(self, intervento: Intervento, update_data: InterventoUpdate) -> Intervento:
-        """Update intervention"""
+    def update(
+        self,
+        intervento: Intervento,
+        update_data: InterventoUpdate,
+        updated_at_atteso: Optional[datetime] = None,
+    ) -> Intervento:
+        """
+        Update intervention (only if still at version updated_at_atteso, when
+        given). Moving it to another contract refreshes the hours used on both
+        contracts in the same transaction.
+        """
+        if updated_at_atteso is not None:
+            claim_version(self.db, Intervento, intervento.id, updated_at_atteso)
+
         update_dict = update_data.model_dump(exclude_unset=True)
+        contratto_precedente = intervento.contratto_id
 
         for field, value in update_dict.items():
             setattr(intervento, field, value)
 
         intervento.updated_at = datetime.utcnow()
 
+        if "contratto_id" in update_dict and intervento.contratto_id != contratto_precedente:
+            billing = BillingRepository(self.db)
+            for contratto_id in (contratto_precedente, intervento.contratto_id):
+                if contratto_id:
+                    billing.refresh_ore_contratto(contratto_id)
+
         self.db.commit()
         self.db.refresh(intervento)
 
@@ -158,6 +298,8 @@ class InterventionRepository:
         self.db.commit()
         self.db.refresh(intervento)
 
+        self._publish(events.INTERVENTION_STARTED, intervento)
+
         return intervento
 
     def complete(
@@ -191,12 +333,28 @@ class InterventionRepository:
         self.db.commit()
         self.db.refresh(intervento)
 
+        self._publish(events.INTERVENTION_COMPLETED, intervento)
+
         return intervento
 
     def add_attivita(
         self, intervento_id: int, attivita_data: AttivitaInterventoCreate
     ) -> InterventoRiga:
         """Add activity to intervention"""
+        attivita = self.build_attivita(intervento_id, attivita_data)
+        self.db.commit()
+        self.db.refresh(attivita)
+
+        return attivita
+
+    def build_attivita(
+        self,
+        intervento_id: int,
+        attivita_data: AttivitaInterventoCreate,
+        sessione_id: Optional[int] = None,
+        client_uuid: Optional[str] = None,
+    ) -> InterventoRiga:
+        """Add an activity row in the current transaction (no commit)"""
         from app.models.lookup import LookupCategorieAttivita
 
         categoria = (
@@ -235,19 +393,27 @@ class InterventionRepository:
             quantita=quantita,
             unita_misura="ore",
             prezzo_unitario=prezzo if prezzo else 0,
+            sessione_id=sessione_id,
+            client_uuid=client_uuid,
         )
 
         self.db.add(attivita)
-        self.db.commit()
-        self.db.refresh(attivita)
+        self.db.flush()
 
         return attivita
 
     def delete(self, intervento: Intervento) -> None:
-        """Soft delete intervention"""
+        """Soft delete intervention (its sessions leave the workload rollup)"""
         intervento.attivo = False
         intervento.updated_at = datetime.utcnow()
 
+        workload = WorkloadRepository(self.db)
+        for sessione in self.get_sessioni(intervento.id):
+            workload.apply_sessione(sessione, segno=-1)
+
+        if intervento.contratto_id:
+            BillingRepository(self.db).refresh_ore_contratto(intervento.contratto_id)
+
         self.db.commit()
 
     # Sessioni Lavoro
@@ -267,8 +433,22 @@ class InterventionRepository:
         self, intervento_id: int, tecnico_id: int, sessione_data
     ) -> InterventoSessione:
         """Add work session to intervention"""
-        from app.models.intervention import InterventoSessione
+        sessione = self.build_sessione(intervento_id, tecnico_id, sessione_data)
+        self._sync_ore_contratto(intervento_id)
+        self.db.commit()
+        self.db.refresh(sessione)
+
+        self.publish_posizione(sessione)
+
+        return sessione
 
+    def build_sessione(
+        self, intervento_id: int, tecnico_id: int, sessione_data, client_uuid: Optional[str] = None
+    ) -> InterventoSessione:
+        """
+        Check and add a work session in the current transaction (workload
+        rollup included, no commit, no contract hours refresh)
+        """
         # Calculate duration if ora_fine is provided
         durata_minuti = None
         if sessione_data.ora_fine:
@@ -281,6 +461,10 @@ class InterventionRepository:
             if durata_minuti < 0:
                 durata_minuti += 24 * 60  # Handle overnight sessions
 
+        CalendarRepository(self.db).check_sessione(
+            tecnico_id, sessione_data.data, sessione_data.ora_inizio, sessione_data.ora_fine
+        )
+
         sessione = InterventoSessione(
             intervento_id=intervento_id,
             tecnico_id=tecnico_id,
@@ -291,13 +475,18 @@ class InterventionRepository:
             tipo_intervento_id=sessione_data.tipo_intervento_id,
             km_percorsi=sessione_data.km_percorsi,
             tempo_viaggio_minuti=sessione_data.tempo_viaggio_minuti,
+            latitudine_inizio=sessione_data.latitudine_inizio,
+            longitudine_inizio=sessione_data.longitudine_inizio,
+            latitudine_fine=sessione_data.latitudine_fine,
+            longitudine_fine=sessione_data.longitudine_fine,
             note=sessione_data.note,
+            client_uuid=client_uuid,
             attivo=True,
         )
 
         self.db.add(sessione)
-        self.db.commit()
-        self.db.refresh(sessione)
+        self.db.flush()
+        WorkloadRepository(self.db).apply_sessione(sessione)
 
         return sessione
 
@@ -316,6 +505,10 @@ class InterventionRepository:
         if not sessione:
             raise ValueError("Sessione non trovata")
 
+        # Remove the old contribution from the daily rollup before changing it
+        workload = WorkloadRepository(self.db)
+        workload.apply_sessione(sessione, segno=-1)
+
         # Update fields
         update_dict = update_data.model_dump(exclude_unset=True)
         for field, value in update_dict.items():
@@ -331,10 +524,23 @@ class InterventionRepository:
                     durata_minuti += 24 * 60
                 sessione.durata_minuti = durata_minuti
 
+        if {"data", "ora_inizio", "ora_fine", "tecnico_id"} & update_dict.keys():
+            CalendarRepository(self.db).check_sessione(
+                sessione.tecnico_id,
+                sessione.data,
+                sessione.ora_inizio,
+                sessione.ora_fine,
+                escludi_sessione_id=sessione.id,
+            )
+
         sessione.updated_at = datetime.utcnow()
+        workload.apply_sessione(sessione)
+        self._sync_ore_contratto(sessione.intervento_id)
         self.db.commit()
         self.db.refresh(sessione)
 
+        self.publish_posizione(sessione)
+
         return sessione
 
     def delete_sessione(self, sessione_id: int) -> None:
@@ -352,8 +558,43 @@ class InterventionRepository:
 
         sessione.attivo = False
         sessione.updated_at = datetime.utcnow()
+        WorkloadRepository(self.db).apply_sessione(sessione, segno=-1)
+        self._sync_ore_contratto(sessione.intervento_id)
         self.db.commit()
 
+    def _sync_ore_contratto(self, intervento_id: int) -> None:
+        """Update hours used on the intervention's contract (same transaction)"""
+        contratto_id = (
+            self.db.query(Intervento.contratto_id)
+            .filter(Intervento.id == intervento_id)
+            .scalar()
+        )
+        if contratto_id:
+            BillingRepository(self.db).refresh_ore_contratto(contratto_id)
+
+    def calculate_total_hours_bulk(self, intervento_ids: List[int]) -> Dict[int, float]:
+        """Calculate total work hours for many interventions in one grouped query"""
+        if not intervento_ids:
+            return {}
+
+        rows = (
+            self.db.query(
+                InterventoSessione.intervento_id,
+                func.sum(InterventoSessione.durata_minuti),
+            )
+            .filter(
+                InterventoSessione.intervento_id.in_(intervento_ids),
+                InterventoSessione.attivo == True,
+            )
+            .group_by(InterventoSessione.intervento_id)
+            .all()
+        )
+
+        totals = {intervento_id: 0.0 for intervento_id in intervento_ids}
+        for intervento_id, minuti in rows:
+            totals[intervento_id] = (minuti or 0) / 60.0
+        return totals
+
     def calculate_total_hours(self, intervento_id: int) -> float:
         """Calculate total work hours for intervention"""
         from app.models.intervention import InterventoSessione
@@ -419,6 +660,34 @@ class InterventionRepository:
         riga.updated_at = datetime.utcnow()
         self.db.commit()
 
+    def _publish(self, tipo: str, intervento: Intervento) -> None:
+        """Notify connected clients about an intervention change"""
+        event_broker.publish(
+            tipo,
+            intervento_id=intervento.id,
+            numero=intervento.numero,
+            cliente_id=intervento.cliente_id,
+            ticket_id=intervento.ticket_id,
+            stato_id=intervento.stato_id,
+            tecnico_id=intervento.tecnico_id,
+        )
+
+    def publish_posizione(self, sessione: InterventoSessione) -> None:
+        """Update the technician's last known position (all workers)"""
+        posizione = posizione_sessione(sessione)
+        if posizione is None:
+            return
+
+        tecnico_id, lat, lon, rilevata_at = posizione
+        technician_locator.update(tecnico_id, lat, lon, rilevata_at)
+        event_broker.publish(
+            events.TECHNICIAN_POSITION,
+            tecnico_id=tecnico_id,
+            latitudine=lat,
+            longitudine=lon,
+            rilevata_at=rilevata_at.isoformat(),
+        )
+
     def _generate_intervention_number(self) -> str:
         """Generate unique intervention number INT-YYYY-00001"""
         current_year = datetime.utcnow().year
@@ -0,0 +1,83 @@
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+
+from app.models.monitoring import SlowQueryLog
+
+
+class MonitoringRepository:
+    """Consultazione del log delle query lente"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_top_slow_queries(
+        self,
+        giorni: int = 7,
+        limit: int = 20,
+        route: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Statements grouped by fingerprint, ordered by total time spent"""
+        da = datetime.utcnow() - timedelta(days=giorni)
+        totale = func.sum(SlowQueryLog.durata_ms)
+
+        query = self.db.query(
+            SlowQueryLog.fingerprint,
+            func.count(SlowQueryLog.id),
+            totale,
+            func.avg(SlowQueryLog.durata_ms),
+            func.max(SlowQueryLog.durata_ms),
+            func.max(SlowQueryLog.created_at),
+        ).filter(SlowQueryLog.created_at >= da)
+        if route:
+            query = query.filter(SlowQueryLog.route == route)
+        gruppi = query.group_by(SlowQueryLog.fingerprint).order_by(totale.desc()).limit(limit).all()
+        if not gruppi:
+            return []
+
+        # Campione più recente per statement, preferendo quelli con piano
+        campioni = {
+            c.fingerprint: c
+            for c in self.db.query(SlowQueryLog)
+            .filter(
+                SlowQueryLog.fingerprint.in_([g[0] for g in gruppi]),
+                SlowQueryLog.created_at >= da,
+            )
+            .order_by(
+                SlowQueryLog.fingerprint,
+                SlowQueryLog.piano.is_(None),
+                SlowQueryLog.created_at.desc(),
+            )
+            .distinct(SlowQueryLog.fingerprint)
+            .all()
+        }
+
+        risultato = []
+        for fingerprint, esecuzioni, totale_ms, media_ms, massimo_ms, ultima in gruppi:
+            campione = campioni[fingerprint]
+            risultato.append({
+                "fingerprint": fingerprint,
+                "esecuzioni": esecuzioni,
+                "totale_ms": float(totale_ms),
+                "media_ms": round(float(media_ms), 2),
+                "massimo_ms": float(massimo_ms),
+                "ultima_esecuzione": ultima,
+                "engine": campione.engine,
+                "statement": campione.statement,
+                "parametri": campione.parametri,
+                "chiamante": campione.chiamante,
+                "route": campione.route,
+                "piano": campione.piano,
+            })
+        return risultato
+
+    def get_samples(self, fingerprint: str, limit: int = 50) -> List[SlowQueryLog]:
+        """Latest executions of one statement"""
+        return (
+            self.db.query(SlowQueryLog)
+            .filter(SlowQueryLog.fingerprint == fingerprint)
+            .order_by(SlowQueryLog.created_at.desc())
+            .limit(limit)
+            .all()
+        )
@@ -0,0 +1,114 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+import time
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, text
+
+from app.core.config import settings
+from app.models.archive import ticket_storico_archivio
+from app.models.asset import AssetCredenzialeAccesso
+from app.models.calendar import CalendarioSyncLog
+from app.models.monitoring import SlowQueryLog
+from app.models.sync import SyncLog, SyncRiassegnazione
+from app.models.ticket import TicketStorico
+from app.repositories.archive import ArchiveRepository
+
+ELIMINA = "elimina"
+ARCHIVIA = "archivia"
+
+
+def get_politiche() -> List[Dict[str, Any]]:
+    """Retention policies from settings; a policy with 0 days is disabled"""
+    return [
+        {"modello": SyncLog, "giorni": settings.RETENTION_SYNC_LOG_DAYS, "azione": ELIMINA},
+        {"modello": SyncRiassegnazione, "giorni": settings.RETENTION_SYNC_RIASSEGNAZIONI_DAYS, "azione": ELIMINA},
+        {"modello": CalendarioSyncLog, "giorni": settings.RETENTION_CALENDARIO_SYNC_LOG_DAYS, "azione": ELIMINA},
+        {"modello": SlowQueryLog, "giorni": settings.RETENTION_SLOW_QUERY_LOG_DAYS, "azione": ELIMINA},
+        {"modello": AssetCredenzialeAccesso, "giorni": settings.RETENTION_CREDENZIALI_ACCESSI_DAYS, "azione": ELIMINA},
+        # Audit dei ticket: spostato nello schema archivio, non eliminato
+        {"modello": TicketStorico, "giorni": settings.RETENTION_TICKET_STORICO_DAYS, "azione": ARCHIVIA,
+         "archivio": ticket_storico_archivio},
+    ]
+
+
+class RetentionRepository:
+    """Pulizia a blocchi delle tabelle di log secondo le politiche di retention"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def applica(
+        self,
+        politica: Dict[str, Any],
+        batch_size: int,
+        pausa_secondi: float,
+        lock_timeout_ms: int,
+        scadenza: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Delete (or archive) the rows of a policy older than its retention.
+
+        The table is walked by primary key in batches of batch_size, one short
+        transaction per batch with a pause in between, so that the purge never
+        holds locks for long. Log rows get increasing ids as they are written,
+        so the walk stops at the first batch that reaches rows still within
+        retention. Stops early when time.monotonic() passes scadenza; the
+        next run continues from the oldest rows left.
+        """
+        modello = politica["modello"]
+        prima_di = datetime.utcnow() - timedelta(days=politica["giorni"])
+        risultato = {
+            "tabella": modello.__tablename__,
+            "azione": politica["azione"],
+            "righe": 0,
+            "batch": 0,
+            "secondi": 0.0,
+            "completato": False,
+        }
+
+        inizio = time.monotonic()
+        ultimo_id = 0
+        try:
+            while True:
+                if scadenza is not None and time.monotonic() >= scadenza:
+                    break
+
+                righe = self.db.execute(
+                    select(modello.id, modello.created_at)
+                    .where(modello.id > ultimo_id)
+                    .order_by(modello.id)
+                    .limit(batch_size)
+                ).all()
+                ids = [r.id for r in righe if r.created_at < prima_di]
+                if ids:
+                    self._rimuovi(politica, ids, lock_timeout_ms)
+                    risultato["righe"] += len(ids)
+                    risultato["batch"] += 1
+                else:
+                    self.db.rollback()
+
+                if len(righe) < batch_size or len(ids) < len(righe):
+                    risultato["completato"] = True
+                    break
+                ultimo_id = righe[-1].id
+                time.sleep(pausa_secondi)
+        finally:
+            risultato["secondi"] = round(time.monotonic() - inizio, 1)
+
+        return risultato
+
+    def _rimuovi(self, politica: Dict[str, Any], ids: List[int], lock_timeout_ms: int) -> None:
+        modello = politica["modello"]
+        # Meglio fallire il batch che restare in coda dietro una transazione applicativa
+        self.db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+        try:
+            if politica["azione"] == ARCHIVIA:
+                ArchiveRepository(self.db).sposta(modello, politica["archivio"], modello.id.in_(ids))
+            else:
+                self.db.execute(
+                    delete(modello).where(modello.id.in_(ids)).execution_options(synchronize_session=False)
+                )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
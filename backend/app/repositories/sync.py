@@ -0,0 +1,357 @@
+import base64
+import json
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, lazyload
+from sqlalchemy import or_, select, tuple_
+
+from app.core.config import settings
+from app.core.exceptions import ConflictException
+from app.models.archive import ticket_archivio
+from app.models.intervention import Intervento, InterventoRiga, InterventoSessione
+from app.models.lookup import (
+    LookupPriorita,
+    LookupStatiTicket,
+    LookupStatiIntervento,
+    LookupTipiIntervento,
+    LookupCategorieAttivita,
+    LookupOriginiIntervento,
+)
+from app.models.sync import SyncRiassegnazione
+from app.models.ticket import Ticket
+from app.repositories.billing import BillingRepository
+from app.repositories.intervention import InterventionRepository
+from app.schemas.sync import SyncPushRequest
+
+# (updated_at, id) dell'ultimo record consegnato per entità
+Cursore = Tuple[datetime, int]
+
+LOOKUP_SYNC = {
+    "priorita": LookupPriorita,
+    "stati_ticket": LookupStatiTicket,
+    "stati_intervento": LookupStatiIntervento,
+    "tipi_intervento": LookupTipiIntervento,
+    "categorie_attivita": LookupCategorieAttivita,
+    "origini_intervento": LookupOriginiIntervento,
+}
+
+TOKEN_VERSIONE = 1
+
+
+def encode_sync_token(cursori: Dict[str, Any]) -> str:
+    """Opaque client token holding the per-entity cursors"""
+    payload = {"v": TOKEN_VERSIONE, "c": {}}
+    for nome, cursore in cursori.items():
+        if isinstance(cursore, tuple):
+            payload["c"][nome] = [cursore[0].isoformat(), cursore[1]]
+        else:
+            payload["c"][nome] = cursore.isoformat()
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Dict[str, Any]:
+    """Inverse of encode_sync_token; ValueError if the token is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        if payload.get("v") != TOKEN_VERSIONE:
+            raise ValueError("Versione token non supportata")
+        cursori: Dict[str, Any] = {}
+        for nome, valore in payload["c"].items():
+            if isinstance(valore, list):
+                cursori[nome] = (datetime.fromisoformat(valore[0]), int(valore[1]))
+            else:
+                cursori[nome] = datetime.fromisoformat(valore)
+        return cursori
+    except (TypeError, KeyError, IndexError, AttributeError, json.JSONDecodeError, ValueError) as e:
+        raise ValueError("Token di sincronizzazione non valido") from e
+
+
+class SyncRepository:
+    """Delta sync e push offline per l'app mobile dei tecnici"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _sorgenti(self, tecnico_id: int) -> List[Tuple[str, Any, Any]]:
+        """(name, scoped query, model) of the entities synced to a technician"""
+        interventi = self.db.query(Intervento).filter(Intervento.tecnico_id == tecnico_id)
+        sessioni = (
+            self.db.query(InterventoSessione)
+            .join(Intervento, Intervento.id == InterventoSessione.intervento_id)
+            .filter(or_(Intervento.tecnico_id == tecnico_id, InterventoSessione.tecnico_id == tecnico_id))
+        )
+        righe = (
+            self.db.query(InterventoRiga)
+            .join(Intervento, Intervento.id == InterventoRiga.intervento_id)
+            .filter(Intervento.tecnico_id == tecnico_id)
+        )
+        ticket = self.db.query(Ticket).filter(Ticket.tecnico_assegnato_id == tecnico_id)
+
+        return [
+            ("interventi", interventi, Intervento),
+            ("sessioni", sessioni, InterventoSessione),
+            ("righe", righe, InterventoRiga),
+            ("ticket", ticket, Ticket),
+        ]
+
+    def get_changes(
+        self,
+        tecnico_id: int,
+        cursori: Dict[str, Any],
+        limite: int,
+    ) -> Dict[str, Any]:
+        """
+        Records changed after the cursors, oldest first, at most `limite` per
+        entity. Active rows are returned as data, deactivated ones as
+        tombstones; without a cursor (first sync) only active rows are read.
+        Tickets moved to the archive or reassigned to another technician no
+        longer match the technician's query: their ids are read from the
+        archive and from sync_riassegnazioni and added to the tombstones.
+
+        New cursors never go past now - SYNC_SAFETY_MARGIN_SECONDS, so rows
+        of transactions still committing are delivered by the next call
+        (clients upsert by id, repeats are harmless).
+        """
+        now = datetime.utcnow()
+        soglia: Cursore = (now - timedelta(seconds=settings.SYNC_SAFETY_MARGIN_SECONDS), 0)
+
+        risultato: Dict[str, Any] = {"server_time": now, "has_more": False, "eliminati": {"lookup": {}}}
+        nuovi_cursori: Dict[str, Any] = {}
+
+        for nome, query, modello in self._sorgenti(tecnico_id):
+            cursore = cursori.get(nome)
+            query = query.options(lazyload("*"))
+            if cursore is None:
+                query = query.filter(modello.attivo == True)
+            else:
+                query = query.filter(tuple_(modello.updated_at, modello.id) > tuple_(*cursore))
+
+            record = query.order_by(modello.updated_at, modello.id).limit(limite + 1).all()
+            altri = len(record) > limite
+            record = record[:limite]
+
+            ultimo = (record[-1].updated_at, record[-1].id) if record else None
+            nuovo = min(ultimo, soglia) if ultimo else soglia
+            if cursore is not None and nuovo <= cursore:
+                # Pagina interamente nel margine: avanzare comunque per non ripeterla
+                nuovo = ultimo if altri else cursore
+            nuovi_cursori[nome] = nuovo
+
+            risultato[nome] = [r for r in record if r.attivo]
+            risultato["eliminati"][nome] = [r.id for r in record if not r.attivo]
+            risultato["has_more"] = risultato["has_more"] or altri
+
+        eliminati, cursori_eliminati, altri = self._ticket_eliminati(tecnico_id, cursori, soglia, limite)
+        risultato["eliminati"]["ticket"] += eliminati
+        nuovi_cursori.update(cursori_eliminati)
+        risultato["has_more"] = risultato["has_more"] or altri
+
+        # Lookup: poche righe, nessuna paginazione
+        cursore_lookup: Optional[datetime] = cursori.get("lookup")
+        lookup: Dict[str, List[Any]] = {}
+        for nome, modello in LOOKUP_SYNC.items():
+            query = self.db.query(modello)
+            if cursore_lookup is None:
+                query = query.filter(modello.attivo == True)
+            else:
+                query = query.filter(modello.updated_at > cursore_lookup)
+            record = query.order_by(modello.id).all()
+            lookup[nome] = [r for r in record if r.attivo]
+            eliminati = [r.id for r in record if not r.attivo]
+            if eliminati:
+                risultato["eliminati"]["lookup"][nome] = eliminati
+        risultato["lookup"] = lookup
+        nuovi_cursori["lookup"] = max(soglia[0], cursore_lookup) if cursore_lookup else soglia[0]
+
+        risultato["cursori"] = nuovi_cursori
+        return risultato
+
+    def _ticket_eliminati(
+        self, tecnico_id: int, cursori: Dict[str, Any], soglia: Cursore, limite: int
+    ) -> Tuple[List[int], Dict[str, Cursore], bool]:
+        """
+        Ids of tickets that no longer match the technician's `ticket` query:
+        moved to the archive or reassigned to someone else after the cursors.
+        Returns the ids, the new cursors and whether more are pending.
+        """
+        t = ticket_archivio
+        archiviati, cursore_archivio, altri_archiviati = self._pagina_eliminati(
+            "ticket_archiviati",
+            select(t.c.archiviato_at, t.c.id, t.c.id.label("record_id")).where(t.c.tecnico_assegnato_id == tecnico_id),
+            t.c.archiviato_at, t.c.id, cursori, soglia, limite,
+        )
+
+        r = SyncRiassegnazione
+        riassegnati, cursore_riassegnati, altri_riassegnati = self._pagina_eliminati(
+            "ticket_riassegnati",
+            select(r.created_at, r.id, r.record_id).where(r.tecnico_id == tecnico_id, r.entita == "ticket"),
+            r.created_at, r.id, cursori, soglia, limite,
+        )
+        if riassegnati:
+            # Riassegnati di nuovo a questo tecnico: arrivano come dati, non come eliminati
+            suoi = set(self.db.execute(
+                select(Ticket.id).where(Ticket.id.in_(riassegnati), Ticket.tecnico_assegnato_id == tecnico_id)
+            ).scalars())
+            riassegnati = [i for i in dict.fromkeys(riassegnati) if i not in suoi]
+
+        return (
+            archiviati + riassegnati,
+            {"ticket_archiviati": cursore_archivio, "ticket_riassegnati": cursore_riassegnati},
+            altri_archiviati or altri_riassegnati,
+        )
+
+    def _pagina_eliminati(
+        self, chiave: str, query, colonna_ts, colonna_id, cursori: Dict[str, Any], soglia: Cursore, limite: int
+    ) -> Tuple[List[int], Cursore, bool]:
+        """
+        Tombstones read from a table other than the entity's own: query
+        selects (timestamp, id, record id) and is paged by its own cursor
+        `chiave`. Returns record ids, new cursor, more pending.
+        """
+        cursore = cursori.get(chiave)
+        if cursore is None:
+            if cursori.get("ticket") is None:
+                # Prima sincronizzazione: nessun ticket da eliminare sul client
+                return [], soglia, False
+            # Token emesso prima di questo cursore: dall'ultima lettura dei ticket
+            cursore = (cursori["ticket"][0], 0)
+
+        righe = self.db.execute(
+            query.where(tuple_(colonna_ts, colonna_id) > tuple_(*cursore))
+            .order_by(colonna_ts, colonna_id)
+            .limit(limite + 1)
+        ).all()
+        altri = len(righe) > limite
+        righe = righe[:limite]
+
+        ultimo = (righe[-1][0], righe[-1][1]) if righe else None
+        nuovo = min(ultimo, soglia) if ultimo else soglia
+        if nuovo <= cursore:
+            nuovo = ultimo if altri else cursore
+        return [riga[2] for riga in righe], nuovo, altri
+
+    def push(
+        self, tecnico_id: int, dati: SyncPushRequest
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[InterventoSessione]]:
+        """
+        Apply sessions and activity rows created offline in one transaction.
+
+        Each item runs in a savepoint: an item in conflict (overlapping
+        session, closed intervention, invalid data) is skipped and reported,
+        the others are committed together. Items already received (same
+        client_uuid) are reported as applied, so a push can be retried.
+        Returns (applied, conflicts, new sessions).
+        """
+        repo = InterventionRepository(self.db)
+        applicati: List[Dict[str, Any]] = []
+        conflitti: List[Dict[str, Any]] = []
+        nuove_sessioni: List[InterventoSessione] = []
+
+        intervento_ids = {s.intervento_id for s in dati.sessioni} | {r.intervento_id for r in dati.righe}
+        interventi = {
+            i.id: i
+            for i in self.db.query(Intervento).filter(
+                Intervento.id.in_(intervento_ids),
+                Intervento.attivo == True,
+            )
+        } if intervento_ids else {}
+
+        uuid_sessioni = {s.client_uuid for s in dati.sessioni} | {
+            r.sessione_client_uuid for r in dati.righe if r.sessione_client_uuid
+        }
+        sessioni_note: Dict[str, int] = dict(
+            self.db.query(InterventoSessione.client_uuid, InterventoSessione.id)
+            .filter(InterventoSessione.client_uuid.in_(uuid_sessioni))
+            .all()
+        ) if uuid_sessioni else {}
+        uuid_righe = {r.client_uuid for r in dati.righe}
+        righe_note: Dict[str, int] = dict(
+            self.db.query(InterventoRiga.client_uuid, InterventoRiga.id)
+            .filter(InterventoRiga.client_uuid.in_(uuid_righe))
+            .all()
+        ) if uuid_righe else {}
+
+        def conflitto(item, tipo: str, motivo: str, messaggio: str, dettaglio: Any = None) -> None:
+            conflitti.append({
+                "client_uuid": item.client_uuid,
+                "tipo": tipo,
+                "motivo": motivo,
+                "messaggio": messaggio,
+                "dettaglio": dettaglio,
+            })
+
+        def verifica_intervento(item, tipo: str) -> bool:
+            intervento = interventi.get(item.intervento_id)
+            if intervento is None:
+                conflitto(item, tipo, "INTERVENTO_NON_TROVATO", "Intervento non trovato")
+                return False
+            if intervento.stato and intervento.stato.finale:
+                conflitto(item, tipo, "INTERVENTO_CHIUSO", "Intervento già completato")
+                return False
+            return True
+
+        contratti = set()
+
+        for item in dati.sessioni:
+            if item.client_uuid in sessioni_note:
+                applicati.append({"client_uuid": item.client_uuid, "tipo": "SESSIONE",
+                                  "id": sessioni_note[item.client_uuid], "gia_presente": True})
+                continue
+            if not verifica_intervento(item, "SESSIONE"):
+                continue
+            try:
+                with self.db.begin_nested():
+                    sessione = repo.build_sessione(
+                        item.intervento_id, tecnico_id, item, client_uuid=item.client_uuid
+                    )
+            except ConflictException as e:
+                conflitto(item, "SESSIONE", "SOVRAPPOSIZIONE", e.message, e.detail)
+                continue
+            except IntegrityError:
+                conflitto(item, "SESSIONE", "DUPLICATO", "Sessione già in elaborazione")
+                continue
+
+            sessioni_note[item.client_uuid] = sessione.id
+            nuove_sessioni.append(sessione)
+            contratti.add(interventi[item.intervento_id].contratto_id)
+            applicati.append({"client_uuid": item.client_uuid, "tipo": "SESSIONE", "id": sessione.id})
+
+        for item in dati.righe:
+            if item.client_uuid in righe_note:
+                applicati.append({"client_uuid": item.client_uuid, "tipo": "RIGA",
+                                  "id": righe_note[item.client_uuid], "gia_presente": True})
+                continue
+            if not verifica_intervento(item, "RIGA"):
+                continue
+            sessione_id = None
+            if item.sessione_client_uuid:
+                sessione_id = sessioni_note.get(item.sessione_client_uuid)
+                if sessione_id is None:
+                    conflitto(item, "RIGA", "NON_VALIDO", "Sessione di riferimento non sincronizzata")
+                    continue
+            try:
+                with self.db.begin_nested():
+                    riga = repo.build_attivita(
+                        item.intervento_id, item, sessione_id=sessione_id, client_uuid=item.client_uuid
+                    )
+            except ValueError as e:
+                conflitto(item, "RIGA", "NON_VALIDO", str(e))
+                continue
+            except IntegrityError:
+                conflitto(item, "RIGA", "DUPLICATO", "Riga già in elaborazione")
+                continue
+
+            righe_note[item.client_uuid] = riga.id
+            applicati.append({"client_uuid": item.client_uuid, "tipo": "RIGA", "id": riga.id})
+
+        billing = BillingRepository(self.db)
+        for contratto_id in contratti:
+            if contratto_id:
+                billing.refresh_ore_contratto(contratto_id)
+
+        self.db.commit()
+
+        return applicati, conflitti, nuove_sessioni
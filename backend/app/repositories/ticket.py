@@ -1,9 +1,17 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
-from typing import Optional, List
+from typing import Optional, List, Iterator, Tuple
 from datetime import datetime
 
+from app.core import events
+from app.core.etag import claim_version
+from app.core.events import event_broker
+from app.models.archive import ticket_archivio
+from app.models.client import CacheClienti, CacheReferenti
+from app.models.lookup import LookupCanaliRichiesta, LookupPriorita, LookupStatiTicket
+from app.models.sync import SyncRiassegnazione
 from app.models.ticket import Ticket, TicketNota, TicketMessaggio, TicketStorico
+from app.models.user import Tecnico
 from app.schemas.ticket import TicketCreate, TicketUpdate
 
 
@@ -24,9 +32,84 @@ class TicketRepository:
         search: Optional[str] = None,
     ) -> tuple[List[Ticket], int]:
         """Get all tickets with filters"""
-        query = self.db.query(Ticket).filter(Ticket.attivo == True)
+        query = self._apply_filters(
+            self.db.query(Ticket),
+            stato_id=stato_id,
+            priorita_id=priorita_id,
+            tecnico_id=tecnico_id,
+            cliente_id=cliente_id,
+            search=search,
+        )
+
+        # Get total count
+        total = query.count()
+
+        # Apply pagination and order
+        tickets = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
+
+        return tickets, total
+
+    def iter_export(
+        self,
+        stato_id: Optional[int] = None,
+        priorita_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        cliente_id: Optional[int] = None,
+        search: Optional[str] = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple]:
+        """
+        Stream flat ticket rows for export through a server-side cursor.
+        Same filters as get_all, no pagination.
+        """
+        query = (
+            self.db.query(
+                Ticket.numero,
+                Ticket.created_at,
+                CacheClienti.ragione_sociale,
+                Ticket.oggetto,
+                LookupPriorita.descrizione,
+                LookupStatiTicket.descrizione,
+                Tecnico.nome,
+                Tecnico.cognome,
+                Ticket.sla_scadenza_risoluzione,
+                Ticket.data_chiusura,
+                Ticket.tipo_chiusura,
+            )
+            .select_from(Ticket)
+            .outerjoin(CacheClienti, Ticket.cliente_id == CacheClienti.id)
+            .outerjoin(LookupPriorita, Ticket.priorita_id == LookupPriorita.id)
+            .outerjoin(LookupStatiTicket, Ticket.stato_id == LookupStatiTicket.id)
+            .outerjoin(Tecnico, Ticket.tecnico_assegnato_id == Tecnico.id)
+        )
+        query = self._apply_filters(
+            query,
+            stato_id=stato_id,
+            priorita_id=priorita_id,
+            tecnico_id=tecnico_id,
+            cliente_id=cliente_id,
+            search=search,
+        )
+
+        for row in query.order_by(Ticket.created_at.desc()).yield_per(batch_size):
+            (numero, created_at, cliente, oggetto, priorita, stato,
+             nome, cognome, scadenza, data_chiusura, tipo_chiusura) = row
+            tecnico = f"{nome} {cognome}" if nome else None
+            yield (numero, created_at, cliente, oggetto, priorita, stato,
+                   tecnico, scadenza, data_chiusura, tipo_chiusura)
+
+    def _apply_filters(
+        self,
+        query,
+        stato_id: Optional[int] = None,
+        priorita_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        cliente_id: Optional[int] = None,
+        search: Optional[str] = None,
+    ):
+        """Apply list filters shared by get_all and iter_export"""
+        query = query.filter(Ticket.attivo == True)
 
-        # Apply filters
         if stato_id:
             query = query.filter(Ticket.stato_id == stato_id)
         if priorita_id:
@@ -43,13 +126,7 @@ class TicketRepository:
             )
             query = query.filter(search_filter)
 
-        # Get total count
-        total = query.count()
-
-        # Apply pagination and order
-        tickets = query.order_by(Ticket.created_at.desc()).offset(skip).limit(limit).all()
-
-        return tickets, total
+        return query
 
     def get_by_id(self, ticket_id: int) -> Optional[Ticket]:
         """Get ticket by ID"""
@@ -65,6 +142,30 @@ class TicketRepository:
             Ticket.attivo == True
         ).first()
 
+    def get_versione(self, ticket_id: int) -> Optional[Tuple[Optional[datetime], ...]]:
+        """updated_at of the ticket and of the entities embedded in TicketResponse (ETag)"""
+        row = (
+            self.db.query(
+                Ticket.updated_at,
+                CacheClienti.updated_at,
+                CacheReferenti.updated_at,
+                LookupCanaliRichiesta.updated_at,
+                LookupPriorita.updated_at,
+                LookupStatiTicket.updated_at,
+                Tecnico.updated_at,
+            )
+            .select_from(Ticket)
+            .outerjoin(CacheClienti, CacheClienti.id == Ticket.cliente_id)
+            .outerjoin(CacheReferenti, CacheReferenti.id == Ticket.referente_id)
+            .outerjoin(LookupCanaliRichiesta, LookupCanaliRichiesta.id == Ticket.canale_id)
+            .outerjoin(LookupPriorita, LookupPriorita.id == Ticket.priorita_id)
+            .outerjoin(LookupStatiTicket, LookupStatiTicket.id == Ticket.stato_id)
+            .outerjoin(Tecnico, Tecnico.id == Ticket.tecnico_assegnato_id)
+            .filter(Ticket.id == ticket_id, Ticket.attivo == True)
+            .first()
+        )
+        return tuple(row) if row else None
+
     def create(self, ticket_data: TicketCreate, stato_nuovo_id: int) -> Ticket:
         """Create new ticket"""
         # Generate ticket number
@@ -80,22 +181,42 @@ class TicketRepository:
         self.db.commit()
         self.db.refresh(ticket)
 
+        self._publish(events.TICKET_CREATED, ticket)
+
         return ticket
 
-    def update(self, ticket: Ticket, update_data: TicketUpdate) -> Ticket:
-        """Update ticket"""
+    def update(
+        self, ticket: Ticket, update_data: TicketUpdate, updated_at_atteso: Optional[datetime] = None
+    ) -> Ticket:
+        """
+        Update ticket (only if still at version updated_at_atteso, when given).
+        Reassignments and moves to a final state are published like assign()
+        and close().
+        """
+        if updated_at_atteso is not None:
+            claim_version(self.db, Ticket, ticket.id, updated_at_atteso)
+
         update_dict = update_data.model_dump(exclude_unset=True)
+        tecnico_precedente = ticket.tecnico_assegnato_id
+        stato_precedente = ticket.stato_id
 
         for field, value in update_dict.items():
             setattr(ticket, field, value)
 
+        self._registra_riassegnazione(ticket.id, tecnico_precedente, ticket.tecnico_assegnato_id)
         self.db.commit()
         self.db.refresh(ticket)
 
+        if ticket.tecnico_assegnato_id != tecnico_precedente:
+            self._publish(events.TICKET_ASSIGNED, ticket)
+        if ticket.stato_id != stato_precedente and ticket.stato is not None and ticket.stato.finale:
+            self._publish(events.TICKET_CLOSED, ticket)
+
         return ticket
 
     def assign(self, ticket: Ticket, tecnico_id: int) -> Ticket:
         """Assign ticket to technician"""
+        self._registra_riassegnazione(ticket.id, ticket.tecnico_assegnato_id, tecnico_id)
         ticket.tecnico_assegnato_id = tecnico_id
 
         # Se è la prima assegnazione, registra prima risposta per SLA
@@ -105,6 +226,8 @@ class TicketRepository:
         self.db.commit()
         self.db.refresh(ticket)
 
+        self._publish(events.TICKET_ASSIGNED, ticket)
+
         return ticket
 
     def close(self, ticket: Ticket, tipo_chiusura: str, note_chiusura: str, stato_chiuso_id: int) -> Ticket:
@@ -117,6 +240,8 @@ class TicketRepository:
         self.db.commit()
         self.db.refresh(ticket)
 
+        self._publish(events.TICKET_CLOSED, ticket)
+
         return ticket
 
     def add_note(self, ticket_id: int, tecnico_id: int, nota: str) -> TicketNota:
@@ -183,22 +308,39 @@ class TicketRepository:
 
         return storico
 
+    def _publish(self, tipo: str, ticket: Ticket) -> None:
+        """Notify connected clients about a ticket change"""
+        event_broker.publish(
+            tipo,
+            ticket_id=ticket.id,
+            numero=ticket.numero,
+            cliente_id=ticket.cliente_id,
+            stato_id=ticket.stato_id,
+            tecnico_id=ticket.tecnico_assegnato_id,
+        )
+
+    def _registra_riassegnazione(self, ticket_id: int, precedente: Optional[int], nuovo: Optional[int]) -> None:
+        """Tombstone for the mobile app of the previous technician (same transaction)"""
+        if precedente is not None and precedente != nuovo:
+            self.db.add(SyncRiassegnazione(entita="ticket", record_id=ticket_id, tecnico_id=precedente))
+
     def _generate_ticket_number(self) -> str:
         """Generate unique ticket number"""
         # Get current year
         year = datetime.utcnow().year
 
-        # Get last ticket number for this year
-        last_ticket = (
-            self.db.query(Ticket)
-            .filter(Ticket.numero.like(f"TK-{year}-%"))
-            .order_by(Ticket.numero.desc())
-            .first()
-        )
+        # Get last ticket number for this year, archived tickets included
+        # (a number moved to the archivio schema must not be issued again)
+        prefisso = f"TK-{year}-%"
+        ultimi = [
+            self.db.query(func.max(Ticket.numero)).filter(Ticket.numero.like(prefisso)).scalar(),
+            self.db.query(func.max(ticket_archivio.c.numero)).filter(ticket_archivio.c.numero.like(prefisso)).scalar(),
+        ]
+        ultimi = [numero for numero in ultimi if numero]
 
-        if last_ticket:
+        if ultimi:
             # Extract number and increment
-            last_num = int(last_ticket.numero.split("-")[-1])
+            last_num = int(max(ultimi).split("-")[-1])
             new_num = last_num + 1
         else:
             new_num = 1
@@ -0,0 +1,249 @@
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select, delete, literal
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.models.intervention import Intervento, InterventoSessione, TecnicoCaricoGiornaliero
+from app.models.user import Tecnico
+
+
+class WorkloadRepository:
+    """Carico di lavoro dei tecnici letto dal rollup giornaliero"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def apply_sessione(self, sessione: InterventoSessione, segno: int = 1) -> None:
+        """
+        Add (segno=1) or remove (segno=-1) a session's contribution to its
+        technician/day bucket. Upsert in the caller's transaction, no commit.
+        """
+        self.apply_delta(
+            tecnico_id=sessione.tecnico_id,
+            data=sessione.data,
+            minuti_lavoro=segno * (sessione.durata_minuti or 0),
+            minuti_viaggio=segno * (sessione.tempo_viaggio_minuti or 0),
+            km_percorsi=segno * Decimal(str(sessione.km_percorsi or 0)),
+            sessioni=segno,
+        )
+
+    def apply_delta(
+        self,
+        tecnico_id: int,
+        data: date,
+        minuti_lavoro: int = 0,
+        minuti_viaggio: int = 0,
+        km_percorsi: Decimal = Decimal("0"),
+        sessioni: int = 0,
+    ) -> None:
+        """Atomically increment a technician/day bucket"""
+        now = datetime.utcnow()
+        stmt = insert(TecnicoCaricoGiornaliero).values(
+            tecnico_id=tecnico_id,
+            data=data,
+            minuti_lavoro=minuti_lavoro,
+            minuti_viaggio=minuti_viaggio,
+            km_percorsi=km_percorsi,
+            sessioni=sessioni,
+            created_at=now,
+            updated_at=now,
+            attivo=True,
+        )
+        tabella = TecnicoCaricoGiornaliero.__table__
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_tecnici_carico_giornaliero_tecnico_data",
+            set_={
+                "minuti_lavoro": tabella.c.minuti_lavoro + stmt.excluded.minuti_lavoro,
+                "minuti_viaggio": tabella.c.minuti_viaggio + stmt.excluded.minuti_viaggio,
+                "km_percorsi": tabella.c.km_percorsi + stmt.excluded.km_percorsi,
+                "sessioni": tabella.c.sessioni + stmt.excluded.sessioni,
+                "updated_at": now,
+            },
+        )
+        self.db.execute(stmt)
+
+    def rebuild(self, data_from: Optional[date] = None, data_to: Optional[date] = None) -> int:
+        """Recompute the rollup from the sessions of active interventions (backfill / repair)"""
+        now = datetime.utcnow()
+        pulizia = delete(TecnicoCaricoGiornaliero)
+        sorgente = (
+            select(
+                InterventoSessione.tecnico_id,
+                InterventoSessione.data,
+                func.coalesce(func.sum(InterventoSessione.durata_minuti), 0),
+                func.coalesce(func.sum(InterventoSessione.tempo_viaggio_minuti), 0),
+                func.coalesce(func.sum(InterventoSessione.km_percorsi), 0),
+                func.count(InterventoSessione.id),
+                literal(now),
+                literal(now),
+                literal(True),
+            )
+            .join(Intervento, Intervento.id == InterventoSessione.intervento_id)
+            .where(InterventoSessione.attivo == True, Intervento.attivo == True)
+            .group_by(InterventoSessione.tecnico_id, InterventoSessione.data)
+        )
+
+        if data_from:
+            pulizia = pulizia.where(TecnicoCaricoGiornaliero.data >= data_from)
+            sorgente = sorgente.where(InterventoSessione.data >= data_from)
+        if data_to:
+            pulizia = pulizia.where(TecnicoCaricoGiornaliero.data <= data_to)
+            sorgente = sorgente.where(InterventoSessione.data <= data_to)
+
+        self.db.execute(pulizia)
+        result = self.db.execute(
+            insert(TecnicoCaricoGiornaliero).from_select(
+                [
+                    "tecnico_id",
+                    "data",
+                    "minuti_lavoro",
+                    "minuti_viaggio",
+                    "km_percorsi",
+                    "sessioni",
+                    "created_at",
+                    "updated_at",
+                    "attivo",
+                ],
+                sorgente,
+            )
+        )
+        self.db.commit()
+
+        return result.rowcount
+
+    def get_giornaliero(self, tecnico_id: int, data_from: date, data_to: date) -> List[TecnicoCaricoGiornaliero]:
+        """Daily buckets for one technician"""
+        return (
+            self.db.query(TecnicoCaricoGiornaliero)
+            .filter(
+                TecnicoCaricoGiornaliero.tecnico_id == tecnico_id,
+                TecnicoCaricoGiornaliero.data >= data_from,
+                TecnicoCaricoGiornaliero.data <= data_to,
+                TecnicoCaricoGiornaliero.sessioni > 0,
+            )
+            .order_by(TecnicoCaricoGiornaliero.data)
+            .all()
+        )
+
+    def get_team(
+        self,
+        data_from: date,
+        data_to: date,
+        reparto_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Totals per technician over a period (all active technicians)"""
+        totali = (
+            select(
+                TecnicoCaricoGiornaliero.tecnico_id.label("tecnico_id"),
+                func.sum(TecnicoCaricoGiornaliero.minuti_lavoro).label("minuti_lavoro"),
+                func.sum(TecnicoCaricoGiornaliero.minuti_viaggio).label("minuti_viaggio"),
+                func.sum(TecnicoCaricoGiornaliero.km_percorsi).label("km_percorsi"),
+                func.sum(TecnicoCaricoGiornaliero.sessioni).label("sessioni"),
+                func.count(TecnicoCaricoGiornaliero.id).label("giorni_lavorati"),
+            )
+            .where(
+                TecnicoCaricoGiornaliero.data >= data_from,
+                TecnicoCaricoGiornaliero.data <= data_to,
+                TecnicoCaricoGiornaliero.sessioni > 0,
+            )
+            .group_by(TecnicoCaricoGiornaliero.tecnico_id)
+            .subquery()
+        )
+
+        query = (
+            self.db.query(
+                Tecnico.id,
+                Tecnico.nome,
+                Tecnico.cognome,
+                totali.c.minuti_lavoro,
+                totali.c.minuti_viaggio,
+                totali.c.km_percorsi,
+                totali.c.sessioni,
+                totali.c.giorni_lavorati,
+            )
+            .outerjoin(totali, totali.c.tecnico_id == Tecnico.id)
+            .filter(Tecnico.attivo == True)
+        )
+
+        if reparto_id:
+            query = query.filter(Tecnico.reparto_id == reparto_id)
+
+        capacita = self.capacita_ore(data_from, data_to)
+
+        return [
+            self._riepilogo(
+                tecnico_id=r.id,
+                nome_completo=f"{r.nome} {r.cognome}",
+                minuti_lavoro=r.minuti_lavoro or 0,
+                minuti_viaggio=r.minuti_viaggio or 0,
+                km_percorsi=r.km_percorsi or 0,
+                sessioni=r.sessioni or 0,
+                giorni_lavorati=r.giorni_lavorati or 0,
+                capacita=capacita,
+            )
+            for r in query.order_by(Tecnico.cognome, Tecnico.nome).all()
+        ]
+
+    @staticmethod
+    def capacita_ore(data_from: date, data_to: date) -> float:
+        """Available hours in the period (working days Mon-Fri)"""
+        giorni = 0
+        giorno = data_from
+        while giorno <= data_to:
+            if giorno.weekday() < 5:
+                giorni += 1
+            giorno += timedelta(days=1)
+        return giorni * settings.WORKLOAD_ORE_GIORNALIERE
+
+    @staticmethod
+    def _riepilogo(
+        tecnico_id: int,
+        nome_completo: str,
+        minuti_lavoro: int,
+        minuti_viaggio: int,
+        km_percorsi,
+        sessioni: int,
+        giorni_lavorati: int,
+        capacita: float,
+    ) -> Dict[str, Any]:
+        ore_lavoro = round(minuti_lavoro / 60.0, 2)
+        ore_viaggio = round(minuti_viaggio / 60.0, 2)
+        return {
+            "tecnico_id": tecnico_id,
+            "nome_completo": nome_completo,
+            "ore_lavoro": ore_lavoro,
+            "ore_viaggio": ore_viaggio,
+            "km_percorsi": float(km_percorsi),
+            "sessioni": int(sessioni),
+            "giorni_lavorati": int(giorni_lavorati),
+            "ore_disponibili": capacita,
+            "utilizzo_percentuale": round((ore_lavoro + ore_viaggio) / capacita * 100, 1) if capacita else 0,
+        }
+
+    def get_riepilogo_tecnico(self, tecnico: Tecnico, data_from: date, data_to: date) -> Dict[str, Any]:
+        """Period summary plus daily detail for one technician"""
+        giorni = self.get_giornaliero(tecnico.id, data_from, data_to)
+        riepilogo = self._riepilogo(
+            tecnico_id=tecnico.id,
+            nome_completo=tecnico.nome_completo,
+            minuti_lavoro=sum(g.minuti_lavoro for g in giorni),
+            minuti_viaggio=sum(g.minuti_viaggio for g in giorni),
+            km_percorsi=sum((g.km_percorsi for g in giorni), Decimal("0")),
+            sessioni=sum(g.sessioni for g in giorni),
+            giorni_lavorati=len(giorni),
+            capacita=self.capacita_ore(data_from, data_to),
+        )
+        riepilogo["giorni"] = [
+            {
+                "data": g.data,
+                "ore_lavoro": round(g.minuti_lavoro / 60.0, 2),
+                "ore_viaggio": round(g.minuti_viaggio / 60.0, 2),
+                "km_percorsi": float(g.km_percorsi),
+                "sessioni": g.sessioni,
+            }
+            for g in giorni
+        ]
+        return riepilogo
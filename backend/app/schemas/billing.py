@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional, Union
+
+
+class OreAggregato(BaseModel):
+    """Hours worked for one group (intervention, contract, client, technician, month)"""
+    chiave: Optional[Union[int, str]]
+    etichetta: Optional[str]
+    ore: float
+    ore_viaggio: float
+    km: float
+    sessioni: int
+    interventi: int
+
+
+class OreAggregatoResponse(BaseModel):
+    raggruppa: str
+    totale_ore: float
+    righe: List[OreAggregato]
+
+
+class ImportoIntervento(BaseModel):
+    """Amounts for one intervention"""
+    intervento_id: int
+    numero: str
+    cliente_id: int
+    cliente_ragione_sociale: str
+    contratto_id: Optional[int]
+    data_fine: Optional[datetime]
+    righe: int
+    quantita: float
+    importo_totale: float
+    importo_fatturabile: float
+
+
+class ImportiResponse(BaseModel):
+    totale_importo: float
+    totale_fatturabile: float
+    interventi: List[ImportoIntervento]
@@ -104,6 +104,8 @@ class SedeClienteBase(BaseModel):
     nazione: str = Field(default="IT", max_length=50)
     telefono: Optional[str] = Field(None, max_length=50)
     email: Optional[str] = Field(None, max_length=255)
+    latitudine: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine: Optional[float] = Field(None, ge=-180, le=180)
     orari_servizio: Optional[str] = None
     note: Optional[str] = None
 
@@ -122,6 +124,8 @@ class SedeClienteUpdate(BaseModel):
     nazione: Optional[str] = Field(None, max_length=50)
     telefono: Optional[str] = Field(None, max_length=50)
     email: Optional[str] = Field(None, max_length=255)
+    latitudine: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine: Optional[float] = Field(None, ge=-180, le=180)
     orari_servizio: Optional[str] = None
     note: Optional[str] = None
     attivo: Optional[bool] = None
@@ -139,6 +143,8 @@ class SedeClienteResponse(BaseModel):
     nazione: str
     telefono: Optional[str]
     email: Optional[str]
+    latitudine: Optional[float] = None
+    longitudine: Optional[float] = None
     orari_servizio: Optional[str]
     note: Optional[str]
     attivo: bool
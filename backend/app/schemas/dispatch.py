@@ -0,0 +1,80 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+class RichiestaDispatch(BaseModel):
+    """Pending intervention request with its queue position"""
+    id: int
+    posizione: int
+    ticket_id: Optional[int]
+    ticket_numero: Optional[str]
+    cliente_id: int
+    cliente_ragione_sociale: str
+    oggetto: str
+    priorita_id: int
+    priorita_codice: str
+    priorita_livello: int
+    data_richiesta: datetime
+    data_preferita: Optional[datetime]
+    sla_scadenza: Optional[datetime]
+    sla_scaduta: bool
+    minuti_attesa: int
+    tecnico_richiesto_id: Optional[int]
+    tipo_intervento_id: Optional[int]
+
+
+class DispatchQueueResponse(BaseModel):
+    totale: int
+    richieste: List[RichiestaDispatch]
+
+
+class DispatchAssign(BaseModel):
+    tecnico_id: int
+    data_inizio: datetime
+    data_fine: datetime
+    tecnici_ids: List[int] = Field(default_factory=list)
+
+
+class DispatchAssignResponse(BaseModel):
+    richiesta_id: int
+    evento_id: int
+    tecnico_id: int
+    message: str
+
+
+class ScheduleRequest(BaseModel):
+    data_from: date
+    data_to: date
+    reparto_id: Optional[int] = None
+    salva_bozze: bool = True
+
+
+class ScheduleAssegnazione(BaseModel):
+    richiesta_id: int
+    tecnico_id: int
+    data_inizio: datetime
+    data_fine: datetime
+    km_stimati: float
+    minuti_viaggio: int
+    evento_id: Optional[int] = None
+
+
+class ScheduleNonAssegnata(BaseModel):
+    richiesta_id: int
+    motivo: str
+
+
+class ScheduleResponse(BaseModel):
+    richieste: int
+    tecnici: int
+    assegnate: int
+    km_stimati_totali: float
+    bozze_salvate: bool
+    durata_ms: int
+    assegnazioni: List[ScheduleAssegnazione]
+    non_assegnate: List[ScheduleNonAssegnata]
+
+
+class ScheduleConfirm(BaseModel):
+    evento_ids: Optional[List[int]] = None
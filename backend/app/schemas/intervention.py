@@ -117,6 +117,10 @@ class SessioneCreate(BaseModel):
     tipo_intervento_id: int
     km_percorsi: Optional[float] = Field(None, ge=0)
     tempo_viaggio_minuti: Optional[int] = Field(None, ge=0)
+    latitudine_inizio: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine_inizio: Optional[float] = Field(None, ge=-180, le=180)
+    latitudine_fine: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine_fine: Optional[float] = Field(None, ge=-180, le=180)
     note: Optional[str] = None
 
 
@@ -127,6 +131,10 @@ class SessioneUpdate(BaseModel):
     tipo_intervento_id: Optional[int] = None
     km_percorsi: Optional[float] = Field(None, ge=0)
     tempo_viaggio_minuti: Optional[int] = Field(None, ge=0)
+    latitudine_inizio: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine_inizio: Optional[float] = Field(None, ge=-180, le=180)
+    latitudine_fine: Optional[float] = Field(None, ge=-90, le=90)
+    longitudine_fine: Optional[float] = Field(None, ge=-180, le=180)
     note: Optional[str] = None
 
 
@@ -141,6 +149,10 @@ class SessioneResponse(BaseModel):
     tipo_intervento: TipoInterventoResponse
     km_percorsi: Optional[float]
     tempo_viaggio_minuti: Optional[int]
+    latitudine_inizio: Optional[float] = None
+    longitudine_inizio: Optional[float] = None
+    latitudine_fine: Optional[float] = None
+    longitudine_fine: Optional[float] = None
     note: Optional[str]
     created_at: datetime
 
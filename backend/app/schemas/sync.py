@@ -0,0 +1,163 @@
+from pydantic import BaseModel, Field
+from datetime import datetime, date, time
+from typing import Any, Dict, List, Optional
+from app.schemas.intervention import AttivitaInterventoCreate, SessioneCreate
+from app.schemas.lookup import (
+    PrioritaResponse,
+    StatoTicketResponse,
+    StatoInterventoResponse,
+    TipoInterventoResponse,
+    CategoriaAttivitaResponse,
+    OrigineInterventoResponse,
+)
+
+
+# Delta sync (GET /sync/changes): record piatti, solo id per le relazioni
+class SyncIntervento(BaseModel):
+    id: int
+    numero: str
+    ticket_id: Optional[int] = None
+    cliente_id: int
+    tipo_intervento_id: int
+    stato_id: int
+    origine_id: int
+    tecnico_id: int
+    oggetto: str
+    descrizione_lavoro: Optional[str] = None
+    note_interne: Optional[str] = None
+    data_inizio: Optional[datetime] = None
+    data_fine: Optional[datetime] = None
+    firma_nome: Optional[str] = None
+    firma_data: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncSessione(BaseModel):
+    id: int
+    intervento_id: int
+    tecnico_id: int
+    data: date
+    ora_inizio: Optional[time] = None
+    ora_fine: Optional[time] = None
+    durata_minuti: Optional[int] = None
+    tipo_intervento_id: int
+    km_percorsi: Optional[float] = None
+    tempo_viaggio_minuti: Optional[int] = None
+    latitudine_inizio: Optional[float] = None
+    longitudine_inizio: Optional[float] = None
+    latitudine_fine: Optional[float] = None
+    longitudine_fine: Optional[float] = None
+    note: Optional[str] = None
+    client_uuid: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncRiga(BaseModel):
+    id: int
+    intervento_id: int
+    numero_riga: int
+    categoria_id: int
+    descrizione: str
+    quantita: Optional[float] = None
+    unita_misura: Optional[str] = None
+    prezzo_unitario: Optional[float] = None
+    sconto_percentuale: Optional[float] = None
+    fatturabile: Optional[bool] = None
+    in_garanzia: Optional[bool] = None
+    incluso_contratto: Optional[bool] = None
+    sessione_id: Optional[int] = None
+    client_uuid: Optional[str] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncTicket(BaseModel):
+    id: int
+    numero: str
+    cliente_id: int
+    priorita_id: int
+    stato_id: int
+    oggetto: str
+    descrizione: Optional[str] = None
+    tecnico_assegnato_id: Optional[int] = None
+    sla_scadenza_risoluzione: Optional[datetime] = None
+    data_chiusura: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class SyncLookup(BaseModel):
+    priorita: List[PrioritaResponse] = []
+    stati_ticket: List[StatoTicketResponse] = []
+    stati_intervento: List[StatoInterventoResponse] = []
+    tipi_intervento: List[TipoInterventoResponse] = []
+    categorie_attivita: List[CategoriaAttivitaResponse] = []
+    origini_intervento: List[OrigineInterventoResponse] = []
+
+
+class SyncEliminati(BaseModel):
+    """Tombstones: id dei record disattivati (attivo = False), archiviati o riassegnati dopo il token"""
+    interventi: List[int] = []
+    sessioni: List[int] = []
+    righe: List[int] = []
+    ticket: List[int] = []
+    lookup: Dict[str, List[int]] = {}
+
+
+class SyncChangesResponse(BaseModel):
+    token: str
+    has_more: bool
+    server_time: datetime
+    interventi: List[SyncIntervento]
+    sessioni: List[SyncSessione]
+    righe: List[SyncRiga]
+    ticket: List[SyncTicket]
+    lookup: SyncLookup
+    eliminati: SyncEliminati
+
+
+# Push offline (POST /sync/push)
+class SyncSessionePush(SessioneCreate):
+    client_uuid: str = Field(..., min_length=1, max_length=36)
+    intervento_id: int
+
+
+class SyncRigaPush(AttivitaInterventoCreate):
+    client_uuid: str = Field(..., min_length=1, max_length=36)
+    intervento_id: int
+    sessione_client_uuid: Optional[str] = Field(None, max_length=36)
+
+
+class SyncPushRequest(BaseModel):
+    sessioni: List[SyncSessionePush] = []
+    righe: List[SyncRigaPush] = []
+
+
+class SyncPushApplicato(BaseModel):
+    client_uuid: str
+    tipo: str  # SESSIONE, RIGA
+    id: int
+    gia_presente: bool = False
+
+
+class SyncPushConflitto(BaseModel):
+    client_uuid: str
+    tipo: str  # SESSIONE, RIGA
+    motivo: str  # SOVRAPPOSIZIONE, INTERVENTO_NON_TROVATO, INTERVENTO_CHIUSO, NON_VALIDO
+    messaggio: str
+    dettaglio: Optional[Any] = None
+
+
+class SyncPushResponse(BaseModel):
+    applicati: List[SyncPushApplicato]
+    conflitti: List[SyncPushConflitto]
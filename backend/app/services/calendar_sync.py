@@ -0,0 +1,784 @@
+"""
+Motore di sincronizzazione calendari esterni (Google Calendar, Outlook/Microsoft 365).
+
+Ogni esecuzione trasferisce solo le modifiche: Google tramite nextSyncToken,
+Microsoft Graph tramite deltaLink. Le modifiche locali vengono inviate in
+batch (Google batch endpoint, Graph $batch). I tecnici vengono sincronizzati
+in parallelo con un limite di concorrenza e un rate limiter per provider.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlencode, urlparse
+
+import httpx
+from sqlalchemy import and_, bindparam, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.exceptions import SyncException
+from app.database import SessionLocal
+from app.models.calendar import CalendarioAccount, CalendarioEvento, CalendarioSyncLog
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_GOOGLE = "GOOGLE"
+PROVIDER_OUTLOOK = "OUTLOOK"
+
+MAX_RETRIES = 3
+
+
+class SyncTokenExpired(Exception):
+    """The provider rejected the sync token: a full resync is required"""
+
+
+class RateLimiter:
+    """Token bucket asincrono condiviso da tutte le sincronizzazioni di un provider"""
+
+    def __init__(self, rate_per_second: float, burst: Optional[int] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or max(1, int(rate_per_second))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ProviderEvent:
+    """Evento normalizzato letto dal provider"""
+
+    def __init__(
+        self,
+        external_id: str,
+        cancellato: bool = False,
+        titolo: Optional[str] = None,
+        descrizione: Optional[str] = None,
+        luogo: Optional[str] = None,
+        data_inizio: Optional[datetime] = None,
+        data_fine: Optional[datetime] = None,
+    ):
+        self.external_id = external_id
+        self.cancellato = cancellato
+        self.titolo = titolo
+        self.descrizione = descrizione
+        self.luogo = luogo
+        self.data_inizio = data_inizio
+        self.data_fine = data_fine
+
+
+class ExportOperation:
+    """Modifica locale da inviare al provider"""
+
+    def __init__(self, evento_id: int, metodo: str, external_id: Optional[str], payload: Optional[dict]):
+        self.evento_id = evento_id
+        self.metodo = metodo  # CREATE, UPDATE, DELETE
+        self.external_id = external_id
+        self.payload = payload
+
+
+def _to_utc_naive(value: str) -> datetime:
+    """Parse an ISO datetime from a provider into naive UTC (DB convention)"""
+    value = value.replace("Z", "+00:00")
+    # Graph restituisce fino a 7 cifre decimali
+    if "." in value:
+        head, _, tail = value.partition(".")
+        frac = "".join(c for c in tail if c.isdigit())
+        offset = tail[len(frac):]
+        value = f"{head}.{frac[:6]}{offset}"
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _retry_after(value: Optional[str], default: float) -> float:
+    """Seconds to wait from a Retry-After header: delta-seconds or HTTP-date"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        quando = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if quando.tzinfo is None:
+        quando = quando.replace(tzinfo=timezone.utc)
+    return max((quando - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _iso_utc(value: datetime) -> str:
+    return value.replace(microsecond=0).isoformat() + "Z"
+
+
+class CalendarProvider(ABC):
+    """Base class for provider adapters"""
+
+    codice = ""
+    id_field = ""
+    batch_size = 20
+
+    def __init__(self, client: httpx.AsyncClient, limiter: RateLimiter):
+        self.client = client
+        self.limiter = limiter
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Rate-limited request with retry on 429/503 (honours Retry-After)"""
+        for tentativo in range(MAX_RETRIES + 1):
+            await self.limiter.acquire()
+            response = await self.client.request(method, url, **kwargs)
+            if response.status_code not in (429, 503) or tentativo == MAX_RETRIES:
+                return response
+            await asyncio.sleep(_retry_after(response.headers.get("Retry-After"), 2 ** tentativo))
+        return response
+
+    def _auth(self, account: CalendarioAccount) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {account.access_token}"}
+
+    async def _token_request(self, url: str, data: Dict[str, str]) -> Tuple[str, Optional[str], datetime]:
+        response = await self.request("POST", url, data=data)
+        if response.status_code != 200:
+            raise SyncException(
+                f"Token {self.codice} non ottenuto",
+                detail={"status": response.status_code, "body": response.text[:500]},
+            )
+        body = response.json()
+        scadenza = datetime.utcnow() + timedelta(seconds=int(body.get("expires_in", 3600)) - 60)
+        return body["access_token"], body.get("refresh_token"), scadenza
+
+    @abstractmethod
+    def authorize_url(self, state: str) -> str:
+        """Consent page URL for the OAuth flow"""
+
+    @abstractmethod
+    async def exchange_code(self, code: str) -> Tuple[str, Optional[str], datetime]:
+        """Authorization code -> (access_token, refresh_token, expiry)"""
+
+    @abstractmethod
+    async def refresh_token(self, account: CalendarioAccount) -> Tuple[str, Optional[str], datetime]:
+        """New access token for the account -> (access_token, refresh_token, expiry)"""
+
+    @abstractmethod
+    async def fetch_changes(self, account: CalendarioAccount) -> Tuple[List[ProviderEvent], str]:
+        """Remote changes since the account's sync token -> (events, new token)"""
+
+    @abstractmethod
+    async def push(self, account: CalendarioAccount, operazioni: List[ExportOperation]) -> List[Tuple[ExportOperation, Optional[str], Optional[str]]]:
+        """Send operations in batches; returns (operation, external_id, error)"""
+
+
+class GoogleCalendarProvider(CalendarProvider):
+    codice = PROVIDER_GOOGLE
+    id_field = "google_event_id"
+    batch_size = 50
+    scope = "https://www.googleapis.com/auth/calendar.events"
+
+    def authorize_url(self, state: str) -> str:
+        params = {
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+            "response_type": "code",
+            "scope": self.scope,
+            "access_type": "offline",
+            "prompt": "consent",
+            "state": state,
+        }
+        return f"{settings.GOOGLE_OAUTH_AUTH_URL}?{urlencode(params)}"
+
+    async def exchange_code(self, code: str) -> Tuple[str, Optional[str], datetime]:
+        return await self._token_request(settings.GOOGLE_OAUTH_TOKEN_URL, {
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        })
+
+    async def refresh_token(self, account: CalendarioAccount) -> Tuple[str, Optional[str], datetime]:
+        return await self._token_request(settings.GOOGLE_OAUTH_TOKEN_URL, {
+            "grant_type": "refresh_token",
+            "refresh_token": account.refresh_token,
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+        })
+
+    def _events_path(self, account: CalendarioAccount) -> str:
+        return f"/calendars/{account.calendar_id or 'primary'}/events"
+
+    async def fetch_changes(self, account: CalendarioAccount) -> Tuple[List[ProviderEvent], str]:
+        url = settings.GOOGLE_CALENDAR_API_URL + self._events_path(account)
+        base_params: Dict[str, Any] = {"maxResults": 250, "showDeleted": "true", "singleEvents": "true"}
+        if account.sync_token:
+            base_params["syncToken"] = account.sync_token
+        else:
+            base_params["timeMin"] = _iso_utc(datetime.utcnow() - timedelta(days=settings.CALENDAR_SYNC_WINDOW_DAYS))
+
+        eventi: List[ProviderEvent] = []
+        page_token = None
+        while True:
+            params = dict(base_params)
+            if page_token:
+                params["pageToken"] = page_token
+            response = await self.request("GET", url, params=params, headers=self._auth(account))
+            if response.status_code == 410:
+                raise SyncTokenExpired()
+            if response.status_code != 200:
+                raise SyncException("Lettura eventi Google fallita", detail=response.text[:500])
+
+            body = response.json()
+            eventi.extend(self._parse(item) for item in body.get("items", []))
+
+            page_token = body.get("nextPageToken")
+            if not page_token:
+                return eventi, body.get("nextSyncToken", account.sync_token)
+
+    def _parse(self, item: dict) -> ProviderEvent:
+        if item.get("status") == "cancelled":
+            return ProviderEvent(item["id"], cancellato=True)
+
+        def _data(campo: dict) -> Optional[datetime]:
+            if "dateTime" in campo:
+                return _to_utc_naive(campo["dateTime"])
+            if "date" in campo:
+                return datetime.fromisoformat(campo["date"])
+            return None
+
+        return ProviderEvent(
+            item["id"],
+            titolo=item.get("summary") or "(senza titolo)",
+            descrizione=item.get("description"),
+            luogo=item.get("location"),
+            data_inizio=_data(item.get("start", {})),
+            data_fine=_data(item.get("end", {})),
+        )
+
+    @staticmethod
+    def payload(evento: CalendarioEvento) -> dict:
+        return {
+            "summary": evento.titolo,
+            "description": evento.descrizione or "",
+            "location": evento.luogo or "",
+            "start": {"dateTime": _iso_utc(evento.data_inizio)},
+            "end": {"dateTime": _iso_utc(evento.data_fine)},
+        }
+
+    async def push(self, account, operazioni):
+        risultati = []
+        api_path = urlparse(settings.GOOGLE_CALENDAR_API_URL).path + self._events_path(account)
+
+        for start in range(0, len(operazioni), self.batch_size):
+            blocco = operazioni[start:start + self.batch_size]
+            boundary = f"batch_{uuid.uuid4().hex}"
+            parti = []
+            for idx, op in enumerate(blocco):
+                if op.metodo == "CREATE":
+                    linea = f"POST {api_path}"
+                elif op.metodo == "UPDATE":
+                    linea = f"PATCH {api_path}/{op.external_id}"
+                else:
+                    linea = f"DELETE {api_path}/{op.external_id}"
+                corpo = json.dumps(op.payload) if op.payload is not None else ""
+                parti.append(
+                    f"--{boundary}\r\n"
+                    "Content-Type: application/http\r\n"
+                    f"Content-ID: <item{idx}>\r\n\r\n"
+                    f"{linea} HTTP/1.1\r\n"
+                    "Content-Type: application/json\r\n\r\n"
+                    f"{corpo}\r\n"
+                )
+            body = "".join(parti) + f"--{boundary}--\r\n"
+
+            response = await self.request(
+                "POST",
+                settings.GOOGLE_CALENDAR_BATCH_URL,
+                content=body.encode("utf-8"),
+                headers={**self._auth(account), "Content-Type": f"multipart/mixed; boundary={boundary}"},
+            )
+            if response.status_code != 200:
+                risultati.extend((op, None, f"HTTP {response.status_code}") for op in blocco)
+                continue
+
+            esiti = self._parse_batch_response(response)
+            for idx, op in enumerate(blocco):
+                status_code, dati = esiti.get(idx, (0, None))
+                if op.metodo == "DELETE" and status_code in (204, 404, 410):
+                    risultati.append((op, None, None))
+                elif 200 <= status_code < 300 and dati:
+                    risultati.append((op, dati.get("id"), None))
+                else:
+                    risultati.append((op, None, f"HTTP {status_code}"))
+
+        return risultati
+
+    @staticmethod
+    def _parse_batch_response(response: httpx.Response) -> Dict[int, Tuple[int, Optional[dict]]]:
+        """Parse a multipart/mixed batch response into {item index: (status, json)}"""
+        content_type = response.headers.get("Content-Type", "")
+        boundary = content_type.split("boundary=")[-1].strip('"')
+        esiti: Dict[int, Tuple[int, Optional[dict]]] = {}
+
+        for parte in response.text.split(f"--{boundary}"):
+            if "Content-ID" not in parte:
+                continue
+            intestazione, _, http_part = parte.partition("\r\n\r\n")
+            content_id = next(
+                (riga.split(":", 1)[1].strip() for riga in intestazione.splitlines() if riga.lower().startswith("content-id")),
+                "",
+            )
+            try:
+                idx = int(content_id.strip("<>").split("item")[-1])
+            except ValueError:
+                continue
+
+            status_line, _, resto = http_part.partition("\r\n")
+            try:
+                status_code = int(status_line.split(" ")[1])
+            except (IndexError, ValueError):
+                continue
+            _, _, corpo = resto.partition("\r\n\r\n")
+            try:
+                dati = json.loads(corpo.strip()) if corpo.strip() else None
+            except ValueError:
+                dati = None
+            esiti[idx] = (status_code, dati)
+
+        return esiti
+
+
+class OutlookCalendarProvider(CalendarProvider):
+    codice = PROVIDER_OUTLOOK
+    id_field = "outlook_event_id"
+    batch_size = 20  # Limite Graph $batch
+    scope = "offline_access Calendars.ReadWrite"
+
+    @property
+    def _token_url(self) -> str:
+        return f"{settings.MICROSOFT_AUTHORITY_URL}/{settings.MICROSOFT_TENANT_ID or 'common'}/oauth2/v2.0/token"
+
+    def authorize_url(self, state: str) -> str:
+        params = {
+            "client_id": settings.MICROSOFT_CLIENT_ID,
+            "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
+            "response_type": "code",
+            "response_mode": "query",
+            "scope": self.scope,
+            "state": state,
+        }
+        tenant = settings.MICROSOFT_TENANT_ID or "common"
+        return f"{settings.MICROSOFT_AUTHORITY_URL}/{tenant}/oauth2/v2.0/authorize?{urlencode(params)}"
+
+    async def exchange_code(self, code: str) -> Tuple[str, Optional[str], datetime]:
+        return await self._token_request(self._token_url, {
+            "grant_type": "authorization_code",
+            "code": code,
+            "client_id": settings.MICROSOFT_CLIENT_ID,
+            "client_secret": settings.MICROSOFT_CLIENT_SECRET,
+            "redirect_uri": settings.MICROSOFT_REDIRECT_URI,
+            "scope": self.scope,
+        })
+
+    async def refresh_token(self, account: CalendarioAccount) -> Tuple[str, Optional[str], datetime]:
+        return await self._token_request(self._token_url, {
+            "grant_type": "refresh_token",
+            "refresh_token": account.refresh_token,
+            "client_id": settings.MICROSOFT_CLIENT_ID,
+            "client_secret": settings.MICROSOFT_CLIENT_SECRET,
+            "scope": self.scope,
+        })
+
+    async def fetch_changes(self, account: CalendarioAccount) -> Tuple[List[ProviderEvent], str]:
+        if account.sync_token:
+            url = account.sync_token  # deltaLink completo
+            params = None
+        else:
+            now = datetime.utcnow()
+            url = f"{settings.MICROSOFT_GRAPH_API_URL}/me/calendarView/delta"
+            params = {
+                "startDateTime": _iso_utc(now - timedelta(days=settings.CALENDAR_SYNC_WINDOW_DAYS)),
+                "endDateTime": _iso_utc(now + timedelta(days=settings.CALENDAR_SYNC_WINDOW_DAYS)),
+            }
+
+        headers = {
+            **self._auth(account),
+            "Prefer": 'odata.maxpagesize=100, outlook.timezone="UTC"',
+        }
+
+        eventi: List[ProviderEvent] = []
+        while True:
+            response = await self.request("GET", url, params=params, headers=headers)
+            if response.status_code == 410:
+                raise SyncTokenExpired()
+            if response.status_code != 200:
+                raise SyncException("Lettura eventi Outlook fallita", detail=response.text[:500])
+
+            body = response.json()
+            eventi.extend(self._parse(item) for item in body.get("value", []))
+
+            if "@odata.nextLink" in body:
+                url, params = body["@odata.nextLink"], None
+                continue
+            return eventi, body.get("@odata.deltaLink", account.sync_token)
+
+    def _parse(self, item: dict) -> ProviderEvent:
+        if "@removed" in item or item.get("isCancelled"):
+            return ProviderEvent(item["id"], cancellato=True)
+
+        def _data(campo: Optional[dict]) -> Optional[datetime]:
+            return _to_utc_naive(campo["dateTime"]) if campo and campo.get("dateTime") else None
+
+        return ProviderEvent(
+            item["id"],
+            titolo=item.get("subject") or "(senza titolo)",
+            descrizione=item.get("bodyPreview"),
+            luogo=(item.get("location") or {}).get("displayName"),
+            data_inizio=_data(item.get("start")),
+            data_fine=_data(item.get("end")),
+        )
+
+    @staticmethod
+    def payload(evento: CalendarioEvento) -> dict:
+        return {
+            "subject": evento.titolo,
+            "body": {"contentType": "text", "content": evento.descrizione or ""},
+            "location": {"displayName": evento.luogo or ""},
+            "start": {"dateTime": evento.data_inizio.isoformat(), "timeZone": "UTC"},
+            "end": {"dateTime": evento.data_fine.isoformat(), "timeZone": "UTC"},
+        }
+
+    async def push(self, account, operazioni):
+        risultati = []
+
+        for start in range(0, len(operazioni), self.batch_size):
+            blocco = operazioni[start:start + self.batch_size]
+            richieste = []
+            for idx, op in enumerate(blocco):
+                richiesta: Dict[str, Any] = {"id": str(idx)}
+                if op.metodo == "CREATE":
+                    richiesta.update(method="POST", url="/me/events")
+                elif op.metodo == "UPDATE":
+                    richiesta.update(method="PATCH", url=f"/me/events/{op.external_id}")
+                else:
+                    richiesta.update(method="DELETE", url=f"/me/events/{op.external_id}")
+                if op.payload is not None:
+                    richiesta["body"] = op.payload
+                    richiesta["headers"] = {"Content-Type": "application/json"}
+                richieste.append(richiesta)
+
+            response = await self.request(
+                "POST",
+                f"{settings.MICROSOFT_GRAPH_API_URL}/$batch",
+                json={"requests": richieste},
+                headers=self._auth(account),
+            )
+            if response.status_code != 200:
+                risultati.extend((op, None, f"HTTP {response.status_code}") for op in blocco)
+                continue
+
+            esiti = {int(r["id"]): r for r in response.json().get("responses", [])}
+            for idx, op in enumerate(blocco):
+                esito = esiti.get(idx, {})
+                status_code = esito.get("status", 0)
+                if op.metodo == "DELETE" and status_code in (204, 404):
+                    risultati.append((op, None, None))
+                elif 200 <= status_code < 300:
+                    risultati.append((op, (esito.get("body") or {}).get("id"), None))
+                else:
+                    risultati.append((op, None, f"HTTP {status_code}"))
+
+        return risultati
+
+
+PROVIDERS = {
+    PROVIDER_GOOGLE: GoogleCalendarProvider,
+    PROVIDER_OUTLOOK: OutlookCalendarProvider,
+}
+
+
+class CalendarSyncEngine:
+    """Esegue la sincronizzazione bidirezionale per uno o più account"""
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.limiters = {
+            codice: RateLimiter(settings.CALENDAR_SYNC_RATE_PER_SECOND) for codice in PROVIDERS
+        }
+
+    def provider(self, codice: str, client: httpx.AsyncClient) -> CalendarProvider:
+        if codice not in PROVIDERS:
+            raise SyncException(f"Provider calendario non supportato: {codice}")
+        return PROVIDERS[codice](client, self.limiters[codice])
+
+    async def sync_all(self, tecnico_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Sync every connected account (optionally for one technician) concurrently"""
+        db = self.session_factory()
+        try:
+            query = db.query(CalendarioAccount.id).filter(CalendarioAccount.attivo == True)
+            if tecnico_id:
+                query = query.filter(CalendarioAccount.tecnico_id == tecnico_id)
+            account_ids = [row.id for row in query.all()]
+        finally:
+            db.close()
+
+        semaforo = asyncio.Semaphore(settings.CALENDAR_SYNC_CONCURRENCY)
+
+        async with httpx.AsyncClient(timeout=30.0) as client:
+
+            async def _run(account_id: int) -> Dict[str, Any]:
+                async with semaforo:
+                    return await self.sync_account(account_id, client)
+
+            return await asyncio.gather(*[_run(account_id) for account_id in account_ids])
+
+    async def sync_account(self, account_id: int, client: httpx.AsyncClient) -> Dict[str, Any]:
+        """Import provider changes, then export local changes, for one account"""
+        db = self.session_factory()
+        inizio = datetime.utcnow()
+        risultato: Dict[str, Any] = {"account_id": account_id, "importati": 0, "esportati": 0, "errori": 0}
+
+        try:
+            account = db.query(CalendarioAccount).filter(CalendarioAccount.id == account_id).first()
+            risultato.update(tecnico_id=account.tecnico_id, provider=account.provider)
+            provider = self.provider(account.provider, client)
+
+            if not account.token_scadenza or account.token_scadenza <= datetime.utcnow():
+                access_token, refresh_token, scadenza = await provider.refresh_token(account)
+                account.access_token = access_token
+                account.refresh_token = refresh_token or account.refresh_token
+                account.token_scadenza = scadenza
+                db.commit()
+
+            # IMPORT
+            try:
+                eventi, sync_token = await provider.fetch_changes(account)
+            except SyncTokenExpired:
+                logger.info(f"Sync token scaduto per account {account_id}, risincronizzazione completa")
+                account.sync_token = None
+                eventi, sync_token = await provider.fetch_changes(account)
+
+            conteggi_import, toccati = await asyncio.to_thread(
+                self._apply_import, db, account, provider.id_field, eventi
+            )
+            account.sync_token = sync_token
+            account.ultimo_sync = inizio
+            self._log(db, account, "IMPORT", conteggi_import)
+            db.commit()
+
+            # EXPORT: il riferimento è preso dopo il commit dell'import, così le
+            # modifiche appena importate non vengono rimandate al provider
+            riferimento_export = datetime.utcnow()
+            operazioni = await asyncio.to_thread(self._collect_export, db, account, provider, toccati)
+            esiti = await provider.push(account, operazioni) if operazioni else []
+            conteggi_export, falliti = await asyncio.to_thread(
+                self._apply_export_results, db, provider.id_field, esiti
+            )
+            # Il riferimento avanza comunque: gli eventi non inviati restano in
+            # export_in_sospeso e vengono ritentati anche se non più modificati
+            account.ultimo_export = riferimento_export
+            account.export_in_sospeso = json.dumps(sorted(falliti)) if falliti else None
+            self._log(db, account, "EXPORT", conteggi_export)
+            db.commit()
+
+            risultato["importati"] = conteggi_import["creati"] + conteggi_import["aggiornati"] + conteggi_import["eliminati"]
+            risultato["esportati"] = conteggi_export["inviati"]
+            risultato["errori"] = conteggi_export["errori"]
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Sincronizzazione calendario account {account_id} fallita: {e}", exc_info=True)
+            risultato["errori"] += 1
+            risultato["errore"] = str(e)
+            account = db.query(CalendarioAccount).filter(CalendarioAccount.id == account_id).first()
+            if account:
+                db.add(CalendarioSyncLog(
+                    tecnico_id=account.tecnico_id,
+                    provider=account.provider,
+                    direzione="IMPORT",
+                    eventi_sincronizzati=0,
+                    eventi_errori=1,
+                    errore=str(e)[:2000],
+                ))
+                db.commit()
+        finally:
+            db.close()
+
+        return risultato
+
+    @staticmethod
+    def _apply_import(
+        db: Session,
+        account: CalendarioAccount,
+        id_field: str,
+        eventi: List[ProviderEvent],
+    ) -> Tuple[Dict[str, int], Set[int]]:
+        """
+        Upsert provider changes into calendario_eventi with one lookup query.
+
+        Local changes not exported yet win over the provider version: the
+        delta also returns the events this engine just pushed, and applying
+        that echo would undo edits made in the meantime. Provider deletions
+        are always applied.
+        """
+        conteggi = {"creati": 0, "aggiornati": 0, "eliminati": 0, "ignorati": 0, "conflitti": 0}
+        toccati: Set[int] = set()
+        if not eventi:
+            return conteggi, toccati
+        in_sospeso = set(json.loads(account.export_in_sospeso)) if account.export_in_sospeso else set()
+
+        colonna = getattr(CalendarioEvento, id_field)
+        esistenti = {
+            getattr(e, id_field): e
+            for e in db.query(CalendarioEvento).filter(colonna.in_([ev.external_id for ev in eventi])).all()
+        }
+
+        for ev in eventi:
+            locale = esistenti.get(ev.external_id)
+
+            if ev.cancellato:
+                if locale is not None and locale.attivo:
+                    locale.attivo = False
+                    toccati.add(locale.id)
+                    conteggi["eliminati"] += 1
+                continue
+
+            if ev.data_inizio is None or ev.data_fine is None:
+                conteggi["ignorati"] += 1
+                continue
+
+            valori = {
+                "titolo": ev.titolo[:200],
+                "descrizione": ev.descrizione,
+                "luogo": (ev.luogo or "")[:255] or None,
+                "data_inizio": ev.data_inizio,
+                "data_fine": ev.data_fine,
+            }
+
+            if locale is None:
+                locale = CalendarioEvento(
+                    tecnico_principale_id=account.tecnico_id,
+                    stato="PIANIFICATO",
+                    **valori,
+                    **{id_field: ev.external_id},
+                )
+                db.add(locale)
+                esistenti[ev.external_id] = locale
+                conteggi["creati"] += 1
+                continue
+
+            if locale.id in in_sospeso or (account.ultimo_export and locale.updated_at > account.ultimo_export):
+                conteggi["conflitti"] += 1
+                continue
+
+            # Solo campi realmente cambiati: evita di ri-esportare l'eco dell'ultimo export
+            modificato = False
+            for campo, valore in valori.items():
+                if getattr(locale, campo) != valore:
+                    setattr(locale, campo, valore)
+                    modificato = True
+            if not locale.attivo:
+                locale.attivo = True
+                modificato = True
+            if modificato:
+                toccati.add(locale.id)
+                conteggi["aggiornati"] += 1
+
+        nuovi = list(db.new)
+        db.flush()
+        toccati.update(e.id for e in nuovi if isinstance(e, CalendarioEvento))
+        return conteggi, toccati
+
+    @staticmethod
+    def _collect_export(
+        db: Session,
+        account: CalendarioAccount,
+        provider: CalendarProvider,
+        escludi: Set[int],
+    ) -> List[ExportOperation]:
+        """Local events of the technician changed since the last export, plus failed ones"""
+        colonna = getattr(CalendarioEvento, provider.id_field)
+        query = db.query(CalendarioEvento).filter(CalendarioEvento.tecnico_principale_id == account.tecnico_id)
+        if account.ultimo_export:
+            filtro = CalendarioEvento.updated_at > account.ultimo_export
+        else:
+            filtro = and_(CalendarioEvento.attivo == True, colonna.is_(None))
+        da_riprovare = json.loads(account.export_in_sospeso) if account.export_in_sospeso else []
+        if da_riprovare:
+            filtro = or_(filtro, CalendarioEvento.id.in_(da_riprovare))
+        query = query.filter(filtro)
+
+        operazioni = []
+        for evento in query.all():
+            if evento.id in escludi:
+                continue
+            external_id = getattr(evento, provider.id_field)
+            if not evento.attivo:
+                if external_id:
+                    operazioni.append(ExportOperation(evento.id, "DELETE", external_id, None))
+                continue
+            operazioni.append(ExportOperation(
+                evento.id,
+                "UPDATE" if external_id else "CREATE",
+                external_id,
+                provider.payload(evento),
+            ))
+        return operazioni
+
+    @staticmethod
+    def _apply_export_results(
+        db: Session,
+        id_field: str,
+        esiti: List[Tuple[ExportOperation, Optional[str], Optional[str]]],
+    ) -> Tuple[Dict[str, int], Set[int]]:
+        """Store provider ids of created events; returns counts and ids of failed events"""
+        conteggi = {"inviati": 0, "errori": 0}
+        falliti: Set[int] = set()
+        creati = {op.evento_id: external_id for op, external_id, errore in esiti
+                  if errore is None and op.metodo == "CREATE" and external_id}
+
+        if creati:
+            # UPDATE Core con updated_at invariato: con l'onupdate dell'ORM gli
+            # eventi appena creati risulterebbero modificati dopo riferimento_export
+            # e verrebbero rimandati come UPDATE al sync successivo
+            tabella = CalendarioEvento.__table__
+            db.execute(
+                update(tabella)
+                .where(tabella.c.id == bindparam("b_id"))
+                .values({id_field: bindparam("b_external_id"), "updated_at": tabella.c.updated_at}),
+                [{"b_id": evento_id, "b_external_id": external_id} for evento_id, external_id in creati.items()],
+            )
+
+        for op, _, errore in esiti:
+            if errore is None:
+                conteggi["inviati"] += 1
+            else:
+                conteggi["errori"] += 1
+                falliti.add(op.evento_id)
+        return conteggi, falliti
+
+    @staticmethod
+    def _log(db: Session, account: CalendarioAccount, direzione: str, conteggi: Dict[str, int]) -> None:
+        errori = conteggi.get("errori", 0)
+        db.add(CalendarioSyncLog(
+            tecnico_id=account.tecnico_id,
+            provider=account.provider,
+            direzione=direzione,
+            eventi_sincronizzati=sum(v for k, v in conteggi.items() if k not in ("errori", "ignorati", "conflitti")),
+            eventi_errori=errori,
+            dettagli=json.dumps(conteggi),
+        ))
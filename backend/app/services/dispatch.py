@@ -0,0 +1,155 @@
+"""
+Coda dispatch in memoria delle richieste di intervento pendenti.
+
+Le richieste sono ordinate per livello di priorità, scadenza SLA del ticket
+collegato e attesa (data richiesta più vecchia prima). La coda viene caricata
+una volta e poi aggiornata per singola richiesta quando arriva un evento di
+modifica (anche da altri worker via Redis); una ricarica completa avviene
+comunque dopo DISPATCH_QUEUE_MAX_AGE_SECONDS.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.core import events
+from app.core.config import settings
+from app.core.events import event_broker
+
+RankKey = Tuple[int, datetime, datetime, int]
+
+
+def rank_key(entry: Dict[str, Any]) -> RankKey:
+    """Sort key: priority level (1 = critical), SLA deadline, request date"""
+    return (
+        entry["priorita_livello"],
+        entry["sla_scadenza"] or datetime.max,
+        entry["data_richiesta"],
+        entry["id"],
+    )
+
+
+class DispatchQueue:
+    """Lista ordinata per rank delle richieste pendenti, con refresh incrementale"""
+
+    def __init__(self, max_age_seconds: int):
+        self.max_age_seconds = max_age_seconds
+        self._ordine: List[Tuple[RankKey, int]] = []
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._per_ticket: Dict[int, Set[int]] = {}
+        self._stale_ids: Set[int] = set()
+        self._stale_tickets: Set[int] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, richiesta_id: Optional[int] = None, ticket_id: Optional[int] = None) -> None:
+        """Mark one request / the requests of a ticket stale, or everything"""
+        with self._lock:
+            if richiesta_id is None and ticket_id is None:
+                self._loaded_at = None
+                return
+            if richiesta_id is not None:
+                self._stale_ids.add(richiesta_id)
+            if ticket_id is not None:
+                self._stale_tickets.add(ticket_id)
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Event broker listener"""
+        if event["tipo"] == events.DISPATCH_UPDATED:
+            self.invalidate(richiesta_id=event.get("richiesta_id"))
+        elif event["tipo"].startswith("ticket.") and event.get("ticket_id"):
+            # Priorità / SLA del ticket influenzano il rank delle sue richieste
+            self.invalidate(ticket_id=event["ticket_id"])
+
+    def _remove(self, richiesta_id: int) -> None:
+        entry = self._entries.pop(richiesta_id, None)
+        if entry is None:
+            return
+        posizione = bisect.bisect_left(self._ordine, (rank_key(entry), richiesta_id))
+        if posizione < len(self._ordine) and self._ordine[posizione][1] == richiesta_id:
+            del self._ordine[posizione]
+        if entry["ticket_id"] is not None:
+            self._per_ticket.get(entry["ticket_id"], set()).discard(richiesta_id)
+
+    def _insert(self, entry: Dict[str, Any]) -> None:
+        self._entries[entry["id"]] = entry
+        bisect.insort(self._ordine, (rank_key(entry), entry["id"]))
+        if entry["ticket_id"] is not None:
+            self._per_ticket.setdefault(entry["ticket_id"], set()).add(entry["id"])
+
+    def refresh(self, loader: Callable[[Optional[List[int]]], List[Dict[str, Any]]]) -> None:
+        """
+        Bring the queue up to date. `loader(ids)` returns pending requests
+        (all when ids is None); only stale entries are reloaded when possible.
+        """
+        with self._lock:
+            scaduta = self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age_seconds
+
+            if scaduta:
+                self._entries.clear()
+                self._ordine.clear()
+                self._per_ticket.clear()
+                self._stale_ids.clear()
+                self._stale_tickets.clear()
+                for entry in loader(None):
+                    self._insert(entry)
+                self._loaded_at = time.monotonic()
+                return
+
+            if not self._stale_ids and not self._stale_tickets:
+                return
+
+            ids = set(self._stale_ids)
+            for ticket_id in self._stale_tickets:
+                ids.update(self._per_ticket.get(ticket_id, ()))
+            self._stale_ids.clear()
+            self._stale_tickets.clear()
+            if not ids:
+                return
+
+            for richiesta_id in ids:
+                self._remove(richiesta_id)
+            # Le richieste non più pendenti non vengono restituite dal loader
+            for entry in loader(sorted(ids)):
+                self._insert(entry)
+
+    def top(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        cliente_id: Optional[int] = None,
+        tecnico_id: Optional[int] = None,
+        priorita_id: Optional[int] = None,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """Ranked pending requests (total matching, page) with queue position"""
+        filtri = cliente_id is not None or tecnico_id is not None or priorita_id is not None
+
+        with self._lock:
+            selezionate = []
+            totale = 0
+            for posizione, (_, richiesta_id) in enumerate(self._ordine, start=1):
+                entry = self._entries[richiesta_id]
+                if filtri and not (
+                    (cliente_id is None or entry["cliente_id"] == cliente_id)
+                    and (tecnico_id is None or entry["tecnico_richiesto_id"] == tecnico_id)
+                    and (priorita_id is None or entry["priorita_id"] == priorita_id)
+                ):
+                    continue
+                totale += 1
+                if offset < totale <= offset + limit:
+                    selezionate.append({**entry, "posizione": posizione})
+                elif totale > offset + limit and not filtri:
+                    totale = len(self._ordine)
+                    break
+
+        now = datetime.utcnow()
+        for entry in selezionate:
+            entry["minuti_attesa"] = max(0, int((now - entry["data_richiesta"]).total_seconds() // 60))
+            entry["sla_scaduta"] = entry["sla_scadenza"] is not None and entry["sla_scadenza"] < now
+
+        return totale, selezionate
+
+
+dispatch_queue = DispatchQueue(settings.DISPATCH_QUEUE_MAX_AGE_SECONDS)
+event_broker.add_listener(dispatch_queue.on_event)
@@ -0,0 +1,158 @@
+"""
+Indice spaziale in memoria dell'ultima posizione nota dei tecnici.
+
+Le posizioni arrivano dalla geolocalizzazione delle sessioni di lavoro e sono
+distribuite in celle di una griglia lat/lon; la ricerca dei k più vicini
+esplora le celle ad anelli crescenti attorno al punto richiesto. L'indice si
+carica dal database al primo utilizzo e viene aggiornato dagli eventi
+technician.position (anche quelli pubblicati da altri worker).
+"""
+import math
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core import events
+from app.core.config import settings
+from app.core.events import event_broker
+
+RAGGIO_TERRA_KM = 6371.0
+# Km per grado di latitudine (circa costante)
+KM_PER_GRADO = 111.2
+
+
+def distanza_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * RAGGIO_TERRA_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class TechnicianLocator:
+    """Griglia di celle (cella_gradi x cella_gradi) con le posizioni dei tecnici"""
+
+    def __init__(self, cella_gradi: float):
+        self.cella_gradi = cella_gradi
+        self._posizioni: Dict[int, Tuple[float, float, datetime]] = {}
+        self._celle: Dict[Tuple[int, int], Set[int]] = {}
+        self._caricato = False
+        self._lock = threading.Lock()
+
+    def _cella(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cella_gradi)), int(math.floor(lon / self.cella_gradi))
+
+    def _set(self, tecnico_id: int, lat: float, lon: float, rilevata_at: datetime) -> None:
+        attuale = self._posizioni.get(tecnico_id)
+        if attuale is not None:
+            if attuale[2] > rilevata_at:
+                return  # Posizione più vecchia di quella nota
+            self._celle.get(self._cella(attuale[0], attuale[1]), set()).discard(tecnico_id)
+        self._posizioni[tecnico_id] = (lat, lon, rilevata_at)
+        self._celle.setdefault(self._cella(lat, lon), set()).add(tecnico_id)
+
+    def update(self, tecnico_id: int, lat: float, lon: float, rilevata_at: datetime) -> None:
+        """Record a technician position if newer than the known one"""
+        with self._lock:
+            self._set(tecnico_id, lat, lon, rilevata_at)
+
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Event broker listener"""
+        if event["tipo"] != events.TECHNICIAN_POSITION:
+            return
+        self.update(
+            event["tecnico_id"],
+            float(event["latitudine"]),
+            float(event["longitudine"]),
+            datetime.fromisoformat(event["rilevata_at"]),
+        )
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Tuple[int, float, float, datetime]]]) -> None:
+        """Load last positions from the database on first use"""
+        with self._lock:
+            if self._caricato:
+                return
+            for tecnico_id, lat, lon, rilevata_at in loader():
+                self._set(tecnico_id, lat, lon, rilevata_at)
+            self._caricato = True
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        escludi: Optional[Set[int]] = None,
+        max_distanza_km: Optional[float] = None,
+        rilevata_dopo: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        k nearest technicians to (lat, lon). Cells are visited in rings of
+        growing radius; the search stops once the k-th distance found is
+        shorter than the distance any unvisited ring could have.
+        """
+        escludi = escludi or set()
+        centro_lat, centro_lon = self._cella(lat, lon)
+        # Lato minimo (km) di una cella: in longitudine si restringe con la latitudine
+        coseno = math.cos(math.radians(min(abs(lat) + self.cella_gradi, 89.0)))
+        cella_km = self.cella_gradi * KM_PER_GRADO * max(coseno, 0.01)
+
+        with self._lock:
+            if not self._posizioni:
+                return []
+            candidati: List[Tuple[float, int]] = []
+            visti = 0
+            anello = 0
+            max_anelli = int(180 / self.cella_gradi)
+
+            while anello <= max_anelli:
+                for cella in self._anello(centro_lat, centro_lon, anello):
+                    for tecnico_id in self._celle.get(cella, ()):
+                        visti += 1
+                        if tecnico_id in escludi:
+                            continue
+                        t_lat, t_lon, rilevata_at = self._posizioni[tecnico_id]
+                        if rilevata_dopo is not None and rilevata_at < rilevata_dopo:
+                            continue
+                        candidati.append((distanza_km(lat, lon, t_lat, t_lon), tecnico_id))
+
+                # Qualsiasi punto oltre l'anello corrente dista almeno anello * cella_km
+                limite = anello * cella_km
+                if max_distanza_km is not None and limite > max_distanza_km:
+                    break
+                if len(candidati) >= k and sorted(candidati)[k - 1][0] <= limite:
+                    break
+                if visti >= len(self._posizioni):
+                    break
+                anello += 1
+
+            risultato = []
+            for distanza, tecnico_id in sorted(candidati)[:k]:
+                if max_distanza_km is not None and distanza > max_distanza_km:
+                    break
+                t_lat, t_lon, rilevata_at = self._posizioni[tecnico_id]
+                risultato.append({
+                    "tecnico_id": tecnico_id,
+                    "distanza_km": round(distanza, 2),
+                    "latitudine": t_lat,
+                    "longitudine": t_lon,
+                    "posizione_rilevata_at": rilevata_at,
+                })
+            return risultato
+
+    @staticmethod
+    def _anello(centro_lat: int, centro_lon: int, raggio: int) -> Iterable[Tuple[int, int]]:
+        """Cells on the border of the square of side 2*raggio+1"""
+        if raggio == 0:
+            yield centro_lat, centro_lon
+            return
+        for d in range(-raggio, raggio + 1):
+            yield centro_lat - raggio, centro_lon + d
+            yield centro_lat + raggio, centro_lon + d
+        for d in range(-raggio + 1, raggio):
+            yield centro_lat + d, centro_lon - raggio
+            yield centro_lat + d, centro_lon + raggio
+
+
+technician_locator = TechnicianLocator(settings.LOCATOR_CELL_DEGREES)
+event_broker.add_listener(technician_locator.on_event)
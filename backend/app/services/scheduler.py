@@ -0,0 +1,266 @@
+"""
+Ottimizzatore di pianificazione delle richieste di intervento pendenti.
+
+Assegna ogni richiesta ad un (tecnico, giorno, orario) libero minimizzando i
+km percorsi, con una penalità per ogni giorno di ritardo proporzionale alla
+priorità. Euristica di inserimento a costo minimo: le richieste vengono
+considerate in ordine di rank e per ognuna il costo marginale su tutte le
+coppie tecnico/giorno è calcolato in un'unica operazione vettoriale NumPy.
+"""
+import time as timer
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.repositories.calendar import CalendarRepository
+from app.repositories.dispatch import DispatchRepository
+from app.services.dispatch import rank_key
+
+RAGGIO_TERRA_KM = 6371.0
+# Fattore strada/linea d'aria per stimare i km reali dalla distanza geodetica
+FATTORE_STRADA = 1.3
+# Costo (in km equivalenti) di una richiesta pianificata dopo la scadenza SLA
+PENALITA_SLA_KM = 500.0
+
+
+def haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km (broadcasting, NaN where a position is unknown)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAGGIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ScheduleOptimizer:
+    """Costruisce le matrici di costo e risolve l'assegnazione"""
+
+    def __init__(
+        self,
+        richieste: List[Dict[str, Any]],
+        tecnico_ids: List[int],
+        giorni: List[date],
+        slot_liberi: Dict[Tuple[int, date], List[List[datetime]]],
+        posizioni_clienti: Dict[int, Tuple[float, float]],
+        basi_tecnici: Dict[int, Tuple[float, float]],
+        storico_viaggi: List[Tuple[int, int, float, float]],
+        tipi_con_viaggio: Dict[int, bool],
+        durate_medie: Dict[int, float],
+    ):
+        self.richieste = sorted(richieste, key=rank_key)
+        self.tecnico_ids = tecnico_ids
+        self.giorni = giorni
+        self.slot_liberi = slot_liberi
+        self.durate_medie = durate_medie
+
+        n_r, n_t = len(self.richieste), len(tecnico_ids)
+        t_index = {t: i for i, t in enumerate(tecnico_ids)}
+
+        # Posizioni (NaN = sconosciuta)
+        self.req_lat = np.full(n_r, np.nan)
+        self.req_lon = np.full(n_r, np.nan)
+        for i, r in enumerate(self.richieste):
+            if r["cliente_id"] in posizioni_clienti:
+                self.req_lat[i], self.req_lon[i] = posizioni_clienti[r["cliente_id"]]
+
+        tec_lat = np.full(n_t, np.nan)
+        tec_lon = np.full(n_t, np.nan)
+        for t, (lat, lon) in basi_tecnici.items():
+            if t in t_index:
+                tec_lat[t_index[t]], tec_lon[t_index[t]] = lat, lon
+
+        # Storico: km medi per (tecnico, cliente), per cliente e globali
+        r_per_cliente: Dict[int, List[int]] = {}
+        for i, r in enumerate(self.richieste):
+            r_per_cliente.setdefault(r["cliente_id"], []).append(i)
+
+        storico = np.full((n_t, n_r), np.nan)
+        storico_minuti = np.full((n_t, n_r), np.nan)
+        somma_cliente: Dict[int, List[float]] = {}
+        for tecnico_id, cliente_id, km, minuti in storico_viaggi:
+            somma_cliente.setdefault(cliente_id, []).append(km)
+            if tecnico_id in t_index and cliente_id in r_per_cliente:
+                storico[t_index[tecnico_id], r_per_cliente[cliente_id]] = km
+                if minuti > 0:
+                    storico_minuti[t_index[tecnico_id], r_per_cliente[cliente_id]] = minuti
+
+        tutti_km = [km for valori in somma_cliente.values() for km in valori]
+        km_globale = float(np.mean(tutti_km)) if tutti_km else settings.SCHEDULER_KM_DEFAULT
+        self.km_cliente = np.array([
+            float(np.mean(somma_cliente[r["cliente_id"]])) if r["cliente_id"] in somma_cliente else km_globale
+            for r in self.richieste
+        ])
+
+        # Matrice base tecnico -> richiesta: geodetica se note entrambe le
+        # posizioni, altrimenti storico della coppia, poi media del cliente
+        geo = haversine_km(tec_lat[:, None], tec_lon[:, None], self.req_lat[None, :], self.req_lon[None, :])
+        base = np.where(np.isnan(geo), storico, geo * FATTORE_STRADA)
+        base = np.where(np.isnan(base), self.km_cliente[None, :], base)
+
+        # Matrice richiesta -> richiesta (giri con più tappe nello stesso giorno)
+        tra = haversine_km(
+            self.req_lat[:, None], self.req_lon[:, None], self.req_lat[None, :], self.req_lon[None, :]
+        ) * FATTORE_STRADA
+        tra = np.where(np.isnan(tra), self.km_cliente[None, :], tra)
+
+        # Interventi senza trasferta (remoto, laboratorio): nessun costo di viaggio
+        self.viaggio = np.array([
+            tipi_con_viaggio.get(r["tipo_intervento_id"], True) for r in self.richieste
+        ], dtype=bool)
+        self.costo_base = base * self.viaggio[None, :]
+        self.costo_tra = tra * self.viaggio[None, :]
+        # Tempo di viaggio reale della coppia tecnico/cliente (traffico, parcheggio),
+        # NaN se assente: per la prima tappa sostituisce la stima da km e velocità
+        self.minuti_base = np.where(self.viaggio[None, :], storico_minuti, 0.0)
+
+        self.durate = np.array([
+            durate_medie.get(r["tipo_intervento_id"], settings.SCHEDULER_DURATA_DEFAULT_MINUTI)
+            for r in self.richieste
+        ])
+        self.req_tecnico = np.array([
+            t_index.get(r["tecnico_richiesto_id"], -1) for r in self.richieste
+        ])
+
+    def solve(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (assignments, unassigned requests)"""
+        n_t, n_d = len(self.tecnico_ids), len(self.giorni)
+        assegnazioni: List[Dict[str, Any]] = []
+        non_assegnate: List[Dict[str, Any]] = []
+        if n_t == 0 or n_d == 0:
+            return assegnazioni, [{"richiesta_id": r["id"], "motivo": "Nessun tecnico o giorno disponibile"}
+                                  for r in self.richieste]
+
+        # Slot liberi per (tecnico, giorno) in ordine cronologico e durata massima disponibile
+        slot = [[
+            [list(s) for s in sorted(self.slot_liberi.get((t, g), []))]
+            for g in self.giorni
+        ] for t in self.tecnico_ids]
+        max_libero = np.array([[
+            max(((s[1] - s[0]).total_seconds() / 60 for s in slot[ti][di]), default=0.0)
+            for di in range(n_d)
+        ] for ti in range(n_t)])
+
+        # Ultima tappa per (tecnico, giorno): -1 = partenza dalla base
+        ultima = np.full((n_t, n_d), -1, dtype=int)
+        indice_giorno = np.arange(n_d)
+
+        for r_idx, richiesta in enumerate(self.richieste):
+            # Costo marginale in km dalla tappa precedente, per ogni (tecnico, giorno)
+            precedente = np.clip(ultima, 0, None)
+            km = np.where(ultima < 0, self.costo_base[:, r_idx][:, None], self.costo_tra[precedente, r_idx])
+            viaggio_min = km / settings.SCHEDULER_VELOCITA_MEDIA_KMH * 60
+            minuti_storici = self.minuti_base[:, r_idx][:, None]
+            viaggio_min = np.where((ultima < 0) & ~np.isnan(minuti_storici), minuti_storici, viaggio_min)
+            necessario = self.durate[r_idx] + viaggio_min
+
+            costo = km.copy()
+            # Ritardo: le priorità alte (livello basso) pesano di più
+            peso_priorita = 6 - richiesta["priorita_livello"]
+            costo += indice_giorno[None, :] * settings.SCHEDULER_KM_PER_GIORNO_RITARDO * peso_priorita
+            if richiesta["sla_scadenza"] is not None:
+                oltre_sla = np.array([g > richiesta["sla_scadenza"].date() for g in self.giorni])
+                costo += oltre_sla[None, :] * PENALITA_SLA_KM
+            if richiesta["data_preferita"] is not None:
+                prima = np.array([g < richiesta["data_preferita"].date() for g in self.giorni])
+                costo += prima[None, :] * settings.SCHEDULER_KM_PER_GIORNO_RITARDO
+            if self.req_tecnico[r_idx] >= 0:
+                altro = np.ones(n_t, dtype=bool)
+                altro[self.req_tecnico[r_idx]] = False
+                costo += altro[:, None] * settings.SCHEDULER_PENALITA_ALTRO_TECNICO_KM
+
+            costo = np.where(max_libero >= necessario, costo, np.inf)
+            migliore = int(np.argmin(costo))
+            ti, di = divmod(migliore, n_d)
+            if not np.isfinite(costo[ti, di]):
+                non_assegnate.append({"richiesta_id": richiesta["id"], "motivo": "Nessuno slot libero sufficiente"})
+                continue
+
+            # Primo slot in cui entrano viaggio + lavoro. Il viaggio è calcolato
+            # dalla tappa precedente del giro: la nuova tappa va dopo di essa, per
+            # cui gli slot precedenti a quello usato non sono più disponibili
+            minuti_viaggio = float(viaggio_min[ti, di])
+            for k, s in enumerate(slot[ti][di]):
+                if (s[1] - s[0]).total_seconds() / 60 >= necessario[ti, di]:
+                    inizio = s[0] + timedelta(minutes=minuti_viaggio)
+                    fine = inizio + timedelta(minutes=float(self.durate[r_idx]))
+                    s[0] = fine
+                    del slot[ti][di][:k]
+                    break
+            max_libero[ti, di] = max(((s[1] - s[0]).total_seconds() / 60 for s in slot[ti][di]), default=0.0)
+            ultima[ti, di] = r_idx
+
+            assegnazioni.append({
+                "richiesta_id": richiesta["id"],
+                "tecnico_id": self.tecnico_ids[ti],
+                "data_inizio": inizio.replace(second=0, microsecond=0),
+                "data_fine": fine.replace(second=0, microsecond=0),
+                "km_stimati": round(float(km[ti, di]), 1),
+                "minuti_viaggio": int(round(minuti_viaggio)),
+            })
+
+        return assegnazioni, non_assegnate
+
+
+def pianifica_richieste(
+    db: Session,
+    data_from: date,
+    data_to: date,
+    reparto_id: Optional[int] = None,
+    salva_bozze: bool = True,
+) -> Dict[str, Any]:
+    """
+    Plan all pending requests over the period. Drafts of a previous run are
+    replaced; with salva_bozze=False the run is a simulation (rolled back).
+    """
+    avvio = timer.perf_counter()
+    repo = DispatchRepository(db)
+    inizio = datetime.combine(data_from, datetime.min.time())
+    fine = datetime.combine(data_to + timedelta(days=1), datetime.min.time())
+
+    # Le bozze precedenti non devono occupare gli slot
+    repo.clear_bozze(inizio, fine)
+    db.flush()
+
+    richieste = repo.load_pending()
+    disponibilita = CalendarRepository(db).get_availability(inizio, fine, reparto_id=reparto_id)
+    tecnico_ids = [d["tecnico_id"] for d in disponibilita]
+    giorni = sorted({s["inizio"].date() for d in disponibilita for s in d["libero"]})
+
+    slot_liberi: Dict[Tuple[int, date], List[List[datetime]]] = {}
+    for d in disponibilita:
+        for s in d["libero"]:
+            slot_liberi.setdefault((d["tecnico_id"], s["inizio"].date()), []).append([s["inizio"], s["fine"]])
+
+    cliente_ids = [r["cliente_id"] for r in richieste]
+    optimizer = ScheduleOptimizer(
+        richieste=richieste,
+        tecnico_ids=tecnico_ids,
+        giorni=giorni,
+        slot_liberi=slot_liberi,
+        posizioni_clienti=repo.get_posizioni_clienti(cliente_ids),
+        basi_tecnici=repo.get_basi_tecnici(tecnico_ids),
+        storico_viaggi=repo.get_storico_viaggi(cliente_ids),
+        tipi_con_viaggio=repo.get_tipi_con_viaggio(),
+        durate_medie=repo.get_durate_medie(),
+    )
+    assegnazioni, non_assegnate = optimizer.solve()
+
+    if salva_bozze:
+        evento_ids = repo.save_bozze(assegnazioni, {r["id"]: r for r in richieste})
+        for assegnazione, evento_id in zip(assegnazioni, evento_ids):
+            assegnazione["evento_id"] = evento_id
+        db.commit()
+    else:
+        db.rollback()
+
+    return {
+        "richieste": len(richieste),
+        "tecnici": len(tecnico_ids),
+        "assegnate": len(assegnazioni),
+        "km_stimati_totali": round(sum(a["km_stimati"] for a in assegnazioni), 1),
+        "bozze_salvate": salva_bozze,
+        "durata_ms": int((timer.perf_counter() - avvio) * 1000),
+        "assegnazioni": assegnazioni,
+        "non_assegnate": non_assegnate,
+    }
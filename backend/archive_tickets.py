@@ -0,0 +1,41 @@
+"""
+Script per l'archiviazione dei ticket chiusi da più di ARCHIVE_TICKET_AFTER_DAYS giorni (da cron)
+
+Sposta nello schema archivio, a blocchi di ARCHIVE_BATCH_SIZE, i ticket chiusi
+o cancellati con note, messaggi, storico e allegati. GET /tickets/{id}
+continua a restituirli leggendo dall'archivio; /sync/changes li consegna
+all'app mobile come eliminati (per archiviato_at).
+
+Uso: python archive_tickets.py [giorni]
+"""
+import sys
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.repositories.archive import ArchiveRepository
+
+
+def archive_tickets(giorni=None):
+    giorni = giorni or settings.ARCHIVE_TICKET_AFTER_DAYS
+    prima_di = datetime.utcnow() - timedelta(days=giorni)
+    print(f"Archiviazione ticket chiusi prima del {prima_di:%Y-%m-%d}...")
+
+    db = SessionLocal()
+    try:
+        repo = ArchiveRepository(db)
+        totale = 0
+        while True:
+            spostati = repo.archivia_ticket(prima_di, settings.ARCHIVE_BATCH_SIZE)
+            if not spostati:
+                break
+            totale += spostati
+            print(f"  - {totale} ticket archiviati")
+    finally:
+        db.close()
+
+    print(f"Completato: {totale} ticket archiviati")
+
+
+if __name__ == "__main__":
+    archive_tickets(int(sys.argv[1]) if len(sys.argv) > 1 else None)
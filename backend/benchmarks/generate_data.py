@@ -0,0 +1,599 @@
+"""
+Generatore di dati sintetici per benchmark e load test.
+
+Popola clienti, referenti, tecnici, ticket, interventi, sessioni e righe
+attività con COPY ... FROM STDIN a blocchi, senza passare dall'ORM. Con
+--scale 1 (default) i volumi sono quelli di produzione:
+
+    5.000 clienti, 50.000 referenti, 2.000.000 ticket,
+    1.000.000 interventi con 1-3 sessioni e 1-4 righe attività ciascuno
+
+Le date coprono gli ultimi --anni anni in ordine di id (come in produzione),
+i clienti hanno una distribuzione sbilanciata (pochi clienti con molti
+ticket), i ticket vecchi sono quasi tutti chiusi. I codici hanno prefisso
+BENCH- e i tecnici sono bench.admin e bench.tecnicoNNN con la password
+indicata da --password. Richiede le lookup (populate_lookups.py).
+
+    cd backend && python -m benchmarks.generate_data --scale 0.05 --seed 42
+"""
+import argparse
+import io
+import random
+import sys
+import time as orologio
+from array import array
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.database import SessionLocal, engine
+from app.repositories.workload import WorkloadRepository
+
+PREFISSO = "BENCH"
+CLIENTI = 5_000
+REFERENTI_PER_CLIENTE = 10
+TICKET = 2_000_000
+INTERVENTI = 1_000_000
+
+NOMI = [
+    "Marco", "Giulia", "Luca", "Francesca", "Andrea", "Sara", "Matteo", "Chiara", "Paolo", "Elena",
+    "Davide", "Martina", "Stefano", "Laura", "Simone", "Valentina", "Alessandro", "Federica", "Roberto", "Silvia",
+]
+COGNOMI = [
+    "Rossi", "Bianchi", "Ferrari", "Esposito", "Romano", "Colombo", "Ricci", "Marino", "Greco", "Bruno",
+    "Gallo", "Conti", "De Luca", "Costa", "Giordano", "Mancini", "Rizzo", "Lombardi", "Moretti", "Barbieri",
+]
+RADICI_AZIENDA = [
+    "Tecno", "Info", "Sistemi", "Data", "Rete", "Logica", "Studio", "Meccanica", "Edil", "Agri",
+    "Trasporti", "Servizi", "Consulting", "Digital", "Energia", "Farma", "Print", "Office", "Nord", "Adriatica",
+]
+FORME = ["S.r.l.", "S.p.A.", "S.n.c.", "S.a.s.", "Studio Associato", "Cooperativa"]
+CITTA = [
+    ("Milano", "MI", "20121"), ("Torino", "TO", "10121"), ("Bologna", "BO", "40121"), ("Verona", "VR", "37121"),
+    ("Padova", "PD", "35121"), ("Brescia", "BS", "25121"), ("Bergamo", "BG", "24121"), ("Modena", "MO", "41121"),
+    ("Firenze", "FI", "50121"), ("Roma", "RM", "00118"), ("Treviso", "TV", "31100"), ("Vicenza", "VI", "36100"),
+]
+RUOLI_REFERENTE = ["IT Manager", "Amministrazione", "Titolare", "Responsabile Ufficio", "Segreteria", "Acquisti"]
+PROBLEMI = [
+    "Stampante non stampa", "PC lento all'avvio", "Posta elettronica non riceve", "VPN non si connette",
+    "Backup notturno fallito", "Rinnovo certificato SSL", "Nuovo utente da configurare", "Errore gestionale in fattura",
+    "Rete Wi-Fi instabile", "Aggiornamento firewall", "Disco NAS quasi pieno", "Password scaduta",
+    "Installazione software", "Telefono VoIP senza linea", "Monitor non si accende", "Server non raggiungibile",
+]
+ATTIVITA = [
+    "Diagnosi del problema", "Sostituzione componente", "Configurazione e test", "Aggiornamento software",
+    "Verifica backup", "Assistenza all'utente", "Installazione hardware", "Controllo log di sistema",
+]
+
+
+def _valore(v: Any) -> str:
+    """Value in COPY text format"""
+    if v is None:
+        return r"\N"
+    if isinstance(v, bool):
+        return "t" if v else "f"
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ")
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    return str(v).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class CopyWriter:
+    """Buffer di righe inviato con COPY quando raggiunge la dimensione del blocco"""
+
+    def __init__(self, cursor, tabella: str, colonne: Sequence[str], blocco: int):
+        self.cursor = cursor
+        self.tabella = tabella
+        self.sql = f"COPY {tabella} ({', '.join(colonne)}) FROM STDIN"
+        self.blocco = blocco
+        self.buffer = io.StringIO()
+        self.in_buffer = 0
+        self.totale = 0
+
+    @property
+    def pieno(self) -> bool:
+        return self.in_buffer >= self.blocco
+
+    def write(self, riga: Iterable[Any]) -> None:
+        self.buffer.write("\t".join(map(_valore, riga)))
+        self.buffer.write("\n")
+        self.in_buffer += 1
+
+    def flush(self) -> None:
+        if not self.in_buffer:
+            return
+        self.buffer.seek(0)
+        self.cursor.copy_expert(self.sql, self.buffer)
+        self.totale += self.in_buffer
+        self.buffer = io.StringIO()
+        self.in_buffer = 0
+
+
+class GeneratoreDati:
+    """Genera il dataset su una connessione psycopg2 (una transazione per tabella)"""
+
+    def __init__(self, conn, scala: float, seed: int, anni: int, tecnici: int, password: str, blocco: int):
+        self.conn = conn
+        self.rng = random.Random(seed)
+        self.blocco = blocco
+        self.password = password
+        self.n_clienti = max(1, int(CLIENTI * scala))
+        self.n_ticket = max(1, int(TICKET * scala))
+        self.n_interventi = max(1, int(INTERVENTI * scala))
+        self.n_tecnici = tecnici
+        self.adesso = datetime.utcnow().replace(microsecond=0)
+        self.inizio = self.adesso - timedelta(days=365 * anni)
+        self.secondi = (self.adesso - self.inizio).total_seconds()
+
+    # ---------------------------------------------------------------- supporto
+
+    def _query(self, sql: str, parametri: Optional[tuple] = None) -> List[tuple]:
+        cursor = self.conn.cursor()
+        cursor.execute(sql, parametri)
+        return cursor.fetchall()
+
+    def _prossimo_id(self, tabella: str) -> int:
+        return self._query(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabella}")[0][0]
+
+    def _allinea_sequenza(self, tabella: str) -> None:
+        # Gli id sono espliciti: la sequenza va portata oltre il massimo
+        self._query(
+            f"SELECT setval(pg_get_serial_sequence('{tabella}', 'id'), (SELECT MAX(id) FROM {tabella}))"
+        )
+
+    def _lookup(self, tabella: str, colonne: str = "id, codice") -> List[tuple]:
+        righe = self._query(f"SELECT {colonne} FROM {tabella} WHERE attivo ORDER BY id")
+        if not righe:
+            sys.exit(f"❌ {tabella} vuota: eseguire prima populate_lookups.py")
+        return righe
+
+    def _istante(self, posizione: float) -> datetime:
+        """Timestamp for a relative position (0-1) in the time window, with jitter"""
+        secondi = self.secondi * posizione + self.rng.uniform(-3600, 3600)
+        return self.inizio + timedelta(seconds=min(max(secondi, 0), self.secondi))
+
+    def _cliente(self) -> int:
+        # Distribuzione sbilanciata: i primi clienti concentrano i ticket
+        return self.clienti[int(len(self.clienti) * self.rng.random() ** 2)]
+
+    def _scrivi(self, writer: CopyWriter, etichetta: str, inizio: float) -> None:
+        writer.flush()
+        velocita = writer.totale / max(orologio.perf_counter() - inizio, 0.001)
+        print(f"   {etichetta}: {writer.totale:,} righe ({velocita:,.0f}/s)", end="\r", flush=True)
+
+    # ---------------------------------------------------------------- fasi
+
+    def carica_lookup(self) -> None:
+        stati_ticket = self._lookup("lookup_stati_ticket", "id, codice, finale")
+        self.stati_ticket_aperti = [r[0] for r in stati_ticket if not r[2]]
+        self.stati_ticket_finali = [r[0] for r in stati_ticket if r[2]]
+        self.stato_ticket_chiuso = next((r[0] for r in stati_ticket if r[1] == "CHIUSO"), self.stati_ticket_finali[0])
+
+        stati_intervento = self._lookup("lookup_stati_intervento", "id, codice, finale")
+        self.stati_intervento_aperti = [r[0] for r in stati_intervento if not r[2]]
+        self.stato_intervento_completato = next(
+            (r[0] for r in stati_intervento if r[1] == "COMPLETATO"),
+            next(r[0] for r in stati_intervento if r[2]),
+        )
+
+        self.canali = [r[0] for r in self._lookup("lookup_canali_richiesta")]
+        self.priorita = [r[0] for r in self._lookup("lookup_priorita")]
+        self.tipi_intervento = self._lookup("lookup_tipi_intervento", "id, richiede_viaggio")
+        self.categorie = [r[0] for r in self._lookup("lookup_categorie_attivita")]
+
+        origini = self._lookup("lookup_origini_intervento")
+        self.origine_ticket = next((r[0] for r in origini if r[1] == "DA_TICKET"), origini[0][0])
+        self.origini_altre = [r[0] for r in origini if r[0] != self.origine_ticket] or [self.origine_ticket]
+
+        self.ruoli = {r[1]: r[0] for r in self._lookup("lookup_ruoli_utente")}
+
+    def genera_tecnici(self) -> None:
+        esistenti = self._query(
+            "SELECT id, username FROM tecnici WHERE username LIKE %s ORDER BY id", (f"{PREFISSO.lower()}.%",)
+        )
+        if esistenti:
+            print(f"👷 Riuso {len(esistenti)} tecnici bench esistenti")
+            self.tecnici = [r[0] for r in esistenti if r[1] != f"{PREFISSO.lower()}.admin"]
+            return
+
+        print(f"👷 Creazione di {self.n_tecnici} tecnici + bench.admin")
+        hashed = get_password_hash(self.password)
+        ruolo_tecnico = self.ruoli.get("TECNICO") or next(iter(self.ruoli.values()))
+        ruolo_admin = self.ruoli.get("ADMIN") or ruolo_tecnico
+        primo = self._prossimo_id("tecnici")
+        writer = CopyWriter(
+            self.conn.cursor(),
+            "tecnici",
+            ["id", "username", "email", "hashed_password", "nome", "cognome", "ruolo_id", "codice_tecnico",
+             "ldap_enabled", "notifiche_email", "notifiche_push", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        utenti = [("admin", ruolo_admin)] + [(f"tecnico{i:03d}", ruolo_tecnico) for i in range(1, self.n_tecnici + 1)]
+        self.tecnici = []
+        for offset, (nome_utente, ruolo_id) in enumerate(utenti):
+            tecnico_id = primo + offset
+            if nome_utente != "admin":
+                self.tecnici.append(tecnico_id)
+            writer.write((
+                tecnico_id,
+                f"{PREFISSO.lower()}.{nome_utente}",
+                f"{PREFISSO.lower()}.{nome_utente}@example.com",
+                hashed,
+                self.rng.choice(NOMI),
+                self.rng.choice(COGNOMI),
+                ruolo_id,
+                f"{PREFISSO}-{nome_utente.upper()}",
+                0, 0, 0,
+                self.inizio, self.inizio, True,
+            ))
+        writer.flush()
+        self._allinea_sequenza("tecnici")
+        self.conn.commit()
+
+    def genera_clienti(self) -> None:
+        print(f"🏢 {self.n_clienti:,} clienti, {self.n_clienti * REFERENTI_PER_CLIENTE:,} referenti")
+        inizio = orologio.perf_counter()
+        primo_cliente = self._prossimo_id("cache_clienti")
+        primo_referente = self._prossimo_id("cache_referenti")
+        cursor = self.conn.cursor()
+
+        clienti = CopyWriter(
+            cursor,
+            "cache_clienti",
+            ["id", "codice_gestionale", "ragione_sociale", "partita_iva", "codice_fiscale", "indirizzo", "cap",
+             "citta", "provincia", "nazione", "telefono", "email", "stato_cliente", "classificazione",
+             "ultimo_sync", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        for i in range(self.n_clienti):
+            cliente_id = primo_cliente + i
+            citta, provincia, cap = self.rng.choice(CITTA)
+            piva = f"{self.rng.randrange(10 ** 10, 10 ** 11)}"
+            creato = self._istante(self.rng.random() * 0.5)
+            clienti.write((
+                cliente_id,
+                f"{PREFISSO}-C-{cliente_id:06d}",
+                f"{self.rng.choice(RADICI_AZIENDA)}{self.rng.choice(RADICI_AZIENDA).lower()} {cliente_id} {self.rng.choice(FORME)}",
+                piva,
+                piva,
+                f"Via {self.rng.choice(COGNOMI)} {self.rng.randint(1, 200)}",
+                cap,
+                citta,
+                provincia,
+                "IT",
+                f"0{self.rng.randint(2, 99)} {self.rng.randint(100000, 9999999)}",
+                f"info@cliente{cliente_id}.example.com",
+                "ATTIVO" if self.rng.random() < 0.95 else "SOSPESO",
+                self.rng.choice(["VIP", "STANDARD", "STANDARD", "BASIC"]),
+                self.adesso,
+                creato,
+                creato,
+                self.rng.random() < 0.98,
+            ))
+            if clienti.pieno:
+                self._scrivi(clienti, "clienti", inizio)
+        self._scrivi(clienti, "clienti", inizio)
+        print()
+
+        referenti = CopyWriter(
+            cursor,
+            "cache_referenti",
+            ["id", "cliente_id", "nome", "cognome", "ruolo", "telefono", "email", "contatto_principale",
+             "riceve_notifiche", "referente_it", "ultimo_sync", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        inizio = orologio.perf_counter()
+        for i in range(self.n_clienti):
+            cliente_id = primo_cliente + i
+            for j in range(REFERENTI_PER_CLIENTE):
+                referente_id = primo_referente + i * REFERENTI_PER_CLIENTE + j
+                nome, cognome = self.rng.choice(NOMI), self.rng.choice(COGNOMI)
+                referenti.write((
+                    referente_id,
+                    cliente_id,
+                    nome,
+                    cognome,
+                    self.rng.choice(RUOLI_REFERENTE),
+                    f"0{self.rng.randint(2, 99)} {self.rng.randint(100000, 9999999)}",
+                    f"{nome.lower()}.{cognome.lower().replace(' ', '')}{referente_id}@example.com",
+                    1 if j == 0 else 0,
+                    1,
+                    1 if j == 1 else 0,
+                    self.adesso,
+                    self.inizio,
+                    self.inizio,
+                    True,
+                ))
+                if referenti.pieno:
+                    self._scrivi(referenti, "referenti", inizio)
+        self._scrivi(referenti, "referenti", inizio)
+        print()
+
+        self.clienti = list(range(primo_cliente, primo_cliente + self.n_clienti))
+        self.primo_cliente = primo_cliente
+        self.primo_referente = primo_referente
+        self._allinea_sequenza("cache_clienti")
+        self._allinea_sequenza("cache_referenti")
+        self.conn.commit()
+
+    def genera_ticket(self) -> None:
+        print(f"🎫 {self.n_ticket:,} ticket")
+        inizio = orologio.perf_counter()
+        self.primo_ticket = self._prossimo_id("ticket")
+        # Cliente di ogni ticket, per collegare gli interventi DA_TICKET allo stesso cliente
+        self.clienti_ticket = array("i")
+
+        writer = CopyWriter(
+            self.conn.cursor(),
+            "ticket",
+            ["id", "numero", "cliente_id", "referente_id", "canale_id", "priorita_id", "stato_id", "oggetto",
+             "descrizione", "tecnico_assegnato_id", "sla_scadenza_risposta", "sla_scadenza_risoluzione",
+             "sla_prima_risposta_at", "sla_paused_total_minutes", "data_chiusura", "tipo_chiusura",
+             "chiuso_da_id", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        trenta_giorni = timedelta(days=30)
+        for i in range(self.n_ticket):
+            ticket_id = self.primo_ticket + i
+            cliente_id = self._cliente()
+            self.clienti_ticket.append(cliente_id)
+            creato = self._istante(i / self.n_ticket)
+
+            chiuso = self.rng.random() < (0.97 if self.adesso - creato > trenta_giorni else 0.4)
+            tecnico_id = self.rng.choice(self.tecnici) if chiuso or self.rng.random() < 0.8 else None
+            risposta = creato + timedelta(minutes=self.rng.randint(5, 240)) if tecnico_id else None
+            data_chiusura = creato + timedelta(hours=self.rng.uniform(0.5, 120)) if chiuso else None
+            if chiuso:
+                stato_id = self.stato_ticket_chiuso if self.rng.random() < 0.95 else self.rng.choice(self.stati_ticket_finali)
+            else:
+                stato_id = self.rng.choice(self.stati_ticket_aperti)
+
+            referente_id = None
+            if self.rng.random() < 0.7:
+                referente_id = (
+                    self.primo_referente
+                    + (cliente_id - self.primo_cliente) * REFERENTI_PER_CLIENTE
+                    + self.rng.randrange(REFERENTI_PER_CLIENTE)
+                )
+
+            writer.write((
+                ticket_id,
+                f"{PREFISSO}-T-{ticket_id:08d}",
+                cliente_id,
+                referente_id,
+                self.rng.choice(self.canali),
+                self.rng.choice(self.priorita),
+                stato_id,
+                f"{self.rng.choice(PROBLEMI)} #{ticket_id}",
+                f"{self.rng.choice(PROBLEMI)}. Segnalato dal cliente, verificare al più presto.",
+                tecnico_id,
+                creato + timedelta(hours=4),
+                creato + timedelta(hours=48),
+                risposta,
+                0,
+                data_chiusura,
+                "DIRETTA" if chiuso else None,
+                tecnico_id if chiuso else None,
+                creato,
+                data_chiusura or risposta or creato,
+                True,
+            ))
+            if writer.pieno:
+                self._scrivi(writer, "ticket", inizio)
+        self._scrivi(writer, "ticket", inizio)
+        print()
+
+        self._allinea_sequenza("ticket")
+        self.conn.commit()
+
+    def genera_interventi(self) -> None:
+        print(f"🔧 {self.n_interventi:,} interventi con sessioni e righe")
+        inizio = orologio.perf_counter()
+        primo_intervento = self._prossimo_id("interventi")
+        prossima_sessione = self._prossimo_id("interventi_sessioni")
+        prossima_riga = self._prossimo_id("interventi_righe")
+        cursor = self.conn.cursor()
+
+        interventi = CopyWriter(
+            cursor,
+            "interventi",
+            ["id", "numero", "origine_id", "ticket_id", "cliente_id", "tipo_intervento_id", "stato_id",
+             "tecnico_id", "oggetto", "descrizione_lavoro", "data_inizio", "data_fine", "firma_nome",
+             "firma_data", "sincronizzato_gestionale", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        sessioni = CopyWriter(
+            cursor,
+            "interventi_sessioni",
+            ["id", "intervento_id", "tecnico_id", "data", "ora_inizio", "ora_fine", "durata_minuti",
+             "tipo_intervento_id", "km_percorsi", "tempo_viaggio_minuti", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+        righe = CopyWriter(
+            cursor,
+            "interventi_righe",
+            ["id", "intervento_id", "numero_riga", "categoria_id", "descrizione", "quantita", "unita_misura",
+             "prezzo_unitario", "sconto_percentuale", "fatturabile", "in_garanzia", "incluso_contratto",
+             "sessione_id", "created_at", "updated_at", "attivo"],
+            self.blocco,
+        )
+
+        sette_giorni = timedelta(days=7)
+        for i in range(self.n_interventi):
+            intervento_id = primo_intervento + i
+            posizione = i / self.n_interventi
+            creato = self._istante(posizione)
+
+            ticket_id = None
+            if self.rng.random() < 0.6:
+                # Ticket coevo: indice proporzionale con un piccolo scarto
+                indice = min(max(int(posizione * self.n_ticket) + self.rng.randint(-50, 0), 0), self.n_ticket - 1)
+                ticket_id = self.primo_ticket + indice
+                cliente_id = self.clienti_ticket[indice]
+                origine_id = self.origine_ticket
+            else:
+                cliente_id = self._cliente()
+                origine_id = self.rng.choice(self.origini_altre)
+
+            tecnico_id = self.rng.choice(self.tecnici)
+            tipo_id, richiede_viaggio = self.rng.choice(self.tipi_intervento)
+            vecchio = self.adesso - creato > sette_giorni
+            completato = self.rng.random() < (0.97 if vecchio else 0.3)
+            avviato = completato or self.rng.random() < 0.5
+
+            data_inizio = data_fine = None
+            stato_id = self.stato_intervento_completato if completato else self.rng.choice(self.stati_intervento_aperti)
+            sessioni_create = []
+            if avviato:
+                giorno = min(creato + timedelta(days=self.rng.randint(1, 3)), self.adesso).date()
+                for k in range(self.rng.choice((1, 1, 1, 2, 2, 3))):
+                    inizio_sessione = self.rng.randint(8 * 60, 15 * 60)
+                    durata = self.rng.choice((30, 45, 60, 90, 120, 180, 240))
+                    fine_sessione = min(inizio_sessione + durata, 23 * 60 + 59)
+                    data_sessione = giorno + timedelta(days=k)
+                    sessione_id = prossima_sessione
+                    prossima_sessione += 1
+                    sessioni.write((
+                        sessione_id,
+                        intervento_id,
+                        tecnico_id,
+                        data_sessione,
+                        time(inizio_sessione // 60, inizio_sessione % 60),
+                        time(fine_sessione // 60, fine_sessione % 60),
+                        fine_sessione - inizio_sessione,
+                        tipo_id,
+                        round(self.rng.uniform(2, 80), 2) if richiede_viaggio else None,
+                        self.rng.randint(10, 90) if richiede_viaggio else None,
+                        creato,
+                        creato,
+                        True,
+                    ))
+                    sessioni_create.append((sessione_id, data_sessione, inizio_sessione, fine_sessione))
+
+                primo_giorno = sessioni_create[0]
+                data_inizio = datetime.combine(primo_giorno[1], time(primo_giorno[2] // 60, primo_giorno[2] % 60))
+                if completato:
+                    ultimo_giorno = sessioni_create[-1]
+                    data_fine = datetime.combine(ultimo_giorno[1], time(ultimo_giorno[3] // 60, ultimo_giorno[3] % 60))
+
+                for numero_riga in range(1, self.rng.randint(1, 4) + 1):
+                    sessione = self.rng.choice(sessioni_create)
+                    righe.write((
+                        prossima_riga,
+                        intervento_id,
+                        numero_riga,
+                        self.rng.choice(self.categorie),
+                        self.rng.choice(ATTIVITA),
+                        self.rng.choice(("0.50", "1.00", "1.50", "2.00", "3.00")),
+                        "ore",
+                        self.rng.choice(("45.00", "55.00", "65.00")),
+                        "0.00",
+                        1 if self.rng.random() < 0.8 else 0,
+                        1 if self.rng.random() < 0.05 else 0,
+                        1 if self.rng.random() < 0.2 else 0,
+                        sessione[0],
+                        creato,
+                        creato,
+                        True,
+                    ))
+                    prossima_riga += 1
+
+            interventi.write((
+                intervento_id,
+                f"{PREFISSO}-I-{intervento_id:08d}",
+                origine_id,
+                ticket_id,
+                cliente_id,
+                tipo_id,
+                stato_id,
+                tecnico_id,
+                f"{self.rng.choice(PROBLEMI)} #{intervento_id}",
+                f"{self.rng.choice(ATTIVITA)}. Problema risolto." if completato else None,
+                data_inizio,
+                data_fine,
+                f"{self.rng.choice(NOMI)} {self.rng.choice(COGNOMI)}" if completato else None,
+                data_fine,
+                1 if completato and vecchio else 0,
+                creato,
+                max(data_fine or data_inizio or creato, creato),
+                True,
+            ))
+
+            # Ordine delle FK: interventi, poi sessioni, poi righe
+            if interventi.pieno or sessioni.pieno or righe.pieno:
+                interventi.flush()
+                sessioni.flush()
+                self._scrivi(righe, "interventi", inizio)
+        interventi.flush()
+        sessioni.flush()
+        self._scrivi(righe, "interventi", inizio)
+        print()
+        print(f"   {interventi.totale:,} interventi, {sessioni.totale:,} sessioni, {righe.totale:,} righe")
+
+        for tabella in ("interventi", "interventi_sessioni", "interventi_righe"):
+            self._allinea_sequenza(tabella)
+        self.conn.commit()
+
+    def analizza(self) -> None:
+        print("📊 ANALYZE")
+        self.conn.autocommit = True
+        cursor = self.conn.cursor()
+        for tabella in ("cache_clienti", "cache_referenti", "tecnici", "ticket",
+                        "interventi", "interventi_sessioni", "interventi_righe"):
+            cursor.execute(f"ANALYZE {tabella}")
+        self.conn.autocommit = False
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Dataset sintetico per benchmark (COPY)")
+    parser.add_argument("--scale", type=float, default=1.0, help="fattore sui volumi di produzione (default 1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anni", type=int, default=3, help="ampiezza della finestra temporale")
+    parser.add_argument("--tecnici", type=int, default=40)
+    parser.add_argument("--password", default="benchmark", help="password dei tecnici bench.*")
+    parser.add_argument("--blocco", type=int, default=50_000, help="righe per COPY")
+    parser.add_argument("--yes", action="store_true", help="non chiedere conferma")
+    args = parser.parse_args(argv)
+
+    volumi: Dict[str, int] = {
+        "clienti": int(CLIENTI * args.scale),
+        "ticket": int(TICKET * args.scale),
+        "interventi": int(INTERVENTI * args.scale),
+    }
+    print(f"Database: {settings.POSTGRES_SERVER}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}")
+    print(", ".join(f"{k}: {v:,}" for k, v in volumi.items()))
+    if not args.yes and input("Inserire i dati sintetici? [s/N] ").strip().lower() not in ("s", "si", "y", "yes"):
+        return
+
+    raw = engine.raw_connection()
+    try:
+        generatore = GeneratoreDati(
+            raw.driver_connection, args.scale, args.seed, args.anni, args.tecnici, args.password, args.blocco
+        )
+        inizio = orologio.perf_counter()
+        generatore.carica_lookup()
+        generatore.genera_tecnici()
+        generatore.genera_clienti()
+        generatore.genera_ticket()
+        generatore.genera_interventi()
+        generatore.analizza()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    # Rollup del carico tecnici per le sessioni appena inserite
+    db = SessionLocal()
+    try:
+        WorkloadRepository(db).rebuild(data_from=generatore.inizio.date())
+    finally:
+        db.close()
+
+    print(f"✅ Completato in {orologio.perf_counter() - inizio:,.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Scenario di carico HTTP (Locust) sul dataset sintetico.
+
+Ogni utente virtuale fa login come uno dei tecnici bench.tecnicoNNN creati
+da benchmarks.generate_data e alterna dashboard, lista/ricerca/dettaglio
+ticket e il flusso di lavoro sugli interventi (lista per periodo, dettaglio,
+sessioni, registrazione di una sessione, apertura e chiusura di un
+intervento). Locust riporta p50/p95/p99 per endpoint; a fine test vengono
+stampati anche i percentili delle query SQL per richiesta, lette
+dall'header Server-Timing.
+
+    cd backend && locust -f benchmarks/locustfile.py --host http://localhost:8000 \\
+        --users 50 --spawn-rate 5 --run-time 5m --headless --csv bench
+
+Variabili: BENCH_TECNICI (default 40), BENCH_PASSWORD (default benchmark).
+"""
+import os
+import random
+import re
+import statistics
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+from locust import HttpUser, between, events, task
+
+API = "/api/v1"
+TECNICI = int(os.environ.get("BENCH_TECNICI", "40"))
+PASSWORD = os.environ.get("BENCH_PASSWORD", "benchmark")
+RICERCHE = ["VPN", "stampante", "backup", "firewall", "Password", "server", "Wi-Fi", "certificato"]
+
+_QUERY = re.compile(r'desc="(\d+) queries"')
+query_per_richiesta: Dict[str, List[int]] = defaultdict(list)
+
+
+@events.request.add_listener
+def _conta_query(request_type, name, response, exception, **kwargs):
+    if response is None or exception is not None:
+        return
+    trovato = _QUERY.search(response.headers.get("Server-Timing", ""))
+    if trovato:
+        query_per_richiesta[f"{request_type} {name}"].append(int(trovato.group(1)))
+
+
+@events.test_stop.add_listener
+def _riepilogo_query(environment, **kwargs):
+    if not query_per_richiesta:
+        return
+    print(f"\n{'richiesta':55s} {'p50':>5s} {'p95':>5s} {'p99':>5s} {'max':>5s}  (query SQL)")
+    for nome, valori in sorted(query_per_richiesta.items()):
+        if len(valori) < 2:
+            valori = valori * 2
+        quantili = statistics.quantiles(valori, n=100, method="inclusive")
+        print(f"{nome:55s} {quantili[49]:5.0f} {quantili[94]:5.0f} {quantili[98]:5.0f} {max(valori):5d}")
+
+
+class TecnicoUser(HttpUser):
+    """Tecnico che lavora su ticket e interventi"""
+
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        username = f"bench.tecnico{random.randint(1, TECNICI):03d}"
+        risposta = self.client.post(
+            f"{API}/auth/login",
+            data={"username": username, "password": PASSWORD},
+            name=f"{API}/auth/login",
+        )
+        risposta.raise_for_status()
+        self.client.headers["Authorization"] = f"Bearer {risposta.json()['access_token']}"
+
+        self.utente_id = self.client.get(f"{API}/auth/me").json()["id"]
+        self.stati_ticket = self.client.get(f"{API}/lookup/ticket-states").json()
+        self.stati_intervento = self.client.get(f"{API}/lookup/intervention-states").json()
+        self.tipi_intervento = self.client.get(f"{API}/lookup/intervention-types").json()
+        self.origini = self.client.get(f"{API}/lookup/intervention-origins").json()
+
+        # Id più recenti: il dettaglio pesca in [1, max] come la navigazione reale
+        self.max_ticket = max((t["id"] for t in self.client.get(f"{API}/tickets?limit=1").json()["tickets"]), default=1)
+        self.max_intervento = max(
+            (i["id"] for i in self.client.get(f"{API}/interventions?limit=1").json()["interventi"]), default=1
+        )
+        self.miei_interventi: List[int] = []
+
+    # ---------------------------------------------------------------- dashboard
+
+    @task(3)
+    def dashboard(self):
+        self.client.get(f"{API}/dashboard")
+
+    # ---------------------------------------------------------------- ticket
+
+    @task(6)
+    def lista_ticket(self):
+        params = {"page": random.choice((1, 1, 1, 2, 3)), "limit": 20}
+        if random.random() < 0.5:
+            params["stato_id"] = random.choice([s["id"] for s in self.stati_ticket if not s.get("finale")])
+        if random.random() < 0.3:
+            params["tecnico_id"] = self.utente_id
+        self.client.get(f"{API}/tickets", params=params, name=f"{API}/tickets")
+
+    @task(3)
+    def ricerca_ticket(self):
+        self.client.get(
+            f"{API}/tickets",
+            params={"search": random.choice(RICERCHE), "limit": 20},
+            name=f"{API}/tickets?search",
+        )
+
+    @task(5)
+    def dettaglio_ticket(self):
+        with self.client.get(
+            f"{API}/tickets/{random.randint(1, self.max_ticket)}",
+            name=f"{API}/tickets/[id]",
+            catch_response=True,
+        ) as risposta:
+            # Id eliminati o di altri dataset: non sono errori del server
+            if risposta.status_code == 404:
+                risposta.success()
+
+    # ---------------------------------------------------------------- interventi
+
+    @task(4)
+    def interventi_periodo(self):
+        oggi = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.client.get(
+            f"{API}/interventions",
+            params={
+                "tecnico_id": self.utente_id,
+                "data_from": (oggi - timedelta(days=30)).isoformat(),
+                "data_to": (oggi + timedelta(days=1)).isoformat(),
+                "limit": 50,
+            },
+            name=f"{API}/interventions?periodo",
+        )
+
+    @task(3)
+    def dettaglio_intervento(self):
+        intervento_id = (
+            random.choice(self.miei_interventi)
+            if self.miei_interventi and random.random() < 0.5
+            else random.randint(1, self.max_intervento)
+        )
+        with self.client.get(
+            f"{API}/interventions/{intervento_id}",
+            name=f"{API}/interventions/[id]",
+            catch_response=True,
+        ) as risposta:
+            if risposta.status_code == 404:
+                risposta.success()
+                return
+        self.client.get(f"{API}/interventions/{intervento_id}/sessions", name=f"{API}/interventions/[id]/sessions")
+
+    @task(1)
+    def flusso_intervento(self):
+        """Nuovo intervento: creazione, avvio, sessione di lavoro, chiusura"""
+        ticket = self.client.get(f"{API}/tickets", params={"tecnico_id": self.utente_id, "limit": 1},
+                                 name=f"{API}/tickets").json()["tickets"]
+        if not ticket:
+            return
+        tipo = random.choice(self.tipi_intervento)
+        risposta = self.client.post(
+            f"{API}/interventions",
+            json={
+                "cliente_id": ticket[0]["cliente_id"],
+                "ticket_id": ticket[0]["id"],
+                "tipo_intervento_id": tipo["id"],
+                "stato_id": next(s["id"] for s in self.stati_intervento if not s.get("finale")),
+                "origine_id": self.origini[0]["id"],
+                "tecnico_id": self.utente_id,
+                "oggetto": "Intervento da load test",
+            },
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+            name=f"{API}/interventions [POST]",
+        )
+        if risposta.status_code != 201:
+            return
+        intervento_id = risposta.json()["id"]
+        self.miei_interventi.append(intervento_id)
+
+        self.client.post(
+            f"{API}/interventions/{intervento_id}/start",
+            json={},
+            name=f"{API}/interventions/[id]/start",
+        )
+
+        # Orario casuale: le sovrapposizioni (409) sono un esito atteso
+        inizio = random.randint(8 * 60, 17 * 60)
+        with self.client.post(
+            f"{API}/interventions/{intervento_id}/sessions",
+            json={
+                "data": date.today().isoformat(),
+                "ora_inizio": f"{inizio // 60:02d}:{inizio % 60:02d}:00",
+                "ora_fine": f"{(inizio + 30) // 60:02d}:{(inizio + 30) % 60:02d}:00",
+                "tipo_intervento_id": tipo["id"],
+            },
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+            name=f"{API}/interventions/[id]/sessions [POST]",
+            catch_response=True,
+        ) as sessione:
+            if sessione.status_code == 409:
+                sessione.success()
+
+        self.client.post(
+            f"{API}/interventions/{intervento_id}/complete",
+            json={"descrizione_lavoro": "Completato durante il load test"},
+            name=f"{API}/interventions/[id]/complete",
+        )
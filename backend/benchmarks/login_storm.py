@@ -0,0 +1,125 @@
+"""
+Verifica che una raffica di login non blocchi le altre richieste.
+
+Misura la latenza di --probe (default /health) prima e durante --logins
+login concorrenti dei tecnici bench.tecnicoNNN (benchmarks.generate_data),
+come all'inizio di un turno. Con bcrypt sul loop ogni login ferma il worker
+per 100-300 ms e il p95 della sonda cresce di conseguenza; con la verifica
+nel pool di thread la sonda deve restare sotto --max-p95-ms. Esce con codice
+1 se il p95 della sonda durante la raffica supera la soglia o se qualche
+login fallisce.
+
+Va eseguito contro un server avviato (idealmente con un solo worker, dove
+il blocco del loop è più evidente):
+
+    cd backend && python -m benchmarks.login_storm --url http://localhost:8000 --logins 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+API = "/api/v1"
+
+
+def _percentili(campioni: List[float]) -> Dict[str, float]:
+    if len(campioni) < 2:
+        campioni = campioni * 2
+    quantili = statistics.quantiles(campioni, n=100, method="inclusive")
+    return {"p50": quantili[49], "p95": quantili[94], "max": max(campioni)}
+
+
+async def sonda(client: httpx.AsyncClient, percorso: str, fine: asyncio.Event, intervallo: float) -> List[float]:
+    """Probe latencies (ms) until fine is set"""
+    latenze = []
+    while not fine.is_set():
+        inizio = time.perf_counter()
+        await client.get(percorso)
+        latenze.append((time.perf_counter() - inizio) * 1000)
+        await asyncio.sleep(intervallo)
+    return latenze
+
+
+async def raffica(
+    client: httpx.AsyncClient, logins: int, concorrenza: int, tecnici: int, password: str
+) -> Tuple[List[float], int]:
+    """Concurrent logins: latencies (ms) of the successful ones, failures"""
+    semaforo = asyncio.Semaphore(concorrenza)
+    latenze: List[float] = []
+    falliti = 0
+
+    async def login(i: int):
+        nonlocal falliti
+        async with semaforo:
+            inizio = time.perf_counter()
+            risposta = await client.post(
+                f"{API}/auth/login",
+                data={"username": f"bench.tecnico{i % tecnici + 1:03d}", "password": password},
+            )
+            if risposta.status_code == 200:
+                latenze.append((time.perf_counter() - inizio) * 1000)
+            else:
+                falliti += 1
+
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    return latenze, falliti
+
+
+async def esegui(args: argparse.Namespace) -> bool:
+    limiti = httpx.Limits(max_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=args.url, limits=limiti, timeout=120.0) as client:
+        await client.get(args.probe)
+
+        # Riferimento: sonda senza carico
+        fine = asyncio.Event()
+        attivita = asyncio.create_task(sonda(client, args.probe, fine, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        fine.set()
+        riferimento = _percentili(await attivita)
+
+        fine = asyncio.Event()
+        attivita = asyncio.create_task(sonda(client, args.probe, fine, args.interval))
+        inizio = time.perf_counter()
+        latenze_login, falliti = await raffica(client, args.logins, args.concurrency, args.tecnici, args.password)
+        durata = time.perf_counter() - inizio
+        fine.set()
+        durante = _percentili(await attivita)
+
+    print(f"{args.logins} login ({args.concurrency} in parallelo) in {durata:.1f}s: "
+          f"{len(latenze_login) / durata:.1f} login/s, {falliti} falliti")
+    if latenze_login:
+        p = _percentili(latenze_login)
+        print(f"  login   p50 {p['p50']:7.1f} ms  p95 {p['p95']:7.1f} ms  max {p['max']:7.1f} ms")
+    print(f"GET {args.probe}")
+    print(f"  a riposo    p50 {riferimento['p50']:7.1f} ms  p95 {riferimento['p95']:7.1f} ms  max {riferimento['max']:7.1f} ms")
+    print(f"  in raffica  p50 {durante['p50']:7.1f} ms  p95 {durante['p95']:7.1f} ms  max {durante['max']:7.1f} ms")
+
+    ok = durante["p95"] <= args.max_p95_ms and falliti == 0
+    print(("\n✅" if ok else "\n❌") + f" p95 della sonda durante la raffica (soglia {args.max_p95_ms:.0f} ms)")
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Latenza delle altre richieste durante una raffica di login")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--probe", default="/health")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--tecnici", type=int, default=int(os.environ.get("BENCH_TECNICI", "40")))
+    parser.add_argument("--password", default=os.environ.get("BENCH_PASSWORD", "benchmark"))
+    parser.add_argument("--interval", type=float, default=0.02, help="pausa fra due richieste della sonda (s)")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--max-p95-ms", type=float, default=100.0)
+    args = parser.parse_args(argv)
+
+    if not asyncio.run(esegui(args)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Controllo di regressione dei piani di esecuzione sui percorsi caldi.
+
+Esegue gli scenari di benchmarks.repositories più TicketRepository.get_all
+per ogni combinazione di filtri (fino a due), cattura gli statement SELECT
+emessi e ne chiede il piano con EXPLAIN (FORMAT JSON), senza eseguirli una
+seconda volta. Uno scenario fallisce se il piano:
+
+- contiene una Seq Scan su una tabella con più di --min-rows righe stimate
+  (pg_class.reltuples);
+- supera il budget di costo del planner (--max-cost).
+
+Le eccezioni (ECCEZIONI) valgono per singolo statement, riconosciuto dalla
+forma (count(*), ILIKE): gli altri statement dello scenario, come la query
+della pagina di ticket.list, restano verificati.
+
+Va eseguito sul dataset sintetico (benchmarks.generate_data) dopo ANALYZE;
+con --save i piani vengono scritti in JSON per confrontarli fra due rami.
+Esce con codice 1 se almeno uno scenario fallisce.
+
+    cd backend && python -m benchmarks.query_plans --save piani.json
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.repositories.ticket import TicketRepository
+from benchmarks.repositories import SCENARI, Scenario, carica_contesto
+
+
+
+def _conteggio(statement: str) -> bool:
+    """SELECT count(*) FROM (...) emitted by Query.count()"""
+    return statement.lstrip().upper().startswith("SELECT COUNT(*)")
+
+
+def _ricerca_testo(statement: str) -> bool:
+    return " ILIKE " in statement.upper()
+
+
+# Scansioni complete accettate, per forma dello statement: solo gli statement
+# riconosciuti sono esenti dal controllo Seq Scan e dal budget di costo, gli
+# altri (la query della pagina) restano verificati. scenari None = tutti
+ECCEZIONI: List[Dict[str, Any]] = [
+    {
+        # Conteggi su tutte le righe attive o su filtri poco selettivi (pochi
+        # valori distinti): nessun indice evita di leggere buona parte della tabella
+        "forma": _conteggio,
+        "scenari": {
+            "dashboard.ticket_stats",
+            "dashboard.intervento_stats",
+            "ticket.list",
+            "ticket.list.stato",
+            "ticket.filtri.stato_id",
+            "ticket.filtri.priorita_id",
+            "ticket.filtri.stato_id+priorita_id",
+        },
+        "seq_scan": {"ticket", "interventi"},
+    },
+    {
+        # ILIKE '%testo%' non può usare indici B-tree
+        "forma": _ricerca_testo,
+        "scenari": None,
+        "seq_scan": {"ticket"},
+    },
+]
+
+
+def eccezione(nome: str, statement: str) -> Optional[Dict[str, Any]]:
+    """Exception covering this statement of the scenario, if any"""
+    for voce in ECCEZIONI:
+        if (voce["scenari"] is None or nome in voce["scenari"]) and voce["forma"](statement):
+            return voce
+    return None
+
+
+FILTRI_TICKET = {
+    "stato_id": lambda c: c["stato_aperto"],
+    "priorita_id": lambda c: c["priorita_id"],
+    "tecnico_id": lambda c: c["tecnico_id"],
+    "cliente_id": lambda c: c["cliente_id"],
+    "search": lambda c: c["numero"],
+}
+
+
+def _scenari_filtri_ticket() -> Iterator[Tuple[str, Scenario]]:
+    for n in (1, 2):
+        for combinazione in itertools.combinations(FILTRI_TICKET, n):
+            def scenario(db, c, combinazione=combinazione):
+                filtri = {nome: FILTRI_TICKET[nome](c) for nome in combinazione}
+                return TicketRepository(db).get_all(limit=20, **filtri)
+
+            yield f"ticket.filtri.{'+'.join(combinazione)}", scenario
+
+
+def cattura(scenario: Scenario, contesto: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """SELECT statements (with parameters) issued by a scenario, deduplicated"""
+    catturati: Dict[str, Any] = {}
+
+    def _cattura(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")) and statement not in catturati:
+            catturati[statement] = parameters
+
+    event.listen(engine, "before_cursor_execute", _cattura)
+    db = SessionLocal()
+    try:
+        scenario(db, contesto)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", _cattura)
+    return list(catturati.items())
+
+
+def _nodi(nodo: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield nodo
+    for figlio in nodo.get("Plans", []):
+        yield from _nodi(figlio)
+
+
+def explain(cursor, statement: str, parametri: Any) -> Dict[str, Any]:
+    cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parametri or None)
+    piano = cursor.fetchone()[0]
+    if isinstance(piano, str):
+        piano = json.loads(piano)
+    return piano[0]["Plan"]
+
+
+def verifica(
+    nome: str,
+    statements: List[str],
+    piani: List[Dict[str, Any]],
+    righe_stimate: Dict[str, float],
+    min_righe: int,
+    max_costo: float,
+) -> List[str]:
+    """Violations of a scenario's plans"""
+    violazioni = []
+    for i, (statement, piano) in enumerate(zip(statements, piani), start=1):
+        esenzione = eccezione(nome, statement)
+        consentite: Set[str] = esenzione["seq_scan"] if esenzione else set()
+        budget = None if esenzione else max_costo
+        for nodo in _nodi(piano):
+            tabella = nodo.get("Relation Name")
+            if nodo["Node Type"] != "Seq Scan" or tabella in consentite:
+                continue
+            if righe_stimate.get(tabella, 0) >= min_righe:
+                violazioni.append(
+                    f"statement {i}: Seq Scan su {tabella} (~{righe_stimate[tabella]:,.0f} righe)"
+                    + (f" filtro {nodo['Filter']}" if nodo.get("Filter") else "")
+                )
+        if budget is not None and piano["Total Cost"] > budget:
+            violazioni.append(f"statement {i}: costo {piano['Total Cost']:,.0f} oltre il budget {budget:,.0f}")
+    return violazioni
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Regressioni dei piani di esecuzione")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="tabelle 'grandi' per il controllo Seq Scan")
+    parser.add_argument("--max-cost", type=float, default=50_000, help="budget di costo per statement")
+    parser.add_argument("--only", help="solo gli scenari che iniziano con questo prefisso")
+    parser.add_argument("--save", help="scrive statement e piani in JSON")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    contesto = carica_contesto(random.Random(args.seed))
+    scenari = list(SCENARI) + list(_scenari_filtri_ticket())
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'p')")
+        righe_stimate = {relname: reltuples for relname, reltuples in cursor.fetchall()}
+
+        salvati: Dict[str, Any] = {}
+        falliti = 0
+        for nome, scenario in scenari:
+            if args.only and not nome.startswith(args.only):
+                continue
+            try:
+                statements = cattura(scenario, contesto)
+                piani = [explain(cursor, statement, parametri) for statement, parametri in statements]
+            except Exception as e:
+                raw.rollback()
+                falliti += 1
+                print(f"❌ {nome}: ERRORE {str(e).splitlines()[0]}")
+                continue
+
+            violazioni = verifica(nome, [st for st, _ in statements], piani, righe_stimate, args.min_rows, args.max_cost)
+            costo = max((p["Total Cost"] for p in piani), default=0)
+            if violazioni:
+                falliti += 1
+                print(f"❌ {nome} (costo max {costo:,.0f})")
+                for v in violazioni:
+                    print(f"     {v}")
+            else:
+                print(f"✅ {nome} (costo max {costo:,.0f})")
+            salvati[nome] = [{"statement": s, "piano": p} for (s, _), p in zip(statements, piani)]
+    finally:
+        raw.rollback()
+        raw.close()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(salvati, f, indent=2, default=str)
+
+    if falliti:
+        print(f"\n{falliti} scenari con regressioni di piano")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Benchmark dei percorsi caldi dei repository sul dataset sintetico.
+
+Ogni scenario viene eseguito --repeat volte con una sessione nuova (come una
+richiesta HTTP); per ognuno vengono riportati p50/p95/p99 della latenza e le
+query SQL per chiamata (contate con collect_stats). Con --save il risultato
+viene scritto in JSON; con --baseline viene confrontato con un risultato
+precedente e lo script esce con codice 1 se il p95 peggiora oltre
+--tolerance o se aumentano le query per chiamata. Gli stessi scenari girano
+come test pytest-benchmark in tests/test_repositories_benchmark.py.
+
+    cd backend && python -m benchmarks.generate_data --scale 0.1 --yes
+    cd backend && python -m benchmarks.repositories --save base.json
+    cd backend && python -m benchmarks.repositories --baseline base.json
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.core.metrics import collect_stats
+from app.database import SessionLocal
+from app.models.client import CacheClienti
+from app.models.intervention import Intervento
+from app.models.lookup import LookupPriorita, LookupStatiTicket
+from app.models.ticket import Ticket
+from app.models.user import Tecnico
+from app.repositories.client import ClientRepository
+from app.repositories.dashboard import DashboardRepository
+from app.repositories.intervention import InterventionRepository
+from app.repositories.ticket import TicketRepository
+
+Scenario = Callable[[Any, Dict[str, Any]], Any]
+
+
+def carica_contesto(rng: random.Random) -> Dict[str, Any]:
+    """Ids used by the scenarios, read once from the dataset"""
+    db = SessionLocal()
+    try:
+        max_ticket = db.query(func.max(Ticket.id)).scalar()
+        max_intervento = db.query(func.max(Intervento.id)).scalar()
+        if not max_ticket or not max_intervento:
+            sys.exit("❌ Nessun ticket/intervento: eseguire prima benchmarks.generate_data")
+
+        # Cliente e tecnico con più ticket: il caso peggiore per i filtri
+        cliente_id = (
+            db.query(Ticket.cliente_id).group_by(Ticket.cliente_id)
+            .order_by(func.count(Ticket.id).desc()).limit(1).scalar()
+        )
+        tecnico_id = (
+            db.query(Ticket.tecnico_assegnato_id).filter(Ticket.tecnico_assegnato_id.isnot(None))
+            .group_by(Ticket.tecnico_assegnato_id).order_by(func.count(Ticket.id).desc()).limit(1).scalar()
+        ) or db.query(func.min(Tecnico.id)).scalar()
+        stato_aperto = (
+            db.query(LookupStatiTicket.id).filter(LookupStatiTicket.finale == 0)
+            .order_by(LookupStatiTicket.ordine).limit(1).scalar()
+        )
+        priorita_id = db.query(func.min(LookupPriorita.id)).filter(LookupPriorita.attivo == True).scalar()
+        numero = db.query(Ticket.numero).filter(Ticket.id == max_ticket // 2).scalar() or ""
+        ragione_sociale = db.query(CacheClienti.ragione_sociale).filter(CacheClienti.id == cliente_id).scalar() or ""
+
+        return {
+            "rng": rng,
+            "max_ticket": max_ticket,
+            "max_intervento": max_intervento,
+            "cliente_id": cliente_id,
+            "tecnico_id": tecnico_id,
+            "stato_aperto": stato_aperto,
+            "priorita_id": priorita_id,
+            "numero": numero,
+            "ricerca_cliente": ragione_sociale.split(" ")[0][:6],
+            "adesso": datetime.utcnow(),
+        }
+    finally:
+        db.close()
+
+
+SCENARI: List[Tuple[str, Scenario]] = [
+    ("ticket.list", lambda db, c: TicketRepository(db).get_all(limit=20)),
+    ("ticket.list.stato", lambda db, c: TicketRepository(db).get_all(limit=20, stato_id=c["stato_aperto"])),
+    ("ticket.list.tecnico", lambda db, c: TicketRepository(db).get_all(limit=20, tecnico_id=c["tecnico_id"])),
+    ("ticket.list.cliente", lambda db, c: TicketRepository(db).get_all(limit=20, cliente_id=c["cliente_id"])),
+    ("ticket.list.pagina_500", lambda db, c: TicketRepository(db).get_all(skip=10_000, limit=20)),
+    ("ticket.search.testo", lambda db, c: TicketRepository(db).get_all(limit=20, search="VPN")),
+    ("ticket.search.numero", lambda db, c: TicketRepository(db).get_all(limit=20, search=c["numero"])),
+    ("ticket.detail", lambda db, c: TicketRepository(db).get_by_id(c["rng"].randint(1, c["max_ticket"]))),
+    (
+        "intervention.list.30gg",
+        lambda db, c: InterventionRepository(db).get_all(
+            limit=20, data_from=c["adesso"] - timedelta(days=30), data_to=c["adesso"]
+        ),
+    ),
+    (
+        "intervention.list.tecnico",
+        lambda db, c: InterventionRepository(db).get_all(limit=20, tecnico_id=c["tecnico_id"]),
+    ),
+    (
+        "intervention.detail",
+        lambda db, c: InterventionRepository(db).get_by_id(c["rng"].randint(1, c["max_intervento"])),
+    ),
+    (
+        "intervention.sessions",
+        lambda db, c: InterventionRepository(db).get_sessioni(c["rng"].randint(1, c["max_intervento"])),
+    ),
+    ("client.search", lambda db, c: ClientRepository(db).get_all(limit=20, search=c["ricerca_cliente"])),
+    ("dashboard.ticket_stats", lambda db, c: DashboardRepository(db).get_ticket_stats()),
+    ("dashboard.intervento_stats", lambda db, c: DashboardRepository(db).get_intervento_stats()),
+    ("dashboard.recent_tickets", lambda db, c: DashboardRepository(db).get_recent_tickets()),
+    ("dashboard.interventi_oggi", lambda db, c: DashboardRepository(db).get_interventi_oggi()),
+]
+
+
+def _percentili(campioni: List[float]) -> Dict[str, float]:
+    quantili = statistics.quantiles(campioni, n=100, method="inclusive")
+    return {
+        "p50": round(quantili[49], 3),
+        "p95": round(quantili[94], 3),
+        "p99": round(quantili[98], 3),
+    }
+
+
+def esegui(nome: str, scenario: Scenario, contesto: Dict[str, Any], repeat: int, warmup: int) -> Dict[str, Any]:
+    """Run a scenario; latencies in milliseconds"""
+    durate: List[float] = []
+    query: List[int] = []
+    for i in range(warmup + repeat):
+        db = SessionLocal()
+        try:
+            with collect_stats() as stats:
+                inizio = time.perf_counter()
+                scenario(db, contesto)
+                durata = (time.perf_counter() - inizio) * 1000
+        finally:
+            db.close()
+        if i >= warmup:
+            durate.append(durata)
+            query.append(stats.queries)
+
+    return {**_percentili(durate), "queries": max(query)}
+
+
+def confronta(risultati: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolleranza: float) -> List[str]:
+    """Regressions against a previous run"""
+    regressioni = []
+    for nome, attuale in risultati.items():
+        precedente = baseline.get(nome)
+        if not precedente or "errore" in attuale or "errore" in precedente:
+            continue
+        if attuale["p95"] > precedente["p95"] * (1 + tolleranza):
+            regressioni.append(f"{nome}: p95 {precedente['p95']:.1f} → {attuale['p95']:.1f} ms")
+        if attuale["queries"] > precedente["queries"]:
+            regressioni.append(f"{nome}: query {precedente['queries']} → {attuale['queries']}")
+    return regressioni
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark repository sul dataset sintetico")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="solo gli scenari che iniziano con questo prefisso")
+    parser.add_argument("--save", help="scrive i risultati in JSON")
+    parser.add_argument("--baseline", help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="peggioramento p95 ammesso (default 20%%)")
+    args = parser.parse_args(argv)
+
+    contesto = carica_contesto(random.Random(args.seed))
+    risultati: Dict[str, Dict[str, Any]] = {}
+
+    print(f"{'scenario':32s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'query':>6s}")
+    for nome, scenario in SCENARI:
+        if args.only and not nome.startswith(args.only):
+            continue
+        try:
+            risultato = esegui(nome, scenario, contesto, max(args.repeat, 2), args.warmup)
+        except Exception as e:
+            risultati[nome] = {"errore": str(e).splitlines()[0]}
+            print(f"{nome:32s} ERRORE: {risultati[nome]['errore']}")
+            continue
+        risultati[nome] = risultato
+        print(
+            f"{nome:32s} {risultato['p50']:7.1f}ms {risultato['p95']:7.1f}ms "
+            f"{risultato['p99']:7.1f}ms {risultato['queries']:6d}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(risultati, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressioni = confronta(risultati, json.load(f), args.tolerance)
+        if regressioni:
+            print("\n❌ Regressioni:")
+            for r in regressioni:
+                print(f"   {r}")
+            sys.exit(1)
+        print("\n✅ Nessuna regressione rispetto alla baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark serializzazione di una pagina di interventi (100 righe).
+
+Confronta il percorso precedente (model_validate per riga, nuova validazione
+contro response_model, jsonable_encoder + json.dumps) con model_response
+(un solo validate_python da attributi + dump_json) e con ORJSONResponse.
+
+    cd backend && python -m benchmarks.serialization [--rows 100] [--repeat 200]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+from app.core.responses import type_adapter
+from app.schemas.intervention import InterventoListResponse, InterventoResponse
+
+
+def _righe(n: int):
+    """Fake ORM rows with the attributes read by InterventoResponse"""
+    adesso = datetime(2026, 1, 1, 8, 0)
+    stato = SimpleNamespace(id=2, codice="IN_CORSO", descrizione="In corso", colore="#ffaa00", finale=False)
+    tipo = SimpleNamespace(id=1, codice="ONSITE", descrizione="On site", colore="#3366ff", richiede_viaggio=True)
+    origine = SimpleNamespace(id=1, codice="TICKET", descrizione="Da ticket")
+    righe = []
+    for i in range(n):
+        righe.append(SimpleNamespace(
+            id=i + 1,
+            numero=f"INT-2026-{i + 1:05d}",
+            cliente=SimpleNamespace(id=i % 50 + 1, codice_gestionale=f"C{i % 50:05d}", ragione_sociale=f"Cliente {i % 50} S.r.l."),
+            tecnico=SimpleNamespace(id=i % 8 + 1, nome_completo=f"Tecnico {i % 8}", email=f"tecnico{i % 8}@example.com"),
+            ticket_id=i + 1000,
+            tipo_intervento=tipo,
+            stato=stato,
+            origine=origine,
+            oggetto=f"Intervento di manutenzione {i}",
+            descrizione_lavoro="Sostituzione componenti e verifica funzionamento " * 4,
+            note_interne=None,
+            data_inizio=adesso + timedelta(hours=i),
+            data_fine=adesso + timedelta(hours=i, minutes=90),
+            firma_cliente=None,
+            firma_nome="Mario Rossi",
+            firma_ruolo="Responsabile IT",
+            firma_data=adesso + timedelta(hours=i, minutes=95),
+            created_at=adesso,
+            updated_at=adesso,
+        ))
+    return righe
+
+
+def percorso_precedente(righe) -> bytes:
+    risposta = InterventoListResponse(
+        total=len(righe) * 10,
+        page=1,
+        limit=len(righe),
+        interventi=[InterventoResponse.model_validate(r) for r in righe],
+    )
+    # FastAPI: validazione contro response_model, poi jsonable_encoder e json.dumps
+    validata = InterventoListResponse.model_validate(risposta.model_dump())
+    return json.dumps(jsonable_encoder(validata), ensure_ascii=False).encode()
+
+
+def percorso_orjson(righe) -> bytes:
+    risposta = InterventoListResponse(
+        total=len(righe) * 10,
+        page=1,
+        limit=len(righe),
+        interventi=[InterventoResponse.model_validate(r) for r in righe],
+    )
+    validata = InterventoListResponse.model_validate(risposta.model_dump())
+    return ORJSONResponse(jsonable_encoder(validata)).body
+
+
+def percorso_type_adapter(righe) -> bytes:
+    adapter = type_adapter(InterventoListResponse)
+    valore = adapter.validate_python(
+        {"total": len(righe) * 10, "page": 1, "limit": len(righe), "interventi": righe},
+        from_attributes=True,
+    )
+    return adapter.dump_json(valore)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    righe = _righe(args.rows)
+    assert json.loads(percorso_type_adapter(righe)) == json.loads(percorso_precedente(righe))
+
+    print(f"{args.rows} righe, {args.repeat} ripetizioni")
+    for nome, funzione in (
+        ("model_validate + jsonable_encoder + json", percorso_precedente),
+        ("model_validate + jsonable_encoder + orjson", percorso_orjson),
+        ("TypeAdapter validate + dump_json", percorso_type_adapter),
+    ):
+        secondi = min(timeit.repeat(lambda: funzione(righe), number=args.repeat, repeat=3))
+        print(f"{nome:45s} {secondi / args.repeat * 1000:8.3f} ms/pagina")
+
+
+if __name__ == "__main__":
+    main()
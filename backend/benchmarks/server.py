@@ -0,0 +1,146 @@
+"""
+Confronto di throughput fra il server di sviluppo e quello di produzione.
+
+Avvia in sequenza l'applicazione come processo uvicorn singolo con --reload
+(la modalità usata finora da Dockerfile e docker-compose) e con gunicorn e
+worker uvicorn (gunicorn.conf.py). Per --duration secondi genera carico su
+--path con --concurrency richieste in parallelo, distribuite su --processes
+processi client perché il client non diventi il collo di bottiglia. Riporta
+richieste al secondo, p50/p95/p99 della latenza ed errori.
+
+Va eseguito su una macchina con più core, con database e Redis raggiungibili
+come per l'applicazione:
+
+    cd backend && python -m benchmarks.server --path /api/v1/lookup/ticket-states --token $TOKEN
+"""
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODALITA = {
+    "uvicorn --reload": lambda porta: [
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta), "--reload",
+    ],
+    "gunicorn": lambda porta: [
+        sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{porta}", "app.main:app",
+    ],
+}
+
+
+async def _carico_async(url: str, headers: Dict[str, str], concorrenza: int, durata: float) -> Tuple[List[float], int]:
+    latenze: List[float] = []
+    errori = 0
+    fine = time.monotonic() + durata
+
+    async def utente(client: httpx.AsyncClient):
+        nonlocal errori
+        while time.monotonic() < fine:
+            inizio = time.perf_counter()
+            try:
+                risposta = await client.get(url, headers=headers)
+                if risposta.status_code >= 400:
+                    errori += 1
+                    continue
+            except httpx.HTTPError:
+                errori += 1
+                continue
+            latenze.append(time.perf_counter() - inizio)
+
+    limiti = httpx.Limits(max_connections=concorrenza, max_keepalive_connections=concorrenza)
+    async with httpx.AsyncClient(limits=limiti, timeout=30.0) as client:
+        await asyncio.gather(*(utente(client) for _ in range(concorrenza)))
+    return latenze, errori
+
+
+def carico(url: str, headers: Dict[str, str], concorrenza: int, durata: float) -> Tuple[List[float], int]:
+    """Closed-loop load from one client process: latencies (s) of successful requests, errors"""
+    return asyncio.run(_carico_async(url, headers, concorrenza, durata))
+
+
+def attendi_avvio(url: str, timeout: float = 60.0) -> None:
+    scadenza = time.monotonic() + timeout
+    while time.monotonic() < scadenza:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server non avviato entro {timeout:.0f}s")
+
+
+def esegui(nome: str, args: argparse.Namespace) -> Dict[str, float]:
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        MODALITA[nome](args.port),
+        cwd=BACKEND,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        attendi_avvio(base + "/health")
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        url = base + args.path
+        # Riscaldamento: connessioni del pool e cache dei worker
+        carico(url, headers, args.concurrency, 2.0)
+
+        per_processo = max(args.concurrency // args.processes, 1)
+        with ProcessPoolExecutor(args.processes) as pool:
+            futuri = [pool.submit(carico, url, headers, per_processo, args.duration) for _ in range(args.processes)]
+            risultati = [f.result() for f in futuri]
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=60)
+
+    latenze = sorted(l for r in risultati for l in r[0])
+    errori = sum(r[1] for r in risultati)
+    if len(latenze) < 2:
+        raise RuntimeError(f"{nome}: nessuna risposta valida ({errori} errori)")
+    quantili = statistics.quantiles(latenze, n=100, method="inclusive")
+    return {
+        "rps": len(latenze) / args.duration,
+        "p50": quantili[49] * 1000,
+        "p95": quantili[94] * 1000,
+        "p99": quantili[98] * 1000,
+        "errori": errori,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Throughput uvicorn singolo vs gunicorn multi-worker")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--token", default="", help="access token per endpoint autenticati")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--processes", type=int, default=max((os.cpu_count() or 2) // 2, 1))
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    print(f"GET {args.path}, {args.concurrency} richieste in parallelo per {args.duration:.0f}s\n")
+    print(f"{'modalità':20s} {'req/s':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'errori':>7s}")
+    risultati = {}
+    for nome in MODALITA:
+        r = risultati[nome] = esegui(nome, args)
+        print(
+            f"{nome:20s} {r['rps']:9.1f} {r['p50']:7.1f}ms {r['p95']:7.1f}ms "
+            f"{r['p99']:7.1f}ms {r['errori']:7d}"
+        )
+
+    singolo, multi = risultati["uvicorn --reload"], risultati["gunicorn"]
+    print(f"\ngunicorn: {multi['rps'] / singolo['rps']:.1f}x throughput, p95 {singolo['p95']:.1f} → {multi['p95']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
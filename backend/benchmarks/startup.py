@@ -0,0 +1,133 @@
+"""
+Benchmark dei tempi di avvio.
+
+Ogni misura gira in un processo Python nuovo (niente moduli già in cache):
+tempo di `import app.main`, startup dell'applicazione (lifespan/eventi di
+startup) e latenza della prima richiesta, GET /health e facoltativamente un
+endpoint con accesso al database (--path, con --token se richiede login).
+Con --importtime vengono elencati i moduli più costosi secondo
+`python -X importtime`. Con --save/--baseline funziona come
+benchmarks.repositories ed esce con codice 1 se la mediana peggiora oltre
+--tolerance.
+
+    cd backend && python -m benchmarks.startup --importtime
+    cd backend && python -m benchmarks.startup --path /api/v1/lookup/ticket-states --token $TOKEN --save avvio.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Eseguito nel processo figlio: stampa i tempi in JSON sull'ultima riga
+FIGLIO = """
+import json, sys, time
+inizio = time.perf_counter()
+import app.main
+importato = time.perf_counter()
+from starlette.testclient import TestClient
+percorso, token = sys.argv[1], sys.argv[2]
+tempi = {"import": importato - inizio}
+with TestClient(app.main.app) as client:
+    t = time.perf_counter()
+    tempi["startup"] = t - importato
+    client.get("/health")
+    tempi["prima_richiesta"] = time.perf_counter() - t
+    if percorso:
+        t = time.perf_counter()
+        risposta = client.get(percorso, headers={"Authorization": f"Bearer {token}"} if token else {})
+        tempi["prima_richiesta_db"] = time.perf_counter() - t
+        tempi["status_db"] = risposta.status_code
+print(json.dumps(tempi))
+"""
+
+
+def misura(percorso: str, token: str) -> Dict[str, float]:
+    """Timings (seconds) of one cold start in a fresh interpreter"""
+    risultato = subprocess.run(
+        [sys.executable, "-c", FIGLIO, percorso, token],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(risultato.stdout.strip().splitlines()[-1])
+
+
+def moduli_lenti(limite: int) -> List[Tuple[float, str]]:
+    """
+    Slowest imports of import app.main (cumulative ms): third-party packages
+    by top-level name, application modules by full name.
+    """
+    risultato = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    moduli: Dict[str, float] = {}
+    for riga in risultato.stderr.splitlines():
+        if not riga.startswith("import time:") or "cumulative" in riga:
+            continue
+        _, cumulativo, nome = riga[len("import time:"):].split("|")
+        nome = nome.strip()
+        chiave = nome if nome.startswith("app.") else nome.split(".")[0]
+        moduli[chiave] = max(moduli.get(chiave, 0.0), int(cumulativo) / 1000)
+    moduli.pop("app", None)
+    moduli.pop("app.main", None)
+    return sorted(((durata, nome) for nome, durata in moduli.items()), reverse=True)[:limite]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Tempi di import, startup e prima richiesta")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", default="", help="endpoint GET con accesso al database")
+    parser.add_argument("--token", default="", help="access token per --path")
+    parser.add_argument("--importtime", action="store_true", help="elenca i moduli più lenti da importare")
+    parser.add_argument("--save", help="scrive i risultati in JSON")
+    parser.add_argument("--baseline", help="JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="peggioramento ammesso (default 20%%)")
+    args = parser.parse_args(argv)
+
+    campioni = [misura(args.path, args.token) for _ in range(max(args.repeat, 1))]
+    risultati: Dict[str, Any] = {}
+    for chiave in ("import", "startup", "prima_richiesta", "prima_richiesta_db"):
+        valori = [c[chiave] * 1000 for c in campioni if chiave in c]
+        if valori:
+            risultati[chiave] = round(statistics.median(valori), 1)
+            print(f"{chiave:20s} {risultati[chiave]:8.1f} ms (min {min(valori):.1f}, max {max(valori):.1f})")
+    if "status_db" in campioni[-1]:
+        print(f"{'':20s} GET {args.path} -> {campioni[-1]['status_db']}")
+
+    if args.importtime:
+        print("\nModuli più lenti da importare (cumulativo):")
+        for durata, nome in moduli_lenti(15):
+            print(f"  {durata:8.1f} ms  {nome}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(risultati, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressioni = [
+            f"{chiave}: {baseline[chiave]:.1f} → {valore:.1f} ms"
+            for chiave, valore in risultati.items()
+            if chiave in baseline and valore > baseline[chiave] * (1 + args.tolerance)
+        ]
+        if regressioni:
+            print("\n❌ Regressioni:")
+            for r in regressioni:
+                print(f"   {r}")
+            sys.exit(1)
+        print("\n✅ Nessuna regressione rispetto alla baseline")
+
+
+if __name__ == "__main__":
+    main()
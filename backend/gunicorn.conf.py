@@ -0,0 +1,48 @@
+"""
+Configurazione gunicorn per la produzione (worker uvicorn)
+
+Uso: gunicorn -c gunicorn.conf.py app.main:app
+
+L'app viene importata una volta nel master (preload) e condivisa con i
+worker via fork; connessioni al database, listener Redis e thread partono
+per ogni worker nel lifespan (app.main). Parametri in Settings (SERVER_*,
+WEB_CONCURRENCY).
+"""
+import os
+import shutil
+
+from app.core.config import settings
+
+# Metriche Prometheus aggregate fra i worker: va impostata prima che
+# prometheus_client venga importato (preload) e svuotata a ogni avvio.
+# Solo qui e non nell'ambiente del container: gli script lanciati a parte
+# troverebbero la directory assente o scriverebbero file nei dati dei worker
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/daassist-metrics")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+bind = settings.SERVER_BIND
+workers = settings.SERVER_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+keepalive = settings.SERVER_KEEPALIVE_SECONDS
+timeout = settings.SERVER_TIMEOUT_SECONDS
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT_SECONDS
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS // 10
+
+# Dietro nginx: X-Forwarded-* accettati solo dal proxy. FORWARDED_ALLOW_IPS
+# elenca indirizzi esatti (uvicorn 0.27 non accetta reti), mai "*" se la
+# porta del backend è raggiungibile senza passare da nginx
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+accesslog = "-"
+errorlog = "-"
+loglevel = "info"
+
+
+def child_exit(server, worker):
+    # I gauge "livesum" del worker terminato non vanno più sommati
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
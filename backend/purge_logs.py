@@ -0,0 +1,57 @@
+"""
+Script per la pulizia delle tabelle di log secondo le politiche di retention (da cron, di notte)
+
+Elimina a blocchi di RETENTION_BATCH_SIZE, con una pausa fra un blocco e
+l'altro, le righe più vecchie della retention configurata (RETENTION_*_DAYS)
+di sync_log, calendario_sync_log, slow_query_log e asset_credenziali_accessi;
+lo storico ticket viene spostato nello schema archivio. Si ferma dopo
+RETENTION_MAX_MINUTES: l'esecuzione successiva riprende dalle righe rimaste.
+
+Uso: python purge_logs.py [tabella]
+"""
+import sys
+import time
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.repositories.retention import ARCHIVIA, RetentionRepository, get_politiche
+
+
+def purge_logs(tabella=None):
+    print("Pulizia tabelle di log...")
+    scadenza = time.monotonic() + settings.RETENTION_MAX_MINUTES * 60
+
+    db = SessionLocal()
+    errori = 0
+    try:
+        repo = RetentionRepository(db)
+        for politica in get_politiche():
+            nome = politica["modello"].__tablename__
+            if (tabella and nome != tabella) or not politica["giorni"]:
+                continue
+            try:
+                r = repo.applica(
+                    politica,
+                    settings.RETENTION_BATCH_SIZE,
+                    settings.RETENTION_PAUSE_MS / 1000,
+                    settings.RETENTION_LOCK_TIMEOUT_MS,
+                    scadenza,
+                )
+            except Exception as e:
+                errori += 1
+                print(f"  - {nome}: ERRORE {str(e).splitlines()[0]}")
+                continue
+            stato = "OK" if r["completato"] else "INTERROTTO (tempo massimo)"
+            azione = "archiviate" if r["azione"] == ARCHIVIA else "eliminate"
+            print(f"  - {nome} (> {politica['giorni']} giorni): {r['righe']} righe {azione} "
+                  f"in {r['batch']} batch, {r['secondi']}s - {stato}")
+    finally:
+        db.close()
+
+    print("Completato" + (f" con {errori} errori" if errori else ""))
+    if errori:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    purge_logs(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,25 @@
+"""
+Script per la sincronizzazione incrementale dei calendari esterni (da cron)
+
+Uso: python sync_calendars.py [tecnico_id]
+"""
+import asyncio
+import sys
+
+from app.services.calendar_sync import CalendarSyncEngine
+
+
+def sync_calendars(tecnico_id=None):
+    print("Sincronizzazione calendari...")
+    risultati = asyncio.run(CalendarSyncEngine().sync_all(tecnico_id))
+
+    for r in risultati:
+        stato = f"ERRORE: {r['errore']}" if r.get("errore") else "OK"
+        print(f"  - Tecnico {r.get('tecnico_id')} ({r.get('provider')}): "
+              f"{r['importati']} importati, {r['esportati']} esportati - {stato}")
+
+    print(f"Completato: {len(risultati)} account sincronizzati")
+
+
+if __name__ == "__main__":
+    sync_calendars(int(sys.argv[1]) if len(sys.argv) > 1 else None)
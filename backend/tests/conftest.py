@@ -0,0 +1,98 @@
+"""
+Fixture comuni dei test.
+
+I test girano senza PostgreSQL né Redis: i repository e i servizi che
+accettano una session factory ricevono un database SQLite in memoria con
+tutte le tabelle dei modelli. Le query specifiche di PostgreSQL (range,
+lock) usano pg_session_factory, su un database vuoto indicato da
+TEST_DATABASE_URL; senza la variabile quei test vengono saltati.
+
+Lo schema archivio (fixture archivio) è un database SQLite collegato con
+ATTACH; le partizioni annuali (solo PostgreSQL) non vengono create.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Base
+from app.models.archive import archivio_metadata
+from app.models.intervention import Intervento
+from app.models.user import Tecnico
+from app.repositories.archive import ArchiveRepository
+
+
+@pytest.fixture
+def session_factory():
+    # Una sola connessione condivisa fra thread (asyncio.to_thread nei servizi)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def archivio(session_factory, monkeypatch):
+    engine = session_factory.kw["bind"]
+    with engine.connect() as conn:
+        conn.execute(text("ATTACH DATABASE ':memory:' AS archivio"))
+        archivio_metadata.create_all(conn)
+        conn.commit()
+    monkeypatch.setattr(ArchiveRepository, "_crea_partizione", lambda self, tabella, anno: None)
+
+
+@pytest.fixture
+def pg_session_factory():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL non impostata (PostgreSQL di test)")
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def tecnico(db) -> Tecnico:
+    tecnico = Tecnico(
+        username="mario.rossi",
+        email="mario.rossi@example.com",
+        hashed_password="x",
+        nome="Mario",
+        cognome="Rossi",
+        ruolo_id=1,
+    )
+    db.add(tecnico)
+    db.commit()
+    return tecnico
+
+
+@pytest.fixture
+def intervento(db, tecnico) -> Intervento:
+    intervento = Intervento(
+        numero="INT-2026-0001",
+        origine_id=1,
+        cliente_id=1,
+        tipo_intervento_id=1,
+        stato_id=1,
+        tecnico_id=tecnico.id,
+        oggetto="Manutenzione",
+    )
+    db.add(intervento)
+    db.commit()
+    return intervento
@@ -0,0 +1,140 @@
+"""
+Finto server Google Calendar in-process, da montare con httpx.MockTransport.
+
+Implementa quanto usato da GoogleCalendarProvider: lista eventi con
+paginazione e syncToken (delta dall'ultimo token, 410 dopo expire_sync_tokens),
+endpoint batch multipart/mixed (POST/PATCH/DELETE) ed endpoint token OAuth.
+Con fail_next si accodano risposte di errore (es. 429 con Retry-After) per le
+richieste successive; gli eventi con titolo in rifiuta_titoli vengono
+respinti dal batch con 400.
+"""
+import json
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+
+class FakeGoogleCalendar:
+    def __init__(self, page_size: int = 250):
+        self.page_size = page_size
+        self.eventi: Dict[str, dict] = {}
+        self.versioni: Dict[str, int] = {}  # id evento -> sequenza dell'ultima modifica
+        self.sequenza = 0
+        self.sync_token_validi: Set[str] = set()
+        self.errori_in_coda: List[httpx.Response] = []
+        self.rifiuta_titoli: Set[str] = set()
+        self.richieste: List[httpx.Request] = []
+        self.operazioni_batch: List[Tuple[str, str]] = []  # (metodo, id evento)
+
+    # Stato lato provider (modifiche fatte "dall'utente" sul calendario esterno)
+
+    def crea(self, titolo: str, inizio: str, fine: str, **campi) -> str:
+        event_id = f"g{len(self.eventi) + 1}"
+        self._salva(event_id, {"summary": titolo, "start": {"dateTime": inizio}, "end": {"dateTime": fine}, **campi})
+        return event_id
+
+    def modifica(self, event_id: str, **campi) -> None:
+        self._salva(event_id, {**self.eventi[event_id], **campi})
+
+    def cancella(self, event_id: str) -> None:
+        self._salva(event_id, {**self.eventi[event_id], "status": "cancelled"})
+
+    def expire_sync_tokens(self) -> None:
+        self.sync_token_validi.clear()
+
+    def fail_next(self, status_code: int, headers: Optional[Dict[str, str]] = None) -> None:
+        self.errori_in_coda.append(httpx.Response(status_code, headers=headers or {}))
+
+    def attivi(self) -> Dict[str, dict]:
+        return {k: v for k, v in self.eventi.items() if v.get("status") != "cancelled"}
+
+    def _salva(self, event_id: str, risorsa: dict) -> None:
+        self.sequenza += 1
+        # Come Google: i campi vuoti non vengono restituiti
+        risorsa = {k: v for k, v in risorsa.items() if v != ""}
+        risorsa.update(id=event_id, status=risorsa.get("status", "confirmed"))
+        self.eventi[event_id] = risorsa
+        self.versioni[event_id] = self.sequenza
+
+    # Trasporto
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.richieste.append(request)
+        if self.errori_in_coda:
+            return self.errori_in_coda.pop(0)
+        if request.url.path.endswith("/token"):
+            return httpx.Response(200, json={"access_token": "nuovo-access", "expires_in": 3600})
+        if request.url.path.startswith("/batch/"):
+            return self._batch(request)
+        if request.method == "GET" and request.url.path.endswith("/events"):
+            return self._lista(request)
+        return httpx.Response(404)
+
+    def _lista(self, request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        sync_token = params.get("syncToken")
+        if sync_token is not None:
+            if sync_token not in self.sync_token_validi:
+                return httpx.Response(410, json={"error": {"code": 410, "message": "Sync token is no longer valid"}})
+            dal = int(sync_token.split("-")[1])
+            ids = [k for k, v in self.versioni.items() if v > dal]
+        else:
+            ids = list(self.attivi())
+
+        ids.sort(key=self.versioni.get)
+        inizio = int(params.get("pageToken", 0))
+        fine = inizio + min(self.page_size, int(params.get("maxResults", 250)))
+        corpo = {"items": [self.eventi[k] for k in ids[inizio:fine]]}
+        if fine < len(ids):
+            corpo["nextPageToken"] = str(fine)
+        else:
+            token = f"st-{self.sequenza}"
+            self.sync_token_validi.add(token)
+            corpo["nextSyncToken"] = token
+        return httpx.Response(200, json=corpo)
+
+    def _batch(self, request: httpx.Request) -> httpx.Response:
+        boundary = request.headers["Content-Type"].split("boundary=")[1]
+        risposte = []
+        for parte in request.content.decode().split(f"--{boundary}"):
+            if "Content-ID" not in parte:
+                continue
+            content_id = re.search(r"Content-ID: <item(\d+)>", parte).group(1)
+            _, _, http_part = parte.partition("\r\n\r\n")
+            linea, _, resto = http_part.partition("\r\n")
+            metodo, percorso, _ = linea.split(" ")
+            _, _, corpo = resto.partition("\r\n\r\n")
+            status_code, dati = self._operazione(metodo, percorso, json.loads(corpo) if corpo.strip() else None)
+            risposte.append(
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-item{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status_code} X\r\n"
+                "Content-Type: application/json\r\n\r\n"
+                f"{json.dumps(dati) if dati is not None else ''}\r\n"
+            )
+        risposta_boundary = "batch_risposta"
+        testo = "".join(f"--{risposta_boundary}\r\n{r}" for r in risposte) + f"--{risposta_boundary}--\r\n"
+        return httpx.Response(
+            200,
+            content=testo.encode(),
+            headers={"Content-Type": f"multipart/mixed; boundary={risposta_boundary}"},
+        )
+
+    def _operazione(self, metodo: str, percorso: str, corpo: Optional[dict]) -> Tuple[int, Optional[dict]]:
+        if corpo is not None and corpo.get("summary") in self.rifiuta_titoli:
+            return 400, {"error": {"code": 400, "message": "Invalid event"}}
+        if metodo == "POST":
+            event_id = f"g{len(self.eventi) + 1}"
+            self._salva(event_id, corpo)
+        else:
+            event_id = percorso.rsplit("/", 1)[1]
+            if event_id not in self.attivi():
+                return 404, None
+            if metodo == "DELETE":
+                self.cancella(event_id)
+                self.operazioni_batch.append((metodo, event_id))
+                return 204, None
+            self.modifica(event_id, **corpo)
+        self.operazioni_batch.append((metodo, event_id))
+        return 200, self.eventi[event_id]
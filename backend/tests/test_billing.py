@@ -0,0 +1,52 @@
+"""Ore utilizzate sui contratti, aggiornate nella stessa transazione delle modifiche"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.models.client import CacheContratti
+from app.models.intervention import InterventoSessione
+from app.repositories.billing import BillingRepository
+from app.repositories.intervention import InterventionRepository
+
+
+class _CambioContratto(BaseModel):
+    # InterventoUpdate non espone il contratto: update() accetta qualsiasi schema
+    contratto_id: Optional[int] = None
+
+
+def _contratto(db, codice: str) -> CacheContratti:
+    contratto = CacheContratti(
+        codice_gestionale=codice,
+        cliente_id=1,
+        descrizione=f"Contratto {codice}",
+        data_inizio=date(2026, 1, 1),
+        ore_incluse=Decimal("100"),
+        ultimo_sync=datetime.utcnow(),
+    )
+    db.add(contratto)
+    db.commit()
+    return contratto
+
+
+def _ore(db, contratto: CacheContratti) -> Decimal:
+    db.expire_all()
+    return Decimal(str(db.get(CacheContratti, contratto.id).ore_utilizzate))
+
+
+def test_cambio_contratto_aggiorna_entrambi(db, tecnico, intervento):
+    vecchio, nuovo = _contratto(db, "C1"), _contratto(db, "C2")
+    intervento.contratto_id = vecchio.id
+    db.add(InterventoSessione(
+        intervento_id=intervento.id, tecnico_id=tecnico.id, tipo_intervento_id=1,
+        data=date(2026, 11, 2), ora_inizio=time(9), ora_fine=time(11), durata_minuti=120,
+    ))
+    BillingRepository(db).refresh_ore_contratto(vecchio.id)
+    db.commit()
+    assert _ore(db, vecchio) == Decimal("2")
+
+    InterventionRepository(db).update(intervento, _CambioContratto(contratto_id=nuovo.id))
+
+    assert _ore(db, vecchio) == Decimal("0")
+    assert _ore(db, nuovo) == Decimal("2")
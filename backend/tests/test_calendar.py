@@ -0,0 +1,119 @@
+"""Conflitti di calendario e disponibilità dei tecnici"""
+import threading
+from datetime import datetime
+
+import pytest
+
+from app.core.exceptions import ConflictException
+from app.models.calendar import CalendarioEvento
+from app.models.lookup import LookupRuoliUtente
+from app.models.user import Tecnico
+from app.repositories.calendar import CalendarRepository
+
+
+def _tecnico(db, username: str, cognome: str) -> Tecnico:
+    tecnico = Tecnico(
+        username=username,
+        email=f"{username}@example.com",
+        hashed_password="x",
+        nome="Test",
+        cognome=cognome,
+        ruolo_id=1,
+    )
+    db.add(tecnico)
+    db.commit()
+    return tecnico
+
+
+def test_disponibilita_fonde_gli_impegni_e_li_sottrae_dall_orario(db, tecnico, monkeypatch):
+    libero = _tecnico(db, "luca.bianchi", "Bianchi")
+    # Lunedì 2 novembre 2026, orario 8-18: impegni sovrapposti e contigui fusi
+    occupato = [
+        (tecnico.id, datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 10), "EVENTO", 1),
+        (tecnico.id, datetime(2026, 11, 2, 9, 30), datetime(2026, 11, 2, 11), "SESSIONE", 2),
+        (tecnico.id, datetime(2026, 11, 2, 11), datetime(2026, 11, 2, 11, 20), "EVENTO", 3),
+        (tecnico.id, datetime(2026, 11, 2, 17), datetime(2026, 11, 2, 20), "EVENTO", 4),
+    ]
+    repo = CalendarRepository(db)
+    monkeypatch.setattr(repo, "get_busy_intervals", lambda *args, **kwargs: occupato)
+
+    risultato = {
+        r["tecnico_id"]: r
+        for r in repo.get_availability(datetime(2026, 11, 2), datetime(2026, 11, 3), durata_minima_minuti=30)
+    }
+
+    mario = risultato[tecnico.id]
+    assert [(b["inizio"], b["fine"]) for b in mario["occupato"]] == [
+        (datetime(2026, 11, 2, 9), datetime(2026, 11, 2, 11, 20)),
+        (datetime(2026, 11, 2, 17), datetime(2026, 11, 2, 20)),
+    ]
+    assert [(s["inizio"], s["fine"]) for s in mario["libero"]] == [
+        (datetime(2026, 11, 2, 8), datetime(2026, 11, 2, 9)),
+        (datetime(2026, 11, 2, 11, 20), datetime(2026, 11, 2, 17)),
+    ]
+    assert mario["minuti_liberi"] == 400 and not mario["libero_intero_periodo"]
+
+    assert risultato[libero.id]["libero_intero_periodo"]
+    assert risultato[libero.id]["minuti_liberi"] == 600
+
+
+@pytest.fixture
+def pg_tecnico(pg_session_factory) -> int:
+    db = pg_session_factory()
+    try:
+        db.add(LookupRuoliUtente(id=1, codice="TECNICO", descrizione="Tecnico"))
+        db.flush()
+        return _tecnico(db, "mario.rossi", "Rossi").id
+    finally:
+        db.close()
+
+
+def _valori(tecnico_id: int, ora_inizio: int, ora_fine: int) -> dict:
+    return {
+        "titolo": "Manutenzione",
+        "data_inizio": datetime(2026, 11, 2, ora_inizio),
+        "data_fine": datetime(2026, 11, 2, ora_fine),
+        "tecnico_principale_id": tecnico_id,
+    }
+
+
+def test_evento_sovrapposto_rifiutato(pg_session_factory, pg_tecnico):
+    db = pg_session_factory()
+    try:
+        repo = CalendarRepository(db)
+        repo.create_evento(_valori(pg_tecnico, 9, 11))
+
+        with pytest.raises(ConflictException) as errore:
+            repo.create_evento(_valori(pg_tecnico, 10, 12))
+        assert [c["tipo"] for c in errore.value.detail] == ["EVENTO"]
+        db.rollback()
+
+        # Intervalli semiaperti: un evento che inizia alla fine del precedente è ammesso
+        repo.create_evento(_valori(pg_tecnico, 11, 12))
+        assert db.query(CalendarioEvento).count() == 2
+    finally:
+        db.close()
+
+
+def test_eventi_concorrenti_sovrapposti(pg_session_factory, pg_tecnico):
+    partenza = threading.Barrier(2)
+    esiti = []
+
+    def crea():
+        db = pg_session_factory()
+        try:
+            partenza.wait()
+            CalendarRepository(db).create_evento(_valori(pg_tecnico, 9, 11))
+            esiti.append("creato")
+        except ConflictException:
+            esiti.append("conflitto")
+        finally:
+            db.close()
+
+    thread = [threading.Thread(target=crea) for _ in range(2)]
+    for t in thread:
+        t.start()
+    for t in thread:
+        t.join()
+
+    assert sorted(esiti) == ["conflitto", "creato"]
@@ -0,0 +1,75 @@
+"""Collegamento OAuth dei calendari: il callback vale solo nel browser che ha avviato il flusso"""
+from datetime import datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1 import calendar as calendar_api
+from app.api.v1.auth import get_current_user
+from app.core.security import create_access_token
+from app.database import get_db
+from app.models.calendar import CalendarioAccount
+from app.services.calendar_sync import GoogleCalendarProvider
+
+BASE = "https://testserver"
+
+
+@pytest.fixture
+def app(session_factory, tecnico, monkeypatch):
+    async def exchange_code(self, code):
+        return f"access-{code}", "refresh", datetime.utcnow() + timedelta(hours=1)
+
+    monkeypatch.setattr(GoogleCalendarProvider, "exchange_code", exchange_code)
+
+    def get_db_test():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(calendar_api.router, prefix="/api/v1/calendar")
+    app.dependency_overrides[get_db] = get_db_test
+    app.dependency_overrides[get_current_user] = lambda: tecnico
+    return app
+
+
+def _avvia(client: TestClient) -> str:
+    risposta = client.get("/api/v1/calendar/sync/google/authorize")
+    assert risposta.status_code == 200
+    return parse_qs(urlparse(risposta.json()["authorize_url"]).query)["state"][0]
+
+
+def test_callback_nello_stesso_browser(app, db, tecnico):
+    browser = TestClient(app, base_url=BASE)
+    state = _avvia(browser)
+
+    risposta = browser.get("/api/v1/calendar/sync/google/callback", params={"code": "abc", "state": state})
+
+    assert risposta.status_code == 200
+    account = db.query(CalendarioAccount).one()
+    assert account.tecnico_id == tecnico.id and account.access_token == "access-abc"
+    assert calendar_api.OAUTH_NONCE_COOKIE not in browser.cookies
+
+
+def test_callback_rifiutato_in_un_altro_browser(app, db, tecnico):
+    # URL di consenso avviato dall'attaccante e completato dalla vittima
+    state = _avvia(TestClient(app, base_url=BASE))
+    vittima = TestClient(app, base_url=BASE)
+    risposta = vittima.get("/api/v1/calendar/sync/google/callback", params={"code": "abc", "state": state})
+    assert risposta.status_code == 400
+
+    # Il nonce di un altro flusso non vale per questo state
+    _avvia(vittima)
+    risposta = vittima.get("/api/v1/calendar/sync/google/callback", params={"code": "abc", "state": state})
+    assert risposta.status_code == 400
+
+    # Un token di accesso non è uno state
+    token = create_access_token(f"{tecnico.id}:GOOGLE")
+    risposta = vittima.get("/api/v1/calendar/sync/google/callback", params={"code": "abc", "state": token})
+    assert risposta.status_code == 400
+
+    assert db.query(CalendarioAccount).count() == 0
@@ -0,0 +1,200 @@
+"""Sincronizzazione calendari contro il finto server Google (tests.fake_google_calendar)"""
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.models.calendar import CalendarioAccount, CalendarioEvento
+from app.services.calendar_sync import PROVIDER_GOOGLE, CalendarSyncEngine, _retry_after
+from tests.fake_google_calendar import FakeGoogleCalendar
+
+
+@pytest.fixture
+def google():
+    return FakeGoogleCalendar()
+
+
+@pytest.fixture
+async def client(google):
+    async with httpx.AsyncClient(transport=httpx.MockTransport(google)) as client:
+        yield client
+
+
+@pytest.fixture
+def engine(session_factory):
+    return CalendarSyncEngine(session_factory=session_factory)
+
+
+@pytest.fixture
+def account(db, tecnico) -> CalendarioAccount:
+    account = CalendarioAccount(
+        tecnico_id=tecnico.id,
+        provider=PROVIDER_GOOGLE,
+        access_token="access",
+        refresh_token="refresh",
+        token_scadenza=datetime.utcnow() + timedelta(hours=1),
+    )
+    db.add(account)
+    db.commit()
+    return account
+
+
+def _evento(db, tecnico, titolo: str, ora: int) -> CalendarioEvento:
+    evento = CalendarioEvento(
+        titolo=titolo,
+        data_inizio=datetime(2026, 11, 2, ora),
+        data_fine=datetime(2026, 11, 2, ora + 1),
+        tecnico_principale_id=tecnico.id,
+    )
+    db.add(evento)
+    db.commit()
+    return evento
+
+
+def _eventi(db):
+    db.expire_all()
+    return {e.google_event_id: e for e in db.query(CalendarioEvento).all()}
+
+
+def _batch(google):
+    return [r for r in google.richieste if r.url.path.startswith("/batch/")]
+
+
+async def test_import_completo_poi_incrementale(engine, client, google, account, db):
+    google.page_size = 2
+    primo = google.crea("Sopralluogo", "2026-11-02T09:00:00Z", "2026-11-02T10:00:00Z", location="Via Roma 1")
+    secondo = google.crea("Manutenzione", "2026-11-03T14:00:00+01:00", "2026-11-03T15:30:00+01:00")
+    terzo = google.crea("Collaudo", "2026-11-04T08:00:00Z", "2026-11-04T09:00:00Z")
+
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["importati"] == 3 and risultato["errori"] == 0
+    eventi = _eventi(db)
+    assert set(eventi) == {primo, secondo, terzo}
+    assert eventi[primo].luogo == "Via Roma 1"
+    assert eventi[secondo].data_inizio == datetime(2026, 11, 3, 13, 0)
+
+    google.modifica(primo, summary="Sopralluogo rinviato")
+    google.cancella(terzo)
+    google.richieste.clear()
+
+    risultato = await engine.sync_account(account.id, client)
+
+    # Solo le modifiche dall'ultimo token, in un'unica pagina
+    liste = [r for r in google.richieste if r.url.path.endswith("/events")]
+    assert len(liste) == 1 and "syncToken" in liste[0].url.params
+    assert risultato["importati"] == 2
+    eventi = _eventi(db)
+    assert eventi[primo].titolo == "Sopralluogo rinviato"
+    assert eventi[terzo].attivo is False
+    assert not _batch(google)
+
+
+async def test_sync_token_scaduto_risincronizza(engine, client, google, account, db):
+    google.crea("Sopralluogo", "2026-11-02T09:00:00Z", "2026-11-02T10:00:00Z")
+    await engine.sync_account(account.id, client)
+    google.expire_sync_tokens()
+    google.crea("Manutenzione", "2026-11-03T09:00:00Z", "2026-11-03T10:00:00Z")
+
+    risultato = await engine.sync_account(account.id, client)
+
+    stati = [r.url.params.get("syncToken") is not None for r in google.richieste if r.url.path.endswith("/events")]
+    assert stati[-2:] == [True, False]  # 410, poi lista completa senza token
+    assert risultato["errori"] == 0
+    assert len(_eventi(db)) == 2  # nessun duplicato dalla lista completa
+
+
+async def test_429_rispetta_retry_after(engine, client, google, account, db):
+    google.crea("Sopralluogo", "2026-11-02T09:00:00Z", "2026-11-02T10:00:00Z")
+    google.fail_next(429, {"Retry-After": "0"})
+    google.fail_next(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["errori"] == 0 and risultato["importati"] == 1
+    assert len(google.richieste) == 3
+
+
+async def test_export_in_batch_senza_eco(engine, client, google, account, db, tecnico):
+    locali = [_evento(db, tecnico, f"Intervento {i}", 8 + i) for i in range(3)]
+    aggiornati_prima = {e.id: e.updated_at for e in locali}
+
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["esportati"] == 3
+    assert len(_batch(google)) == 1
+    assert [metodo for metodo, _ in google.operazioni_batch] == ["POST"] * 3
+    eventi = _eventi(db)
+    assert set(eventi) == set(google.attivi())
+    # L'id esterno non deve far risultare l'evento modificato
+    assert {e.id: e.updated_at for e in eventi.values()} == aggiornati_prima
+
+    google.richieste.clear()
+    risultato = await engine.sync_account(account.id, client)
+
+    # Il delta restituisce gli eventi appena creati: identici, nessun aggiornamento né rinvio
+    assert risultato["importati"] == 0 and risultato["esportati"] == 0
+    assert not _batch(google)
+
+
+async def test_modifiche_locali_ed_eliminazioni(engine, client, google, account, db, tecnico):
+    modificato = _evento(db, tecnico, "Intervento", 9)
+    eliminato = _evento(db, tecnico, "Da annullare", 11)
+    await engine.sync_account(account.id, client)
+    google.operazioni_batch.clear()
+
+    modificato = db.get(CalendarioEvento, modificato.id)
+    modificato.titolo = "Intervento spostato"
+    db.get(CalendarioEvento, eliminato.id).attivo = False
+    db.commit()
+
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["esportati"] == 2
+    assert sorted(metodo for metodo, _ in google.operazioni_batch) == ["DELETE", "PATCH"]
+    assert [e["summary"] for e in google.attivi().values()] == ["Intervento spostato"]
+
+
+async def test_export_fallito_viene_ritentato(engine, client, google, account, db, tecnico):
+    _evento(db, tecnico, "Valido", 9)
+    rifiutato = _evento(db, tecnico, "Rifiutato", 11)
+    google.rifiuta_titoli.add("Rifiutato")
+
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["esportati"] == 1 and risultato["errori"] == 1
+    db.expire_all()
+    assert json.loads(db.get(CalendarioAccount, account.id).export_in_sospeso) == [rifiutato.id]
+
+    # Nessuna modifica locale: l'evento viene ritentato comunque
+    google.rifiuta_titoli.clear()
+    google.operazioni_batch.clear()
+    risultato = await engine.sync_account(account.id, client)
+
+    assert risultato["esportati"] == 1 and risultato["errori"] == 0
+    db.expire_all()
+    assert google.operazioni_batch == [("POST", db.get(CalendarioEvento, rifiutato.id).google_event_id)]
+    assert db.get(CalendarioAccount, account.id).export_in_sospeso is None
+
+
+async def test_token_oauth_cifrati(account, db):
+    salvati = db.execute(
+        text("SELECT access_token, refresh_token FROM calendario_account WHERE id = :id"), {"id": account.id}
+    ).one()
+
+    assert "access" not in salvati.access_token and "refresh" not in salvati.refresh_token
+    db.expire_all()
+    account = db.get(CalendarioAccount, account.id)
+    assert (account.access_token, account.refresh_token) == ("access", "refresh")
+
+
+def test_retry_after():
+    assert _retry_after("2", 5) == 2
+    assert _retry_after(None, 5) == 5
+    assert _retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 5) == 0
+    assert 59 < _retry_after(
+        (datetime.utcnow() + timedelta(seconds=60)).strftime("%a, %d %b %Y %H:%M:%S GMT"), 5
+    ) <= 60
+    assert _retry_after("domani", 5) == 5
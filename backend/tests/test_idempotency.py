@@ -0,0 +1,63 @@
+"""IdempotencyMiddleware: ambito per utente e richieste più lunghe del lock"""
+import asyncio
+from datetime import timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.core.idempotency import IdempotencyMiddleware, IdempotencyStore
+from app.core.security import create_access_token
+
+
+def _app(durata: float = 0.0):
+    app = FastAPI()
+    app.state.esecuzioni = 0
+
+    @app.post("/tickets")
+    async def crea():
+        app.state.esecuzioni += 1
+        await asyncio.sleep(durata)
+        return {"numero": app.state.esecuzioni}
+
+    store = IdempotencyStore()
+    store._redis_provato = True  # solo memoria
+    return app, IdempotencyMiddleware(app, store)
+
+
+def _headers(token: str, chiave: str = "chiave-1") -> dict:
+    return {"Authorization": f"Bearer {token}", "Idempotency-Key": chiave}
+
+
+async def test_reinvio_dopo_refresh_del_token():
+    app, middleware = _app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+        primo = await client.post("/tickets", json={}, headers=_headers(create_access_token("mario")))
+        # Stesso utente, token nuovo (exp diverso)
+        reinvio = await client.post(
+            "/tickets", json={}, headers=_headers(create_access_token("mario", expires_delta=timedelta(hours=2)))
+        )
+        altro_utente = await client.post("/tickets", json={}, headers=_headers(create_access_token("luigi")))
+
+    assert reinvio.headers.get("idempotent-replayed") == "true"
+    assert reinvio.json() == primo.json()
+    assert altro_utente.json() == {"numero": 2}
+    assert app.state.esecuzioni == 2
+
+
+async def test_richiesta_piu_lunga_del_lock(monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 1)
+    app, middleware = _app(durata=2.5)
+    headers = _headers(create_access_token("mario"))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test") as client:
+        primo = asyncio.create_task(client.post("/tickets", json={}, headers=headers))
+        await asyncio.sleep(1.8)  # oltre IDEMPOTENCY_LOCK_SECONDS
+        durante = await client.post("/tickets", json={}, headers=headers)
+        primo = await primo
+        dopo = await client.post("/tickets", json={}, headers=headers)
+
+    assert durante.status_code == 409
+    assert dopo.headers.get("idempotent-replayed") == "true" and dopo.json() == primo.json()
+    assert app.state.esecuzioni == 1
@@ -0,0 +1,33 @@
+"""Routing delle letture sulle repliche: esclusione delle repliche guaste"""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.database import ReplicaRouter
+
+
+def test_replica_esclusa_al_primo_errore_di_connessione(monkeypatch):
+    # Il controllo di ritardo usa funzioni di PostgreSQL
+    monkeypatch.setattr(database, "_QUERY_RITARDO", text("SELECT 0"))
+    stato = {"raggiungibile": True}
+
+    def connetti():
+        if not stato["raggiungibile"]:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(":memory:")
+
+    sana = create_engine("sqlite://", poolclass=NullPool)
+    guasta = create_engine("sqlite://", creator=connetti, poolclass=NullPool)
+    router = ReplicaRouter([sana, guasta])
+    assert {router.scegli() for _ in range(4)} == {sana, guasta}
+
+    stato["raggiungibile"] = False
+    with pytest.raises(exc.OperationalError):
+        with guasta.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    # Esclusa subito, senza aspettare REPLICA_HEALTH_CHECK_SECONDS
+    assert {router.scegli() for _ in range(4)} == {sana}
@@ -0,0 +1,57 @@
+"""
+Scenari di benchmarks.repositories come test pytest-benchmark.
+
+Girano solo sul dataset sintetico (benchmarks.generate_data), altrimenti
+vengono saltati. Oltre ai tempi, extra_info riporta le query SQL per
+chiamata. Confronto con un'esecuzione salvata:
+
+    cd backend && python -m benchmarks.generate_data --scale 0.1 --yes
+    cd backend && python -m pytest tests/test_repositories_benchmark.py --benchmark-autosave
+    cd backend && python -m pytest tests/test_repositories_benchmark.py --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.core.metrics import collect_stats  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models.user import Tecnico  # noqa: E402
+from benchmarks.repositories import SCENARI, carica_contesto  # noqa: E402
+
+
+def _dataset_presente() -> bool:
+    try:
+        db = SessionLocal()
+        try:
+            return db.query(Tecnico.id).filter(Tecnico.username == "bench.admin").first() is not None
+        finally:
+            db.close()
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="module")
+def contesto():
+    if not _dataset_presente():
+        pytest.skip("Dataset sintetico assente (benchmarks.generate_data)")
+    return carica_contesto(random.Random(42))
+
+
+@pytest.mark.parametrize("scenario", [s for _, s in SCENARI], ids=[nome for nome, _ in SCENARI])
+def test_repository(benchmark, contesto, scenario):
+    query = []
+
+    def chiamata():
+        # Sessione nuova per chiamata, come una richiesta HTTP
+        db = SessionLocal()
+        try:
+            with collect_stats() as stats:
+                scenario(db, contesto)
+            query.append(stats.queries)
+        finally:
+            db.close()
+
+    benchmark.pedantic(chiamata, rounds=50, warmup_rounds=5)
+    benchmark.extra_info["queries"] = max(query)
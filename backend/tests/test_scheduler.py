@@ -0,0 +1,72 @@
+"""ScheduleOptimizer: ordine delle tappe nel giro e tempi di viaggio storici"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.services.scheduler import ScheduleOptimizer  # noqa: E402
+
+GIORNO = date(2026, 11, 2)
+DURATE = {1: 120.0, 2: 30.0}
+
+
+def _richiesta(id: int, cliente_id: int, tipo: int, priorita: int = 3) -> dict:
+    return {
+        "id": id,
+        "cliente_id": cliente_id,
+        "tipo_intervento_id": tipo,
+        "tecnico_richiesto_id": None,
+        "priorita_livello": priorita,
+        "sla_scadenza": None,
+        "data_richiesta": datetime(2026, 10, 30),
+        "data_preferita": None,
+    }
+
+
+def _ore(inizio: int, fine: int) -> list:
+    return [datetime.combine(GIORNO, datetime.min.time()) + timedelta(hours=inizio),
+            datetime.combine(GIORNO, datetime.min.time()) + timedelta(hours=fine)]
+
+
+def test_tappa_successiva_non_anticipa_la_precedente():
+    # La prima richiesta (lunga) entra solo nel pomeriggio; la seconda starebbe
+    # nello slot del mattino, ma il viaggio è calcolato dalla prima tappa
+    optimizer = ScheduleOptimizer(
+        richieste=[_richiesta(1, 10, tipo=1, priorita=1), _richiesta(2, 20, tipo=2, priorita=2)],
+        tecnico_ids=[7],
+        giorni=[GIORNO],
+        slot_liberi={(7, GIORNO): [_ore(8, 9), _ore(14, 18)]},
+        posizioni_clienti={10: (45.46, 9.19), 20: (45.50, 9.25)},
+        basi_tecnici={7: (45.48, 9.20)},
+        storico_viaggi=[],
+        tipi_con_viaggio={},
+        durate_medie=DURATE,
+    )
+
+    assegnazioni, non_assegnate = optimizer.solve()
+
+    assert not non_assegnate
+    prima, seconda = sorted(assegnazioni, key=lambda a: a["richiesta_id"])
+    assert prima["data_inizio"] >= _ore(14, 18)[0]
+    assert seconda["data_inizio"] >= prima["data_fine"] + timedelta(minutes=seconda["minuti_viaggio"] - 1)
+
+
+def test_prima_tappa_usa_il_tempo_di_viaggio_storico():
+    optimizer = ScheduleOptimizer(
+        richieste=[_richiesta(1, 10, tipo=2)],
+        tecnico_ids=[7],
+        giorni=[GIORNO],
+        slot_liberi={(7, GIORNO): [_ore(8, 18)]},
+        posizioni_clienti={},
+        basi_tecnici={},
+        storico_viaggi=[(7, 10, 12.0, 45.0)],
+        tipi_con_viaggio={},
+        durate_medie=DURATE,
+    )
+
+    assegnazioni, _ = optimizer.solve()
+
+    assert assegnazioni[0]["km_stimati"] == 12.0
+    assert assegnazioni[0]["minuti_viaggio"] == 45
+    assert assegnazioni[0]["data_inizio"] == _ore(8, 18)[0] + timedelta(minutes=45)
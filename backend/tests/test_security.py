@@ -0,0 +1,49 @@
+"""
+Verifica password fuori dal loop: una raffica di login concorrenti non deve
+fermare le altre coroutine (stessa misura di benchmarks.login_storm, senza
+server né database).
+"""
+import asyncio
+import statistics
+import time
+from typing import List
+
+from app.core.security import get_password_hash, verify_password_async
+
+LOGIN_CONCORRENTI = 16
+INTERVALLO_SONDA = 0.005
+MAX_P95_RITARDO_MS = 50.0
+
+
+async def _sonda(fine: asyncio.Event) -> List[float]:
+    """Lateness (ms) of the loop on a tick every INTERVALLO_SONDA, until fine is set"""
+    ritardi = []
+    previsto = time.perf_counter() + INTERVALLO_SONDA
+    while not fine.is_set():
+        await asyncio.sleep(max(previsto - time.perf_counter(), 0))
+        adesso = time.perf_counter()
+        # Un loop bloccato salta dei tick: contano tutti, non solo il risveglio
+        while previsto <= adesso:
+            ritardi.append((adesso - previsto) * 1000)
+            previsto += INTERVALLO_SONDA
+    return ritardi
+
+
+async def test_verifica_concorrente_non_blocca_il_loop():
+    hash_password = get_password_hash("segreta")
+
+    fine = asyncio.Event()
+    sonda = asyncio.create_task(_sonda(fine))
+    esiti = await asyncio.gather(
+        *(verify_password_async("segreta", hash_password) for _ in range(LOGIN_CONCORRENTI // 2)),
+        *(verify_password_async("segreta", None) for _ in range(LOGIN_CONCORRENTI // 4)),
+        *(verify_password_async("sbagliata", hash_password) for _ in range(LOGIN_CONCORRENTI // 4)),
+    )
+    fine.set()
+    ritardi = await sonda
+
+    assert esiti == [True] * (LOGIN_CONCORRENTI // 2) + [False] * (LOGIN_CONCORRENTI // 2)
+    # Con bcrypt sul loop ogni verifica ferma la sonda per 100-300 ms
+    assert len(ritardi) >= 10
+    p95 = statistics.quantiles(ritardi, n=100, method="inclusive")[94]
+    assert p95 < MAX_P95_RITARDO_MS, f"p95 ritardo del loop {p95:.1f} ms"
@@ -0,0 +1,84 @@
+"""
+Delta sync dell'app mobile: i ticket spostati nell'archivio o riassegnati ad
+un altro tecnico arrivano al client come eliminati.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.lookup import LookupStatiTicket
+from app.models.ticket import Ticket
+from app.models.user import Tecnico
+from app.repositories.archive import ArchiveRepository
+from app.repositories.sync import SyncRepository
+from app.repositories.ticket import TicketRepository
+from app.schemas.ticket import TicketUpdate
+
+
+@pytest.fixture
+def ticket_chiuso(db, tecnico) -> Ticket:
+    stato = LookupStatiTicket(codice="CHIUSO", descrizione="Chiuso", finale=1)
+    db.add(stato)
+    db.flush()
+    chiuso = datetime.utcnow() - timedelta(days=800)
+    ticket = Ticket(
+        numero="T-0001",
+        cliente_id=1,
+        canale_id=1,
+        priorita_id=1,
+        stato_id=stato.id,
+        oggetto="Stampante",
+        tecnico_assegnato_id=tecnico.id,
+        data_chiusura=chiuso,
+        created_at=chiuso,
+        updated_at=chiuso,
+    )
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_ticket_archiviato_consegnato_come_eliminato(db, tecnico, ticket_chiuso, archivio):
+    sync = SyncRepository(db)
+    ticket_id = ticket_chiuso.id
+
+    primo = sync.get_changes(tecnico.id, {}, 100)
+    assert [t.id for t in primo["ticket"]] == [ticket_id]
+    assert primo["eliminati"]["ticket"] == []
+
+    assert ArchiveRepository(db).archivia_ticket(datetime.utcnow() - timedelta(days=730), 100) == 1
+    db.expire_all()
+
+    dopo = sync.get_changes(tecnico.id, primo["cursori"], 100)
+    assert dopo["ticket"] == []
+    assert dopo["eliminati"]["ticket"] == [ticket_id]
+
+    # Token emesso prima del cursore dell'archivio: si parte dal cursore dei ticket
+    vecchio = {k: v for k, v in primo["cursori"].items() if k != "ticket_archiviati"}
+    assert sync.get_changes(tecnico.id, vecchio, 100)["eliminati"]["ticket"] == [ticket_id]
+
+    # Prima sincronizzazione: nessun eliminato da consegnare
+    assert sync.get_changes(tecnico.id, {}, 100)["eliminati"]["ticket"] == []
+
+
+def test_ticket_riassegnato_consegnato_come_eliminato_al_tecnico_precedente(db, tecnico, ticket_chiuso, archivio):
+    collega = Tecnico(username="luca.bianchi", email="luca.bianchi@example.com", hashed_password="x",
+                      nome="Luca", cognome="Bianchi", ruolo_id=1)
+    db.add(collega)
+    db.commit()
+    sync = SyncRepository(db)
+    repo = TicketRepository(db)
+    ticket_id = ticket_chiuso.id
+
+    prima = sync.get_changes(tecnico.id, {}, 100)["cursori"]
+    repo.assign(ticket_chiuso, collega.id)
+
+    dopo = sync.get_changes(tecnico.id, prima, 100)
+    assert dopo["ticket"] == [] and dopo["eliminati"]["ticket"] == [ticket_id]
+    assert [t.id for t in sync.get_changes(collega.id, {}, 100)["ticket"]] == [ticket_id]
+
+    # Riassegnato di nuovo (PATCH) prima della sincronizzazione: torna come dato, non come eliminato
+    repo.update(ticket_chiuso, TicketUpdate(tecnico_assegnato_id=tecnico.id))
+    di_nuovo = sync.get_changes(tecnico.id, prima, 100)
+    assert [t.id for t in di_nuovo["ticket"]] == [ticket_id]
+    assert di_nuovo["eliminati"]["ticket"] == []
@@ -0,0 +1,67 @@
+"""Ticket: eventi SSE pubblicati dalle modifiche e numerazione"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import events
+from app.models.lookup import LookupStatiTicket
+from app.models.ticket import Ticket
+from app.repositories import ticket as ticket_repository
+from app.repositories.archive import ArchiveRepository
+from app.repositories.ticket import TicketRepository
+from app.schemas.ticket import TicketUpdate
+
+
+@pytest.fixture
+def pubblicati(monkeypatch):
+    eventi = []
+    monkeypatch.setattr(
+        ticket_repository.event_broker, "publish", lambda tipo, **payload: eventi.append((tipo, payload))
+    )
+    return eventi
+
+
+@pytest.fixture
+def stati(db):
+    aperto = LookupStatiTicket(codice="APERTO", descrizione="Aperto", finale=0)
+    in_lavorazione = LookupStatiTicket(codice="IN_LAVORAZIONE", descrizione="In lavorazione", finale=0)
+    chiuso = LookupStatiTicket(codice="CHIUSO", descrizione="Chiuso", finale=1)
+    db.add_all([aperto, in_lavorazione, chiuso])
+    db.commit()
+    return {"aperto": aperto.id, "in_lavorazione": in_lavorazione.id, "chiuso": chiuso.id}
+
+
+@pytest.fixture
+def ticket(db, stati) -> Ticket:
+    ticket = Ticket(numero="T-0001", cliente_id=1, canale_id=1, priorita_id=1, stato_id=stati["aperto"],
+                    oggetto="Stampante")
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def test_patch_pubblica_assegnazione_e_chiusura(db, tecnico, ticket, stati, pubblicati):
+    repo = TicketRepository(db)
+
+    repo.update(ticket, TicketUpdate(oggetto="Stampante guasta", stato_id=stati["in_lavorazione"]))
+    assert pubblicati == []
+
+    repo.update(ticket, TicketUpdate(tecnico_assegnato_id=tecnico.id))
+    assert [(t, p["tecnico_id"]) for t, p in pubblicati] == [(events.TICKET_ASSIGNED, tecnico.id)]
+
+    pubblicati.clear()
+    repo.update(ticket, TicketUpdate(stato_id=stati["chiuso"]))
+    assert [(t, p["ticket_id"]) for t, p in pubblicati] == [(events.TICKET_CLOSED, ticket.id)]
+
+
+def test_numero_non_riusa_ticket_archiviati(db, stati, archivio):
+    anno = datetime.utcnow().year
+    chiuso = datetime.utcnow() - timedelta(days=800)
+    db.add(Ticket(numero=f"TK-{anno}-00007", cliente_id=1, canale_id=1, priorita_id=1, stato_id=stati["chiuso"],
+                  oggetto="Stampante", data_chiusura=chiuso, created_at=chiuso, updated_at=chiuso))
+    db.add(Ticket(numero=f"TK-{anno}-00003", cliente_id=1, canale_id=1, priorita_id=1, stato_id=stati["aperto"],
+                  oggetto="Monitor"))
+    db.commit()
+
+    assert ArchiveRepository(db).archivia_ticket(datetime.utcnow() - timedelta(days=730), 100) == 1
+    assert TicketRepository(db)._generate_ticket_number() == f"TK-{anno}-00008"
@@ -0,0 +1,98 @@
+"""
+Rollup giornaliero del carico dei tecnici: gli aggiornamenti incrementali
+di sessioni e interventi devono coincidere con rebuild().
+
+L'upsert del rollup è specifico di PostgreSQL (pg_session_factory).
+"""
+from datetime import date, time
+
+import pytest
+
+from app.models.client import CacheClienti
+from app.models.intervention import Intervento, TecnicoCaricoGiornaliero
+from app.models.lookup import (
+    LookupOriginiIntervento,
+    LookupRuoliUtente,
+    LookupStatiIntervento,
+    LookupTipiIntervento,
+)
+from app.models.user import Tecnico
+from app.repositories.intervention import InterventionRepository
+from app.repositories.workload import WorkloadRepository
+from app.schemas.intervention import SessioneCreate, SessioneUpdate
+
+
+@pytest.fixture
+def pg_db(pg_session_factory):
+    db = pg_session_factory()
+    db.add_all([
+        LookupRuoliUtente(id=1, codice="TECNICO", descrizione="Tecnico"),
+        LookupOriginiIntervento(id=1, codice="TICKET", descrizione="Ticket"),
+        LookupTipiIntervento(id=1, codice="ONSITE", descrizione="On site"),
+        LookupStatiIntervento(id=1, codice="APERTO", descrizione="Aperto"),
+        CacheClienti(id=1, codice_gestionale="C0001", ragione_sociale="Cliente"),
+    ])
+    db.flush()
+    yield db
+    db.close()
+
+
+def _intervento(db, numero: str, tecnico_id: int) -> Intervento:
+    intervento = Intervento(
+        numero=numero,
+        origine_id=1,
+        cliente_id=1,
+        tipo_intervento_id=1,
+        stato_id=1,
+        tecnico_id=tecnico_id,
+        oggetto="Manutenzione",
+    )
+    db.add(intervento)
+    db.commit()
+    return intervento
+
+
+def _sessione(giorno: int, ora_inizio: int, ora_fine: int, km: float) -> SessioneCreate:
+    return SessioneCreate(
+        data=date(2026, 11, giorno),
+        ora_inizio=time(ora_inizio),
+        ora_fine=time(ora_fine),
+        tipo_intervento_id=1,
+        km_percorsi=km,
+        tempo_viaggio_minuti=30,
+    )
+
+
+def _rollup(db) -> dict:
+    db.expire_all()
+    return {
+        (r.tecnico_id, r.data): (r.minuti_lavoro, r.minuti_viaggio, float(r.km_percorsi), r.sessioni)
+        for r in db.query(TecnicoCaricoGiornaliero).filter(TecnicoCaricoGiornaliero.sessioni != 0)
+    }
+
+
+def test_rollup_incrementale_coincide_con_rebuild(pg_db):
+    tecnico = Tecnico(username="mario.rossi", email="mario.rossi@example.com", hashed_password="x",
+                      nome="Mario", cognome="Rossi", ruolo_id=1)
+    pg_db.add(tecnico)
+    pg_db.commit()
+    repo = InterventionRepository(pg_db)
+    primo = _intervento(pg_db, "INT-2026-0001", tecnico.id)
+    secondo = _intervento(pg_db, "INT-2026-0002", tecnico.id)
+
+    a = repo.add_sessione(primo.id, tecnico.id, _sessione(2, 8, 10, 12.5))
+    b = repo.add_sessione(primo.id, tecnico.id, _sessione(2, 11, 12, 4))
+    c = repo.add_sessione(secondo.id, tecnico.id, _sessione(2, 14, 17, 20))
+    repo.add_sessione(secondo.id, tecnico.id, _sessione(3, 9, 12, 7))
+
+    # Spostata ad un altro giorno e accorciata
+    repo.update_sessione(a.id, SessioneUpdate(data=date(2026, 11, 4), ora_fine=time(9)))
+    repo.delete_sessione(b.id)
+    repo.update_sessione(c.id, SessioneUpdate(km_percorsi=18))
+    repo.delete(repo.get_by_id(secondo.id))
+
+    incrementale = _rollup(pg_db)
+    assert incrementale == {(tecnico.id, date(2026, 11, 4)): (60, 30, 12.5, 1)}
+
+    WorkloadRepository(pg_db).rebuild()
+    assert _rollup(pg_db) == incrementale
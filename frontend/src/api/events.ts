@@ -0,0 +1,91 @@
+// Server-Sent Events: aggiornamenti in tempo reale di ticket e interventi
+import apiClient from './client';
+
+export type EventTipo =
+  | 'ticket.created'
+  | 'ticket.assigned'
+  | 'ticket.closed'
+  | 'intervention.started'
+  | 'intervention.completed'
+  | 'resync';
+
+export interface LiveEvent {
+  tipo: EventTipo;
+  timestamp?: string;
+  ticket_id?: number;
+  intervento_id?: number;
+  numero?: string;
+  cliente_id?: number;
+  stato_id?: number;
+  tecnico_id?: number | null;
+}
+
+export interface EventStreamOptions {
+  soloMiei?: boolean;
+  tipi?: EventTipo[];
+}
+
+const EVENT_TYPES: EventTipo[] = [
+  'ticket.created',
+  'ticket.assigned',
+  'ticket.closed',
+  'intervention.started',
+  'intervention.completed',
+  'resync',
+];
+
+const RECONNECT_DELAY_MS = 5000;
+
+export const eventsApi = {
+  // Returns a function that closes the stream
+  subscribe: (onEvent: (event: LiveEvent) => void, options: EventStreamOptions = {}) => {
+    let source: EventSource | null = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const handler = (e: MessageEvent) => {
+      try {
+        onEvent(JSON.parse(e.data) as LiveEvent);
+      } catch (error) {
+        console.error('Invalid event payload:', error);
+      }
+    };
+
+    const scheduleReconnect = () => {
+      if (!closed) reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+    };
+
+    // EventSource non invia header: l'access token resta fuori dall'URL (e dai
+    // log), lo stream si apre con un ticket breve chiesto a ogni connessione
+    const connect = async () => {
+      try {
+        const response = await apiClient.post<{ ticket: string }>('/events/ticket');
+        if (closed) return;
+
+        const params = new URLSearchParams({ ticket: response.data.ticket });
+        if (options.soloMiei) params.set('solo_miei', 'true');
+        if (options.tipi?.length) params.set('tipi', options.tipi.join(','));
+
+        source = new EventSource(`/api/v1/events?${params.toString()}`);
+        EVENT_TYPES.forEach((tipo) => source!.addEventListener(tipo, handler as EventListener));
+        // La riconnessione automatica riuserebbe il ticket scaduto
+        source.onerror = () => {
+          source?.close();
+          source = null;
+          scheduleReconnect();
+        };
+      } catch (error) {
+        console.error('Failed to open event stream:', error);
+        scheduleReconnect();
+      }
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
+      source?.close();
+    };
+  },
+};
@@ -2,6 +2,10 @@ import { useState, useEffect } from 'react';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/Card';
 import { Ticket, Wrench, CheckCircle, Clock, MapPin, TrendingUp } from 'lucide-react';
 import { dashboardApi, type DashboardData } from '@/api/dashboard';
+import { eventsApi } from '@/api/events';
+
+const RELOAD_DELAY_MS = 3000;
+const RELOAD_JITTER_MS = 2000;
 
 export default function Dashboard() {
   const [dashboardData, setDashboardData] = useState<DashboardData | null>(null);
@@ -11,9 +15,27 @@ export default function Dashboard() {
     loadDashboardData();
   }, []);
 
-  const loadDashboardData = async () => {
+  // Refresh stats when tickets or interventions change. Events are coalesced:
+  // the first one schedules a single reload, the ones arriving meanwhile reuse
+  // it. The random part spreads the reloads of all open dashboards.
+  useEffect(() => {
+    let reloadTimer: ReturnType<typeof setTimeout> | undefined;
+    const unsubscribe = eventsApi.subscribe(() => {
+      if (reloadTimer !== undefined) return;
+      reloadTimer = setTimeout(() => {
+        reloadTimer = undefined;
+        loadDashboardData(false);
+      }, RELOAD_DELAY_MS + Math.random() * RELOAD_JITTER_MS);
+    });
+    return () => {
+      clearTimeout(reloadTimer);
+      unsubscribe();
+    };
+  }, []);
+
+  const loadDashboardData = async (showLoading = true) => {
     try {
-      setLoading(true);
+      if (showLoading) setLoading(true);
       const data = await dashboardApi.getData();
       setDashboardData(data);
     } catch (error) {
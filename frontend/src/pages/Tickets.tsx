@@ -9,6 +9,7 @@ import { ticketsApi, type Ticket, type TicketFilters } from '@/api/tickets';
 import { lookupApi, type State, type Priority } from '@/api/lookup';
 import { clientiApi, type Cliente } from '@/api/clients';
 import { authApi, type Tecnico } from '@/api/auth';
+import { eventsApi } from '@/api/events';
 import TicketCreateForm from '@/components/TicketCreateForm';
 
 export default function Tickets() {
@@ -39,6 +40,18 @@ export default function Tickets() {
     loadTickets();
   }, [page, filters]);
 
+  // Reload on live ticket changes instead of polling
+  useEffect(() => {
+    return eventsApi.subscribe(
+      (event) => {
+        if (event.tipo.startsWith('ticket.') || event.tipo === 'resync') {
+          loadTickets();
+        }
+      },
+      { tipi: ['ticket.created', 'ticket.assigned', 'ticket.closed'] }
+    );
+  }, [page, filters]);
+
   const loadFilterOptions = async () => {
     try {
       const [statiData, prioritaData, clientiData, tecniciData] = await Promise.all([